@@ -13,14 +13,29 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/4/6 14:21
 # @Desc    : 异步Aiomysql的增删改查封装
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Sequence, Tuple, Union
 
 import aiomysql
 
 
+def group_items_by_fields(items: List[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[List[Any]]]:
+    """
+    按字段集合对记录分组，同一组内的记录可以用同一条 executemany 语句写入
+    :param items: 记录列表
+    :return: {字段元组: [每条记录的值列表, ...]}
+    """
+    groups: Dict[Tuple[str, ...], List[List[Any]]] = {}
+    for item in items:
+        fields = tuple(item.keys())
+        groups.setdefault(fields, []).append([item[field] for field in fields])
+    return groups
+
+
 class AsyncMysqlDB:
     def __init__(self, pool: aiomysql.Pool) -> None:
         self.__pool = pool
+        # key: (表名, 冲突字段), value: 冲突字段上是否存在唯一索引
+        self.__unique_key_cache: Dict[Tuple[str, Tuple[str, ...]], bool] = {}
 
     async def query(self, sql: str, *args: Union[str, int]) -> List[Dict[str, Any]]:
         """
@@ -105,3 +120,126 @@ class AsyncMysqlDB:
             async with conn.cursor() as cur:
                 rows = await cur.execute(sql, args)
                 return rows
+
+    async def has_unique_key(self, table_name: str, key_fields: Sequence[str]) -> bool:
+        """
+        判断表中是否存在恰好由 key_fields 组成的唯一索引，结果会被缓存
+        :param table_name: 表名
+        :param key_fields: 字段列表
+        :return:
+        """
+        cache_key = (table_name, tuple(key_fields))
+        if cache_key not in self.__unique_key_cache:
+            rows = await self.query(f"SHOW INDEX FROM `{table_name}` WHERE Non_unique = 0")
+            unique_indexes: Dict[str, set] = {}
+            for row in rows:
+                unique_indexes.setdefault(row["Key_name"], set()).add(row["Column_name"])
+            self.__unique_key_cache[cache_key] = set(key_fields) in unique_indexes.values()
+        return self.__unique_key_cache[cache_key]
+
+    async def table_exists(self, table_name: str) -> bool:
+        """
+        判断表是否存在
+        :param table_name: 表名
+        :return:
+        """
+        # SHOW TABLES LIKE 会把表名中的 _ 当作通配符，这里按表名精确匹配
+        return await self.get_first(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+            table_name,
+        ) is not None
+
+    async def add_unique_key(self, table_name: str, key_fields: Sequence[str], index_name: str) -> int:
+        """
+        删除 key_fields 重复的记录（保留 id 最大即最新写入的一条），然后在 key_fields 上加唯一索引
+        :param table_name: 表名
+        :param key_fields: 字段列表
+        :param index_name: 唯一索引名
+        :return: 删除的重复记录数
+        """
+        join_condition = " AND ".join(f"t1.`{field}` = t2.`{field}`" for field in key_fields)
+        deleted_rows = await self.execute(
+            f"DELETE t1 FROM `{table_name}` t1 JOIN `{table_name}` t2 ON {join_condition} AND t1.`id` < t2.`id`"
+        )
+        key_fields_str = ", ".join(f"`{field}`" for field in key_fields)
+        await self.execute(f"ALTER TABLE `{table_name}` ADD UNIQUE KEY `{index_name}` ({key_fields_str})")
+        self.__unique_key_cache[(table_name, tuple(key_fields))] = True
+        return deleted_rows
+
+    async def upsert_many(self, table_name: str, items: List[Dict[str, Any]], conflict_key: Union[str, Sequence[str]],
+                          insert_only_fields: Sequence[str] = ("add_ts",)) -> int:
+        """
+        批量写入记录，已存在（conflict_key 相同）的记录则更新
+        conflict_key 上有唯一索引时使用 INSERT ... ON DUPLICATE KEY UPDATE，一组记录只需要一条语句；
+        老的表结构没有唯一索引时，先一次查询出已存在的记录，再分别批量插入和更新
+        :param table_name: 表名
+        :param items: 记录列表
+        :param conflict_key: 判断记录是否重复的字段，联合唯一时传字段列表
+        :param insert_only_fields: 只在插入时写入、更新时保持原值的字段
+        :return: 受影响的行数
+        """
+        if not items:
+            return 0
+        key_fields = [conflict_key] if isinstance(conflict_key, str) else list(conflict_key)
+        if await self.has_unique_key(table_name, key_fields):
+            return await self.__upsert_by_unique_key(table_name, items, key_fields, insert_only_fields)
+        return await self.__upsert_by_query(table_name, items, key_fields, insert_only_fields)
+
+    async def __upsert_by_unique_key(self, table_name: str, items: List[Dict[str, Any]], key_fields: List[str],
+                                     insert_only_fields: Sequence[str]) -> int:
+        rows = 0
+        async with self.__pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                for fields, values_list in group_items_by_fields(items).items():
+                    fieldstr = ','.join(f'`{field}`' for field in fields)
+                    valstr = ','.join(['%s'] * len(fields))
+                    update_fields = [f for f in fields if f not in key_fields and f not in insert_only_fields]
+                    if update_fields:
+                        updatestr = ','.join(f'`{field}`=VALUES(`{field}`)' for field in update_fields)
+                        sql = f"INSERT INTO {table_name} ({fieldstr}) VALUES({valstr}) ON DUPLICATE KEY UPDATE {updatestr}"
+                    else:
+                        sql = f"INSERT IGNORE INTO {table_name} ({fieldstr}) VALUES({valstr})"
+                    # aiomysql 会把 INSERT ... VALUES 的 executemany 改写为一条多行插入语句
+                    rows += await cur.executemany(sql, values_list)
+        return rows
+
+    async def __upsert_by_query(self, table_name: str, items: List[Dict[str, Any]], key_fields: List[str],
+                                insert_only_fields: Sequence[str]) -> int:
+        key_str = ','.join(f'`{field}`' for field in key_fields)
+        key_values = list({tuple(item.get(field) for field in key_fields) for item in items})
+        placeholders = ','.join(['(' + ','.join(['%s'] * len(key_fields)) + ')'] * len(key_values))
+        args = [value for key_value in key_values for value in key_value]
+        existed_rows = await self.query(f"SELECT {key_str} FROM {table_name} WHERE ({key_str}) IN ({placeholders})", *args)
+        existed_keys = {tuple(str(row[field]) for field in key_fields) for row in existed_rows}
+
+        new_items, old_items = [], []
+        for item in items:
+            item_key = tuple(str(item.get(field)) for field in key_fields)
+            if item_key in existed_keys:
+                old_items.append(item)
+            else:
+                new_items.append(item)
+                # 同一批中重复的记录，第一条插入，后面的作为更新处理
+                existed_keys.add(item_key)
+
+        rows = 0
+        async with self.__pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                for fields, values_list in group_items_by_fields(new_items).items():
+                    fieldstr = ','.join(f'`{field}`' for field in fields)
+                    valstr = ','.join(['%s'] * len(fields))
+                    rows += await cur.executemany(f"INSERT INTO {table_name} ({fieldstr}) VALUES({valstr})", values_list)
+
+                update_items = [{k: v for k, v in item.items() if k not in insert_only_fields} for item in old_items]
+                for fields, values_list in group_items_by_fields(update_items).items():
+                    update_fields = [f for f in fields if f not in key_fields]
+                    if not update_fields:
+                        continue
+                    updatestr = ','.join(f'`{field}`=%s' for field in update_fields)
+                    wherestr = ' AND '.join(f'`{field}`=%s' for field in key_fields)
+                    args_list = [
+                        [dict(zip(fields, values))[f] for f in update_fields + key_fields]
+                        for values in values_list
+                    ]
+                    rows += await cur.executemany(f"UPDATE {table_name} SET {updatestr} WHERE {wherestr}", args_list)
+        return rows
@@ -13,14 +13,97 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/4/6 14:21
 # @Desc    : 异步SQLite的增删改查封装
-from typing import Any, Dict, List, Union
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import aiosqlite
 
+from async_db import group_items_by_fields
+from tools import utils
+
 
 class AsyncSqliteDB:
-    def __init__(self, db_path: str) -> None:
+    def __init__(self, db_path: str, commit_batch_size: int = 500, commit_interval: float = 1.0) -> None:
+        """
+        整个进程复用同一个 SQLite 连接（aiosqlite 会把所有语句串行交给同一个后台线程执行，即唯一的写入者），
+        写操作不会每条都提交，而是累计到 commit_batch_size 条或者距离上次提交超过 commit_interval 秒时合并提交
+        :param db_path: 数据库文件路径
+        :param commit_batch_size: 累计多少行写入后提交一次事务
+        :param commit_interval: 两次事务提交之间的最大间隔（秒）
+        """
         self.__db_path = db_path
+        self.__commit_batch_size = commit_batch_size
+        self.__commit_interval = commit_interval
+        self.__conn: Optional[aiosqlite.Connection] = None
+        self.__connect_lock: Optional[asyncio.Lock] = None
+        self.__commit_task: Optional[asyncio.Task] = None
+        self.__pending_rows = 0
+        self.__last_commit_time = time.monotonic()
+        # key: (表名, 冲突字段), value: 冲突字段上是否存在唯一索引
+        self.__unique_key_cache: Dict[Tuple[str, Tuple[str, ...]], bool] = {}
+
+    async def connect(self) -> aiosqlite.Connection:
+        """
+        打开长连接并设置 WAL 等 pragma，重复调用直接返回已打开的连接
+        :return:
+        """
+        if self.__conn is not None:
+            return self.__conn
+        if self.__connect_lock is None:
+            self.__connect_lock = asyncio.Lock()
+        async with self.__connect_lock:
+            if self.__conn is None:
+                conn = await aiosqlite.connect(self.__db_path)
+                conn.row_factory = aiosqlite.Row
+                await conn.execute("PRAGMA journal_mode=WAL")
+                # WAL 模式下 NORMAL 不会损坏数据库，只有掉电时可能丢失最后一次提交
+                await conn.execute("PRAGMA synchronous=NORMAL")
+                await conn.execute("PRAGMA cache_size=-64000")
+                await conn.execute("PRAGMA temp_store=MEMORY")
+                await conn.execute("PRAGMA busy_timeout=5000")
+                self.__conn = conn
+                self.__last_commit_time = time.monotonic()
+                self.__commit_task = asyncio.create_task(self.__commit_periodically())
+        return self.__conn
+
+    async def close(self) -> None:
+        """
+        提交未提交的写入并关闭连接
+        :return:
+        """
+        if self.__commit_task is not None:
+            self.__commit_task.cancel()
+            self.__commit_task = None
+        if self.__conn is not None:
+            await self.commit()
+            await self.__conn.close()
+            self.__conn = None
+
+    async def commit(self) -> None:
+        """
+        立即提交当前事务中累计的写入
+        :return:
+        """
+        if self.__conn is None:
+            return
+        self.__pending_rows = 0
+        self.__last_commit_time = time.monotonic()
+        await self.__conn.commit()
+
+    async def __after_write(self, rows: int) -> None:
+        self.__pending_rows += max(rows, 1)
+        if self.__pending_rows >= self.__commit_batch_size:
+            await self.commit()
+
+    async def __commit_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.__commit_interval)
+            if self.__pending_rows and time.monotonic() - self.__last_commit_time >= self.__commit_interval:
+                try:
+                    await self.commit()
+                except Exception as e:
+                    utils.logger.error(f"[AsyncSqliteDB.__commit_periodically] commit failed: {e}")
 
     async def query(self, sql: str, *args: Union[str, int]) -> List[Dict[str, Any]]:
         """
@@ -29,11 +112,10 @@ class AsyncSqliteDB:
         :param args: sql中传递动态参数列表
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            conn.row_factory = aiosqlite.Row
-            async with conn.execute(sql, args) as cursor:
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows] if rows else []
+        conn = await self.connect()
+        async with conn.execute(sql, args) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows] if rows else []
 
     async def get_first(self, sql: str, *args: Union[str, int]) -> Union[Dict[str, Any], None]:
         """
@@ -42,11 +124,10 @@ class AsyncSqliteDB:
         :param args:sql中传递动态参数列表
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            conn.row_factory = aiosqlite.Row
-            async with conn.execute(sql, args) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
+        conn = await self.connect()
+        async with conn.execute(sql, args) as cursor:
+            row = await cursor.fetchone()
+            return dict(row) if row else None
 
     async def item_to_table(self, table_name: str, item: Dict[str, Any]) -> int:
         """
@@ -60,10 +141,11 @@ class AsyncSqliteDB:
         fieldstr = ','.join(fields)
         valstr = ','.join(['?'] * len(item))
         sql = f"INSERT INTO {table_name} ({fieldstr}) VALUES({valstr})"
-        async with aiosqlite.connect(self.__db_path) as conn:
-            async with conn.execute(sql, values) as cursor:
-                await conn.commit()
-                return cursor.lastrowid
+        conn = await self.connect()
+        async with conn.execute(sql, values) as cursor:
+            lastrowid = cursor.lastrowid
+        await self.__after_write(1)
+        return lastrowid
 
     async def update_table(self, table_name: str, updates: Dict[str, Any], field_where: str,
                            value_where: Union[str, int, float]) -> int:
@@ -83,10 +165,11 @@ class AsyncSqliteDB:
         upsets_str = ','.join(upsets)
         values.append(value_where)
         sql = f'UPDATE {table_name} SET {upsets_str} WHERE {field_where}=?'
-        async with aiosqlite.connect(self.__db_path) as conn:
-            async with conn.execute(sql, values) as cursor:
-                await conn.commit()
-                return cursor.rowcount
+        conn = await self.connect()
+        async with conn.execute(sql, values) as cursor:
+            rowcount = cursor.rowcount
+        await self.__after_write(rowcount)
+        return rowcount
 
     async def execute(self, sql: str, *args: Union[str, int]) -> int:
         """
@@ -95,10 +178,11 @@ class AsyncSqliteDB:
         :param args:
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            async with conn.execute(sql, args) as cursor:
-                await conn.commit()
-                return cursor.rowcount
+        conn = await self.connect()
+        async with conn.execute(sql, args) as cursor:
+            rowcount = cursor.rowcount
+        await self.__after_write(rowcount)
+        return rowcount
 
     async def executescript(self, sql_script: str) -> None:
         """
@@ -106,6 +190,136 @@ class AsyncSqliteDB:
         :param sql_script: SQL脚本内容
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            await conn.executescript(sql_script)
-            await conn.commit()
\ No newline at end of file
+        conn = await self.connect()
+        await conn.executescript(sql_script)
+        await self.commit()
+
+    async def has_unique_key(self, table_name: str, key_fields: Sequence[str]) -> bool:
+        """
+        判断表中是否存在恰好由 key_fields 组成的唯一索引，结果会被缓存
+        :param table_name: 表名
+        :param key_fields: 字段列表
+        :return:
+        """
+        cache_key = (table_name, tuple(key_fields))
+        if cache_key not in self.__unique_key_cache:
+            has_unique = False
+            for index in await self.query(f"PRAGMA index_list({table_name})"):
+                if not index["unique"]:
+                    continue
+                index_columns = await self.query(f"PRAGMA index_info({index['name']})")
+                if {column["name"] for column in index_columns} == set(key_fields):
+                    has_unique = True
+                    break
+            self.__unique_key_cache[cache_key] = has_unique
+        return self.__unique_key_cache[cache_key]
+
+    async def table_exists(self, table_name: str) -> bool:
+        """
+        判断表是否存在
+        :param table_name: 表名
+        :return:
+        """
+        return await self.get_first("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", table_name) is not None
+
+    async def add_unique_key(self, table_name: str, key_fields: Sequence[str], index_name: str) -> int:
+        """
+        删除 key_fields 重复的记录（保留 id 最大即最新写入的一条），然后在 key_fields 上加唯一索引
+        :param table_name: 表名
+        :param key_fields: 字段列表
+        :param index_name: 唯一索引名
+        :return: 删除的重复记录数
+        """
+        match_condition = " AND ".join(f"t2.{field} = {table_name}.{field}" for field in key_fields)
+        deleted_rows = await self.execute(
+            f"DELETE FROM {table_name} WHERE EXISTS "
+            f"(SELECT 1 FROM {table_name} t2 WHERE {match_condition} AND t2.id > {table_name}.id)"
+        )
+        await self.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table_name}({', '.join(key_fields)})")
+        await self.commit()
+        self.__unique_key_cache[(table_name, tuple(key_fields))] = True
+        return deleted_rows
+
+    async def upsert_many(self, table_name: str, items: List[Dict[str, Any]], conflict_key: Union[str, Sequence[str]],
+                          insert_only_fields: Sequence[str] = ("add_ts",)) -> int:
+        """
+        批量写入记录，已存在（conflict_key 相同）的记录则更新
+        conflict_key 上有唯一索引时使用 INSERT ... ON CONFLICT DO UPDATE；
+        老的表结构没有唯一索引时，先一次查询出已存在的记录，再分别批量插入和更新
+        :param table_name: 表名
+        :param items: 记录列表
+        :param conflict_key: 判断记录是否重复的字段，联合唯一时传字段列表
+        :param insert_only_fields: 只在插入时写入、更新时保持原值的字段
+        :return: 受影响的行数
+        """
+        if not items:
+            return 0
+        key_fields = [conflict_key] if isinstance(conflict_key, str) else list(conflict_key)
+        if await self.has_unique_key(table_name, key_fields):
+            statements = self.__build_upsert_statements(table_name, items, key_fields, insert_only_fields)
+        else:
+            statements = await self.__build_query_upsert_statements(table_name, items, key_fields, insert_only_fields)
+
+        rows = 0
+        conn = await self.connect()
+        for sql, args_list in statements:
+            async with conn.executemany(sql, args_list) as cursor:
+                rows += max(cursor.rowcount, 0)
+        await self.__after_write(rows)
+        return rows
+
+    @staticmethod
+    def __build_upsert_statements(table_name: str, items: List[Dict[str, Any]], key_fields: List[str],
+                                  insert_only_fields: Sequence[str]) -> List[Tuple[str, List[List[Any]]]]:
+        statements = []
+        conflict_str = ','.join(key_fields)
+        for fields, values_list in group_items_by_fields(items).items():
+            fieldstr = ','.join(fields)
+            valstr = ','.join(['?'] * len(fields))
+            update_fields = [f for f in fields if f not in key_fields and f not in insert_only_fields]
+            if update_fields:
+                updatestr = ','.join(f'{field}=excluded.{field}' for field in update_fields)
+                sql = f"INSERT INTO {table_name} ({fieldstr}) VALUES({valstr}) ON CONFLICT({conflict_str}) DO UPDATE SET {updatestr}"
+            else:
+                sql = f"INSERT INTO {table_name} ({fieldstr}) VALUES({valstr}) ON CONFLICT({conflict_str}) DO NOTHING"
+            statements.append((sql, values_list))
+        return statements
+
+    async def __build_query_upsert_statements(self, table_name: str, items: List[Dict[str, Any]], key_fields: List[str],
+                                              insert_only_fields: Sequence[str]) -> List[Tuple[str, List[List[Any]]]]:
+        key_str = ','.join(key_fields)
+        key_values = list({tuple(item.get(field) for field in key_fields) for item in items})
+        placeholders = ','.join(['(' + ','.join(['?'] * len(key_fields)) + ')'] * len(key_values))
+        args = [value for key_value in key_values for value in key_value]
+        existed_rows = await self.query(f"SELECT {key_str} FROM {table_name} WHERE ({key_str}) IN ({placeholders})", *args)
+        existed_keys = {tuple(str(row[field]) for field in key_fields) for row in existed_rows}
+
+        new_items, old_items = [], []
+        for item in items:
+            item_key = tuple(str(item.get(field)) for field in key_fields)
+            if item_key in existed_keys:
+                old_items.append(item)
+            else:
+                new_items.append(item)
+                # 同一批中重复的记录，第一条插入，后面的作为更新处理
+                existed_keys.add(item_key)
+
+        statements = []
+        for fields, values_list in group_items_by_fields(new_items).items():
+            fieldstr = ','.join(fields)
+            valstr = ','.join(['?'] * len(fields))
+            statements.append((f"INSERT INTO {table_name} ({fieldstr}) VALUES({valstr})", values_list))
+
+        update_items = [{k: v for k, v in item.items() if k not in insert_only_fields} for item in old_items]
+        for fields, values_list in group_items_by_fields(update_items).items():
+            update_fields = [f for f in fields if f not in key_fields]
+            if not update_fields:
+                continue
+            updatestr = ','.join(f'{field}=?' for field in update_fields)
+            wherestr = ' AND '.join(f'{field}=?' for field in key_fields)
+            args_list = [
+                [dict(zip(fields, values))[f] for f in update_fields + key_fields]
+                for values in values_list
+            ]
+            statements.append((f"UPDATE {table_name} SET {updatestr} WHERE {wherestr}", args_list))
+        return statements
@@ -8,11 +8,21 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
+import asyncio
+import random
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
 
+import httpx
 from playwright.async_api import BrowserContext, BrowserType, Playwright
 
+import config
+from config import PlatformSettings, get_platform_settings
+from tools import utils
+from tools.concurrency_controller import ConcurrencyController
+from tools.rate_limiter import AdaptiveRateLimiter
+
 
 class AbstractCrawler(ABC):
 
@@ -90,6 +100,19 @@ class AbstractStore(ABC):
     async def store_creator(self, creator: Dict):
         pass
 
+    # 批量存储接口，默认逐条调用单条存储接口，各存储实现类可覆盖为一次性写入
+    async def store_contents(self, content_items: List[Dict]):
+        for content_item in content_items:
+            await self.store_content(content_item)
+
+    async def store_comments(self, comment_items: List[Dict]):
+        for comment_item in comment_items:
+            await self.store_comment(comment_item)
+
+    async def store_creators(self, creators: List[Dict]):
+        for creator in creators:
+            await self.store_creator(creator)
+
 
 class AbstractStoreImage(ABC):
     # TODO: support all platform
@@ -107,7 +130,50 @@ class AbstractStoreVideo(ABC):
         pass
 
 
+class RetryableRequestError(Exception):
+    """可以重试的请求错误，由各平台的响应校验函数抛出，例如请求被限流、服务端临时错误"""
+
+
+class RequestRetryError(Exception):
+    """可重试的错误在达到最大重试次数、请求截止时间或者重试预算用完后仍然失败，__cause__ 为最后一次的错误"""
+
+
+class RetryBudget:
+    """
+    重试预算（令牌桶），限制一个客户端的重试总量，避免平台大面积故障时每个请求都重试到上限
+    每次重试消耗一个令牌，每次请求成功返还 refill_per_success 个令牌，令牌数不超过 max_tokens
+    """
+
+    def __init__(self, max_tokens: float = 20, refill_per_success: float = 0.1):
+        self._max_tokens = max_tokens
+        self._refill_per_success = refill_per_success
+        self._tokens = max_tokens
+
+    def on_success(self):
+        self._tokens = min(self._max_tokens, self._tokens + self._refill_per_success)
+
+    def try_acquire(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
 class AbstractApiClient(ABC):
+    # 平台的配置，各平台客户端在创建时传入，重试策略、重试预算、限流器和并发控制器都从这里读取配置
+    settings: PlatformSettings
+    # 请求重试策略，各平台可以按需覆盖，为 None 时在每次请求时读取 settings 中对应的配置
+    retry_max_attempts: Optional[int] = None  # REQUEST_RETRY_MAX_ATTEMPTS
+    retry_base_delay: Optional[float] = None  # REQUEST_RETRY_BASE_DELAY_SEC
+    retry_max_delay: Optional[float] = None  # REQUEST_RETRY_MAX_DELAY_SEC
+    request_deadline: Optional[float] = None  # REQUEST_DEADLINE_SEC
+    # 单次请求的最短超时时间（秒），避免临近截止时间时超时被截断为 0 或负数
+    min_attempt_timeout: float = 1.0
+    # 需要重试的 HTTP 状态码（限流、服务端临时错误）
+    retry_status_codes = (429, 500, 502, 503, 504)
+    # 触发风控的 HTTP 状态码和错误类型，出现时限流器会降低该域名的请求速率
+    rate_limit_penalty_status_codes = (403, 429, 461, 471)
+    rate_limit_penalty_errors: Tuple[Type[Exception], ...] = ()
 
     @abstractmethod
     async def request(self, method, url, **kwargs):
@@ -116,3 +182,151 @@ class AbstractApiClient(ABC):
     @abstractmethod
     async def update_cookies(self, browser_context: BrowserContext):
         pass
+
+    def get_settings(self) -> PlatformSettings:
+        # 没有传入平台配置的客户端（例如测试中的客户端）读取全局配置中当前平台的配置
+        if getattr(self, "settings", None) is None:
+            self.settings = get_platform_settings(config.PLATFORM)
+        return self.settings
+
+    @property
+    def retry_budget(self) -> RetryBudget:
+        # 各平台客户端的 __init__ 没有调用父类的初始化方法，这里在第一次使用时创建
+        if getattr(self, "_retry_budget", None) is None:
+            self._retry_budget = RetryBudget(max_tokens=self.get_settings().REQUEST_RETRY_BUDGET)
+        return self._retry_budget
+
+    @property
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        if getattr(self, "_rate_limiter", None) is None:
+            self._rate_limiter = AdaptiveRateLimiter.for_platform(self.get_settings())
+        return self._rate_limiter
+
+    @property
+    def concurrency(self) -> ConcurrencyController:
+        # 爬虫创建客户端后会注入平台的并发控制器，没有注入时使用客户端所属平台的控制器
+        if getattr(self, "_concurrency", None) is None:
+            settings = self.get_settings()
+            self._concurrency = ConcurrencyController.for_platform(settings.PLATFORM, settings)
+        return self._concurrency
+
+    @concurrency.setter
+    def concurrency(self, controller: ConcurrencyController):
+        self._concurrency = controller
+
+    async def gather_sub_comment_threads(self, handler: Callable[[Any], Awaitable[List[Dict]]],
+                                         root_comments: List[Any]) -> List[Dict]:
+        """
+        并发获取多个一级评论下的二级评论
+        - 不同一级评论的二级评论互不依赖，每个一级评论一个任务，同时执行的任务数受并发控制器 api 额度的限制
+        - 同一个一级评论下的分页依赖上一页的游标，由 handler 按顺序获取
+        - 调用方持有 comment 额度，这里使用 api 额度，避免同一额度嵌套获取导致死锁
+        Args:
+            handler: 获取一个一级评论下所有二级评论的函数
+            root_comments: 一级评论列表
+
+        Returns: 按一级评论顺序合并的二级评论列表
+
+        """
+
+        async def _run(root_comment: Any) -> List[Dict]:
+            async with self.concurrency.api:
+                return await handler(root_comment)
+
+        results = await asyncio.gather(*[_run(root_comment) for root_comment in root_comments], return_exceptions=True)
+        sub_comments: List[Dict] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            sub_comments.extend(result or [])
+        return sub_comments
+
+    def get_retry_setting(self, name: str, config_key: str) -> Any:
+        """
+        读取重试策略，客户端没有覆盖时读取平台当前的配置
+        Args:
+            name: 客户端属性名
+            config_key: 对应的配置项
+
+        Returns:
+
+        """
+        value = getattr(self, name)
+        return value if value is not None else getattr(self.get_settings(), config_key)
+
+    def is_retryable_error(self, error: Exception) -> bool:
+        """
+        错误分类：网络错误、超时和响应校验函数抛出的 RetryableRequestError 可以重试，
+        其他错误（例如内容已删除、参数错误、账号被封）直接抛出
+        """
+        return isinstance(error, (httpx.TransportError, RetryableRequestError))
+
+    def get_retry_delay(self, attempt: int) -> float:
+        """
+        指数退避加随机抖动（full jitter）
+        Args:
+            attempt: 已经失败的次数，从 1 开始
+
+        Returns: 下次重试前等待的秒数
+
+        """
+        max_delay = self.get_retry_setting("retry_max_delay", "REQUEST_RETRY_MAX_DELAY_SEC")
+        base_delay = self.get_retry_setting("retry_base_delay", "REQUEST_RETRY_BASE_DELAY_SEC")
+        return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+    async def send_request(self, client: httpx.AsyncClient, method: str, url: str,
+                           validator: Callable[[httpx.Response], Any],
+                           prepare_headers: Optional[Callable[[], Awaitable[Dict]]] = None, **kwargs) -> Any:
+        """
+        公共请求引擎：发送请求并用平台的校验函数解析响应，可重试的错误按指数退避重试
+        Args:
+            client: httpx 客户端
+            method: 请求方法
+            url: 请求的URL
+            validator: 平台的响应校验函数，返回解析后的结果，出错时抛出异常
+            prepare_headers: 生成请求头的函数，每次尝试在拿到限流令牌之后调用，用于签名等有时效的请求头
+            **kwargs: 其他请求参数，timeout 为单次请求的超时时间，会被截断到请求截止时间之内
+
+        Returns: validator 的返回值
+
+        """
+        timeout = kwargs.pop("timeout", None)
+        max_attempts = self.get_retry_setting("retry_max_attempts", "REQUEST_RETRY_MAX_ATTEMPTS")
+        request_deadline = self.get_retry_setting("request_deadline", "REQUEST_DEADLINE_SEC")
+        host = httpx.URL(url).host
+        deadline: Optional[float] = None
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.get_settings().ENABLE_RATE_LIMITER:
+                await self.rate_limiter.acquire(host)
+            if deadline is None:
+                # 截止时间从拿到第一个令牌后开始计算，排队等待限流令牌的时间不算在内
+                deadline = time.monotonic() + request_deadline
+            remaining = max(deadline - time.monotonic(), self.min_attempt_timeout)
+            try:
+                if prepare_headers is not None:
+                    kwargs["headers"] = await prepare_headers()
+                response = await client.request(method, url, timeout=min(timeout or remaining, remaining), **kwargs)
+                if response.status_code in self.rate_limit_penalty_status_codes:
+                    self.rate_limiter.penalize(host)
+                if response.status_code in self.retry_status_codes:
+                    raise RetryableRequestError(f"status code: {response.status_code}")
+                result = validator(response)
+                self.retry_budget.on_success()
+                self.rate_limiter.reward(host)
+                return result
+            except Exception as e:
+                if isinstance(e, self.rate_limit_penalty_errors):
+                    self.rate_limiter.penalize(host)
+                if not self.is_retryable_error(e):
+                    raise
+                delay = self.get_retry_delay(attempt)
+                if attempt >= max_attempts:
+                    raise RequestRetryError(f"request {method}:{url} failed after {attempt} attempts: {e!r}") from e
+                if time.monotonic() + delay >= deadline:
+                    raise RequestRetryError(f"request {method}:{url} exceeded the deadline of {request_deadline}s: {e!r}") from e
+                if not self.retry_budget.try_acquire():
+                    raise RequestRetryError(f"request {method}:{url} failed and the retry budget is exhausted: {e!r}") from e
+                utils.logger.warning(f"[{self.__class__.__name__}.send_request] request {method}:{url} failed: {e!r}, retry {attempt} after {delay:.2f}s")
+                await asyncio.sleep(delay)
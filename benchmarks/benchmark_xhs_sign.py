@@ -0,0 +1,98 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 小红书 sign() 的性能测试，对比逐字节实现与当前实现每次签名的耗时
+# 运行方式：python -m benchmarks.benchmark_xhs_sign
+import ctypes
+import json
+import timeit
+import urllib.parse
+
+from media_platform.xhs import help as xhs_help
+
+A1 = "187a8b2d9c3yg5ab0e2f6qx1c4n5d8m9h7j6k3l2p0"
+B1 = "I38rHdgsjopgIvesdVwgIC" * 8
+X_S = "XYW_eyJzaWduU3ZuIjoiNTEiLCJzaWduVHlwZSI6IngxIiwiYXBwSWQiOiJ4aHMtcGMtd2ViIiwic2lnblZlcnNpb24iOiIxIiwicGF5bG9hZCI6IjAwMDAwIn0="
+X_T = "1722830283000"
+
+
+def _crc_table():
+    table = []
+    for n in range(256):
+        c = n
+        for _ in range(8):
+            c = (c >> 1) ^ 0xEDB88320 if c & 1 else c >> 1
+        table.append(c)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def legacy_mrc(e):
+    o = -1
+    for n in range(57):
+        val = ctypes.c_uint32(o).value >> 8
+        o = _CRC_TABLE[(o & 255) ^ ord(e[n])] ^ ((val + 4294967296) % 8589934592 - 4294967296)
+    return o ^ -1 ^ 3988292384
+
+
+def legacy_encode_utf8(e):
+    b = []
+    m = urllib.parse.quote(e, safe='~()*!.\'')
+    w = 0
+    while w < len(m):
+        if m[w] == "%":
+            b.append(int(m[w + 1] + m[w + 2], 16))
+            w += 2
+        else:
+            b.append(ord(m[w]))
+        w += 1
+    return b
+
+
+def legacy_b64_encode(e):
+    lookup = xhs_help.lookup
+    result = ""
+    full = len(e) - len(e) % 3
+    for i in range(0, full, 3):
+        n = (e[i] << 16) + (e[i + 1] << 8) + e[i + 2]
+        result += lookup[63 & (n >> 18)] + lookup[63 & (n >> 12)] + lookup[(n >> 6) & 63] + lookup[n & 63]
+    if len(e) % 3 == 1:
+        f = e[-1]
+        result += lookup[f >> 2] + lookup[(f << 4) & 63] + "=="
+    elif len(e) % 3 == 2:
+        f = (e[-2] << 8) + e[-1]
+        result += lookup[f >> 10] + lookup[63 & (f >> 4)] + lookup[(f << 2) & 63] + "="
+    return result
+
+
+def legacy_x_s_common(a1, b1, x_s, x_t):
+    common = {
+        "s0": 3, "s1": "", "x0": "1", "x1": "3.7.8-2", "x2": "Mac OS", "x3": "xhs-pc-web", "x4": "4.27.2",
+        "x5": a1, "x6": x_t, "x7": x_s, "x8": b1, "x9": legacy_mrc(x_t + x_s + b1), "x10": 154,
+    }
+    return legacy_b64_encode(legacy_encode_utf8(json.dumps(common, separators=(',', ':'))))
+
+
+def main(number: int = 5000):
+    assert legacy_x_s_common(A1, B1, X_S, X_T) == xhs_help.sign(A1, B1, X_S, X_T)["x-s-common"]
+    legacy_cost = timeit.timeit(lambda: legacy_x_s_common(A1, B1, X_S, X_T), number=number) / number
+    current_cost = timeit.timeit(lambda: xhs_help.sign(A1, B1, X_S, X_T), number=number) / number
+    print(f"legacy sign:  {legacy_cost * 1e6:.1f} us/request")
+    print(f"current sign: {current_cost * 1e6:.1f} us/request")
+    print(f"speedup:      {legacy_cost / current_cost:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -36,5 +36,8 @@ class CacheFactory:
         elif cache_type == 'redis':
             from .redis_cache import RedisCache
             return RedisCache()
+        elif cache_type == 'file':
+            from .file_cache import ExpiringFileCache
+            return ExpiringFileCache(*args, **kwargs)
         else:
             raise ValueError(f'Unknown cache type: {cache_type}')
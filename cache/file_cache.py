@@ -0,0 +1,91 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 本地文件缓存，缓存内容保存在 json 文件中，程序重新启动后仍然有效
+
+import fnmatch
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache.abs_cache import AbstractCache
+
+
+class ExpiringFileCache(AbstractCache):
+
+    def __init__(self, cache_file: str):
+        """
+        初始化文件缓存，缓存的值需要可以被 json 序列化
+        :param cache_file: 缓存文件路径
+        :return:
+        """
+        self._cache_file = cache_file
+
+    def _load(self) -> Dict[str, Tuple[Any, float]]:
+        """
+        读取缓存文件，文件不存在或者内容损坏时返回空缓存
+        :return:
+        """
+        if not os.path.exists(self._cache_file):
+            return {}
+        try:
+            with open(self._cache_file, "r", encoding="utf-8") as f:
+                return {key: (value, expire_time) for key, (value, expire_time) in json.load(f).items()}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _dump(self, cache_container: Dict[str, Tuple[Any, float]]):
+        """
+        先写临时文件再替换，避免写入中断时缓存文件损坏
+        :param cache_container:
+        :return:
+        """
+        os.makedirs(os.path.dirname(self._cache_file) or ".", exist_ok=True)
+        tmp_file = f"{self._cache_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(cache_container, f, ensure_ascii=False)
+        os.replace(tmp_file, self._cache_file)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        从缓存中获取键的值
+        :param key:
+        :return:
+        """
+        value, expire_time = self._load().get(key, (None, 0))
+        if value is None or expire_time < time.time():
+            return None
+        return value
+
+    def set(self, key: str, value: Any, expire_time: int) -> None:
+        """
+        将键的值设置到缓存中，同时清理已经过期的键
+        :param key:
+        :param value:
+        :param expire_time:
+        :return:
+        """
+        now = time.time()
+        cache_container = {k: v for k, v in self._load().items() if v[1] >= now}
+        cache_container[key] = (value, now + expire_time)
+        self._dump(cache_container)
+
+    def keys(self, pattern: str) -> List[str]:
+        """
+        获取所有符合pattern的key
+        :param pattern: 匹配模式
+        :return:
+        """
+        now = time.time()
+        return [key for key, (_, expire_time) in self._load().items() if expire_time >= now and fnmatch.fnmatchcase(key, pattern)]
@@ -21,6 +21,9 @@ async def parse_cmd():
     parser.add_argument('--platform', type=str, 
                         help='Media platform select / 选择媒体平台 (xhs=小红书 | dy=抖音 | ks=快手 | bili=哔哩哔哩 | wb=微博 | tieba=百度贴吧 | zhihu=知乎)',
                         choices=["xhs", "dy", "ks", "bili", "wb", "tieba", "zhihu"], default=config.PLATFORM)
+    parser.add_argument('--platforms', type=str,
+                        help='Media platforms crawled concurrently in one process, separated by comma / 同时爬取的多个平台，以英文逗号分隔，例如 xhs,dy,bili',
+                        default=",".join(config.PLATFORMS))
     parser.add_argument('--lt', type=str, 
                         help='Login type / 登录方式 (qrcode=二维码 | phone=手机号 | cookie=Cookie)',
                         choices=["qrcode", "phone", "cookie"], default=config.LOGIN_TYPE)
@@ -36,8 +39,8 @@ async def parse_cmd():
     parser.add_argument('--get_sub_comment', type=str2bool,
                         help=''''Whether to crawl level two comment / 是否爬取二级评论, supported values case insensitive / 支持的值(不区分大小写) ('yes', 'true', 't', 'y', '1', 'no', 'false', 'f', 'n', '0')''', default=config.ENABLE_GET_SUB_COMMENTS)
     parser.add_argument('--save_data_option', type=str,
-                        help='Where to save the data / 数据保存方式 (csv=CSV文件 | db=MySQL数据库 | json=JSON文件 | sqlite=SQLite数据库)', 
-                        choices=['csv', 'db', 'json', 'sqlite'], default=config.SAVE_DATA_OPTION)
+                        help='Where to save the data / 数据保存方式 (csv=CSV文件 | db=MySQL数据库 | json=JSON文件 | jsonl=JSON Lines文件 | sqlite=SQLite数据库)', 
+                        choices=['csv', 'db', 'json', 'jsonl', 'sqlite'], default=config.SAVE_DATA_OPTION)
     parser.add_argument('--cookies', type=str,
                         help='Cookies used for cookie login type / Cookie登录方式使用的Cookie值', default=config.COOKIES)
 
@@ -45,6 +48,7 @@ async def parse_cmd():
 
     # override config
     config.PLATFORM = args.platform
+    config.PLATFORMS = [platform for platform in args.platforms.split(",") if platform]
     config.LOGIN_TYPE = args.lt
     config.CRAWLER_TYPE = args.type
     config.START_PAGE = args.start
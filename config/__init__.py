@@ -10,4 +10,5 @@
 
 
 from .base_config import *
-from .db_config import *
\ No newline at end of file
+from .db_config import *
+from .platform_settings import PlatformSettings, check_platform_configs, get_platform_settings
@@ -10,7 +10,19 @@
 
 # 基础配置
 PLATFORM = "xhs"  # 平台，xhs | dy | ks | bili | wb | tieba | zhihu
+# 多平台同时爬取：在同一个进程中并发运行多个平台的爬虫，共用存储队列、数据库连接池和媒体下载池，为空时只爬取 PLATFORM
+PLATFORMS = []  # 例如 ["xhs", "dy", "bili"]
+# 各平台单独的配置段，例如 {"xhs": {"KEYWORDS": "编程副业"}, "dy": {"CRAWLER_TYPE": "detail", "RATE_LIMIT_DEFAULT_RPS": 0.5}}
+# 配置段通过 PlatformSettings 传给该平台的爬虫、API 客户端、登录、浏览器和各个连接池，可以覆盖：
+#   爬取配置（KEYWORDS、CRAWLER_TYPE、START_PAGE、CRAWLER_MAX_NOTES_COUNT、ENABLE_GET_COMMENTS、各平台的 ID 列表等）
+#   登录和浏览器配置（LOGIN_TYPE、COOKIES、HEADLESS、ENABLE_CDP_MODE、CDP_DEBUG_PORT、ENABLE_BROWSER_RESOURCE_BLOCKING 等）
+#   并发（MAX_CONCURRENCY_NUM、CONCURRENCY_*_NUM、KEYWORD_CONCURRENCY_NUM、CRAWL_PIPELINE_*）
+#   请求重试（REQUEST_RETRY_*、REQUEST_DEADLINE_SEC）、限流器（ENABLE_RATE_LIMITER、RATE_LIMIT_*）
+#   HTTP 连接池（HTTP_POOL_*）、JS 签名进程数（JS_SIGN_WORKER_NUM）、词云开关（ENABLE_GET_WORDCLOUD）
+# 存储、存储队列、媒体下载池、词云进程池、登录状态缓存和数据库的配置整个进程共用，不能放在配置段中，见 platform_settings.PROCESS_CONFIG_KEYS
+PLATFORM_CONFIGS = {}
 KEYWORDS = "编程副业,编程兼职"  # 关键词搜索配置，以英文逗号分隔
+KEYWORD_CONCURRENCY_NUM = 1  # 关键词搜索时同时爬取的关键词数，接口请求仍受 MAX_CONCURRENCY_NUM 和限流器约束
 LOGIN_TYPE = "qrcode"  # qrcode or phone or cookie
 COOKIES = ""
 CRAWLER_TYPE = (
@@ -34,6 +46,13 @@ HEADLESS = False
 # 是否保存登录状态
 SAVE_LOGIN_STATE = True
 
+# 是否拦截浏览器中不需要的请求（图片、视频、字体和第三方域名），浏览器只用来获取 cookie 和执行签名函数，开启后可以降低浏览器的 CPU、带宽和内存占用
+# 需要登录时会先关闭拦截，避免登录二维码无法显示，登录完成后重新开启
+ENABLE_BROWSER_RESOURCE_BLOCKING = False
+
+# 开启请求拦截时拦截的资源类型
+BROWSER_BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+
 # ==================== CDP (Chrome DevTools Protocol) 配置 ====================
 # 是否启用CDP模式 - 使用用户现有的Chrome/Edge浏览器进行爬取，提供更好的反检测能力
 # 启用后将自动检测并启动用户的Chrome/Edge浏览器，通过CDP协议进行控制
@@ -61,12 +80,54 @@ BROWSER_LAUNCH_TIMEOUT = 30
 # 设置为False可以保持浏览器运行，便于调试
 AUTO_CLOSE_BROWSER = True
 
-# 数据保存类型选项配置,支持四种类型：csv、db、json、sqlite, 最好保存到DB，有排重的功能。
-SAVE_DATA_OPTION = "json"  # csv or db or json or sqlite
+# 数据保存类型选项配置,支持五种类型：csv、db、json、jsonl、sqlite, 最好保存到DB，有排重的功能。
+# jsonl 每条数据只追加写一行，数据量大的时候比 json 快很多
+SAVE_DATA_OPTION = "json"  # csv or db or json or jsonl or sqlite
+
+# jsonl 模式下，程序结束时是否额外导出一份旧版的 json 数组格式文件（扩展名为 .converted.json，不会覆盖 json 模式的输出）
+JSONL_CONVERT_TO_JSON = False
+
+# 是否开启异步存储队列，开启后爬取流程只把数据放入队列，由后台任务攒批写入，不再等待每条数据落盘
+# 开启后写入失败不会立即中断爬取，重试仍失败的数据会在程序结束关闭存储队列时以 StoreWriteError 抛出
+ENABLE_STORE_PIPELINE = True
+
+# 存储队列容量，队列满时爬取流程会等待写入任务消费（背压）
+STORE_QUEUE_MAX_SIZE = 1000
+
+# 存储队列的写入任务数量
+STORE_WORKER_NUM = 1
+
+# 每批最多写入的数据条数
+STORE_BATCH_SIZE = 100
+
+# 攒批的最长等待时间（秒），超过后不足一批也会写入
+STORE_FLUSH_INTERVAL_SEC = 1.0
+
+# 一批数据写入失败时的最大尝试次数，仍然失败时程序结束时会抛出错误，不会静默丢弃数据
+STORE_WRITE_MAX_ATTEMPTS = 3
+
+# 写入重试的等待时间（秒），第 n 次重试等待 n 倍
+STORE_WRITE_RETRY_DELAY_SEC = 1.0
 
 # 用户浏览器缓存的浏览器文件配置
 USER_DATA_DIR = "%s_user_data_dir"  # %s will be replaced by platform name
 
+# 免浏览器模式，只对 API 请求不需要浏览器签名的平台生效（快手、微博，贴吧本身不启动浏览器）
+# 开启后优先使用保存的 cookie（或 LOGIN_TYPE 为 cookie 时配置的 COOKIES）直接请求，cookie 失效时才启动浏览器登录，取出 cookie 后立即关闭浏览器
+ENABLE_BROWSERLESS_MODE = False
+
+# 免浏览器模式下保存登录 cookie 的文件，SAVE_LOGIN_STATE 为 True 时才会保存
+BROWSERLESS_COOKIE_FILE = "browser_data/%s_cookies.json"  # %s will be replaced by platform name
+
+# 登录态检查结果的缓存时间（秒），同一个平台、同一份登录 cookie 在缓存时间内不再重复检查登录态，设置为 0 关闭缓存
+LOGIN_STATE_CACHE_TTL_SEC = 1800
+
+# 登录态检查结果的缓存类型，file 保存在本地文件中，重新启动后仍然有效；也可以使用 redis
+LOGIN_STATE_CACHE_TYPE = "file"
+
+# 缓存类型为 file 时的缓存文件
+LOGIN_STATE_CACHE_FILE = "browser_data/login_state_cache.json"
+
 # 爬取开始页数 默认从第一页开始
 START_PAGE = 1
 
@@ -75,9 +136,56 @@ CRAWLER_MAX_NOTES_COUNT = 200
 
 # 并发爬虫数量控制
 MAX_CONCURRENCY_NUM = 1
+# 每个平台的接口请求、评论爬取、媒体相关请求各自的并发数，整个进程共用，0 表示使用 MAX_CONCURRENCY_NUM
+CONCURRENCY_API_NUM = 0
+CONCURRENCY_COMMENT_NUM = 0
+CONCURRENCY_MEDIA_NUM = 0
+
+# 关键词搜索按 搜索 -> 详情 -> 存储 -> 评论 分阶段流水线爬取，各阶段之间队列的容量
+CRAWL_PIPELINE_QUEUE_SIZE = 100
+# 流水线中详情阶段和评论阶段的 worker 数，0 表示与并发控制器中 api、comment 额度的并发数相同
+CRAWL_PIPELINE_DETAIL_WORKER_NUM = 0
+CRAWL_PIPELINE_COMMENT_WORKER_NUM = 0
+
+# 平台 API 请求的重试策略，只重试网络错误、超时、限流和服务端临时错误
+# 每个请求的最大尝试次数（包含第一次请求）
+REQUEST_RETRY_MAX_ATTEMPTS = 3
+# 指数退避的初始等待时间和最长等待时间（秒），实际等待时间会加上随机抖动
+REQUEST_RETRY_BASE_DELAY_SEC = 0.5
+REQUEST_RETRY_MAX_DELAY_SEC = 8.0
+# 每个请求（包含所有重试）的截止时间（秒）
+REQUEST_DEADLINE_SEC = 120
+# 每个客户端的重试预算，每次重试消耗一次，请求成功后缓慢恢复，用完后不再重试
+REQUEST_RETRY_BUDGET = 20
+
+# 平台 API 客户端的 httpx 连接池配置
+# 每个连接池的最大连接数
+HTTP_POOL_MAX_CONNECTIONS = 100
+# 每个连接池保持的最大空闲（keep-alive）连接数
+HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS = 20
+# 空闲连接的保持时间（秒）
+HTTP_POOL_KEEPALIVE_EXPIRY = 30.0
+# 是否启用 HTTP/2，需要先安装 h2：pip install httpx[http2]
+HTTP_POOL_ENABLE_HTTP2 = False
+# 每个客户端最多同时保留的代理连接池数量，切换代理 IP 时超出的旧连接池会被关闭
+HTTP_POOL_MAX_PROXY_CLIENTS = 4
+# 常驻的 JS 签名进程数（抖音、知乎签名），需要安装 node，没有安装时退回到 execjs
+JS_SIGN_WORKER_NUM = 2
 
 # 是否开启爬媒体模式（包含图片或视频资源），默认不开启爬媒体
 ENABLE_GET_MEIDAS = False
+# 媒体文件流式下载时每次读取和写入的块大小（字节），下载时内存占用与文件大小无关
+MEDIA_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# 媒体文件下载池的并发下载数，与 MAX_CONCURRENCY_NUM 相互独立
+MEDIA_DOWNLOAD_WORKER_NUM = 8
+# 同一个 CDN 域名的最大并发下载数
+MEDIA_DOWNLOAD_PER_HOST_LIMIT = 4
+# 下载队列的容量，队列满时提交下载任务会等待
+MEDIA_DOWNLOAD_QUEUE_MAX_SIZE = 1000
+# 下载队列持久化文件，程序中断后下次启动会继续下载其中没有完成的任务
+MEDIA_DOWNLOAD_QUEUE_FILE = "data/media_download_queue.jsonl"
+# 下载任务的最大尝试次数（跨程序启动累计），达到后从下载队列中移除；资源返回 4xx 时直接移除
+MEDIA_DOWNLOAD_MAX_ATTEMPTS = 3
 
 # 是否开启爬评论模式, 默认开启爬评论
 ENABLE_GET_COMMENTS = True
@@ -92,6 +200,10 @@ ENABLE_GET_SUB_COMMENTS = False
 # 词云相关
 # 是否开启生成评论词云图
 ENABLE_GET_WORDCLOUD = False
+# 词频文件和词云图的最短生成间隔（秒），程序结束时会再生成一次最终结果
+WORDCLOUD_FLUSH_INTERVAL_SEC = 60
+# 分词和渲染词云图的进程数
+WORDCLOUD_PROCESS_NUM = 1
 # 自定义词语及其分组
 # 添加规则：xx:yy 其中xx为自定义添加的词组，yy为将xx该词组分到的组名。
 CUSTOM_WORDS = {
@@ -105,9 +217,24 @@ STOP_WORDS_FILE = "./docs/hit_stopwords.txt"
 # 中文字体文件路径
 FONT_PATH = "./docs/STZHONGS.TTF"
 
-# 爬取间隔时间
+# 爬取间隔时间，开启限流器时不再使用
 CRAWLER_MAX_SLEEP_SEC = 2
 
+# 是否开启按域名限流，开启后请求节奏由限流器控制，代替各处的随机等待
+ENABLE_RATE_LIMITER = True
+# 默认每个域名每秒允许的请求数和突发请求数
+RATE_LIMIT_DEFAULT_RPS = 1.0
+RATE_LIMIT_DEFAULT_BURST = 3
+# 按域名配置每秒请求数和突发请求数，格式：{"域名": (每秒请求数, 突发请求数)}
+RATE_LIMIT_HOST_RULES = {
+    "edith.xiaohongshu.com": (0.5, 2),
+    "m.weibo.cn": (0.5, 2),
+}
+# 遇到验证码、403、IP 被封等风控响应时，把该域名的速率乘以这个比例，之后请求成功会逐步恢复
+RATE_LIMIT_BACKOFF_FACTOR = 0.5
+# 自动降速的最低速率（每秒请求数）
+RATE_LIMIT_MIN_RPS = 0.05
+
 from .bilibili_config import *
 from .xhs_config import *
 from .dy_config import *
@@ -45,3 +45,6 @@ CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES = 100
 
 # 单个视频/帖子最大爬取动态数
 CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES = 50
+
+# WBI 签名 key（img_key、sub_key）的缓存时间（秒），过期后在后台刷新，刷新完成前继续使用旧的 key
+BILI_WBI_KEYS_TTL_SEC = 3600
@@ -28,6 +28,11 @@ REDIS_DB_NUM = os.getenv("REDIS_DB_NUM", 0)  # your redis db num
 # cache type
 CACHE_TYPE_REDIS = "redis"
 CACHE_TYPE_MEMORY = "memory"
+CACHE_TYPE_FILE = "file"
 
 # sqlite config
-SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schema", "sqlite_tables.db")
\ No newline at end of file
+SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schema", "sqlite_tables.db")
+
+# sqlite 写入合并提交：累计写入多少行，或者距离上次提交多少秒后提交一次事务
+SQLITE_COMMIT_BATCH_SIZE = 500
+SQLITE_COMMIT_INTERVAL_SEC = 1.0
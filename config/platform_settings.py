@@ -0,0 +1,82 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 平台配置，多平台同时爬取时每个平台的爬虫、客户端和连接池读取自己的配置段
+from typing import Any, Dict
+
+import config
+
+from . import db_config
+
+# 整个进程共用、在平台任务之外读取的配置，不能放在平台的配置段中
+PROCESS_CONFIG_KEYS = frozenset({
+    "PLATFORM", "PLATFORMS", "PLATFORM_CONFIGS",
+    # 存储和存储队列
+    "SAVE_DATA_OPTION", "JSONL_CONVERT_TO_JSON", "ENABLE_STORE_PIPELINE",
+    "STORE_QUEUE_MAX_SIZE", "STORE_WORKER_NUM", "STORE_BATCH_SIZE", "STORE_FLUSH_INTERVAL_SEC",
+    "STORE_WRITE_MAX_ATTEMPTS", "STORE_WRITE_RETRY_DELAY_SEC",
+    # 媒体下载池
+    "MEDIA_DOWNLOAD_CHUNK_SIZE", "MEDIA_DOWNLOAD_WORKER_NUM", "MEDIA_DOWNLOAD_PER_HOST_LIMIT",
+    "MEDIA_DOWNLOAD_QUEUE_MAX_SIZE", "MEDIA_DOWNLOAD_QUEUE_FILE", "MEDIA_DOWNLOAD_MAX_ATTEMPTS",
+    # 词云进程池
+    "WORDCLOUD_FLUSH_INTERVAL_SEC", "WORDCLOUD_PROCESS_NUM", "CUSTOM_WORDS", "STOP_WORDS_FILE", "FONT_PATH",
+    # 登录状态缓存
+    "LOGIN_STATE_CACHE_TTL_SEC", "LOGIN_STATE_CACHE_TYPE", "LOGIN_STATE_CACHE_FILE",
+})
+
+
+class PlatformSettings:
+    """
+    一个平台的配置
+    - 读取配置时优先返回 PLATFORM_CONFIGS 中该平台配置段的值，配置段中没有的读取 config 模块的值
+    - 每次读取时才查找，命令行参数等在创建之后修改的配置同样生效
+    - 只影响通过 settings 读取的配置，直接读取 config 模块得到的仍然是全局配置
+    """
+
+    def __init__(self, platform: str):
+        """
+        :param platform: 平台名称，xhs | dy | ks | bili | wb | tieba | zhihu
+        """
+        self.PLATFORM = platform
+
+    def __getattr__(self, name: str) -> Any:
+        section: Dict[str, Any] = config.PLATFORM_CONFIGS.get(self.PLATFORM) or {}
+        if name in section:
+            return section[name]
+        return getattr(config, name)
+
+    def __repr__(self) -> str:
+        return f"PlatformSettings({self.PLATFORM!r})"
+
+
+def get_platform_settings(platform: str) -> PlatformSettings:
+    """
+    获取平台的配置
+    Args:
+        platform: 平台名称
+
+    Returns:
+
+    """
+    return PlatformSettings(platform)
+
+
+def check_platform_configs():
+    """
+    检查 PLATFORM_CONFIGS，配置段中有进程级的配置或数据库配置时抛出 ValueError，避免配置不生效而没有察觉
+    Returns:
+
+    """
+    for platform, section in config.PLATFORM_CONFIGS.items():
+        invalid_keys = [key for key in section if key in PROCESS_CONFIG_KEYS or hasattr(db_config, key)]
+        if invalid_keys:
+            raise ValueError(f"PLATFORM_CONFIGS[{platform!r}] can not override process level config: {', '.join(invalid_keys)}")
@@ -14,7 +14,7 @@
 # @Time    : 2024/4/6 14:54
 # @Desc    : mediacrawler db 管理
 import asyncio
-from typing import Dict
+from typing import Dict, List, Union
 from urllib.parse import urlparse
 
 import aiofiles
@@ -26,6 +26,32 @@ from async_sqlite_db import AsyncSqliteDB
 from tools import utils
 from var import db_conn_pool_var, media_crawler_db_var
 
+# 各表的业务唯一键，需要与 schema 中的 uk_ 唯一索引、store/*/*_store_sql.py 中 upsert 使用的冲突字段保持一致
+TABLE_UNIQUE_KEYS: Dict[str, List[str]] = {
+    "bilibili_video": ["video_id"],
+    "bilibili_video_comment": ["comment_id"],
+    "bilibili_up_info": ["user_id"],
+    "bilibili_contact_info": ["up_id", "fan_id"],
+    "bilibili_up_dynamic": ["dynamic_id"],
+    "douyin_aweme": ["aweme_id"],
+    "douyin_aweme_comment": ["comment_id"],
+    "dy_creator": ["user_id"],
+    "kuaishou_video": ["video_id"],
+    "kuaishou_video_comment": ["comment_id"],
+    "weibo_note": ["note_id"],
+    "weibo_note_comment": ["comment_id"],
+    "weibo_creator": ["user_id"],
+    "xhs_creator": ["user_id"],
+    "xhs_note": ["note_id"],
+    "xhs_note_comment": ["comment_id"],
+    "tieba_note": ["note_id"],
+    "tieba_comment": ["comment_id"],
+    "tieba_creator": ["user_id"],
+    "zhihu_content": ["content_id"],
+    "zhihu_comment": ["comment_id"],
+    "zhihu_creator": ["user_id"],
+}
+
 
 async def init_mediacrawler_db():
     """
@@ -54,8 +80,14 @@ async def init_sqlite_db():
     Returns:
 
     """
-    async_db_obj = AsyncSqliteDB(config.SQLITE_DB_PATH)
-    
+    async_db_obj = AsyncSqliteDB(
+        config.SQLITE_DB_PATH,
+        commit_batch_size=config.SQLITE_COMMIT_BATCH_SIZE,
+        commit_interval=config.SQLITE_COMMIT_INTERVAL_SEC,
+    )
+    # 整个运行期间复用同一个连接，并开启 WAL 模式
+    await async_db_obj.connect()
+
     # 将SQLite数据库对象放到上下文变量中
     media_crawler_db_var.set(async_db_obj)
 
@@ -83,11 +115,14 @@ async def close():
     """
     utils.logger.info("[close] close mediacrawler db connection")
     if config.SAVE_DATA_OPTION == "sqlite":
-        # SQLite数据库连接会在AsyncSqliteDB对象销毁时自动关闭
-        utils.logger.info("[close] sqlite db connection will be closed automatically")
+        # 提交尚未提交的写入并关闭SQLite长连接
+        async_db_obj: AsyncSqliteDB = media_crawler_db_var.get(None)
+        if async_db_obj is not None:
+            await async_db_obj.close()
+            utils.logger.info("[close] sqlite db connection closed")
     else:
         # MySQL连接池关闭
-        db_pool: aiomysql.Pool = db_conn_pool_var.get()
+        db_pool: aiomysql.Pool = db_conn_pool_var.get(None)
         if db_pool is not None:
             db_pool.close()
             utils.logger.info("[close] mysql db pool closed")
@@ -95,7 +130,8 @@ async def close():
 
 async def init_table_schema(db_type: str = None):
     """
-    用来初始化数据库表结构，请在第一次需要创建表结构的时候使用，多次执行该函数会将已有的表以及数据全部删除
+    用来初始化数据库表结构，请在第一次需要创建表结构的时候使用，多次执行该函数会将已有的表以及数据全部删除；
+    已有数据的库请使用 migrate_table_schema 迁移
     Args:
         db_type: 数据库类型，可选值为 'sqlite' 或 'mysql'，如果不指定则使用配置文件中的设置
     Returns:
@@ -115,6 +151,10 @@ async def init_table_schema(db_type: str = None):
                 # 尝试删除现有的数据库文件
                 os.remove(config.SQLITE_DB_PATH)
                 utils.logger.info(f"[init_table_schema] removed existing sqlite db file: {config.SQLITE_DB_PATH}")
+                # WAL 模式遗留的日志文件也一并删除
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(config.SQLITE_DB_PATH + suffix):
+                        os.remove(config.SQLITE_DB_PATH + suffix)
             except Exception as e:
                 utils.logger.warning(f"[init_table_schema] failed to remove existing sqlite db file: {e}")
                 # 如果删除失败，尝试重命名文件
@@ -132,6 +172,7 @@ async def init_table_schema(db_type: str = None):
             schema_sql = await f.read()
             await async_db_obj.executescript(schema_sql)
             utils.logger.info("[init_table_schema] sqlite table schema init successful")
+            await async_db_obj.close()
     elif db_type == "mysql":
         utils.logger.info("[init_table_schema] begin init mysql table schema ...")
         await init_mediacrawler_db()
@@ -146,6 +187,47 @@ async def init_table_schema(db_type: str = None):
         raise ValueError(f"不支持的数据库类型: {db_type}，支持的类型: sqlite, mysql")
 
 
+async def migrate_table_schema(db_type: str = None):
+    """
+    不删除已有数据的表结构迁移：按 TABLE_UNIQUE_KEYS 对每张表去重（保留最新写入的一条），然后补上唯一索引，
+    已经有唯一索引或者不存在的表会被跳过，可以重复执行。迁移后 upsert 会直接使用数据库原生的冲突更新语句
+    Args:
+        db_type: 数据库类型，可选值为 'sqlite' 或 'mysql'，如果不指定则使用配置文件中的设置
+    Returns:
+
+    """
+    if db_type is None:
+        db_type = "mysql" if config.SAVE_DATA_OPTION == "db" else config.SAVE_DATA_OPTION
+
+    if db_type == "sqlite":
+        await init_sqlite_db()
+    elif db_type == "mysql":
+        await init_mediacrawler_db()
+    else:
+        utils.logger.error(f"[migrate_table_schema] 不支持的数据库类型: {db_type}")
+        raise ValueError(f"不支持的数据库类型: {db_type}，支持的类型: sqlite, mysql")
+
+    utils.logger.info(f"[migrate_table_schema] begin migrate {db_type} table schema ...")
+    async_db_obj: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    try:
+        for table_name, key_fields in TABLE_UNIQUE_KEYS.items():
+            if not await async_db_obj.table_exists(table_name):
+                utils.logger.info(f"[migrate_table_schema] table {table_name} not exists, skip")
+                continue
+            if await async_db_obj.has_unique_key(table_name, key_fields):
+                utils.logger.info(f"[migrate_table_schema] table {table_name} already has unique key {key_fields}, skip")
+                continue
+            index_name = f"uk_{table_name}_{'_'.join(key_fields)}"
+            deleted_rows = await async_db_obj.add_unique_key(table_name, key_fields, index_name)
+            utils.logger.info(f"[migrate_table_schema] table {table_name} removed {deleted_rows} duplicate rows, added unique key {index_name}")
+        utils.logger.info(f"[migrate_table_schema] {db_type} table schema migrate successful")
+    finally:
+        if db_type == "sqlite":
+            await async_db_obj.close()
+        else:
+            db_conn_pool_var.get().close()
+
+
 def show_database_options():
     """
     显示支持的数据库选项
@@ -155,7 +237,8 @@ def show_database_options():
     print("1. sqlite  - SQLite 数据库 (轻量级，无需额外配置)")
     print("2. mysql   - MySQL 数据库 (需要配置数据库连接信息)")
     print("3. config  - 使用配置文件中的设置")
-    print("4. exit    - 退出程序")
+    print("4. migrate - 不删除数据，去重后为已有的表补上唯一索引 (使用配置文件中的数据库类型)")
+    print("5. exit    - 退出程序")
     print("="*50)
 
 
@@ -166,12 +249,12 @@ def get_user_choice():
         str: 用户选择的数据库类型
     """
     while True:
-        choice = input("请输入数据库类型 (sqlite/mysql/config/exit): ").strip().lower()
+        choice = input("请输入数据库类型 (sqlite/mysql/config/migrate/exit): ").strip().lower()
         
-        if choice in ['sqlite', 'mysql', 'config', 'exit']:
+        if choice in ['sqlite', 'mysql', 'config', 'migrate', 'exit']:
             return choice
         else:
-            print("❌ 无效的选择，请输入: sqlite, mysql, config 或 exit")
+            print("❌ 无效的选择，请输入: sqlite, mysql, config, migrate 或 exit")
 
 
 async def main():
@@ -187,6 +270,11 @@ async def main():
             if choice == 'exit':
                 print("👋 程序已退出")
                 break
+            elif choice == 'migrate':
+                print(f"📋 迁移配置文件中的数据库: {config.SAVE_DATA_OPTION}")
+                await migrate_table_schema()
+                print("✅ 数据库表结构迁移完成！")
+                break
             elif choice == 'config':
                 print(f"📋 使用配置文件中的设置: {config.SAVE_DATA_OPTION}")
                 await init_table_schema()
@@ -0,0 +1,24 @@
+// 常驻的 JS 签名进程，由 tools/js_signer.py 启动
+// 启动时加载一次签名脚本，之后从 stdin 逐行读取一批调用请求，每批请求的结果写回 stdout 的一行
+// 请求格式：[{"id": 1, "func": "get_sign", "args": [...]}, ...]
+// 响应格式：[{"id": 1, "result": ...}, {"id": 2, "error": "..."}, ...]
+const fs = require('fs');
+const readline = require('readline');
+const vm = require('vm');
+
+globalThis.require = require;
+const code = fs.readFileSync(process.argv[2], 'utf-8').replace(/^﻿/, '');
+vm.runInThisContext(code, {filename: process.argv[2]});
+
+const rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', (line) => {
+    const calls = JSON.parse(line);
+    const results = calls.map((call) => {
+        try {
+            return {id: call.id, result: globalThis[call.func](...call.args)};
+        } catch (e) {
+            return {id: call.id, error: String(e && e.stack || e)};
+        }
+    });
+    process.stdout.write(JSON.stringify(results) + '\n');
+});
@@ -11,7 +11,7 @@
 
 import asyncio
 import sys
-from typing import Optional
+from typing import List, Optional
 
 import cmd_arg
 import config
@@ -24,6 +24,14 @@ from media_platform.tieba import TieBaCrawler
 from media_platform.weibo import WeiboCrawler
 from media_platform.xhs import XiaoHongShuCrawler
 from media_platform.zhihu import ZhihuCrawler
+from store.store_pipeline import StoreWriteError, store_pipeline
+from tools.async_file_writer import csv_writer, jsonl_writer
+from tools.http_client_pool import HttpClientPool
+from tools.js_signer import JsSignerPool
+from tools import utils
+from tools.concurrency_controller import ConcurrencyController
+from tools.media_downloader import media_downloader
+from tools.words import AsyncWordCloudGenerator
 
 
 class CrawlerFactory:
@@ -44,33 +52,99 @@ class CrawlerFactory:
             raise ValueError(
                 "Invalid Media Platform Currently only supported xhs or dy or ks or bili ..."
             )
-        return crawler_class()
+        return crawler_class(settings=config.get_platform_settings(platform))
 
 
 crawler: Optional[AbstractCrawler] = None
 
 
+async def run_platform_crawler(platform: str):
+    """
+    运行一个平台的爬虫，在该平台独立的任务中调用，爬虫、客户端和连接池读取该平台配置段的配置
+    :param platform: 平台名称
+    :return:
+    """
+    platform_crawler = CrawlerFactory.create_crawler(platform=platform)
+    await platform_crawler.start()
+
+
+async def run_multi_platform_crawlers(platforms: List[str]):
+    """
+    在同一个事件循环中并发运行多个平台的爬虫，共用存储队列、数据库连接池、媒体下载池和 HTTP 连接池
+    一个平台失败只记录日志，不影响其他平台
+    :param platforms: 平台列表
+    :return:
+    """
+    for platform in platforms:
+        if platform not in CrawlerFactory.CRAWLERS:
+            raise ValueError(f"Invalid Media Platform: {platform}")
+    tasks = [asyncio.create_task(run_platform_crawler(platform), name=platform) for platform in platforms]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for platform, result in zip(platforms, results):
+        if isinstance(result, Exception):
+            utils.logger.error(f"[run_multi_platform_crawlers] {platform} crawler failed: {result!r}")
+        else:
+            utils.logger.info(f"[run_multi_platform_crawlers] {platform} crawler finished")
+
+
 async def main():
     # Init crawler
     global crawler
 
     # parse cmd
     await cmd_arg.parse_cmd()
+    config.check_platform_configs()
 
     # init db
     if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
         await db.init_db()
 
-    crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
-    await crawler.start()
+    # 启动媒体下载池，继续下载上次没有完成的任务，任意一个平台开启媒体下载时都需要启动
+    platforms = config.PLATFORMS or [config.PLATFORM]
+    if any(config.get_platform_settings(platform).ENABLE_GET_MEIDAS for platform in platforms):
+        media_downloader.start()
+
+    # 存储队列的写入任务整个进程共用，读取全局配置
+    if config.ENABLE_STORE_PIPELINE:
+        store_pipeline.start()
+
+    try:
+        if config.PLATFORMS:
+            await run_multi_platform_crawlers(config.PLATFORMS)
+        else:
+            crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
+            await crawler.start()
+    finally:
+        ConcurrencyController.log_all_stats()
+        # 先等待存储队列中剩余的数据全部写完，写入失败的错误在其他资源关闭后再抛出
+        store_error: Optional[StoreWriteError] = None
+        try:
+            await store_pipeline.close()
+        except StoreWriteError as e:
+            store_error = e
+        # 等待媒体文件全部下载完成
+        await media_downloader.close()
+        # 关闭各平台 API 客户端还没有关闭的 httpx 连接池
+        await HttpClientPool.close_all()
+        # 关闭常驻的 JS 签名进程
+        await JsSignerPool.close_all()
+        # 生成最终的词频文件和词云图，词云开关可以按平台配置，没有生成过词云的生成器关闭时直接返回
+        await AsyncWordCloudGenerator.close_all()
+        # 在同一个事件循环里关闭数据库连接，保证 sqlite 中合并提交的数据全部落盘
+        if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
+            await db.close()
+        if store_error is not None:
+            raise store_error
 
 
 def cleanup():
     if crawler:
         # asyncio.run(crawler.close())
         pass
-    if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
-        asyncio.run(db.close())
+    if config.SAVE_DATA_OPTION == "jsonl":
+        jsonl_writer.close(convert_to_json=config.JSONL_CONVERT_TO_JSON)
+    elif config.SAVE_DATA_OPTION == "csv":
+        csv_writer.close()
 
 
 if __name__ == "__main__":
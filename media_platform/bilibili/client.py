@@ -15,15 +15,17 @@
 import asyncio
 import json
 import random
+import time
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlencode
 
 import httpx
 from playwright.async_api import BrowserContext, Page
 
-import config
+from config import PlatformSettings, get_platform_settings
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.http_client_pool import HttpClientPool
 
 from .exception import DataFetchError
 from .field import CommentOrderType, SearchOrderType
@@ -40,6 +42,7 @@ class BilibiliClient(AbstractApiClient):
         headers: Dict[str, str],
         playwright_page: Page,
         cookie_dict: Dict[str, str],
+        settings: Optional[PlatformSettings] = None,
     ):
         self.proxy = proxy
         self.timeout = timeout
@@ -47,10 +50,19 @@ class BilibiliClient(AbstractApiClient):
         self._host = "https://api.bilibili.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        self.settings = settings or get_platform_settings("bili")
+        self._http_pool = HttpClientPool(settings=self.settings)
+        # 缓存的 WBI 签名对象，过期后在后台刷新 img_key 和 sub_key
+        self._wbi_sign: Optional[BilibiliSign] = None
+        self._wbi_sign_expire_time = 0.0
+        self._wbi_refresh_task: Optional[asyncio.Task] = None
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        async with self._http_pool.get_client(self.proxy) as client:
+            return await self.send_request(client, method, url, self._validate_response, timeout=self.timeout, **kwargs)
+
+    @staticmethod
+    def _validate_response(response: httpx.Response) -> Any:
         try:
             data: Dict = response.json()
         except json.JSONDecodeError:
@@ -61,6 +73,14 @@ class BilibiliClient(AbstractApiClient):
         else:
             return data.get("data", {})
 
+    async def close(self):
+        """
+        关闭 httpx 连接池
+        """
+        if self._wbi_refresh_task is not None and not self._wbi_refresh_task.done():
+            self._wbi_refresh_task.cancel()
+        await self._http_pool.close()
+
     async def pre_request_data(self, req_data: Dict) -> Dict:
         """
         发送请求进行请求参数签名
@@ -71,8 +91,35 @@ class BilibiliClient(AbstractApiClient):
         """
         if not req_data:
             return {}
-        img_key, sub_key = await self.get_wbi_keys()
-        return BilibiliSign(img_key, sub_key).sign(req_data)
+        wbi_sign = await self.get_wbi_sign()
+        return wbi_sign.sign(req_data)
+
+    async def get_wbi_sign(self) -> BilibiliSign:
+        """
+        获取缓存的 WBI 签名对象
+        第一次调用时等待获取 img_key 和 sub_key，之后缓存过期时在后台刷新，刷新完成前继续使用旧的签名对象
+        :return:
+        """
+        if self._wbi_sign is None:
+            if self._wbi_refresh_task is None or self._wbi_refresh_task.done():
+                self._wbi_refresh_task = asyncio.create_task(self._refresh_wbi_sign())
+            # shield 避免某个等待的请求被取消时连带取消刷新任务
+            await asyncio.shield(self._wbi_refresh_task)
+        elif time.monotonic() >= self._wbi_sign_expire_time:
+            if self._wbi_refresh_task is None or self._wbi_refresh_task.done():
+                self._wbi_refresh_task = asyncio.create_task(self._refresh_wbi_sign())
+        return self._wbi_sign
+
+    async def _refresh_wbi_sign(self):
+        try:
+            img_key, sub_key = await self.get_wbi_keys()
+        except Exception as e:
+            if self._wbi_sign is None:
+                raise
+            utils.logger.warning(f"[BilibiliClient._refresh_wbi_sign] Refresh wbi keys failed: {e}, keep using the old keys")
+            return
+        self._wbi_sign = BilibiliSign(img_key, sub_key)
+        self._wbi_sign_expire_time = time.monotonic() + self.settings.BILI_WBI_KEYS_TTL_SEC
 
     async def get_wbi_keys(self) -> Tuple[str, str]:
         """
@@ -129,6 +176,8 @@ class BilibiliClient(AbstractApiClient):
         cookie_str, cookie_dict = utils.convert_cookies(await browser_context.cookies())
         self.headers["Cookie"] = cookie_str
         self.cookie_dict = cookie_dict
+        # 登录后重新获取 WBI key
+        self._wbi_sign_expire_time = 0.0
 
     async def search_video_by_keyword(
         self,
@@ -200,20 +249,6 @@ class BilibiliClient(AbstractApiClient):
 
         return await self.get(uri, params, enable_params_sign=True)
 
-    async def get_video_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(f"[BilibiliClient.get_video_media] request {url} err, res:{response.text}")
-                    return None
-                else:
-                    return response.content
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[BilibiliClient.get_video_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
-                return None
-
     async def get_video_comments(
         self,
         video_id: str,
@@ -289,10 +324,13 @@ class BilibiliClient(AbstractApiClient):
                 utils.logger.warning(f"[BilibiliClient.get_video_all_comments] 'is_end' is not a boolean for video_id: {video_id}. Assuming end of comments.")
                 is_end = True
             if is_fetch_sub_comments:
-                for comment in comment_list:
-                    comment_id = comment['rpid']
-                    if (comment.get("rcount", 0) > 0):
-                        {await self.get_video_all_level_two_comments(video_id, comment_id, CommentOrderType.DEFAULT, 10, crawl_interval, callback)}
+                # 不同一级评论下的二级评论并发获取，同一个一级评论下按页码顺序获取
+                await self.gather_sub_comment_threads(
+                    lambda comment: self.get_video_all_level_two_comments(
+                        video_id, comment["rpid"], CommentOrderType.DEFAULT, 10, crawl_interval, callback
+                    ),
+                    [comment for comment in comment_list if comment.get("rcount", 0) > 0],
+                )
             if len(result) + len(comment_list) > max_count:
                 comment_list = comment_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
@@ -469,7 +507,7 @@ class BilibiliClient(AbstractApiClient):
         """
         creator_id = creator_info["id"]
         result = []
-        pn = config.START_CONTACTS_PAGE
+        pn = self.settings.START_CONTACTS_PAGE
         while len(result) < max_count:
             fans_res: Dict = await self.get_creator_fans(creator_id, pn=pn)
             fans_list: List[Dict] = fans_res.get("list", [])
@@ -503,7 +541,7 @@ class BilibiliClient(AbstractApiClient):
         """
         creator_id = creator_info["id"]
         result = []
-        pn = config.START_CONTACTS_PAGE
+        pn = self.settings.START_CONTACTS_PAGE
         while len(result) < max_count:
             followings_res: Dict = await self.get_creator_followings(creator_id, pn=pn)
             followings_list: List[Dict] = followings_res.get("list", [])
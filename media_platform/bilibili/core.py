@@ -17,7 +17,7 @@ import asyncio
 import os
 import random
 from asyncio import Task
-from typing import Dict, List, Optional, Tuple, Union
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import pandas as pd
 
@@ -30,13 +30,19 @@ from playwright.async_api import (
 )
 from playwright._impl._errors import TargetClosedError
 
-import config
+from config import PlatformSettings, get_platform_settings
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import bilibili as bilibili_store
 from tools import utils
+from tools.rate_limiter import get_crawl_interval
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_controller import ConcurrencyController
+from tools.keyword_runner import run_keywords
+from tools.crawl_pipeline import CrawlPipeline, get_stage_worker_num
+from tools.login_state_cache import check_login_state
+from tools.resource_blocker import disable_resource_blocking, enable_resource_blocking
+from var import crawler_type_var
 
 from .client import BilibiliClient
 from .exception import DataFetchError
@@ -49,34 +55,37 @@ class BilibiliCrawler(AbstractCrawler):
     bili_client: BilibiliClient
     browser_context: BrowserContext
     cdp_manager: Optional[CDPBrowserManager]
+    concurrency: ConcurrencyController
 
-    def __init__(self):
+    def __init__(self, settings: Optional[PlatformSettings] = None):
+        self.settings = settings or get_platform_settings("bili")
         self.index_url = "https://www.bilibili.com"
         self.user_agent = utils.get_user_agent()
         self.cdp_manager = None
+        self.concurrency = ConcurrencyController.for_platform("bili", self.settings)
 
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
-        if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
+        if self.settings.ENABLE_IP_PROXY:
+            ip_proxy_pool = await create_ip_pool(self.settings.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(ip_proxy_info)
 
         async with async_playwright() as playwright:
             # 根据配置选择启动模式
-            if config.ENABLE_CDP_MODE:
+            if self.settings.ENABLE_CDP_MODE:
                 utils.logger.info("[BilibiliCrawler] 使用CDP模式启动浏览器")
                 self.browser_context = await self.launch_browser_with_cdp(
                     playwright,
                     playwright_proxy_format,
                     self.user_agent,
-                    headless=config.CDP_HEADLESS,
+                    headless=self.settings.CDP_HEADLESS,
                 )
             else:
                 utils.logger.info("[BilibiliCrawler] 使用标准模式启动浏览器")
                 # Launch a browser context.
                 chromium = playwright.chromium
-                self.browser_context = await self.launch_browser(chromium, None, self.user_agent, headless=config.HEADLESS)
+                self.browser_context = await self.launch_browser(chromium, None, self.user_agent, headless=self.settings.HEADLESS)
             # stealth.min.js is a js script to prevent the website from detecting the crawler.
             await self.browser_context.add_init_script(path="libs/stealth.min.js")
             self.context_page = await self.browser_context.new_page()
@@ -84,29 +93,33 @@ class BilibiliCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.bili_client = await self.create_bilibili_client(httpx_proxy_format)
-            if not await self.bili_client.pong():
+            if not await check_login_state(self.settings.PLATFORM, self.bili_client.cookie_dict, self.bili_client.pong):
                 login_obj = BilibiliLogin(
-                    login_type=config.LOGIN_TYPE,
+                    login_type=self.settings.LOGIN_TYPE,
                     login_phone="",  # your phone number
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=self.settings.COOKIES,
                 )
+                # 登录前关闭请求拦截，避免登录二维码无法显示
+                await disable_resource_blocking(self.browser_context, self.settings)
                 await login_obj.begin()
                 await self.bili_client.update_cookies(browser_context=self.browser_context)
+                # 登录完成后重新开启请求拦截
+                await enable_resource_blocking(self.browser_context, self.settings)
 
-            crawler_type_var.set(config.CRAWLER_TYPE)
-            if config.CRAWLER_TYPE == "search":
+            crawler_type_var.set(self.settings.CRAWLER_TYPE)
+            if self.settings.CRAWLER_TYPE == "search":
                 await self.search()
-            elif config.CRAWLER_TYPE == "detail":
+            elif self.settings.CRAWLER_TYPE == "detail":
                 # Get the information and comments of the specified post
-                await self.get_specified_videos(config.BILI_SPECIFIED_ID_LIST)
-            elif config.CRAWLER_TYPE == "creator":
-                if config.CREATOR_MODE:
-                    for creator_id in config.BILI_CREATOR_ID_LIST:
+                await self.get_specified_videos(self.settings.BILI_SPECIFIED_ID_LIST)
+            elif self.settings.CRAWLER_TYPE == "creator":
+                if self.settings.CREATOR_MODE:
+                    for creator_id in self.settings.BILI_CREATOR_ID_LIST:
                         await self.get_creator_videos(int(creator_id))
                 else:
-                    await self.get_all_creator_details(config.BILI_CREATOR_ID_LIST)
+                    await self.get_all_creator_details(self.settings.BILI_CREATOR_ID_LIST)
             else:
                 pass
             utils.logger.info("[BilibiliCrawler.start] Bilibili Crawler finished ...")
@@ -116,20 +129,17 @@ class BilibiliCrawler(AbstractCrawler):
         search bilibili video
         """
         # Search for video and retrieve their comment information.
-        if config.BILI_SEARCH_MODE == "normal":
+        if self.settings.BILI_SEARCH_MODE == "normal":
             await self.search_by_keywords()
-        elif config.BILI_SEARCH_MODE == "all_in_time_range":
+        elif self.settings.BILI_SEARCH_MODE == "all_in_time_range":
             await self.search_by_keywords_in_time_range(daily_limit=False)
-        elif config.BILI_SEARCH_MODE == "daily_limit_in_time_range":
+        elif self.settings.BILI_SEARCH_MODE == "daily_limit_in_time_range":
             await self.search_by_keywords_in_time_range(daily_limit=True)
         else:
-            utils.logger.warning(f"Unknown BILI_SEARCH_MODE: {config.BILI_SEARCH_MODE}")
+            utils.logger.warning(f"Unknown BILI_SEARCH_MODE: {self.settings.BILI_SEARCH_MODE}")
 
     @staticmethod
-    async def get_pubtime_datetime(
-        start: str = config.START_DAY,
-        end: str = config.END_DAY,
-    ) -> Tuple[str, str]:
+    async def get_pubtime_datetime(start: str, end: str) -> Tuple[str, str]:
         """
         获取 bilibili 作品发布日期起始时间戳 pubtime_begin_s 与发布日期结束时间戳 pubtime_end_s
         ---
@@ -165,50 +175,80 @@ class BilibiliCrawler(AbstractCrawler):
         """
         utils.logger.info("[BilibiliCrawler.search_by_keywords] Begin search bilibli keywords")
         bili_limit_count = 20  # bilibili limit page fixed value
-        if config.CRAWLER_MAX_NOTES_COUNT < bili_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = bili_limit_count
-        start_page = config.START_PAGE  # start page number
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        # 多个平台同时爬取时共用配置模块，这里用局部变量，不修改全局配置
+        max_notes_count = max(self.settings.CRAWLER_MAX_NOTES_COUNT, bili_limit_count)
+        start_page = self.settings.START_PAGE  # start page number
+        detail_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_DETAIL_WORKER_NUM, self.concurrency.api.limit)
+        comment_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_COMMENT_WORKER_NUM, self.concurrency.comment.limit)
+
+        async def search_keyword(keyword: str):
             utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Current search keyword: {keyword}")
-            page = 1
-            while (page - start_page + 1) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Skip page: {page}")
-                    page += 1
-                    continue
-
-                utils.logger.info(f"[BilibiliCrawler.search_by_keywords] search bilibili keyword: {keyword}, page: {page}")
-                video_id_list: List[str] = []
-                videos_res = await self.bili_client.search_video_by_keyword(
-                    keyword=keyword,
-                    page=page,
-                    page_size=bili_limit_count,
-                    order=SearchOrderType.DEFAULT,
-                    pubtime_begin_s=0,  # 作品发布日期起始时间戳
-                    pubtime_end_s=0,  # 作品发布日期结束日期时间戳
+            # 搜索 -> 详情 -> 存储 -> 评论 分阶段执行，下一页的搜索和详情不再等待上一页的评论爬取完成
+            pipeline = CrawlPipeline("BilibiliCrawler.search_by_keywords", ignore_errors=(DataFetchError,), settings=self.settings)
+            pipeline.add_stage(
+                "detail",
+                lambda video_item: self.get_video_info_task(aid=video_item.get("aid"), bvid="", semaphore=self.concurrency.api),
+                worker_num=detail_worker_num,
+            )
+            pipeline.add_stage("store", self.save_video_detail)
+            if self.settings.ENABLE_GET_COMMENTS:
+                pipeline.add_stage(
+                    "comment",
+                    lambda video_id: self.get_comments(video_id, self.concurrency.comment),
+                    worker_num=comment_worker_num,
                 )
-                video_list: List[Dict] = videos_res.get("result")
+            await pipeline.run(self.iter_search_videos(keyword, start_page, bili_limit_count, max_notes_count))
 
-                if not video_list:
-                    utils.logger.info(f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword.")
-                    break
+        await run_keywords("BilibiliCrawler.search_by_keywords", self.settings.KEYWORDS.split(","), search_keyword,
+                           ignore_errors=(DataFetchError,), concurrency=self.settings.KEYWORD_CONCURRENCY_NUM,
+                           controller=self.concurrency)
 
-                semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                task_list = []
-                try:
-                    task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="", semaphore=semaphore) for video_item in video_list]
-                except Exception as e:
-                    utils.logger.warning(f"[BilibiliCrawler.search_by_keywords] error in the task list. The video for this page will not be included. {e}")
-                video_items = await asyncio.gather(*task_list)
-                for video_item in video_items:
-                    if video_item:
-                        video_id_list.append(video_item.get("View").get("aid"))
-                        await bilibili_store.update_bilibili_video(video_item)
-                        await bilibili_store.update_up_info(video_item)
-                        await self.get_bilibili_video(video_item, semaphore)
+    async def iter_search_videos(self, keyword: str, start_page: int, page_size: int,
+                                 max_notes_count: int) -> AsyncIterator[Dict]:
+        """
+        search bilibili video page by page and yield the search result items
+        :param keyword: search keyword
+        :param start_page: skip the pages before start_page
+        :param page_size: bilibili limit page fixed value
+        :param max_notes_count: max videos count of the keyword
+        :return:
+        """
+        page = 1
+        while (page - start_page + 1) * page_size <= max_notes_count:
+            if page < start_page:
+                utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Skip page: {page}")
                 page += 1
-                await self.batch_get_video_comments(video_id_list)
+                continue
+
+            utils.logger.info(f"[BilibiliCrawler.search_by_keywords] search bilibili keyword: {keyword}, page: {page}")
+            videos_res = await self.bili_client.search_video_by_keyword(
+                keyword=keyword,
+                page=page,
+                page_size=page_size,
+                order=SearchOrderType.DEFAULT,
+                pubtime_begin_s=0,  # 作品发布日期起始时间戳
+                pubtime_end_s=0,  # 作品发布日期结束日期时间戳
+            )
+            video_list: List[Dict] = videos_res.get("result")
+
+            if not video_list:
+                utils.logger.info(f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword.")
+                break
+
+            page += 1
+            for video_item in video_list:
+                yield video_item
+
+    async def save_video_detail(self, video_item: Dict) -> Optional[str]:
+        """
+        save video detail, up info and video file, return the video id for the comment stage
+        :param video_item:
+        :return:
+        """
+        await bilibili_store.update_bilibili_video(video_item)
+        await bilibili_store.update_up_info(video_item)
+        await self.get_bilibili_video(video_item, self.concurrency.media)
+        return video_item.get("View").get("aid")
 
     async def search_by_keywords_in_time_range(self, daily_limit: bool):
         """
@@ -217,19 +257,18 @@ class BilibiliCrawler(AbstractCrawler):
         """
         utils.logger.info(f"[BilibiliCrawler.search_by_keywords_in_time_range] Begin search with daily_limit={daily_limit}")
         bili_limit_count = 20
-        start_page = config.START_PAGE
+        start_page = self.settings.START_PAGE
 
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        async def search_keyword(keyword: str):
             utils.logger.info(f"[BilibiliCrawler.search_by_keywords_in_time_range] Current search keyword: {keyword}")
             total_notes_crawled_for_keyword = 0
 
-            for day in pd.date_range(start=config.START_DAY, end=config.END_DAY, freq="D"):
-                if (daily_limit and total_notes_crawled_for_keyword >= config.CRAWLER_MAX_NOTES_COUNT):
+            for day in pd.date_range(start=self.settings.START_DAY, end=self.settings.END_DAY, freq="D"):
+                if (daily_limit and total_notes_crawled_for_keyword >= self.settings.CRAWLER_MAX_NOTES_COUNT):
                     utils.logger.info(f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}', skipping remaining days.")
                     break
 
-                if (not daily_limit and total_notes_crawled_for_keyword >= config.CRAWLER_MAX_NOTES_COUNT):
+                if (not daily_limit and total_notes_crawled_for_keyword >= self.settings.CRAWLER_MAX_NOTES_COUNT):
                     utils.logger.info(f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}', skipping remaining days.")
                     break
 
@@ -238,13 +277,13 @@ class BilibiliCrawler(AbstractCrawler):
                 notes_count_this_day = 0
 
                 while True:
-                    if notes_count_this_day >= config.MAX_NOTES_PER_DAY:
+                    if notes_count_this_day >= self.settings.MAX_NOTES_PER_DAY:
                         utils.logger.info(f"[BilibiliCrawler.search] Reached MAX_NOTES_PER_DAY limit for {day.ctime()}.")
                         break
-                    if (daily_limit and total_notes_crawled_for_keyword >= config.CRAWLER_MAX_NOTES_COUNT):
+                    if (daily_limit and total_notes_crawled_for_keyword >= self.settings.CRAWLER_MAX_NOTES_COUNT):
                         utils.logger.info(f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}'.")
                         break
-                    if (not daily_limit and total_notes_crawled_for_keyword >= config.CRAWLER_MAX_NOTES_COUNT):
+                    if (not daily_limit and total_notes_crawled_for_keyword >= self.settings.CRAWLER_MAX_NOTES_COUNT):
                         break
 
                     try:
@@ -264,24 +303,24 @@ class BilibiliCrawler(AbstractCrawler):
                             utils.logger.info(f"[BilibiliCrawler.search] No more videos for '{keyword}' on {day.ctime()}, moving to next day.")
                             break
 
-                        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+                        semaphore = self.concurrency.api
                         task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="", semaphore=semaphore) for video_item in video_list]
                         video_items = await asyncio.gather(*task_list)
 
                         for video_item in video_items:
                             if video_item:
-                                if (daily_limit and total_notes_crawled_for_keyword >= config.CRAWLER_MAX_NOTES_COUNT):
+                                if (daily_limit and total_notes_crawled_for_keyword >= self.settings.CRAWLER_MAX_NOTES_COUNT):
                                     break
-                                if (not daily_limit and total_notes_crawled_for_keyword >= config.CRAWLER_MAX_NOTES_COUNT):
+                                if (not daily_limit and total_notes_crawled_for_keyword >= self.settings.CRAWLER_MAX_NOTES_COUNT):
                                     break
-                                if notes_count_this_day >= config.MAX_NOTES_PER_DAY:
+                                if notes_count_this_day >= self.settings.MAX_NOTES_PER_DAY:
                                     break
                                 notes_count_this_day += 1
                                 total_notes_crawled_for_keyword += 1
                                 video_id_list.append(video_item.get("View").get("aid"))
                                 await bilibili_store.update_bilibili_video(video_item)
                                 await bilibili_store.update_up_info(video_item)
-                                await self.get_bilibili_video(video_item, semaphore)
+                                await self.get_bilibili_video(video_item, self.concurrency.media)
 
                         page += 1
                         await self.batch_get_video_comments(video_id_list)
@@ -290,18 +329,22 @@ class BilibiliCrawler(AbstractCrawler):
                         utils.logger.error(f"[BilibiliCrawler.search] Error searching on {day.ctime()}: {e}")
                         break
 
+        await run_keywords("BilibiliCrawler.search_by_keywords_in_time_range", self.settings.KEYWORDS.split(","), search_keyword,
+                           ignore_errors=(DataFetchError,), concurrency=self.settings.KEYWORD_CONCURRENCY_NUM,
+                           controller=self.concurrency)
+
     async def batch_get_video_comments(self, video_id_list: List[str]):
         """
         batch get video comments
         :param video_id_list:
         :return:
         """
-        if not config.ENABLE_GET_COMMENTS:
+        if not self.settings.ENABLE_GET_COMMENTS:
             utils.logger.info(f"[BilibiliCrawler.batch_get_note_comments] Crawling comment mode is not enabled")
             return
 
         utils.logger.info(f"[BilibiliCrawler.batch_get_video_comments] video ids:{video_id_list}")
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.comment
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(self.get_comments(video_id, semaphore), name=video_id)
@@ -318,13 +361,13 @@ class BilibiliCrawler(AbstractCrawler):
         async with semaphore:
             try:
                 utils.logger.info(f"[BilibiliCrawler.get_comments] begin get video_id: {video_id} comments ...")
-                await asyncio.sleep(random.uniform(0.5, 1.5))
+                await asyncio.sleep(get_crawl_interval(random.uniform(0.5, 1.5), self.settings))
                 await self.bili_client.get_video_all_comments(
                     video_id=video_id,
-                    crawl_interval=random.random(),
-                    is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
+                    crawl_interval=get_crawl_interval(random.random(), self.settings),
+                    is_fetch_sub_comments=self.settings.ENABLE_GET_SUB_COMMENTS,
                     callback=bilibili_store.batch_update_bilibili_video_comments,
-                    max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                    max_count=self.settings.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
 
             except DataFetchError as ex:
@@ -347,7 +390,7 @@ class BilibiliCrawler(AbstractCrawler):
             await self.get_specified_videos(video_bvids_list)
             if int(result["page"]["count"]) <= pn * ps:
                 break
-            await asyncio.sleep(random.random())
+            await asyncio.sleep(get_crawl_interval(random.random(), self.settings))
             pn += 1
 
     async def get_specified_videos(self, bvids_list: List[str]):
@@ -355,7 +398,7 @@ class BilibiliCrawler(AbstractCrawler):
         get specified videos info
         :return:
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.api
         task_list = [self.get_video_info_task(aid=0, bvid=video_id, semaphore=semaphore) for video_id in bvids_list]
         video_details = await asyncio.gather(*task_list)
         video_aids_list = []
@@ -367,7 +410,7 @@ class BilibiliCrawler(AbstractCrawler):
                     video_aids_list.append(video_aid)
                 await bilibili_store.update_bilibili_video(video_detail)
                 await bilibili_store.update_up_info(video_detail)
-                await self.get_bilibili_video(video_detail, semaphore)
+                await self.get_bilibili_video(video_detail, self.concurrency.media)
         await self.batch_get_video_comments(video_aids_list)
 
     async def get_video_info_task(self, aid: int, bvid: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
@@ -427,7 +470,9 @@ class BilibiliCrawler(AbstractCrawler):
             },
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
+            settings=self.settings,
         )
+        bilibili_client_obj.concurrency = self.concurrency
         return bilibili_client_obj
 
     async def launch_browser(
@@ -446,10 +491,10 @@ class BilibiliCrawler(AbstractCrawler):
         :return: browser context
         """
         utils.logger.info("[BilibiliCrawler.launch_browser] Begin create browser context ...")
-        if config.SAVE_LOGIN_STATE:
+        if self.settings.SAVE_LOGIN_STATE:
             # feat issue #14
             # we will save login state to avoid login every time
-            user_data_dir = os.path.join(os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM)  # type: ignore
+            user_data_dir = os.path.join(os.getcwd(), "browser_data", self.settings.USER_DATA_DIR % self.settings.PLATFORM)  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
                 accept_downloads=True,
@@ -461,11 +506,13 @@ class BilibiliCrawler(AbstractCrawler):
                 },
                 user_agent=user_agent,
             )
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
         else:
             # type: ignore
             browser = await chromium.launch(headless=headless, proxy=playwright_proxy)
             browser_context = await browser.new_context(viewport={"width": 1920, "height": 1080}, user_agent=user_agent)
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
 
     async def launch_browser_with_cdp(
@@ -479,7 +526,7 @@ class BilibiliCrawler(AbstractCrawler):
         使用CDP模式启动浏览器
         """
         try:
-            self.cdp_manager = CDPBrowserManager()
+            self.cdp_manager = CDPBrowserManager(self.settings)
             browser_context = await self.cdp_manager.launch_and_connect(
                 playwright=playwright,
                 playwright_proxy=playwright_proxy,
@@ -501,6 +548,9 @@ class BilibiliCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭 API 客户端的 httpx 连接池
+        if getattr(self, "bili_client", None):
+            await self.bili_client.close()
         try:
             # 如果使用CDP模式，需要特殊处理
             if self.cdp_manager:
@@ -521,7 +571,7 @@ class BilibiliCrawler(AbstractCrawler):
         :param semaphore:
         :return:
         """
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.settings.ENABLE_GET_MEIDAS:
             utils.logger.info(f"[BilibiliCrawler.get_bilibili_video] Crawling image mode is not enabled")
             return
         video_item_view: Dict = video_item.get("View")
@@ -543,12 +593,11 @@ class BilibiliCrawler(AbstractCrawler):
             utils.logger.info("[BilibiliCrawler.get_bilibili_video] get video url failed")
             return
 
-        content = await self.bili_client.get_video_media(video_url)
-        await asyncio.sleep(random.random())
-        if content is None:
-            return
         extension_file_name = f"video.mp4"
-        await bilibili_store.store_video(aid, content, extension_file_name)
+        # 视频 CDN 只校验 Referer 和 User-Agent，下载队列会持久化到文件中，所以不带上 Cookie
+        headers = {key: value for key, value in self.bili_client.headers.items() if key in ("Referer", "User-Agent")}
+        await bilibili_store.download_video(aid, video_url, extension_file_name, proxy=self.bili_client.proxy,
+                                            timeout=self.bili_client.timeout, headers=headers)
 
     async def get_all_creator_details(self, creator_id_list: List[int]):
         """
@@ -557,7 +606,7 @@ class BilibiliCrawler(AbstractCrawler):
         utils.logger.info(f"[BilibiliCrawler.get_creator_details] Crawling the detalis of creator")
         utils.logger.info(f"[BilibiliCrawler.get_creator_details] creator ids:{creator_id_list}")
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.api
         task_list: List[Task] = []
         try:
             for creator_id in creator_id_list:
@@ -600,9 +649,9 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.info(f"[BilibiliCrawler.get_fans] begin get creator_id: {creator_id} fans ...")
                 await self.bili_client.get_creator_all_fans(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
+                    crawl_interval=get_crawl_interval(random.random(), self.settings),
                     callback=bilibili_store.batch_update_bilibili_creator_fans,
-                    max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
+                    max_count=self.settings.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
 
             except DataFetchError as ex:
@@ -623,9 +672,9 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.info(f"[BilibiliCrawler.get_followings] begin get creator_id: {creator_id} followings ...")
                 await self.bili_client.get_creator_all_followings(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
+                    crawl_interval=get_crawl_interval(random.random(), self.settings),
                     callback=bilibili_store.batch_update_bilibili_creator_followings,
-                    max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
+                    max_count=self.settings.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
 
             except DataFetchError as ex:
@@ -646,9 +695,9 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.info(f"[BilibiliCrawler.get_dynamics] begin get creator_id: {creator_id} dynamics ...")
                 await self.bili_client.get_creator_all_dynamics(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
+                    crawl_interval=get_crawl_interval(random.random(), self.settings),
                     callback=bilibili_store.batch_update_bilibili_creator_dynamics,
-                    max_count=config.CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES,
+                    max_count=self.settings.CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES,
                 )
 
             except DataFetchError as ex:
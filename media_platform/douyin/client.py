@@ -12,13 +12,15 @@ import asyncio
 import copy
 import json
 import urllib.parse
-from typing import Any, Callable, Dict, Union, Optional
+from typing import Any, Callable, Dict, List, Union, Optional
 
 import httpx
 from playwright.async_api import BrowserContext
 
 from base.base_crawler import AbstractApiClient
+from config import PlatformSettings, get_platform_settings
 from tools import utils
+from tools.http_client_pool import HttpClientPool
 from var import request_keyword_var
 
 from .exception import *
@@ -36,6 +38,7 @@ class DouYinClient(AbstractApiClient):
         headers: Dict,
         playwright_page: Optional[Page],
         cookie_dict: Dict,
+        settings: Optional[PlatformSettings] = None,
     ):
         self.proxy = proxy
         self.timeout = timeout
@@ -43,6 +46,8 @@ class DouYinClient(AbstractApiClient):
         self._host = "https://www.douyin.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        self.settings = settings or get_platform_settings("dy")
+        self._http_pool = HttpClientPool(settings=self.settings)
 
     async def __process_req_params(
         self,
@@ -95,8 +100,11 @@ class DouYinClient(AbstractApiClient):
         params["a_bogus"] = a_bogus
 
     async def request(self, method, url, **kwargs):
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        async with self._http_pool.get_client(self.proxy) as client:
+            return await self.send_request(client, method, url, self._validate_response, timeout=self.timeout, **kwargs)
+
+    @staticmethod
+    def _validate_response(response: httpx.Response) -> Dict:
         try:
             if response.text == "" or response.text == "blocked":
                 utils.logger.error(f"request params incrr, response.text: {response.text}")
@@ -105,6 +113,12 @@ class DouYinClient(AbstractApiClient):
         except Exception as e:
             raise DataFetchError(f"{e}, {response.text}")
 
+    async def close(self):
+        """
+        关闭 httpx 连接池
+        """
+        await self._http_pool.close()
+
     async def get(self, uri: str, params: Optional[Dict] = None, headers: Optional[Dict] = None):
         """
         GET请求
@@ -251,27 +265,44 @@ class DouYinClient(AbstractApiClient):
             await asyncio.sleep(crawl_interval)
             if not is_fetch_sub_comments:
                 continue
-            # 获取二级评论
-            for comment in comments:
-                reply_comment_total = comment.get("reply_comment_total")
-
-                if reply_comment_total > 0:
-                    comment_id = comment.get("cid")
-                    sub_comments_has_more = 1
-                    sub_comments_cursor = 0
+            # 获取二级评论，不同一级评论下的二级评论并发获取
+            sub_comments = await self.gather_sub_comment_threads(
+                lambda comment: self.get_comment_all_sub_comments(aweme_id, comment.get("cid"), crawl_interval, callback),
+                [comment for comment in comments if comment.get("reply_comment_total", 0) > 0],
+            )
+            result.extend(sub_comments)
+        return result
 
-                    while sub_comments_has_more:
-                        sub_comments_res = await self.get_sub_comments(aweme_id, comment_id, sub_comments_cursor)
-                        sub_comments_has_more = sub_comments_res.get("has_more", 0)
-                        sub_comments_cursor = sub_comments_res.get("cursor", 0)
-                        sub_comments = sub_comments_res.get("comments", [])
+    async def get_comment_all_sub_comments(
+        self,
+        aweme_id: str,
+        comment_id: str,
+        crawl_interval: float = 1.0,
+        callback: Optional[Callable] = None,
+    ) -> List[Dict]:
+        """
+        按游标顺序获取一个一级评论下的所有子评论
+        :param aweme_id: 帖子ID
+        :param comment_id: 一级评论ID
+        :param crawl_interval: 抓取间隔
+        :param callback: 回调函数，用于处理抓取到的评论
+        :return: 子评论列表
+        """
+        result = []
+        sub_comments_has_more = 1
+        sub_comments_cursor = 0
+        while sub_comments_has_more:
+            sub_comments_res = await self.get_sub_comments(aweme_id, comment_id, sub_comments_cursor)
+            sub_comments_has_more = sub_comments_res.get("has_more", 0)
+            sub_comments_cursor = sub_comments_res.get("cursor", 0)
+            sub_comments = sub_comments_res.get("comments", [])
 
-                        if not sub_comments:
-                            continue
-                        result.extend(sub_comments)
-                        if callback:  # 如果有回调函数，就执行回调函数
-                            await callback(aweme_id, sub_comments)
-                        await asyncio.sleep(crawl_interval)
+            if not sub_comments:
+                continue
+            result.extend(sub_comments)
+            if callback:  # 如果有回调函数，就执行回调函数
+                await callback(aweme_id, sub_comments)
+            await asyncio.sleep(crawl_interval)
         return result
 
     async def get_user_info(self, sec_user_id: str):
@@ -310,17 +341,3 @@ class DouYinClient(AbstractApiClient):
                 await callback(aweme_list)
             result.extend(aweme_list)
         return result
-
-    async def get_aweme_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout, follow_redirects=True)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(f"[DouYinClient.get_aweme_media] request {url} err, res:{response.text}")
-                    return None
-                else:
-                    return response.content
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[DouYinClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
-                return None
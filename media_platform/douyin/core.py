@@ -12,7 +12,7 @@ import asyncio
 import os
 import random
 from asyncio import Task
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from playwright.async_api import (
     BrowserContext,
@@ -22,13 +22,19 @@ from playwright.async_api import (
     async_playwright,
 )
 
-import config
+from config import PlatformSettings, get_platform_settings
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import douyin as douyin_store
 from tools import utils
+from tools.keyword_runner import run_keywords
+from tools.rate_limiter import get_crawl_interval
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_controller import ConcurrencyController
+from tools.crawl_pipeline import CrawlPipeline, get_stage_worker_num
+from tools.login_state_cache import check_login_state
+from tools.resource_blocker import disable_resource_blocking, enable_resource_blocking
+from var import crawler_type_var
 
 from .client import DouYinClient
 from .exception import DataFetchError
@@ -41,27 +47,30 @@ class DouYinCrawler(AbstractCrawler):
     dy_client: DouYinClient
     browser_context: BrowserContext
     cdp_manager: Optional[CDPBrowserManager]
+    concurrency: ConcurrencyController
 
-    def __init__(self) -> None:
+    def __init__(self, settings: Optional[PlatformSettings] = None) -> None:
+        self.settings = settings or get_platform_settings("dy")
         self.index_url = "https://www.douyin.com"
         self.cdp_manager = None
+        self.concurrency = ConcurrencyController.for_platform("dy", self.settings)
 
     async def start(self) -> None:
         playwright_proxy_format, httpx_proxy_format = None, None
-        if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
+        if self.settings.ENABLE_IP_PROXY:
+            ip_proxy_pool = await create_ip_pool(self.settings.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(ip_proxy_info)
 
         async with async_playwright() as playwright:
             # 根据配置选择启动模式
-            if config.ENABLE_CDP_MODE:
+            if self.settings.ENABLE_CDP_MODE:
                 utils.logger.info("[DouYinCrawler] 使用CDP模式启动浏览器")
                 self.browser_context = await self.launch_browser_with_cdp(
                     playwright,
                     playwright_proxy_format,
                     None,
-                    headless=config.CDP_HEADLESS,
+                    headless=self.settings.CDP_HEADLESS,
                 )
             else:
                 utils.logger.info("[DouYinCrawler] 使用标准模式启动浏览器")
@@ -71,7 +80,7 @@ class DouYinCrawler(AbstractCrawler):
                     chromium,
                     playwright_proxy_format,
                     user_agent=None,
-                    headless=config.HEADLESS,
+                    headless=self.settings.HEADLESS,
                 )
             # stealth.min.js is a js script to prevent the website from detecting the crawler.
             await self.browser_context.add_init_script(path="libs/stealth.min.js")
@@ -79,24 +88,28 @@ class DouYinCrawler(AbstractCrawler):
             await self.context_page.goto(self.index_url)
 
             self.dy_client = await self.create_douyin_client(httpx_proxy_format)
-            if not await self.dy_client.pong(browser_context=self.browser_context):
+            if not await check_login_state(self.settings.PLATFORM, self.dy_client.cookie_dict, lambda: self.dy_client.pong(browser_context=self.browser_context)):
                 login_obj = DouYinLogin(
-                    login_type=config.LOGIN_TYPE,
+                    login_type=self.settings.LOGIN_TYPE,
                     login_phone="",  # you phone number
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=self.settings.COOKIES,
                 )
+                # 登录前关闭请求拦截，避免登录二维码无法显示
+                await disable_resource_blocking(self.browser_context, self.settings)
                 await login_obj.begin()
                 await self.dy_client.update_cookies(browser_context=self.browser_context)
-            crawler_type_var.set(config.CRAWLER_TYPE)
-            if config.CRAWLER_TYPE == "search":
+                # 登录完成后重新开启请求拦截
+                await enable_resource_blocking(self.browser_context, self.settings)
+            crawler_type_var.set(self.settings.CRAWLER_TYPE)
+            if self.settings.CRAWLER_TYPE == "search":
                 # Search for notes and retrieve their comment information.
                 await self.search()
-            elif config.CRAWLER_TYPE == "detail":
+            elif self.settings.CRAWLER_TYPE == "detail":
                 # Get the information and comments of the specified post
                 await self.get_specified_awemes()
-            elif config.CRAWLER_TYPE == "creator":
+            elif self.settings.CRAWLER_TYPE == "creator":
                 # Get the information and comments of the specified creator
                 await self.get_creators_and_videos()
 
@@ -105,61 +118,91 @@ class DouYinCrawler(AbstractCrawler):
     async def search(self) -> None:
         utils.logger.info("[DouYinCrawler.search] Begin search douyin keywords")
         dy_limit_count = 10  # douyin limit page fixed value
-        if config.CRAWLER_MAX_NOTES_COUNT < dy_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = dy_limit_count
-        start_page = config.START_PAGE  # start page number
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        # 多个平台同时爬取时共用配置模块，这里用局部变量，不修改全局配置
+        max_notes_count = max(self.settings.CRAWLER_MAX_NOTES_COUNT, dy_limit_count)
+        start_page = self.settings.START_PAGE  # start page number
+        comment_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_COMMENT_WORKER_NUM, self.concurrency.comment.limit)
+
+        async def search_keyword(keyword: str):
             utils.logger.info(f"[DouYinCrawler.search] Current keyword: {keyword}")
-            aweme_list: List[str] = []
-            page = 0
-            dy_search_id = ""
-            while (page - start_page + 1) * dy_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[DouYinCrawler.search] Skip {page}")
-                    page += 1
-                    continue
-                try:
-                    utils.logger.info(f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page}")
-                    posts_res = await self.dy_client.search_info_by_keyword(
-                        keyword=keyword,
-                        offset=page * dy_limit_count - dy_limit_count,
-                        publish_time=PublishTimeType(config.PUBLISH_TIME_TYPE),
-                        search_id=dy_search_id,
-                    )
-                    if posts_res.get("data") is None or posts_res.get("data") == []:
-                        utils.logger.info(f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page} is empty,{posts_res.get('data')}`")
-                        break
-                except DataFetchError:
-                    utils.logger.error(f"[DouYinCrawler.search] search douyin keyword: {keyword} failed")
-                    break
+            # 搜索结果已经是完整的视频信息，搜索 -> 存储 -> 评论 分阶段执行，评论不再等待这个关键词所有页搜索完成
+            pipeline = CrawlPipeline("DouYinCrawler.search", ignore_errors=(DataFetchError,), settings=self.settings)
+            pipeline.add_stage("store", self.save_aweme_detail)
+            if self.settings.ENABLE_GET_COMMENTS:
+                pipeline.add_stage(
+                    "comment",
+                    lambda aweme_id: self.get_comments(aweme_id, self.concurrency.comment),
+                    worker_num=comment_worker_num,
+                )
+            await pipeline.run(self.iter_search_awemes(keyword, start_page, dy_limit_count, max_notes_count))
+
+        await run_keywords("DouYinCrawler.search", self.settings.KEYWORDS.split(","), search_keyword,
+                           ignore_errors=(DataFetchError,), concurrency=self.settings.KEYWORD_CONCURRENCY_NUM,
+                           controller=self.concurrency)
+
+    async def iter_search_awemes(self, keyword: str, start_page: int, page_size: int,
+                                 max_notes_count: int) -> AsyncIterator[Dict]:
+        """
+        Search awemes page by page and yield the aweme info of the search results
+        Args:
+            keyword: search keyword
+            start_page: skip the pages before start_page
+            page_size: douyin limit page fixed value
+            max_notes_count: max awemes count of the keyword
+
+        Returns:
 
+        """
+        page = 0
+        dy_search_id = ""
+        while (page - start_page + 1) * page_size <= max_notes_count:
+            if page < start_page:
+                utils.logger.info(f"[DouYinCrawler.search] Skip {page}")
                 page += 1
-                if "data" not in posts_res:
-                    utils.logger.error(f"[DouYinCrawler.search] search douyin keyword: {keyword} failed，账号也许被风控了。")
+                continue
+            try:
+                utils.logger.info(f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page}")
+                posts_res = await self.dy_client.search_info_by_keyword(
+                    keyword=keyword,
+                    offset=page * page_size - page_size,
+                    publish_time=PublishTimeType(self.settings.PUBLISH_TIME_TYPE),
+                    search_id=dy_search_id,
+                )
+                if posts_res.get("data") is None or posts_res.get("data") == []:
+                    utils.logger.info(f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page} is empty,{posts_res.get('data')}`")
                     break
-                dy_search_id = posts_res.get("extra", {}).get("logid", "")
-                for post_item in posts_res.get("data"):
-                    try:
-                        aweme_info: Dict = (post_item.get("aweme_info") or post_item.get("aweme_mix_info", {}).get("mix_items")[0])
-                    except TypeError:
-                        continue
-                    aweme_list.append(aweme_info.get("aweme_id", ""))
-                    await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
-                    await self.get_aweme_media(aweme_item=aweme_info)
-            utils.logger.info(f"[DouYinCrawler.search] keyword:{keyword}, aweme_list:{aweme_list}")
-            await self.batch_get_note_comments(aweme_list)
+            except DataFetchError:
+                utils.logger.error(f"[DouYinCrawler.search] search douyin keyword: {keyword} failed")
+                break
+
+            page += 1
+            if "data" not in posts_res:
+                utils.logger.error(f"[DouYinCrawler.search] search douyin keyword: {keyword} failed，账号也许被风控了。")
+                break
+            dy_search_id = posts_res.get("extra", {}).get("logid", "")
+            for post_item in posts_res.get("data"):
+                try:
+                    aweme_info: Dict = (post_item.get("aweme_info") or post_item.get("aweme_mix_info", {}).get("mix_items")[0])
+                except TypeError:
+                    continue
+                yield aweme_info
+
+    async def save_aweme_detail(self, aweme_info: Dict) -> str:
+        """Save aweme info and its media, return the aweme id for the comment stage"""
+        await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
+        await self.get_aweme_media(aweme_item=aweme_info)
+        return aweme_info.get("aweme_id", "")
 
     async def get_specified_awemes(self):
         """Get the information and comments of the specified post"""
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        task_list = [self.get_aweme_detail(aweme_id=aweme_id, semaphore=semaphore) for aweme_id in config.DY_SPECIFIED_ID_LIST]
+        semaphore = self.concurrency.api
+        task_list = [self.get_aweme_detail(aweme_id=aweme_id, semaphore=semaphore) for aweme_id in self.settings.DY_SPECIFIED_ID_LIST]
         aweme_details = await asyncio.gather(*task_list)
         for aweme_detail in aweme_details:
             if aweme_detail is not None:
                 await douyin_store.update_douyin_aweme(aweme_item=aweme_detail)
                 await self.get_aweme_media(aweme_item=aweme_detail)
-        await self.batch_get_note_comments(config.DY_SPECIFIED_ID_LIST)
+        await self.batch_get_note_comments(self.settings.DY_SPECIFIED_ID_LIST)
 
     async def get_aweme_detail(self, aweme_id: str, semaphore: asyncio.Semaphore) -> Any:
         """Get note detail"""
@@ -177,12 +220,12 @@ class DouYinCrawler(AbstractCrawler):
         """
         Batch get note comments
         """
-        if not config.ENABLE_GET_COMMENTS:
+        if not self.settings.ENABLE_GET_COMMENTS:
             utils.logger.info(f"[DouYinCrawler.batch_get_note_comments] Crawling comment mode is not enabled")
             return
 
         task_list: List[Task] = []
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.comment
         for aweme_id in aweme_list:
             task = asyncio.create_task(self.get_comments(aweme_id, semaphore), name=aweme_id)
             task_list.append(task)
@@ -195,10 +238,10 @@ class DouYinCrawler(AbstractCrawler):
                 # 将关键词列表传递给 get_aweme_all_comments 方法
                 await self.dy_client.get_aweme_all_comments(
                     aweme_id=aweme_id,
-                    crawl_interval=random.random(),
-                    is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
+                    crawl_interval=get_crawl_interval(random.random(), self.settings),
+                    is_fetch_sub_comments=self.settings.ENABLE_GET_SUB_COMMENTS,
                     callback=douyin_store.batch_update_dy_aweme_comments,
-                    max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                    max_count=self.settings.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
                 utils.logger.info(f"[DouYinCrawler.get_comments] aweme_id: {aweme_id} comments have all been obtained and filtered ...")
             except DataFetchError as e:
@@ -209,7 +252,7 @@ class DouYinCrawler(AbstractCrawler):
         Get the information and videos of the specified creator
         """
         utils.logger.info("[DouYinCrawler.get_creators_and_videos] Begin get douyin creators")
-        for user_id in config.DY_CREATOR_ID_LIST:
+        for user_id in self.settings.DY_CREATOR_ID_LIST:
             creator_info: Dict = await self.dy_client.get_user_info(user_id)
             if creator_info:
                 await douyin_store.save_creator(user_id, creator=creator_info)
@@ -224,7 +267,7 @@ class DouYinCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.api
         task_list = [self.get_aweme_detail(post_item.get("aweme_id"), semaphore) for post_item in video_list]
 
         note_details = await asyncio.gather(*task_list)
@@ -248,7 +291,9 @@ class DouYinCrawler(AbstractCrawler):
             },
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
+            settings=self.settings,
         )
+        douyin_client.concurrency = self.concurrency
         return douyin_client
 
     async def launch_browser(
@@ -259,8 +304,8 @@ class DouYinCrawler(AbstractCrawler):
         headless: bool = True,
     ) -> BrowserContext:
         """Launch browser and create browser context"""
-        if config.SAVE_LOGIN_STATE:
-            user_data_dir = os.path.join(os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM)  # type: ignore
+        if self.settings.SAVE_LOGIN_STATE:
+            user_data_dir = os.path.join(os.getcwd(), "browser_data", self.settings.USER_DATA_DIR % self.settings.PLATFORM)  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
                 accept_downloads=True,
@@ -272,10 +317,12 @@ class DouYinCrawler(AbstractCrawler):
                 },
                 user_agent=user_agent,
             )  # type: ignore
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
         else:
             browser = await chromium.launch(headless=headless, proxy=playwright_proxy)  # type: ignore
             browser_context = await browser.new_context(viewport={"width": 1920, "height": 1080}, user_agent=user_agent)
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
 
     async def launch_browser_with_cdp(
@@ -289,7 +336,7 @@ class DouYinCrawler(AbstractCrawler):
         使用CDP模式启动浏览器
         """
         try:
-            self.cdp_manager = CDPBrowserManager()
+            self.cdp_manager = CDPBrowserManager(self.settings)
             browser_context = await self.cdp_manager.launch_and_connect(
                 playwright=playwright,
                 playwright_proxy=playwright_proxy,
@@ -314,6 +361,9 @@ class DouYinCrawler(AbstractCrawler):
 
     async def close(self) -> None:
         """Close browser context"""
+        # 关闭 API 客户端的 httpx 连接池
+        if getattr(self, "dy_client", None):
+            await self.dy_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
@@ -329,7 +379,7 @@ class DouYinCrawler(AbstractCrawler):
         Args:
             aweme_item (Dict): 抖音作品详情
         """
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.settings.ENABLE_GET_MEIDAS:
             utils.logger.info(f"[DouYinCrawler.get_aweme_media] Crawling image mode is not enabled")
             return
         # 笔记 urls 列表，若为短视频类型则返回为空列表
@@ -349,7 +399,7 @@ class DouYinCrawler(AbstractCrawler):
         Args:
             aweme_item (Dict): 抖音作品详情
         """
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.settings.ENABLE_GET_MEIDAS:
             return
         aweme_id = aweme_item.get("aweme_id")
         # 笔记 urls 列表，若为短视频类型则返回为空列表
@@ -361,13 +411,10 @@ class DouYinCrawler(AbstractCrawler):
         for url in note_download_url:
             if not url:
                 continue
-            content = await self.dy_client.get_aweme_media(url)
-            await asyncio.sleep(random.random())
-            if content is None:
-                continue
             extension_file_name = f"{picNum:>03d}.jpeg"
             picNum += 1
-            await douyin_store.update_dy_aweme_image(aweme_id, content, extension_file_name)
+            await douyin_store.download_dy_aweme_image(aweme_id, url, extension_file_name, proxy=self.dy_client.proxy,
+                                                       timeout=self.dy_client.timeout, follow_redirects=True)
 
     async def get_aweme_video(self, aweme_item: Dict):
         """
@@ -376,7 +423,7 @@ class DouYinCrawler(AbstractCrawler):
         Args:
             aweme_item (Dict): 抖音作品详情
         """
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.settings.ENABLE_GET_MEIDAS:
             return
         aweme_id = aweme_item.get("aweme_id")
 
@@ -385,9 +432,6 @@ class DouYinCrawler(AbstractCrawler):
 
         if not video_download_url:
             return
-        content = await self.dy_client.get_aweme_media(video_download_url)
-        await asyncio.sleep(random.random())
-        if content is None:
-            return
         extension_file_name = f"video.mp4"
-        await douyin_store.update_dy_aweme_video(aweme_id, content, extension_file_name)
+        await douyin_store.download_dy_aweme_video(aweme_id, video_download_url, extension_file_name, proxy=self.dy_client.proxy,
+                                                   timeout=self.dy_client.timeout, follow_redirects=True)
@@ -18,9 +18,10 @@ from urllib.parse import urlencode
 import httpx
 from playwright.async_api import BrowserContext, Page
 
-import config
+from config import PlatformSettings, get_platform_settings
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.http_client_pool import HttpClientPool
 
 from .exception import DataFetchError
 from .graphql import KuaiShouGraphQL
@@ -33,8 +34,9 @@ class KuaiShouClient(AbstractApiClient):
         proxy=None,
         *,
         headers: Dict[str, str],
-        playwright_page: Page,
+        playwright_page: Optional[Page],
         cookie_dict: Dict[str, str],
+        settings: Optional[PlatformSettings] = None,
     ):
         self.proxy = proxy
         self.timeout = timeout
@@ -43,16 +45,27 @@ class KuaiShouClient(AbstractApiClient):
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
         self.graphql = KuaiShouGraphQL()
+        self.settings = settings or get_platform_settings("ks")
+        self._http_pool = HttpClientPool(settings=self.settings)
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        async with self._http_pool.get_client(self.proxy) as client:
+            return await self.send_request(client, method, url, self._validate_response, timeout=self.timeout, **kwargs)
+
+    @staticmethod
+    def _validate_response(response: httpx.Response) -> Any:
         data: Dict = response.json()
         if data.get("errors"):
             raise DataFetchError(data.get("errors", "unkonw error"))
         else:
             return data.get("data", {})
 
+    async def close(self):
+        """
+        关闭 httpx 连接池
+        """
+        await self._http_pool.close()
+
     async def get(self, uri: str, params=None) -> Dict:
         final_uri = uri
         if isinstance(params, dict):
@@ -230,7 +243,7 @@ class KuaiShouClient(AbstractApiClient):
         Returns:
 
         """
-        if not config.ENABLE_GET_SUB_COMMENTS:
+        if not self.settings.ENABLE_GET_SUB_COMMENTS:
             utils.logger.info(
                 f"[KuaiShouClient.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled"
             )
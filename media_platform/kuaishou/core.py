@@ -14,7 +14,7 @@ import os
 import random
 import time
 from asyncio import Task
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from playwright.async_api import (
     BrowserContext,
@@ -24,13 +24,19 @@ from playwright.async_api import (
     async_playwright,
 )
 
-import config
+from config import PlatformSettings, get_platform_settings
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import kuaishou as kuaishou_store
-from tools import utils
+from tools import cookie_store, utils
+from tools.keyword_runner import run_keywords
+from tools.rate_limiter import get_crawl_interval
 from tools.cdp_browser import CDPBrowserManager
-from var import comment_tasks_var, crawler_type_var, source_keyword_var
+from tools.concurrency_controller import ConcurrencyController
+from tools.crawl_pipeline import CrawlPipeline, get_stage_worker_num
+from tools.login_state_cache import check_login_state
+from tools.resource_blocker import disable_resource_blocking, enable_resource_blocking
+from var import comment_tasks_var, crawler_type_var
 
 from .client import KuaiShouClient
 from .exception import DataFetchError
@@ -42,137 +48,214 @@ class KuaishouCrawler(AbstractCrawler):
     ks_client: KuaiShouClient
     browser_context: BrowserContext
     cdp_manager: Optional[CDPBrowserManager]
+    concurrency: ConcurrencyController
 
-    def __init__(self):
+    def __init__(self, settings: Optional[PlatformSettings] = None):
+        self.settings = settings or get_platform_settings("ks")
         self.index_url = "https://www.kuaishou.com"
         self.user_agent = utils.get_user_agent()
         self.cdp_manager = None
+        self.concurrency = ConcurrencyController.for_platform("ks", self.settings)
 
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
-        if config.ENABLE_IP_PROXY:
+        if self.settings.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
+                self.settings.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(
                 ip_proxy_info
             )
 
+        if self.settings.ENABLE_BROWSERLESS_MODE:
+            await self.start_browserless(playwright_proxy_format, httpx_proxy_format)
+            return
+
         async with async_playwright() as playwright:
-            # 根据配置选择启动模式
-            if config.ENABLE_CDP_MODE:
-                utils.logger.info("[KuaishouCrawler] 使用CDP模式启动浏览器")
-                self.browser_context = await self.launch_browser_with_cdp(
-                    playwright,
-                    playwright_proxy_format,
-                    self.user_agent,
-                    headless=config.CDP_HEADLESS,
-                )
-            else:
-                utils.logger.info("[KuaishouCrawler] 使用标准模式启动浏览器")
-                # Launch a browser context.
-                chromium = playwright.chromium
-                self.browser_context = await self.launch_browser(
-                    chromium, None, self.user_agent, headless=config.HEADLESS
-                )
-            # stealth.min.js is a js script to prevent the website from detecting the crawler.
-            await self.browser_context.add_init_script(path="libs/stealth.min.js")
-            self.context_page = await self.browser_context.new_page()
-            await self.context_page.goto(f"{self.index_url}?isHome=1")
-
-            # Create a client to interact with the kuaishou website.
-            self.ks_client = await self.create_ks_client(httpx_proxy_format)
-            if not await self.ks_client.pong():
-                login_obj = KuaishouLogin(
-                    login_type=config.LOGIN_TYPE,
-                    login_phone=httpx_proxy_format,
-                    browser_context=self.browser_context,
-                    context_page=self.context_page,
-                    cookie_str=config.COOKIES,
-                )
-                await login_obj.begin()
-                await self.ks_client.update_cookies(
-                    browser_context=self.browser_context
-                )
+            await self.launch_and_login(playwright, playwright_proxy_format, httpx_proxy_format)
+            await self.crawl()
+
+    async def start_browserless(self, playwright_proxy_format: Optional[Dict], httpx_proxy_format: Optional[str]):
+        """
+        免浏览器模式：使用保存的 cookie 直接请求 API，cookie 失效时才启动浏览器登录，登录后保存 cookie 并立即关闭浏览器
+        Args:
+            playwright_proxy_format: 浏览器代理
+            httpx_proxy_format: httpx 代理
+
+        Returns:
+
+        """
+        cookie_str = cookie_store.load_cookies(self.settings.PLATFORM, self.settings)
+        self.ks_client = self.create_ks_client_with_cookies(httpx_proxy_format, cookie_str)
+        if not cookie_str or not await check_login_state(self.settings.PLATFORM, self.ks_client.cookie_dict, self.ks_client.pong):
+            utils.logger.info("[KuaishouCrawler.start_browserless] Saved cookies are invalid, launch browser to login ...")
+            await self.ks_client.close()
+            async with async_playwright() as playwright:
+                await self.launch_and_login(playwright, playwright_proxy_format, httpx_proxy_format)
+                cookie_store.save_cookies(self.settings.PLATFORM, self.ks_client.headers["Cookie"], self.settings)
+                await self.close_browser()
+            self.ks_client.playwright_page = None
+        await self.crawl()
+
+    async def launch_and_login(self, playwright: Playwright, playwright_proxy_format: Optional[Dict], httpx_proxy_format: Optional[str]):
+        """
+        启动浏览器，创建 API 客户端，登录态失效时登录
+        Args:
+            playwright: playwright 对象
+            playwright_proxy_format: 浏览器代理
+            httpx_proxy_format: httpx 代理
+
+        Returns:
+
+        """
+        # 根据配置选择启动模式
+        if self.settings.ENABLE_CDP_MODE:
+            utils.logger.info("[KuaishouCrawler] 使用CDP模式启动浏览器")
+            self.browser_context = await self.launch_browser_with_cdp(
+                playwright,
+                playwright_proxy_format,
+                self.user_agent,
+                headless=self.settings.CDP_HEADLESS,
+            )
+        else:
+            utils.logger.info("[KuaishouCrawler] 使用标准模式启动浏览器")
+            # Launch a browser context.
+            chromium = playwright.chromium
+            self.browser_context = await self.launch_browser(
+                chromium, None, self.user_agent, headless=self.settings.HEADLESS
+            )
+        # stealth.min.js is a js script to prevent the website from detecting the crawler.
+        await self.browser_context.add_init_script(path="libs/stealth.min.js")
+        self.context_page = await self.browser_context.new_page()
+        await self.context_page.goto(f"{self.index_url}?isHome=1")
+
+        # Create a client to interact with the kuaishou website.
+        self.ks_client = await self.create_ks_client(httpx_proxy_format)
+        if not await check_login_state(self.settings.PLATFORM, self.ks_client.cookie_dict, self.ks_client.pong):
+            login_obj = KuaishouLogin(
+                login_type=self.settings.LOGIN_TYPE,
+                login_phone=httpx_proxy_format,
+                browser_context=self.browser_context,
+                context_page=self.context_page,
+                cookie_str=self.settings.COOKIES,
+            )
+            # 登录前关闭请求拦截，避免登录二维码无法显示
+            await disable_resource_blocking(self.browser_context, self.settings)
+            await login_obj.begin()
+            await self.ks_client.update_cookies(
+                browser_context=self.browser_context
+            )
+            # 登录完成后重新开启请求拦截
+            await enable_resource_blocking(self.browser_context, self.settings)
 
-            crawler_type_var.set(config.CRAWLER_TYPE)
-            if config.CRAWLER_TYPE == "search":
-                # Search for videos and retrieve their comment information.
-                await self.search()
-            elif config.CRAWLER_TYPE == "detail":
-                # Get the information and comments of the specified post
-                await self.get_specified_videos()
-            elif config.CRAWLER_TYPE == "creator":
-                # Get creator's information and their videos and comments
-                await self.get_creators_and_videos()
-            else:
-                pass
-
-            utils.logger.info("[KuaishouCrawler.start] Kuaishou Crawler finished ...")
+    async def crawl(self):
+        """
+        按爬取类型开始爬取
+        Returns:
+
+        """
+        crawler_type_var.set(self.settings.CRAWLER_TYPE)
+        if self.settings.CRAWLER_TYPE == "search":
+            # Search for videos and retrieve their comment information.
+            await self.search()
+        elif self.settings.CRAWLER_TYPE == "detail":
+            # Get the information and comments of the specified post
+            await self.get_specified_videos()
+        elif self.settings.CRAWLER_TYPE == "creator":
+            # Get creator's information and their videos and comments
+            await self.get_creators_and_videos()
+        else:
+            pass
+
+        utils.logger.info("[KuaishouCrawler.start] Kuaishou Crawler finished ...")
 
     async def search(self):
         utils.logger.info("[KuaishouCrawler.search] Begin search kuaishou keywords")
         ks_limit_count = 20  # kuaishou limit page fixed value
-        if config.CRAWLER_MAX_NOTES_COUNT < ks_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = ks_limit_count
-        start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            search_session_id = ""
-            source_keyword_var.set(keyword)
+        # 多个平台同时爬取时共用配置模块，这里用局部变量，不修改全局配置
+        max_notes_count = max(self.settings.CRAWLER_MAX_NOTES_COUNT, ks_limit_count)
+        start_page = self.settings.START_PAGE
+        comment_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_COMMENT_WORKER_NUM, self.concurrency.comment.limit)
+
+        async def search_keyword(keyword: str):
             utils.logger.info(
                 f"[KuaishouCrawler.search] Current search keyword: {keyword}"
             )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * ks_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[KuaishouCrawler.search] Skip page: {page}")
-                    page += 1
-                    continue
-                utils.logger.info(
-                    f"[KuaishouCrawler.search] search kuaishou keyword: {keyword}, page: {page}"
+            # 搜索结果已经是完整的视频信息，搜索 -> 存储 -> 评论 分阶段执行，下一页的搜索不再等待上一页的评论爬取完成
+            pipeline = CrawlPipeline("KuaishouCrawler.search", ignore_errors=(DataFetchError,), settings=self.settings)
+            pipeline.add_stage("store", self.save_video_detail)
+            if self.settings.ENABLE_GET_COMMENTS:
+                pipeline.add_stage(
+                    "comment",
+                    lambda video_id: self.get_comments(video_id, self.concurrency.comment),
+                    worker_num=comment_worker_num,
                 )
-                video_id_list: List[str] = []
-                videos_res = await self.ks_client.search_info_by_keyword(
-                    keyword=keyword,
-                    pcursor=str(page),
-                    search_session_id=search_session_id,
-                )
-                if not videos_res:
-                    utils.logger.error(
-                        f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data"
-                    )
-                    continue
+            await pipeline.run(self.iter_search_videos(keyword, start_page, ks_limit_count, max_notes_count))
 
-                vision_search_photo: Dict = videos_res.get("visionSearchPhoto")
-                if vision_search_photo.get("result") != 1:
-                    utils.logger.error(
-                        f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data "
-                    )
-                    continue
-                search_session_id = vision_search_photo.get("searchSessionId", "")
-                for video_detail in vision_search_photo.get("feeds"):
-                    video_id_list.append(video_detail.get("photo", {}).get("id"))
-                    await kuaishou_store.update_kuaishou_video(video_item=video_detail)
+        await run_keywords("KuaishouCrawler.search", self.settings.KEYWORDS.split(","), search_keyword,
+                           ignore_errors=(DataFetchError,), concurrency=self.settings.KEYWORD_CONCURRENCY_NUM,
+                           controller=self.concurrency)
 
-                # batch fetch video comments
+    async def iter_search_videos(self, keyword: str, start_page: int, page_size: int,
+                                 max_notes_count: int) -> AsyncIterator[Dict]:
+        """
+        Search videos page by page and yield the video details of the search results
+        :param keyword: search keyword
+        :param start_page: skip the pages before start_page
+        :param page_size: kuaishou limit page fixed value
+        :param max_notes_count: max videos count of the keyword
+        :return:
+        """
+        search_session_id = ""
+        page = 1
+        while (page - start_page + 1) * page_size <= max_notes_count:
+            if page < start_page:
+                utils.logger.info(f"[KuaishouCrawler.search] Skip page: {page}")
                 page += 1
-                await self.batch_get_video_comments(video_id_list)
+                continue
+            utils.logger.info(
+                f"[KuaishouCrawler.search] search kuaishou keyword: {keyword}, page: {page}"
+            )
+            videos_res = await self.ks_client.search_info_by_keyword(
+                keyword=keyword,
+                pcursor=str(page),
+                search_session_id=search_session_id,
+            )
+            if not videos_res:
+                utils.logger.error(
+                    f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data"
+                )
+                continue
+
+            vision_search_photo: Dict = videos_res.get("visionSearchPhoto")
+            if vision_search_photo.get("result") != 1:
+                utils.logger.error(
+                    f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data "
+                )
+                continue
+            search_session_id = vision_search_photo.get("searchSessionId", "")
+            page += 1
+            for video_detail in vision_search_photo.get("feeds"):
+                yield video_detail
+
+    async def save_video_detail(self, video_detail: Dict) -> str:
+        """Save video detail, return the video id for the comment stage"""
+        await kuaishou_store.update_kuaishou_video(video_item=video_detail)
+        return video_detail.get("photo", {}).get("id")
 
     async def get_specified_videos(self):
         """Get the information and comments of the specified post"""
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.api
         task_list = [
             self.get_video_info_task(video_id=video_id, semaphore=semaphore)
-            for video_id in config.KS_SPECIFIED_ID_LIST
+            for video_id in self.settings.KS_SPECIFIED_ID_LIST
         ]
         video_details = await asyncio.gather(*task_list)
         for video_detail in video_details:
             if video_detail is not None:
                 await kuaishou_store.update_kuaishou_video(video_detail)
-        await self.batch_get_video_comments(config.KS_SPECIFIED_ID_LIST)
+        await self.batch_get_video_comments(self.settings.KS_SPECIFIED_ID_LIST)
 
     async def get_video_info_task(
         self, video_id: str, semaphore: asyncio.Semaphore
@@ -202,7 +285,7 @@ class KuaishouCrawler(AbstractCrawler):
         :param video_id_list:
         :return:
         """
-        if not config.ENABLE_GET_COMMENTS:
+        if not self.settings.ENABLE_GET_COMMENTS:
             utils.logger.info(
                 f"[KuaishouCrawler.batch_get_video_comments] Crawling comment mode is not enabled"
             )
@@ -211,7 +294,7 @@ class KuaishouCrawler(AbstractCrawler):
         utils.logger.info(
             f"[KuaishouCrawler.batch_get_video_comments] video ids:{video_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.comment
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(
@@ -236,9 +319,9 @@ class KuaishouCrawler(AbstractCrawler):
                 )
                 await self.ks_client.get_video_all_comments(
                     photo_id=video_id,
-                    crawl_interval=random.random(),
+                    crawl_interval=get_crawl_interval(random.random(), self.settings),
                     callback=kuaishou_store.batch_update_ks_video_comments,
-                    max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                    max_count=self.settings.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
             except DataFetchError as ex:
                 utils.logger.error(
@@ -254,10 +337,12 @@ class KuaishouCrawler(AbstractCrawler):
                 for task in current_running_tasks:
                     task.cancel()
                 time.sleep(20)
-                await self.context_page.goto(f"{self.index_url}?isHome=1")
-                await self.ks_client.update_cookies(
-                    browser_context=self.browser_context
-                )
+                # 免浏览器模式下浏览器已经关闭，继续使用原来的 cookie
+                if getattr(self, "context_page", None) and not self.context_page.is_closed():
+                    await self.context_page.goto(f"{self.index_url}?isHome=1")
+                    await self.ks_client.update_cookies(
+                        browser_context=self.browser_context
+                    )
 
     async def create_ks_client(self, httpx_proxy: Optional[str]) -> KuaiShouClient:
         """Create ks client"""
@@ -269,18 +354,38 @@ class KuaishouCrawler(AbstractCrawler):
         )
         ks_client_obj = KuaiShouClient(
             proxy=httpx_proxy,
-            headers={
-                "User-Agent": self.user_agent,
-                "Cookie": cookie_str,
-                "Origin": self.index_url,
-                "Referer": self.index_url,
-                "Content-Type": "application/json;charset=UTF-8",
-            },
+            headers=self._make_client_headers(cookie_str),
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
+            settings=self.settings,
         )
+        ks_client_obj.concurrency = self.concurrency
         return ks_client_obj
 
+    def create_ks_client_with_cookies(self, httpx_proxy: Optional[str], cookie_str: str) -> KuaiShouClient:
+        """Create ks client from cookie string without browser"""
+        utils.logger.info(
+            "[KuaishouCrawler.create_ks_client_with_cookies] Begin create kuaishou API client without browser ..."
+        )
+        ks_client_obj = KuaiShouClient(
+            proxy=httpx_proxy,
+            headers=self._make_client_headers(cookie_str),
+            playwright_page=None,
+            cookie_dict=utils.convert_str_cookie_to_dict(cookie_str),
+            settings=self.settings,
+        )
+        ks_client_obj.concurrency = self.concurrency
+        return ks_client_obj
+
+    def _make_client_headers(self, cookie_str: str) -> Dict[str, str]:
+        return {
+            "User-Agent": self.user_agent,
+            "Cookie": cookie_str,
+            "Origin": self.index_url,
+            "Referer": self.index_url,
+            "Content-Type": "application/json;charset=UTF-8",
+        }
+
     async def launch_browser(
         self,
         chromium: BrowserType,
@@ -292,9 +397,9 @@ class KuaishouCrawler(AbstractCrawler):
         utils.logger.info(
             "[KuaishouCrawler.launch_browser] Begin create browser context ..."
         )
-        if config.SAVE_LOGIN_STATE:
+        if self.settings.SAVE_LOGIN_STATE:
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", self.settings.USER_DATA_DIR % self.settings.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -304,12 +409,14 @@ class KuaishouCrawler(AbstractCrawler):
                 viewport={"width": 1920, "height": 1080},
                 user_agent=user_agent,
             )
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
         else:
             browser = await chromium.launch(headless=headless, proxy=playwright_proxy)  # type: ignore
             browser_context = await browser.new_context(
                 viewport={"width": 1920, "height": 1080}, user_agent=user_agent
             )
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
 
     async def launch_browser_with_cdp(
@@ -323,7 +430,7 @@ class KuaishouCrawler(AbstractCrawler):
         使用CDP模式启动浏览器
         """
         try:
-            self.cdp_manager = CDPBrowserManager()
+            self.cdp_manager = CDPBrowserManager(self.settings)
             browser_context = await self.cdp_manager.launch_and_connect(
                 playwright=playwright,
                 playwright_proxy=playwright_proxy,
@@ -352,7 +459,7 @@ class KuaishouCrawler(AbstractCrawler):
         utils.logger.info(
             "[KuaiShouCrawler.get_creators_and_videos] Begin get kuaishou creators"
         )
-        for user_id in config.KS_CREATOR_ID_LIST:
+        for user_id in self.settings.KS_CREATOR_ID_LIST:
             # get creator detail info from web html content
             createor_info: Dict = await self.ks_client.get_creator_info(user_id=user_id)
             if createor_info:
@@ -361,7 +468,7 @@ class KuaishouCrawler(AbstractCrawler):
             # Get all video information of the creator
             all_video_list = await self.ks_client.get_all_videos_by_creator(
                 user_id=user_id,
-                crawl_interval=random.random(),
+                crawl_interval=get_crawl_interval(random.random(), self.settings),
                 callback=self.fetch_creator_video_detail,
             )
 
@@ -374,7 +481,7 @@ class KuaishouCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.api
         task_list = [
             self.get_video_info_task(post_item.get("photo", {}).get("id"), semaphore)
             for post_item in video_list
@@ -387,10 +494,17 @@ class KuaishouCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭 API 客户端的 httpx 连接池
+        if getattr(self, "ks_client", None):
+            await self.ks_client.close()
+        await self.close_browser()
+
+    async def close_browser(self):
+        """Close browser context only, the API client keeps working with the extracted cookies"""
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
             self.cdp_manager = None
-        else:
+        elif getattr(self, "browser_context", None):
             await self.browser_context.close()
         utils.logger.info("[KuaishouCrawler.close] Browser context closed ...")
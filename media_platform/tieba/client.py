@@ -15,13 +15,13 @@ from urllib.parse import urlencode
 
 import httpx
 from playwright.async_api import BrowserContext
-from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
 
-import config
-from base.base_crawler import AbstractApiClient
+from config import PlatformSettings, get_platform_settings
+from base.base_crawler import AbstractApiClient, RequestRetryError, RetryableRequestError
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
 from proxy.proxy_ip_pool import ProxyIpPool
 from tools import utils
+from tools.http_client_pool import HttpClientPool
 
 from .field import SearchNoteType, SearchSortType
 from .help import TieBaExtractor
@@ -34,6 +34,7 @@ class BaiduTieBaClient(AbstractApiClient):
         timeout=10,
         ip_pool=None,
         default_ip_proxy=None,
+        settings: Optional[PlatformSettings] = None,
     ):
         self.ip_pool: Optional[ProxyIpPool] = ip_pool
         self.timeout = timeout
@@ -44,8 +45,9 @@ class BaiduTieBaClient(AbstractApiClient):
         self._host = "https://tieba.baidu.com"
         self._page_extractor = TieBaExtractor()
         self.default_ip_proxy = default_ip_proxy
+        self.settings = settings or get_platform_settings("tieba")
+        self._http_pool = HttpClientPool(settings=self.settings)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def request(self, method, url, return_ori_content=False, proxy=None, **kwargs) -> Union[str, Any]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -60,23 +62,42 @@ class BaiduTieBaClient(AbstractApiClient):
 
         """
         actual_proxy = proxy if proxy else self.default_ip_proxy
-        async with httpx.AsyncClient(proxy=actual_proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, headers=self.headers, **kwargs)
+        async with self._http_pool.get_client(actual_proxy) as client:
+            return await self.send_request(client, method, url, lambda response: self._validate_response(response, return_ori_content),
+                                           timeout=self.timeout, headers=self.headers, **kwargs)
 
+    @staticmethod
+    def _validate_response(response: httpx.Response, return_ori_content: bool = False) -> Union[str, Any]:
+        """
+        校验并解析响应，贴吧请求失败通常是 IP 被限制，抛出可重试的错误，重试失败后由 get 方法切换代理 IP
+        Args:
+            response: 响应
+            return_ori_content: 是否返回原始内容
+
+        Returns:
+
+        """
+        method, url = response.request.method, response.request.url
         if response.status_code != 200:
             utils.logger.error(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
             utils.logger.error(f"Request failed, response: {response.text}")
-            raise Exception(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
+            raise RetryableRequestError(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
 
         if response.text == "" or response.text == "blocked":
             utils.logger.error(f"request params incrr, response.text: {response.text}")
-            raise Exception("account blocked")
+            raise RetryableRequestError("account blocked")
 
         if return_ori_content:
             return response.text
 
         return response.json()
 
+    async def close(self):
+        """
+        关闭 httpx 连接池
+        """
+        await self._http_pool.close()
+
     async def get(self, uri: str, params=None, return_ori_content=False, **kwargs) -> Any:
         """
         GET请求，对请求头签名
@@ -95,7 +116,7 @@ class BaiduTieBaClient(AbstractApiClient):
         try:
             res = await self.request(method="GET", url=f"{self._host}{final_uri}", return_ori_content=return_ori_content, **kwargs)
             return res
-        except RetryError as e:
+        except RequestRetryError as e:
             if self.ip_pool:
                 proxie_model = await self.ip_pool.get_proxy()
                 _, proxy = utils.format_proxy_info(proxie_model)
@@ -251,7 +272,7 @@ class BaiduTieBaClient(AbstractApiClient):
 
         """
         uri = "/p/comment"
-        if not config.ENABLE_GET_SUB_COMMENTS:
+        if not self.settings.ENABLE_GET_SUB_COMMENTS:
             return []
 
         # # 贴吧获取所有子评论需要登录态
@@ -13,7 +13,7 @@ import asyncio
 import os
 import random
 from asyncio import Task
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from playwright.async_api import (
     BrowserContext,
@@ -23,14 +23,19 @@ from playwright.async_api import (
     async_playwright,
 )
 
-import config
+from config import PlatformSettings, get_platform_settings
 from base.base_crawler import AbstractCrawler
 from model.m_baidu_tieba import TiebaCreator, TiebaNote
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import tieba as tieba_store
 from tools import utils
+from tools.keyword_runner import run_keywords
+from tools.rate_limiter import get_crawl_interval
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_controller import ConcurrencyController
+from tools.crawl_pipeline import CrawlPipeline, get_stage_worker_num
+from tools.resource_blocker import enable_resource_blocking
+from var import crawler_type_var
 
 from .client import BaiduTieBaClient
 from .field import SearchNoteType, SearchSortType
@@ -43,12 +48,15 @@ class TieBaCrawler(AbstractCrawler):
     tieba_client: BaiduTieBaClient
     browser_context: BrowserContext
     cdp_manager: Optional[CDPBrowserManager]
+    concurrency: ConcurrencyController
 
-    def __init__(self) -> None:
+    def __init__(self, settings: Optional[PlatformSettings] = None) -> None:
+        self.settings = settings or get_platform_settings("tieba")
         self.index_url = "https://tieba.baidu.com"
         self.user_agent = utils.get_user_agent()
         self._page_extractor = TieBaExtractor()
         self.cdp_manager = None
+        self.concurrency = ConcurrencyController.for_platform("tieba", self.settings)
 
     async def start(self) -> None:
         """
@@ -57,12 +65,12 @@ class TieBaCrawler(AbstractCrawler):
 
         """
         ip_proxy_pool, httpx_proxy_format = None, None
-        if config.ENABLE_IP_PROXY:
+        if self.settings.ENABLE_IP_PROXY:
             utils.logger.info(
                 "[BaiduTieBaCrawler.start] Begin create ip proxy pool ..."
             )
             ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
+                self.settings.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
             _, httpx_proxy_format = utils.format_proxy_info(ip_proxy_info)
@@ -74,16 +82,18 @@ class TieBaCrawler(AbstractCrawler):
         self.tieba_client = BaiduTieBaClient(
             ip_pool=ip_proxy_pool,
             default_ip_proxy=httpx_proxy_format,
+            settings=self.settings,
         )
-        crawler_type_var.set(config.CRAWLER_TYPE)
-        if config.CRAWLER_TYPE == "search":
+        self.tieba_client.concurrency = self.concurrency
+        crawler_type_var.set(self.settings.CRAWLER_TYPE)
+        if self.settings.CRAWLER_TYPE == "search":
             # Search for notes and retrieve their comment information.
             await self.search()
             await self.get_specified_tieba_notes()
-        elif config.CRAWLER_TYPE == "detail":
+        elif self.settings.CRAWLER_TYPE == "detail":
             # Get the information and comments of the specified post
             await self.get_specified_notes()
-        elif config.CRAWLER_TYPE == "creator":
+        elif self.settings.CRAWLER_TYPE == "creator":
             # Get creator's information and their notes and comments
             await self.get_creators_and_notes()
         else:
@@ -101,52 +111,92 @@ class TieBaCrawler(AbstractCrawler):
             "[BaiduTieBaCrawler.search] Begin search baidu tieba keywords"
         )
         tieba_limit_count = 10  # tieba limit page fixed value
-        if config.CRAWLER_MAX_NOTES_COUNT < tieba_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = tieba_limit_count
-        start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        # 多个平台同时爬取时共用配置模块，这里用局部变量，不修改全局配置
+        max_notes_count = max(self.settings.CRAWLER_MAX_NOTES_COUNT, tieba_limit_count)
+        start_page = self.settings.START_PAGE
+        detail_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_DETAIL_WORKER_NUM, self.concurrency.api.limit)
+        comment_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_COMMENT_WORKER_NUM, self.concurrency.comment.limit)
+
+        async def search_keyword(keyword: str):
             utils.logger.info(
                 f"[BaiduTieBaCrawler.search] Current search keyword: {keyword}"
             )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * tieba_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[BaiduTieBaCrawler.search] Skip page {page}")
-                    page += 1
-                    continue
-                try:
-                    utils.logger.info(
-                        f"[BaiduTieBaCrawler.search] search tieba keyword: {keyword}, page: {page}"
-                    )
-                    notes_list: List[TiebaNote] = (
-                        await self.tieba_client.get_notes_by_keyword(
-                            keyword=keyword,
-                            page=page,
-                            page_size=tieba_limit_count,
-                            sort=SearchSortType.TIME_DESC,
-                            note_type=SearchNoteType.FIXED_THREAD,
-                        )
-                    )
-                    if not notes_list:
-                        utils.logger.info(
-                            f"[BaiduTieBaCrawler.search] Search note list is empty"
-                        )
-                        break
-                    utils.logger.info(
-                        f"[BaiduTieBaCrawler.search] Note list len: {len(notes_list)}"
-                    )
-                    await self.get_specified_notes(
-                        note_id_list=[note_detail.note_id for note_detail in notes_list]
-                    )
-                    page += 1
-                except Exception as ex:
-                    utils.logger.error(
-                        f"[BaiduTieBaCrawler.search] Search keywords error, current page: {page}, current keyword: {keyword}, err: {ex}"
-                    )
-                    break
+            # 搜索 -> 详情 -> 存储 -> 评论 分阶段执行，下一页的搜索和详情不再等待上一页的评论爬取完成
+            pipeline = CrawlPipeline("BaiduTieBaCrawler.search", settings=self.settings)
+            pipeline.add_stage(
+                "detail",
+                lambda note: self.get_note_detail_async_task(note_id=note.note_id, semaphore=self.concurrency.api),
+                worker_num=detail_worker_num,
+            )
+            pipeline.add_stage("store", self.save_note_detail)
+            if self.settings.ENABLE_GET_COMMENTS:
+                pipeline.add_stage(
+                    "comment",
+                    lambda note_detail: self.get_comments_async_task(note_detail, self.concurrency.comment),
+                    worker_num=comment_worker_num,
+                )
+            try:
+                await pipeline.run(self.iter_search_notes(keyword, start_page, tieba_limit_count, max_notes_count))
+            except Exception as ex:
+                utils.logger.error(
+                    f"[BaiduTieBaCrawler.search] Search keywords error, current keyword: {keyword}, err: {ex}"
+                )
+
+        await run_keywords("BaiduTieBaCrawler.search", self.settings.KEYWORDS.split(","), search_keyword,
+                           concurrency=self.settings.KEYWORD_CONCURRENCY_NUM,
+                           controller=self.concurrency)
+
+    async def iter_search_notes(self, keyword: str, start_page: int, page_size: int,
+                                max_notes_count: int) -> AsyncIterator[TiebaNote]:
+        """
+        Search notes page by page and yield the search result notes
+        Args:
+            keyword: search keyword
+            start_page: skip the pages before start_page
+            page_size: tieba limit page fixed value
+            max_notes_count: max notes count of the keyword
+
+        Returns:
+
+        """
+        page = 1
+        while (page - start_page + 1) * page_size <= max_notes_count:
+            if page < start_page:
+                utils.logger.info(f"[BaiduTieBaCrawler.search] Skip page {page}")
+                page += 1
+                continue
+            utils.logger.info(
+                f"[BaiduTieBaCrawler.search] search tieba keyword: {keyword}, page: {page}"
+            )
+            try:
+                notes_list: List[TiebaNote] = await self.tieba_client.get_notes_by_keyword(
+                    keyword=keyword,
+                    page=page,
+                    page_size=page_size,
+                    sort=SearchSortType.TIME_DESC,
+                    note_type=SearchNoteType.FIXED_THREAD,
+                )
+            except Exception as ex:
+                utils.logger.error(
+                    f"[BaiduTieBaCrawler.search] Search keywords error, current page: {page}, current keyword: {keyword}, err: {ex}"
+                )
+                break
+            if not notes_list:
+                utils.logger.info(
+                    f"[BaiduTieBaCrawler.search] Search note list is empty"
+                )
+                break
+            utils.logger.info(
+                f"[BaiduTieBaCrawler.search] Note list len: {len(notes_list)}"
+            )
+            page += 1
+            for note in notes_list:
+                yield note
+
+    async def save_note_detail(self, note_detail: TiebaNote) -> TiebaNote:
+        """Save note detail, return the note detail for the comment stage"""
+        await tieba_store.update_tieba_note(note_detail)
+        return note_detail
 
     async def get_specified_tieba_notes(self):
         """
@@ -155,14 +205,14 @@ class TieBaCrawler(AbstractCrawler):
 
         """
         tieba_limit_count = 50
-        if config.CRAWLER_MAX_NOTES_COUNT < tieba_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = tieba_limit_count
-        for tieba_name in config.TIEBA_NAME_LIST:
+        # 多个平台同时爬取时共用配置模块，这里用局部变量，不修改全局配置
+        max_notes_count = max(self.settings.CRAWLER_MAX_NOTES_COUNT, tieba_limit_count)
+        for tieba_name in self.settings.TIEBA_NAME_LIST:
             utils.logger.info(
                 f"[BaiduTieBaCrawler.get_specified_tieba_notes] Begin get tieba name: {tieba_name}"
             )
             page_number = 0
-            while page_number <= config.CRAWLER_MAX_NOTES_COUNT:
+            while page_number <= max_notes_count:
                 note_list: List[TiebaNote] = (
                     await self.tieba_client.get_notes_by_tieba_name(
                         tieba_name=tieba_name, page_num=page_number
@@ -180,18 +230,18 @@ class TieBaCrawler(AbstractCrawler):
                 await self.get_specified_notes([note.note_id for note in note_list])
                 page_number += tieba_limit_count
 
-    async def get_specified_notes(
-        self, note_id_list: List[str] = config.TIEBA_SPECIFIED_ID_LIST
-    ):
+    async def get_specified_notes(self, note_id_list: Optional[List[str]] = None):
         """
         Get the information and comments of the specified post
         Args:
-            note_id_list:
+            note_id_list: 帖子 id 列表，默认读取 TIEBA_SPECIFIED_ID_LIST
 
         Returns:
 
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        if note_id_list is None:
+            note_id_list = self.settings.TIEBA_SPECIFIED_ID_LIST
+        semaphore = self.concurrency.api
         task_list = [
             self.get_note_detail_async_task(note_id=note_id, semaphore=semaphore)
             for note_id in note_id_list
@@ -248,10 +298,10 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
-        if not config.ENABLE_GET_COMMENTS:
+        if not self.settings.ENABLE_GET_COMMENTS:
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.comment
         task_list: List[Task] = []
         for note_detail in note_detail_list:
             task = asyncio.create_task(
@@ -279,9 +329,9 @@ class TieBaCrawler(AbstractCrawler):
             )
             await self.tieba_client.get_note_all_comments(
                 note_detail=note_detail,
-                crawl_interval=random.random(),
+                crawl_interval=get_crawl_interval(random.random(), self.settings),
                 callback=tieba_store.batch_update_tieba_note_comments,
-                max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                max_count=self.settings.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
             )
 
     async def get_creators_and_notes(self) -> None:
@@ -293,7 +343,7 @@ class TieBaCrawler(AbstractCrawler):
         utils.logger.info(
             "[WeiboCrawler.get_creators_and_notes] Begin get weibo creators"
         )
-        for creator_url in config.TIEBA_CREATOR_URL_LIST:
+        for creator_url in self.settings.TIEBA_CREATOR_URL_LIST:
             creator_page_html_content = await self.tieba_client.get_creator_info_by_url(
                 creator_url=creator_url
             )
@@ -315,7 +365,7 @@ class TieBaCrawler(AbstractCrawler):
                         user_name=creator_info.user_name,
                         crawl_interval=0,
                         callback=tieba_store.batch_update_tieba_notes,
-                        max_note_count=config.CRAWLER_MAX_NOTES_COUNT,
+                        max_note_count=self.settings.CRAWLER_MAX_NOTES_COUNT,
                         creator_page_html_content=creator_page_html_content,
                     )
                 )
@@ -348,11 +398,11 @@ class TieBaCrawler(AbstractCrawler):
         utils.logger.info(
             "[BaiduTieBaCrawler.launch_browser] Begin create browser context ..."
         )
-        if config.SAVE_LOGIN_STATE:
+        if self.settings.SAVE_LOGIN_STATE:
             # feat issue #14
             # we will save login state to avoid login every time
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", self.settings.USER_DATA_DIR % self.settings.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -362,12 +412,14 @@ class TieBaCrawler(AbstractCrawler):
                 viewport={"width": 1920, "height": 1080},
                 user_agent=user_agent,
             )
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
         else:
             browser = await chromium.launch(headless=headless, proxy=playwright_proxy)  # type: ignore
             browser_context = await browser.new_context(
                 viewport={"width": 1920, "height": 1080}, user_agent=user_agent
             )
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
 
     async def launch_browser_with_cdp(
@@ -381,7 +433,7 @@ class TieBaCrawler(AbstractCrawler):
         使用CDP模式启动浏览器
         """
         try:
-            self.cdp_manager = CDPBrowserManager()
+            self.cdp_manager = CDPBrowserManager(self.settings)
             browser_context = await self.cdp_manager.launch_and_connect(
                 playwright=playwright,
                 playwright_proxy=playwright_proxy,
@@ -409,6 +461,9 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
+        # 关闭 API 客户端的 httpx 连接池
+        if getattr(self, "tieba_client", None):
+            await self.tieba_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
@@ -24,14 +24,16 @@ import httpx
 from httpx import Response
 from playwright.async_api import BrowserContext, Page
 
-import config
+from config import PlatformSettings, get_platform_settings
+from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.http_client_pool import HttpClientPool
 
 from .exception import DataFetchError
 from .field import SearchType
 
 
-class WeiboClient:
+class WeiboClient(AbstractApiClient):
 
     def __init__(
         self,
@@ -39,8 +41,9 @@ class WeiboClient:
         proxy=None,
         *,
         headers: Dict[str, str],
-        playwright_page: Page,
+        playwright_page: Optional[Page],
         cookie_dict: Dict[str, str],
+        settings: Optional[PlatformSettings] = None,
     ):
         self.proxy = proxy
         self.timeout = timeout
@@ -49,26 +52,47 @@ class WeiboClient:
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
         self._image_agent_host = "https://i1.wp.com/"
+        self.settings = settings or get_platform_settings("wb")
+        self._http_pool = HttpClientPool(settings=self.settings)
 
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         enable_return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        async with self._http_pool.get_client(self.proxy) as client:
+            return await self.send_request(client, method, url, lambda response: self._validate_response(response, enable_return_response),
+                                           timeout=self.timeout, **kwargs)
 
+    @staticmethod
+    def _validate_response(response: Response, enable_return_response: bool = False) -> Union[Response, Dict]:
         if enable_return_response:
             return response
 
         data: Dict = response.json()
         ok_code = data.get("ok")
         if ok_code == 0:  # response error
-            utils.logger.error(f"[WeiboClient.request] request {method}:{url} err, res:{data}")
+            utils.logger.error(f"[WeiboClient.request] request {response.request.method}:{response.request.url} err, res:{data}")
             raise DataFetchError(data.get("msg", "response error"))
         elif ok_code != 1:  # unknown error
-            utils.logger.error(f"[WeiboClient.request] request {method}:{url} err, res:{data}")
+            utils.logger.error(f"[WeiboClient.request] request {response.request.method}:{response.request.url} err, res:{data}")
             raise DataFetchError(data.get("msg", "unknown error"))
         else:  # response right
             return data.get("data", {})
 
+    @staticmethod
+    def _validate_html_response(response: Response) -> str:
+        """
+        校验网页请求的响应，返回网页内容
+        """
+        if response.status_code != 200:
+            utils.logger.error(f"[WeiboClient.request] request {response.request.method}:{response.request.url} err, status code: {response.status_code}")
+            raise DataFetchError(f"get weibo html err: {response.text}")
+        return response.text
+
+    async def close(self):
+        """
+        关闭 httpx 连接池
+        """
+        await self._http_pool.close()
+
     async def get(self, uri: str, params=None, headers=None, **kwargs) -> Union[Response, Dict]:
         final_uri = uri
         if isinstance(params, dict):
@@ -182,8 +206,8 @@ class WeiboClient:
             result.extend(sub_comment_result)
         return result
 
-    @staticmethod
     async def get_comments_all_sub_comments(
+        self,
         note_id: str,
         comment_list: List[Dict],
         callback: Optional[Callable] = None,
@@ -198,7 +222,7 @@ class WeiboClient:
         Returns:
 
         """
-        if not config.ENABLE_GET_SUB_COMMENTS:
+        if not self.settings.ENABLE_GET_SUB_COMMENTS:
             utils.logger.info(f"[WeiboClient.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled")
             return []
 
@@ -217,22 +241,20 @@ class WeiboClient:
         :return:
         """
         url = f"{self._host}/detail/{note_id}"
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-            if response.status_code != 200:
-                raise DataFetchError(f"get weibo detail err: {response.text}")
-            match = re.search(r'var \$render_data = (\[.*?\])\[0\]', response.text, re.DOTALL)
-            if match:
-                render_data_json = match.group(1)
-                render_data_dict = json.loads(render_data_json)
-                note_detail = render_data_dict[0].get("status")
-                note_item = {"mblog": note_detail}
-                return note_item
-            else:
-                utils.logger.info(f"[WeiboClient.get_note_info_by_id] 未找到$render_data的值")
-                return dict()
-
-    async def get_note_image(self, image_url: str) -> bytes:
+        async with self._http_pool.get_client(self.proxy) as client:
+            html = await self.send_request(client, "GET", url, self._validate_html_response, timeout=self.timeout, headers=self.headers)
+        match = re.search(r'var \$render_data = (\[.*?\])\[0\]', html, re.DOTALL)
+        if match:
+            render_data_json = match.group(1)
+            render_data_dict = json.loads(render_data_json)
+            note_detail = render_data_dict[0].get("status")
+            note_item = {"mblog": note_detail}
+            return note_item
+        else:
+            utils.logger.info(f"[WeiboClient.get_note_info_by_id] 未找到$render_data的值")
+            return dict()
+
+    def get_note_image_url(self, image_url: str) -> str:
         image_url = image_url[8:]  # 去掉 https://
         sub_url = image_url.split("/")
         image_url = ""
@@ -245,20 +267,8 @@ class WeiboClient:
                 image_url += sub_url[i] + "/"
         # 微博图床对外存在防盗链，所以需要代理访问
         # 由于微博图片是通过 i1.wp.com 来访问的，所以需要拼接一下
-        final_uri = (f"{self._image_agent_host}"
-                     f"{image_url}")
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", final_uri, timeout=self.timeout)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(f"[WeiboClient.get_note_image] request {final_uri} err, res:{response.text}")
-                    return None
-                else:
-                    return response.content
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[DouYinClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")    # 保留原始异常类型名称，以便开发者调试
-                return None
+        return (f"{self._image_agent_host}"
+                f"{image_url}")
 
     async def get_creator_container_info(self, creator_id: str) -> Dict:
         """
@@ -17,7 +17,7 @@ import asyncio
 import os
 import random
 from asyncio import Task
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from playwright.async_api import (
     BrowserContext,
@@ -27,13 +27,19 @@ from playwright.async_api import (
     async_playwright,
 )
 
-import config
+from config import PlatformSettings, get_platform_settings
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import weibo as weibo_store
-from tools import utils
+from tools import cookie_store, utils
+from tools.rate_limiter import get_crawl_interval
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_controller import ConcurrencyController
+from tools.keyword_runner import run_keywords
+from tools.crawl_pipeline import CrawlPipeline, get_stage_worker_num
+from tools.login_state_cache import check_login_state
+from tools.resource_blocker import disable_resource_blocking, enable_resource_blocking
+from var import crawler_type_var
 
 from .client import WeiboClient
 from .exception import DataFetchError
@@ -47,72 +53,125 @@ class WeiboCrawler(AbstractCrawler):
     wb_client: WeiboClient
     browser_context: BrowserContext
     cdp_manager: Optional[CDPBrowserManager]
+    concurrency: ConcurrencyController
 
-    def __init__(self):
+    def __init__(self, settings: Optional[PlatformSettings] = None):
+        self.settings = settings or get_platform_settings("wb")
         self.index_url = "https://www.weibo.com"
         self.mobile_index_url = "https://m.weibo.cn"
         self.user_agent = utils.get_user_agent()
         self.mobile_user_agent = utils.get_mobile_user_agent()
         self.cdp_manager = None
+        self.concurrency = ConcurrencyController.for_platform("wb", self.settings)
 
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
-        if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
+        if self.settings.ENABLE_IP_PROXY:
+            ip_proxy_pool = await create_ip_pool(self.settings.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(ip_proxy_info)
 
+        if self.settings.ENABLE_BROWSERLESS_MODE:
+            await self.start_browserless(playwright_proxy_format, httpx_proxy_format)
+            return
+
         async with async_playwright() as playwright:
-            # 根据配置选择启动模式
-            if config.ENABLE_CDP_MODE:
-                utils.logger.info("[WeiboCrawler] 使用CDP模式启动浏览器")
-                self.browser_context = await self.launch_browser_with_cdp(
-                    playwright,
-                    playwright_proxy_format,
-                    self.mobile_user_agent,
-                    headless=config.CDP_HEADLESS,
-                )
-            else:
-                utils.logger.info("[WeiboCrawler] 使用标准模式启动浏览器")
-                # Launch a browser context.
-                chromium = playwright.chromium
-                self.browser_context = await self.launch_browser(chromium, None, self.mobile_user_agent, headless=config.HEADLESS)
-            # stealth.min.js is a js script to prevent the website from detecting the crawler.
-            await self.browser_context.add_init_script(path="libs/stealth.min.js")
-            self.context_page = await self.browser_context.new_page()
+            await self.launch_and_login(playwright, playwright_proxy_format, httpx_proxy_format)
+            await self.crawl()
+
+    async def start_browserless(self, playwright_proxy_format: Optional[Dict], httpx_proxy_format: Optional[str]):
+        """
+        免浏览器模式：使用保存的 cookie 直接请求 API，cookie 失效时才启动浏览器登录，登录后保存 cookie 并立即关闭浏览器
+        Args:
+            playwright_proxy_format: 浏览器代理
+            httpx_proxy_format: httpx 代理
+
+        Returns:
+
+        """
+        cookie_str = cookie_store.load_cookies(self.settings.PLATFORM, self.settings)
+        self.wb_client = self.create_weibo_client_with_cookies(httpx_proxy_format, cookie_str)
+        if not cookie_str or not await check_login_state(self.settings.PLATFORM, self.wb_client.cookie_dict, self.wb_client.pong):
+            utils.logger.info("[WeiboCrawler.start_browserless] Saved cookies are invalid, launch browser to login ...")
+            await self.wb_client.close()
+            async with async_playwright() as playwright:
+                await self.launch_and_login(playwright, playwright_proxy_format, httpx_proxy_format)
+                cookie_store.save_cookies(self.settings.PLATFORM, self.wb_client.headers["Cookie"], self.settings)
+                await self.close_browser()
+            self.wb_client.playwright_page = None
+        await self.crawl()
+
+    async def launch_and_login(self, playwright: Playwright, playwright_proxy_format: Optional[Dict], httpx_proxy_format: Optional[str]):
+        """
+        启动浏览器，创建 API 客户端，登录态失效时登录
+        Args:
+            playwright: playwright 对象
+            playwright_proxy_format: 浏览器代理
+            httpx_proxy_format: httpx 代理
+
+        Returns:
+
+        """
+        # 根据配置选择启动模式
+        if self.settings.ENABLE_CDP_MODE:
+            utils.logger.info("[WeiboCrawler] 使用CDP模式启动浏览器")
+            self.browser_context = await self.launch_browser_with_cdp(
+                playwright,
+                playwright_proxy_format,
+                self.mobile_user_agent,
+                headless=self.settings.CDP_HEADLESS,
+            )
+        else:
+            utils.logger.info("[WeiboCrawler] 使用标准模式启动浏览器")
+            # Launch a browser context.
+            chromium = playwright.chromium
+            self.browser_context = await self.launch_browser(chromium, None, self.mobile_user_agent, headless=self.settings.HEADLESS)
+        # stealth.min.js is a js script to prevent the website from detecting the crawler.
+        await self.browser_context.add_init_script(path="libs/stealth.min.js")
+        self.context_page = await self.browser_context.new_page()
+        await self.context_page.goto(self.mobile_index_url)
+
+        # Create a client to interact with the xiaohongshu website.
+        self.wb_client = await self.create_weibo_client(httpx_proxy_format)
+        if not await check_login_state(self.settings.PLATFORM, self.wb_client.cookie_dict, self.wb_client.pong):
+            login_obj = WeiboLogin(
+                login_type=self.settings.LOGIN_TYPE,
+                login_phone="",  # your phone number
+                browser_context=self.browser_context,
+                context_page=self.context_page,
+                cookie_str=self.settings.COOKIES,
+            )
+            # 登录前关闭请求拦截，避免登录二维码无法显示
+            await disable_resource_blocking(self.browser_context, self.settings)
+            await login_obj.begin()
+
+            # 登录成功后重定向到手机端的网站，再更新手机端登录成功的cookie
+            utils.logger.info("[WeiboCrawler.start] redirect weibo mobile homepage and update cookies on mobile platform")
             await self.context_page.goto(self.mobile_index_url)
+            await asyncio.sleep(2)
+            await self.wb_client.update_cookies(browser_context=self.browser_context)
+            # 登录完成后重新开启请求拦截
+            await enable_resource_blocking(self.browser_context, self.settings)
 
-            # Create a client to interact with the xiaohongshu website.
-            self.wb_client = await self.create_weibo_client(httpx_proxy_format)
-            if not await self.wb_client.pong():
-                login_obj = WeiboLogin(
-                    login_type=config.LOGIN_TYPE,
-                    login_phone="",  # your phone number
-                    browser_context=self.browser_context,
-                    context_page=self.context_page,
-                    cookie_str=config.COOKIES,
-                )
-                await login_obj.begin()
-
-                # 登录成功后重定向到手机端的网站，再更新手机端登录成功的cookie
-                utils.logger.info("[WeiboCrawler.start] redirect weibo mobile homepage and update cookies on mobile platform")
-                await self.context_page.goto(self.mobile_index_url)
-                await asyncio.sleep(2)
-                await self.wb_client.update_cookies(browser_context=self.browser_context)
-
-            crawler_type_var.set(config.CRAWLER_TYPE)
-            if config.CRAWLER_TYPE == "search":
-                # Search for video and retrieve their comment information.
-                await self.search()
-            elif config.CRAWLER_TYPE == "detail":
-                # Get the information and comments of the specified post
-                await self.get_specified_notes()
-            elif config.CRAWLER_TYPE == "creator":
-                # Get creator's information and their notes and comments
-                await self.get_creators_and_notes()
-            else:
-                pass
-            utils.logger.info("[WeiboCrawler.start] Weibo Crawler finished ...")
+    async def crawl(self):
+        """
+        按爬取类型开始爬取
+        Returns:
+
+        """
+        crawler_type_var.set(self.settings.CRAWLER_TYPE)
+        if self.settings.CRAWLER_TYPE == "search":
+            # Search for video and retrieve their comment information.
+            await self.search()
+        elif self.settings.CRAWLER_TYPE == "detail":
+            # Get the information and comments of the specified post
+            await self.get_specified_notes()
+        elif self.settings.CRAWLER_TYPE == "creator":
+            # Get creator's information and their notes and comments
+            await self.get_creators_and_notes()
+        else:
+            pass
+        utils.logger.info("[WeiboCrawler.start] Weibo Crawler finished ...")
 
     async def search(self):
         """
@@ -121,59 +180,90 @@ class WeiboCrawler(AbstractCrawler):
         """
         utils.logger.info("[WeiboCrawler.search] Begin search weibo keywords")
         weibo_limit_count = 10  # weibo limit page fixed value
-        if config.CRAWLER_MAX_NOTES_COUNT < weibo_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = weibo_limit_count
-        start_page = config.START_PAGE
+        # 多个平台同时爬取时共用配置模块，这里用局部变量，不修改全局配置
+        max_notes_count = max(self.settings.CRAWLER_MAX_NOTES_COUNT, weibo_limit_count)
+        start_page = self.settings.START_PAGE
 
         # Set the search type based on the configuration for weibo
-        if config.WEIBO_SEARCH_TYPE == "default":
+        if self.settings.WEIBO_SEARCH_TYPE == "default":
             search_type = SearchType.DEFAULT
-        elif config.WEIBO_SEARCH_TYPE == "real_time":
+        elif self.settings.WEIBO_SEARCH_TYPE == "real_time":
             search_type = SearchType.REAL_TIME
-        elif config.WEIBO_SEARCH_TYPE == "popular":
+        elif self.settings.WEIBO_SEARCH_TYPE == "popular":
             search_type = SearchType.POPULAR
-        elif config.WEIBO_SEARCH_TYPE == "video":
+        elif self.settings.WEIBO_SEARCH_TYPE == "video":
             search_type = SearchType.VIDEO
         else:
-            utils.logger.error(f"[WeiboCrawler.search] Invalid WEIBO_SEARCH_TYPE: {config.WEIBO_SEARCH_TYPE}")
+            utils.logger.error(f"[WeiboCrawler.search] Invalid WEIBO_SEARCH_TYPE: {self.settings.WEIBO_SEARCH_TYPE}")
             return
 
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        comment_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_COMMENT_WORKER_NUM, self.concurrency.comment.limit)
+
+        async def search_keyword(keyword: str):
             utils.logger.info(f"[WeiboCrawler.search] Current search keyword: {keyword}")
-            page = 1
-            while (page - start_page + 1) * weibo_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[WeiboCrawler.search] Skip page: {page}")
-                    page += 1
-                    continue
-                utils.logger.info(f"[WeiboCrawler.search] search weibo keyword: {keyword}, page: {page}")
-                search_res = await self.wb_client.get_note_by_keyword(keyword=keyword, page=page, search_type=search_type)
-                note_id_list: List[str] = []
-                note_list = filter_search_result_card(search_res.get("cards"))
-                for note_item in note_list:
-                    if note_item:
-                        mblog: Dict = note_item.get("mblog")
-                        if mblog:
-                            note_id_list.append(mblog.get("id"))
-                            await weibo_store.update_weibo_note(note_item)
-                            await self.get_note_images(mblog)
+            # 搜索 -> 存储 -> 评论 分阶段执行，下一页的搜索不再等待上一页的评论爬取完成
+            pipeline = CrawlPipeline("WeiboCrawler.search", ignore_errors=(DataFetchError,), settings=self.settings)
+            pipeline.add_stage("store", self.save_note_item)
+            if self.settings.ENABLE_GET_COMMENTS:
+                pipeline.add_stage(
+                    "comment",
+                    lambda note_id: self.get_note_comments(note_id, self.concurrency.comment),
+                    worker_num=comment_worker_num,
+                )
+            await pipeline.run(self.iter_search_notes(keyword, search_type, start_page, weibo_limit_count, max_notes_count))
+
+        await run_keywords("WeiboCrawler.search", self.settings.KEYWORDS.split(","), search_keyword,
+                           ignore_errors=(DataFetchError,), concurrency=self.settings.KEYWORD_CONCURRENCY_NUM,
+                           controller=self.concurrency)
 
+    async def iter_search_notes(self, keyword: str, search_type: SearchType, start_page: int,
+                                page_size: int, max_notes_count: int) -> AsyncIterator[Dict]:
+        """
+        search weibo note page by page and yield the note items which have mblog
+        :param keyword: search keyword
+        :param search_type: weibo search type
+        :param start_page: skip the pages before start_page
+        :param page_size: weibo limit page fixed value
+        :param max_notes_count: max notes count of the keyword
+        :return:
+        """
+        page = 1
+        while (page - start_page + 1) * page_size <= max_notes_count:
+            if page < start_page:
+                utils.logger.info(f"[WeiboCrawler.search] Skip page: {page}")
                 page += 1
-                await self.batch_get_notes_comments(note_id_list)
+                continue
+            utils.logger.info(f"[WeiboCrawler.search] search weibo keyword: {keyword}, page: {page}")
+            search_res = await self.wb_client.get_note_by_keyword(keyword=keyword, page=page, search_type=search_type)
+            note_list = filter_search_result_card(search_res.get("cards"))
+            page += 1
+            for note_item in note_list:
+                if note_item and note_item.get("mblog"):
+                    yield note_item
+
+    async def save_note_item(self, note_item: Dict) -> str:
+        """
+        save note and its images, return the note id for the comment stage
+        :param note_item:
+        :return:
+        """
+        mblog: Dict = note_item.get("mblog")
+        await weibo_store.update_weibo_note(note_item)
+        await self.get_note_images(mblog)
+        return mblog.get("id")
 
     async def get_specified_notes(self):
         """
         get specified notes info
         :return:
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        task_list = [self.get_note_info_task(note_id=note_id, semaphore=semaphore) for note_id in config.WEIBO_SPECIFIED_ID_LIST]
+        semaphore = self.concurrency.api
+        task_list = [self.get_note_info_task(note_id=note_id, semaphore=semaphore) for note_id in self.settings.WEIBO_SPECIFIED_ID_LIST]
         video_details = await asyncio.gather(*task_list)
         for note_item in video_details:
             if note_item:
                 await weibo_store.update_weibo_note(note_item)
-        await self.batch_get_notes_comments(config.WEIBO_SPECIFIED_ID_LIST)
+        await self.batch_get_notes_comments(self.settings.WEIBO_SPECIFIED_ID_LIST)
 
     async def get_note_info_task(self, note_id: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
         """
@@ -199,12 +289,12 @@ class WeiboCrawler(AbstractCrawler):
         :param note_id_list:
         :return:
         """
-        if not config.ENABLE_GET_COMMENTS:
+        if not self.settings.ENABLE_GET_COMMENTS:
             utils.logger.info(f"[WeiboCrawler.batch_get_note_comments] Crawling comment mode is not enabled")
             return
 
         utils.logger.info(f"[WeiboCrawler.batch_get_notes_comments] note ids:{note_id_list}")
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.comment
         task_list: List[Task] = []
         for note_id in note_id_list:
             task = asyncio.create_task(self.get_note_comments(note_id, semaphore), name=note_id)
@@ -223,9 +313,9 @@ class WeiboCrawler(AbstractCrawler):
                 utils.logger.info(f"[WeiboCrawler.get_note_comments] begin get note_id: {note_id} comments ...")
                 await self.wb_client.get_note_all_comments(
                     note_id=note_id,
-                    crawl_interval=random.randint(1, 3),  # 微博对API的限流比较严重，所以延时提高一些
+                    crawl_interval=get_crawl_interval(random.randint(1, 3), self.settings),  # 微博对API的限流比较严重，所以延时提高一些
                     callback=weibo_store.batch_update_weibo_note_comments,
-                    max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                    max_count=self.settings.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
             except DataFetchError as ex:
                 utils.logger.error(f"[WeiboCrawler.get_note_comments] get note_id: {note_id} comment error: {ex}")
@@ -238,7 +328,7 @@ class WeiboCrawler(AbstractCrawler):
         :param mblog:
         :return:
         """
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.settings.ENABLE_GET_MEIDAS:
             utils.logger.info(f"[WeiboCrawler.get_note_images] Crawling image mode is not enabled")
             return
 
@@ -249,11 +339,9 @@ class WeiboCrawler(AbstractCrawler):
             url = pic.get("url")
             if not url:
                 continue
-            content = await self.wb_client.get_note_image(url)
-            await asyncio.sleep(random.random())
-            if content != None:
-                extension_file_name = url.split(".")[-1]
-                await weibo_store.update_weibo_note_image(pic["pid"], content, extension_file_name)
+            extension_file_name = url.split(".")[-1]
+            await weibo_store.download_weibo_note_image(pic["pid"], self.wb_client.get_note_image_url(url), extension_file_name,
+                                                        proxy=self.wb_client.proxy, timeout=self.wb_client.timeout)
 
     async def get_creators_and_notes(self) -> None:
         """
@@ -262,7 +350,7 @@ class WeiboCrawler(AbstractCrawler):
 
         """
         utils.logger.info("[WeiboCrawler.get_creators_and_notes] Begin get weibo creators")
-        for user_id in config.WEIBO_CREATOR_ID_LIST:
+        for user_id in self.settings.WEIBO_CREATOR_ID_LIST:
             createor_info_res: Dict = await self.wb_client.get_creator_info_by_id(creator_id=user_id)
             if createor_info_res:
                 createor_info: Dict = createor_info_res.get("userInfo", {})
@@ -291,18 +379,39 @@ class WeiboCrawler(AbstractCrawler):
         cookie_str, cookie_dict = utils.convert_cookies(await self.browser_context.cookies())
         weibo_client_obj = WeiboClient(
             proxy=httpx_proxy,
-            headers={
-                "User-Agent": utils.get_mobile_user_agent(),
-                "Cookie": cookie_str,
-                "Origin": "https://m.weibo.cn",
-                "Referer": "https://m.weibo.cn",
-                "Content-Type": "application/json;charset=UTF-8",
-            },
+            headers=self._make_client_headers(cookie_str),
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
+            settings=self.settings,
         )
+        weibo_client_obj.concurrency = self.concurrency
         return weibo_client_obj
 
+    def create_weibo_client_with_cookies(self, httpx_proxy: Optional[str], cookie_str: str) -> WeiboClient:
+        """
+        不启动浏览器，使用 cookie 字符串创建 API 客户端
+        """
+        utils.logger.info("[WeiboCrawler.create_weibo_client_with_cookies] Begin create weibo API client without browser ...")
+        weibo_client_obj = WeiboClient(
+            proxy=httpx_proxy,
+            headers=self._make_client_headers(cookie_str),
+            playwright_page=None,
+            cookie_dict=utils.convert_str_cookie_to_dict(cookie_str),
+            settings=self.settings,
+        )
+        weibo_client_obj.concurrency = self.concurrency
+        return weibo_client_obj
+
+    @staticmethod
+    def _make_client_headers(cookie_str: str) -> Dict[str, str]:
+        return {
+            "User-Agent": utils.get_mobile_user_agent(),
+            "Cookie": cookie_str,
+            "Origin": "https://m.weibo.cn",
+            "Referer": "https://m.weibo.cn",
+            "Content-Type": "application/json;charset=UTF-8",
+        }
+
     async def launch_browser(
         self,
         chromium: BrowserType,
@@ -312,8 +421,8 @@ class WeiboCrawler(AbstractCrawler):
     ) -> BrowserContext:
         """Launch browser and create browser context"""
         utils.logger.info("[WeiboCrawler.launch_browser] Begin create browser context ...")
-        if config.SAVE_LOGIN_STATE:
-            user_data_dir = os.path.join(os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM)  # type: ignore
+        if self.settings.SAVE_LOGIN_STATE:
+            user_data_dir = os.path.join(os.getcwd(), "browser_data", self.settings.USER_DATA_DIR % self.settings.PLATFORM)  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
                 accept_downloads=True,
@@ -325,10 +434,12 @@ class WeiboCrawler(AbstractCrawler):
                 },
                 user_agent=user_agent,
             )
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
         else:
             browser = await chromium.launch(headless=headless, proxy=playwright_proxy)  # type: ignore
             browser_context = await browser.new_context(viewport={"width": 1920, "height": 1080}, user_agent=user_agent)
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
 
     async def launch_browser_with_cdp(
@@ -342,7 +453,7 @@ class WeiboCrawler(AbstractCrawler):
         使用CDP模式启动浏览器
         """
         try:
-            self.cdp_manager = CDPBrowserManager()
+            self.cdp_manager = CDPBrowserManager(self.settings)
             browser_context = await self.cdp_manager.launch_and_connect(
                 playwright=playwright,
                 playwright_proxy=playwright_proxy,
@@ -364,10 +475,17 @@ class WeiboCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭 API 客户端的 httpx 连接池
+        if getattr(self, "wb_client", None):
+            await self.wb_client.close()
+        await self.close_browser()
+
+    async def close_browser(self):
+        """Close browser context only, the API client keeps working with the extracted cookies"""
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
             self.cdp_manager = None
-        else:
+        elif getattr(self, "browser_context", None):
             await self.browser_context.close()
         utils.logger.info("[WeiboCrawler.close] Browser context closed ...")
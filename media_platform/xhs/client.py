@@ -16,19 +16,21 @@ from urllib.parse import urlencode
 
 import httpx
 from playwright.async_api import BrowserContext, Page
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_result
 
-import config
+from config import PlatformSettings, get_platform_settings
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.http_client_pool import HttpClientPool
 from html import unescape
 
 from .exception import DataFetchError, IPBlockError
 from .field import SearchNoteType, SearchSortType
 from .help import get_search_id, sign
+from .signer import XhsPlaywrightSigner
 
 
 class XiaoHongShuClient(AbstractApiClient):
+    rate_limit_penalty_errors = (IPBlockError,)
 
     def __init__(
         self,
@@ -38,6 +40,7 @@ class XiaoHongShuClient(AbstractApiClient):
         headers: Dict[str, str],
         playwright_page: Page,
         cookie_dict: Dict[str, str],
+        settings: Optional[PlatformSettings] = None,
     ):
         self.proxy = proxy
         self.timeout = timeout
@@ -50,6 +53,9 @@ class XiaoHongShuClient(AbstractApiClient):
         self.NOTE_ABNORMAL_CODE = -510001
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        self.settings = settings or get_platform_settings("xhs")
+        self._http_pool = HttpClientPool(settings=self.settings)
+        self._signer = XhsPlaywrightSigner(playwright_page)
 
     async def _pre_headers(self, url: str, data=None) -> Dict:
         """
@@ -61,11 +67,10 @@ class XiaoHongShuClient(AbstractApiClient):
         Returns:
 
         """
-        encrypt_params = await self.playwright_page.evaluate("([url, data]) => window._webmsxyw(url,data)", [url, data])
-        local_storage = await self.playwright_page.evaluate("() => window.localStorage")
+        encrypt_params, b1 = await self._signer.sign(url, data)
         signs = sign(
             a1=self.cookie_dict.get("a1", ""),
-            b1=local_storage.get("b1", ""),
+            b1=b1,
             x_s=encrypt_params.get("X-s", ""),
             x_t=str(encrypt_params.get("X-t", "")),
         )
@@ -76,10 +81,9 @@ class XiaoHongShuClient(AbstractApiClient):
             "x-S-Common": signs["x-s-common"],
             "X-B3-Traceid": signs["x-b3-traceid"],
         }
-        self.headers.update(headers)
-        return self.headers
+        # 每个请求使用自己的请求头，并发请求之间不会互相覆盖签名
+        return {**self.headers, **headers}
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def request(self, method, url, **kwargs) -> Union[str, Any]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -93,9 +97,20 @@ class XiaoHongShuClient(AbstractApiClient):
         """
         # return response.text
         return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        async with self._http_pool.get_client(self.proxy) as client:
+            return await self.send_request(client, method, url, lambda response: self._validate_response(response, return_response),
+                                           timeout=self.timeout, **kwargs)
 
+    def _validate_response(self, response: httpx.Response, return_response: bool = False) -> Union[str, Any]:
+        """
+        校验并解析响应
+        Args:
+            response: 响应
+            return_response: 是否直接返回响应文本
+
+        Returns:
+
+        """
         if response.status_code == 471 or response.status_code == 461:
             # someday someone maybe will bypass captcha
             verify_type = response.headers["Verifytype"]
@@ -114,6 +129,12 @@ class XiaoHongShuClient(AbstractApiClient):
         else:
             raise DataFetchError(data.get("msg", None))
 
+    async def close(self):
+        """
+        关闭 httpx 连接池
+        """
+        await self._http_pool.close()
+
     async def get(self, uri: str, params=None) -> Dict:
         """
         GET请求，对请求头签名
@@ -127,8 +148,9 @@ class XiaoHongShuClient(AbstractApiClient):
         final_uri = uri
         if isinstance(params, dict):
             final_uri = f"{uri}?" f"{urlencode(params)}"
-        headers = await self._pre_headers(final_uri)
-        return await self.request(method="GET", url=f"{self._host}{final_uri}", headers=headers)
+        # 签名在拿到限流令牌之后计算，避免排队等待后 X-t、X-s 已经过时
+        return await self.request(method="GET", url=f"{self._host}{final_uri}",
+                                  prepare_headers=lambda: self._pre_headers(final_uri))
 
     async def post(self, uri: str, data: dict, **kwargs) -> Dict:
         """
@@ -140,30 +162,15 @@ class XiaoHongShuClient(AbstractApiClient):
         Returns:
 
         """
-        headers = await self._pre_headers(uri, data)
         json_str = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
         return await self.request(
             method="POST",
             url=f"{self._host}{uri}",
             data=json_str,
-            headers=headers,
+            prepare_headers=lambda: self._pre_headers(uri, data),
             **kwargs,
         )
 
-    async def get_note_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}")
-                    return None
-                else:
-                    return response.content
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[DouYinClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
-                return None
-
     async def pong(self) -> bool:
         """
         用于检查登录态是否失效了
@@ -172,6 +179,13 @@ class XiaoHongShuClient(AbstractApiClient):
         """
         """get a note to check if login state is ok"""
         utils.logger.info("[XiaoHongShuClient.pong] Begin to pong xhs...")
+        # 先用获取当前用户信息的轻量接口检查，失败时再用搜索接口确认
+        try:
+            self_info: Dict = await self.get_self_info()
+            if self_info.get("user_id") and not self_info.get("guest"):
+                return True
+        except Exception as e:
+            utils.logger.info(f"[XiaoHongShuClient.pong] Get self info failed: {e}, fallback to search ...")
         ping_flag = False
         try:
             note_card: Dict = await self.get_note_by_keyword(keyword="小红书")
@@ -194,6 +208,16 @@ class XiaoHongShuClient(AbstractApiClient):
         cookie_str, cookie_dict = utils.convert_cookies(await browser_context.cookies())
         self.headers["Cookie"] = cookie_str
         self.cookie_dict = cookie_dict
+        # 登录后 localStorage 中的 b1 可能变化
+        self._signer.invalidate_b1()
+
+    async def get_self_info(self) -> Dict:
+        """
+        获取当前登录用户的信息，未登录时返回的 guest 为 True
+        Returns:
+
+        """
+        return await self.get("/api/sns/web/v2/user/me")
 
     async def get_note_by_keyword(
         self,
@@ -385,46 +409,69 @@ class XiaoHongShuClient(AbstractApiClient):
         Returns:
 
         """
-        if not config.ENABLE_GET_SUB_COMMENTS:
+        if not self.settings.ENABLE_GET_SUB_COMMENTS:
             utils.logger.info(f"[XiaoHongShuCrawler.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled")
             return []
 
-        result = []
+        root_comments = []
         for comment in comments:
-            note_id = comment.get("note_id")
             sub_comments = comment.get("sub_comments")
             if sub_comments and callback:
-                await callback(note_id, sub_comments)
-
-            sub_comment_has_more = comment.get("sub_comment_has_more")
-            if not sub_comment_has_more:
-                continue
-
-            root_comment_id = comment.get("id")
-            sub_comment_cursor = comment.get("sub_comment_cursor")
-
-            while sub_comment_has_more:
-                comments_res = await self.get_note_sub_comments(
-                    note_id=note_id,
-                    root_comment_id=root_comment_id,
-                    xsec_token=xsec_token,
-                    num=10,
-                    cursor=sub_comment_cursor,
-                )
-
-                if comments_res is None:
-                    utils.logger.info(f"[XiaoHongShuClient.get_comments_all_sub_comments] No response found for note_id: {note_id}")
-                    continue
-                sub_comment_has_more = comments_res.get("has_more", False)
-                sub_comment_cursor = comments_res.get("cursor", "")
-                if "comments" not in comments_res:
-                    utils.logger.info(f"[XiaoHongShuClient.get_comments_all_sub_comments] No 'comments' key found in response: {comments_res}")
-                    break
-                comments = comments_res["comments"]
-                if callback:
-                    await callback(note_id, comments)
-                await asyncio.sleep(crawl_interval)
-                result.extend(comments)
+                await callback(comment.get("note_id"), sub_comments)
+            if comment.get("sub_comment_has_more"):
+                root_comments.append(comment)
+
+        # 不同一级评论下的二级评论并发获取，同一个一级评论下按游标顺序翻页
+        return await self.gather_sub_comment_threads(
+            lambda comment: self.get_root_comment_all_sub_comments(comment, xsec_token, crawl_interval, callback),
+            root_comments,
+        )
+
+    async def get_root_comment_all_sub_comments(
+        self,
+        comment: Dict,
+        xsec_token: str,
+        crawl_interval: float = 1.0,
+        callback: Optional[Callable] = None,
+    ) -> List[Dict]:
+        """
+        按游标顺序获取一个一级评论下剩余的所有二级评论
+        Args:
+            comment: 一级评论
+            xsec_token: 验证token
+            crawl_interval: 爬取一次评论的延迟单位（秒）
+            callback: 一次评论爬取结束后
+
+        Returns:
+
+        """
+        result = []
+        note_id = comment.get("note_id")
+        root_comment_id = comment.get("id")
+        sub_comment_has_more = comment.get("sub_comment_has_more")
+        sub_comment_cursor = comment.get("sub_comment_cursor")
+        while sub_comment_has_more:
+            comments_res = await self.get_note_sub_comments(
+                note_id=note_id,
+                root_comment_id=root_comment_id,
+                xsec_token=xsec_token,
+                num=10,
+                cursor=sub_comment_cursor,
+            )
+
+            if comments_res is None:
+                utils.logger.info(f"[XiaoHongShuClient.get_root_comment_all_sub_comments] No response found for note_id: {note_id}")
+                break
+            sub_comment_has_more = comments_res.get("has_more", False)
+            sub_comment_cursor = comments_res.get("cursor", "")
+            if "comments" not in comments_res:
+                utils.logger.info(f"[XiaoHongShuClient.get_root_comment_all_sub_comments] No 'comments' key found in response: {comments_res}")
+                break
+            comments = comments_res["comments"]
+            if callback:
+                await callback(note_id, comments)
+            await asyncio.sleep(crawl_interval)
+            result.extend(comments)
         return result
 
     async def get_creator_info(self, user_id: str) -> Dict:
@@ -489,7 +536,7 @@ class XiaoHongShuClient(AbstractApiClient):
         result = []
         notes_has_more = True
         notes_cursor = ""
-        while notes_has_more and len(result) < config.CRAWLER_MAX_NOTES_COUNT:
+        while notes_has_more and len(result) < self.settings.CRAWLER_MAX_NOTES_COUNT:
             notes_res = await self.get_notes_by_creator(user_id, notes_cursor)
             if not notes_res:
                 utils.logger.error(f"[XiaoHongShuClient.get_notes_by_creator] The current creator may have been banned by xhs, so they cannot access the data.")
@@ -504,7 +551,7 @@ class XiaoHongShuClient(AbstractApiClient):
             notes = notes_res["notes"]
             utils.logger.info(f"[XiaoHongShuClient.get_all_notes_by_creator] got user_id:{user_id} notes len : {len(notes)}")
 
-            remaining = config.CRAWLER_MAX_NOTES_COUNT - len(result)
+            remaining = self.settings.CRAWLER_MAX_NOTES_COUNT - len(result)
             if remaining <= 0:
                 break
 
@@ -531,7 +578,6 @@ class XiaoHongShuClient(AbstractApiClient):
         data = {"original_url": f"{self._domain}/discovery/item/{note_id}"}
         return await self.post(uri, data=data, return_response=True)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def get_note_by_id_from_html(
         self,
         note_id: str,
@@ -540,7 +586,7 @@ class XiaoHongShuClient(AbstractApiClient):
         enable_cookie: bool = False,
     ) -> Optional[Dict]:
         """
-        通过解析网页版的笔记详情页HTML，获取笔记详情, 该接口可能会出现失败的情况，这里尝试重试3次
+        通过解析网页版的笔记详情页HTML，获取笔记详情, 该接口可能会出现失败的情况，请求失败时由公共请求引擎重试
         copy from https://github.com/ReaJason/xhs/blob/eb1c5a0213f6fbb592f0a2897ee552847c69ea2d/xhs/core.py#L217-L259
         thanks for ReaJason
         Args:
@@ -13,7 +13,7 @@ import os
 import random
 import time
 from asyncio import Task
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from playwright.async_api import (
     BrowserContext,
@@ -22,17 +22,21 @@ from playwright.async_api import (
     Playwright,
     async_playwright,
 )
-from tenacity import RetryError
 
-import config
-from base.base_crawler import AbstractCrawler
-from config import CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
+from config import PlatformSettings, get_platform_settings
+from base.base_crawler import AbstractCrawler, RequestRetryError
 from model.m_xiaohongshu import NoteUrlInfo
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import xhs as xhs_store
 from tools import utils
+from tools.rate_limiter import get_crawl_interval
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_controller import ConcurrencyController
+from tools.keyword_runner import run_keywords
+from tools.crawl_pipeline import CrawlPipeline, get_stage_worker_num
+from tools.login_state_cache import check_login_state
+from tools.resource_blocker import disable_resource_blocking, enable_resource_blocking
+from var import crawler_type_var
 
 from .client import XiaoHongShuClient
 from .exception import DataFetchError
@@ -46,29 +50,32 @@ class XiaoHongShuCrawler(AbstractCrawler):
     xhs_client: XiaoHongShuClient
     browser_context: BrowserContext
     cdp_manager: Optional[CDPBrowserManager]
+    concurrency: ConcurrencyController
 
-    def __init__(self) -> None:
+    def __init__(self, settings: Optional[PlatformSettings] = None) -> None:
+        self.settings = settings or get_platform_settings("xhs")
         self.index_url = "https://www.xiaohongshu.com"
         # self.user_agent = utils.get_user_agent()
         self.user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
         self.cdp_manager = None
+        self.concurrency = ConcurrencyController.for_platform("xhs", self.settings)
 
     async def start(self) -> None:
         playwright_proxy_format, httpx_proxy_format = None, None
-        if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
+        if self.settings.ENABLE_IP_PROXY:
+            ip_proxy_pool = await create_ip_pool(self.settings.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(ip_proxy_info)
 
         async with async_playwright() as playwright:
             # 根据配置选择启动模式
-            if config.ENABLE_CDP_MODE:
+            if self.settings.ENABLE_CDP_MODE:
                 utils.logger.info("[XiaoHongShuCrawler] 使用CDP模式启动浏览器")
                 self.browser_context = await self.launch_browser_with_cdp(
                     playwright,
                     playwright_proxy_format,
                     self.user_agent,
-                    headless=config.CDP_HEADLESS,
+                    headless=self.settings.CDP_HEADLESS,
                 )
             else:
                 utils.logger.info("[XiaoHongShuCrawler] 使用标准模式启动浏览器")
@@ -78,7 +85,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                     chromium,
                     playwright_proxy_format,
                     self.user_agent,
-                    headless=config.HEADLESS,
+                    headless=self.settings.HEADLESS,
                 )
             # stealth.min.js is a js script to prevent the website from detecting the crawler.
             await self.browser_context.add_init_script(path="libs/stealth.min.js")
@@ -87,25 +94,29 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.xhs_client = await self.create_xhs_client(httpx_proxy_format)
-            if not await self.xhs_client.pong():
+            if not await check_login_state(self.settings.PLATFORM, self.xhs_client.cookie_dict, self.xhs_client.pong):
                 login_obj = XiaoHongShuLogin(
-                    login_type=config.LOGIN_TYPE,
+                    login_type=self.settings.LOGIN_TYPE,
                     login_phone="",  # input your phone number
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=self.settings.COOKIES,
                 )
+                # 登录前关闭请求拦截，避免登录二维码无法显示
+                await disable_resource_blocking(self.browser_context, self.settings)
                 await login_obj.begin()
                 await self.xhs_client.update_cookies(browser_context=self.browser_context)
+                # 登录完成后重新开启请求拦截
+                await enable_resource_blocking(self.browser_context, self.settings)
 
-            crawler_type_var.set(config.CRAWLER_TYPE)
-            if config.CRAWLER_TYPE == "search":
+            crawler_type_var.set(self.settings.CRAWLER_TYPE)
+            if self.settings.CRAWLER_TYPE == "search":
                 # Search for notes and retrieve their comment information.
                 await self.search()
-            elif config.CRAWLER_TYPE == "detail":
+            elif self.settings.CRAWLER_TYPE == "detail":
                 # Get the information and comments of the specified post
                 await self.get_specified_notes()
-            elif config.CRAWLER_TYPE == "creator":
+            elif self.settings.CRAWLER_TYPE == "creator":
                 # Get creator's information and their notes and comments
                 await self.get_creators_and_notes()
             else:
@@ -117,75 +128,108 @@ class XiaoHongShuCrawler(AbstractCrawler):
         """Search for notes and retrieve their comment information."""
         utils.logger.info("[XiaoHongShuCrawler.search] Begin search xiaohongshu keywords")
         xhs_limit_count = 20  # xhs limit page fixed value
-        if config.CRAWLER_MAX_NOTES_COUNT < xhs_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = xhs_limit_count
-        start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        # 多个平台同时爬取时共用配置模块，这里用局部变量，不修改全局配置
+        max_notes_count = max(self.settings.CRAWLER_MAX_NOTES_COUNT, xhs_limit_count)
+        start_page = self.settings.START_PAGE
+        detail_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_DETAIL_WORKER_NUM, self.concurrency.api.limit)
+        comment_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_COMMENT_WORKER_NUM, self.concurrency.comment.limit)
+
+        async def search_keyword(keyword: str):
             utils.logger.info(f"[XiaoHongShuCrawler.search] Current search keyword: {keyword}")
-            page = 1
-            search_id = get_search_id()
-            while (page - start_page + 1) * xhs_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
-                    page += 1
-                    continue
+            # 搜索 -> 详情 -> 存储 -> 评论 分阶段执行，下一页的搜索和详情不再等待上一页的评论爬取完成
+            pipeline = CrawlPipeline("XiaoHongShuCrawler.search", ignore_errors=(DataFetchError,), settings=self.settings)
+            pipeline.add_stage(
+                "detail",
+                lambda post_item: self.get_note_detail_async_task(
+                    note_id=post_item.get("id"),
+                    xsec_source=post_item.get("xsec_source"),
+                    xsec_token=post_item.get("xsec_token"),
+                    semaphore=self.concurrency.api,
+                ),
+                worker_num=detail_worker_num,
+            )
+            pipeline.add_stage("store", self.save_note_detail)
+            if self.settings.ENABLE_GET_COMMENTS:
+                pipeline.add_stage(
+                    "comment",
+                    lambda note_detail: self.get_comments(
+                        note_id=note_detail.get("note_id"),
+                        xsec_token=note_detail.get("xsec_token"),
+                        semaphore=self.concurrency.comment,
+                    ),
+                    worker_num=comment_worker_num,
+                )
+            await pipeline.run(self.iter_search_notes(keyword, start_page, xhs_limit_count, max_notes_count))
 
-                try:
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}")
-                    note_ids: List[str] = []
-                    xsec_tokens: List[str] = []
-                    notes_res = await self.xhs_client.get_note_by_keyword(
-                        keyword=keyword,
-                        search_id=search_id,
-                        page=page,
-                        sort=(SearchSortType(config.SORT_TYPE) if config.SORT_TYPE != "" else SearchSortType.GENERAL),
-                    )
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Search notes res:{notes_res}")
-                    if not notes_res or not notes_res.get("has_more", False):
-                        utils.logger.info("No more content!")
-                        break
-                    semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                    task_list = [
-                        self.get_note_detail_async_task(
-                            note_id=post_item.get("id"),
-                            xsec_source=post_item.get("xsec_source"),
-                            xsec_token=post_item.get("xsec_token"),
-                            semaphore=semaphore,
-                        ) for post_item in notes_res.get("items", {}) if post_item.get("model_type") not in ("rec_query", "hot_query")
-                    ]
-                    note_details = await asyncio.gather(*task_list)
-                    for note_detail in note_details:
-                        if note_detail:
-                            await xhs_store.update_xhs_note(note_detail)
-                            await self.get_notice_media(note_detail)
-                            note_ids.append(note_detail.get("note_id"))
-                            xsec_tokens.append(note_detail.get("xsec_token"))
-                    page += 1
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Note details: {note_details}")
-                    await self.batch_get_note_comments(note_ids, xsec_tokens)
-                except DataFetchError:
-                    utils.logger.error("[XiaoHongShuCrawler.search] Get note detail error")
-                    break
+        await run_keywords("XiaoHongShuCrawler.search", self.settings.KEYWORDS.split(","), search_keyword,
+                           ignore_errors=(DataFetchError,), concurrency=self.settings.KEYWORD_CONCURRENCY_NUM,
+                           controller=self.concurrency)
+
+    async def iter_search_notes(self, keyword: str, start_page: int, page_size: int,
+                                max_notes_count: int) -> AsyncIterator[Dict]:
+        """
+        Search notes page by page and yield the search result items
+        Args:
+            keyword: search keyword
+            start_page: skip the pages before start_page
+            page_size: xhs limit page fixed value
+            max_notes_count: max notes count of the keyword
+
+        Returns:
+
+        """
+        page = 1
+        search_id = get_search_id()
+        while (page - start_page + 1) * page_size <= max_notes_count:
+            if page < start_page:
+                utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
+                page += 1
+                continue
+
+            utils.logger.info(f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}")
+            try:
+                notes_res = await self.xhs_client.get_note_by_keyword(
+                    keyword=keyword,
+                    search_id=search_id,
+                    page=page,
+                    sort=(SearchSortType(self.settings.SORT_TYPE) if self.settings.SORT_TYPE != "" else SearchSortType.GENERAL),
+                )
+            except DataFetchError:
+                utils.logger.error("[XiaoHongShuCrawler.search] Get note detail error")
+                break
+            utils.logger.info(f"[XiaoHongShuCrawler.search] Search notes res:{notes_res}")
+            if not notes_res or not notes_res.get("has_more", False):
+                utils.logger.info("No more content!")
+                break
+            page += 1
+            for post_item in notes_res.get("items", {}):
+                if post_item.get("model_type") not in ("rec_query", "hot_query"):
+                    yield post_item
+
+    async def save_note_detail(self, note_detail: Dict) -> Dict:
+        """Save note detail and its media, return the note detail for the comment stage"""
+        await xhs_store.update_xhs_note(note_detail)
+        await self.get_notice_media(note_detail)
+        return note_detail
 
     async def get_creators_and_notes(self) -> None:
         """Get creator's notes and retrieve their comment information."""
         utils.logger.info("[XiaoHongShuCrawler.get_creators_and_notes] Begin get xiaohongshu creators")
-        for user_id in config.XHS_CREATOR_ID_LIST:
+        for user_id in self.settings.XHS_CREATOR_ID_LIST:
             # get creator detail info from web html content
             createor_info: Dict = await self.xhs_client.get_creator_info(user_id=user_id)
             if createor_info:
                 await xhs_store.save_creator(user_id, creator=createor_info)
 
             # When proxy is not enabled, increase the crawling interval
-            if config.ENABLE_IP_PROXY:
+            if self.settings.ENABLE_IP_PROXY:
                 crawl_interval = random.random()
             else:
-                crawl_interval = random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC)
+                crawl_interval = random.uniform(1, self.settings.CRAWLER_MAX_SLEEP_SEC)
             # Get all note information of the creator
             all_notes_list = await self.xhs_client.get_all_notes_by_creator(
                 user_id=user_id,
-                crawl_interval=crawl_interval,
+                crawl_interval=get_crawl_interval(crawl_interval, self.settings),
                 callback=self.fetch_creator_notes_detail,
             )
 
@@ -200,7 +244,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.api
         task_list = [
             self.get_note_detail_async_task(
                 note_id=post_item.get("note_id"),
@@ -224,14 +268,14 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
         """
         get_note_detail_task_list = []
-        for full_note_url in config.XHS_SPECIFIED_NOTE_URL_LIST:
+        for full_note_url in self.settings.XHS_SPECIFIED_NOTE_URL_LIST:
             note_url_info: NoteUrlInfo = parse_note_info_from_note_url(full_note_url)
             utils.logger.info(f"[XiaoHongShuCrawler.get_specified_notes] Parse note url info: {note_url_info}")
             crawler_task = self.get_note_detail_async_task(
                 note_id=note_url_info.note_id,
                 xsec_source=note_url_info.xsec_source,
                 xsec_token=note_url_info.xsec_token,
-                semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
+                semaphore=self.concurrency.api,
             )
             get_note_detail_task_list.append(crawler_task)
 
@@ -271,7 +315,8 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
                 try:
                     note_detail = await self.xhs_client.get_note_by_id(note_id, xsec_source, xsec_token)
-                except RetryError as e:
+                except (RequestRetryError, DataFetchError):
+                    # 接口获取失败时从网页版的笔记详情页解析
                     pass
 
                 if not note_detail:
@@ -291,12 +336,12 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
     async def batch_get_note_comments(self, note_list: List[str], xsec_tokens: List[str]):
         """Batch get note comments"""
-        if not config.ENABLE_GET_COMMENTS:
+        if not self.settings.ENABLE_GET_COMMENTS:
             utils.logger.info(f"[XiaoHongShuCrawler.batch_get_note_comments] Crawling comment mode is not enabled")
             return
 
         utils.logger.info(f"[XiaoHongShuCrawler.batch_get_note_comments] Begin batch get note comments, note list: {note_list}")
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.comment
         task_list: List[Task] = []
         for index, note_id in enumerate(note_list):
             task = asyncio.create_task(
@@ -311,16 +356,16 @@ class XiaoHongShuCrawler(AbstractCrawler):
         async with semaphore:
             utils.logger.info(f"[XiaoHongShuCrawler.get_comments] Begin get note id comments {note_id}")
             # When proxy is not enabled, increase the crawling interval
-            if config.ENABLE_IP_PROXY:
+            if self.settings.ENABLE_IP_PROXY:
                 crawl_interval = random.random()
             else:
-                crawl_interval = random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC)
+                crawl_interval = random.uniform(1, self.settings.CRAWLER_MAX_SLEEP_SEC)
             await self.xhs_client.get_note_all_comments(
                 note_id=note_id,
                 xsec_token=xsec_token,
-                crawl_interval=crawl_interval,
+                crawl_interval=get_crawl_interval(crawl_interval, self.settings),
                 callback=xhs_store.batch_update_xhs_note_comments,
-                max_count=CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                max_count=self.settings.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
             )
 
     async def create_xhs_client(self, httpx_proxy: Optional[str]) -> XiaoHongShuClient:
@@ -349,7 +394,9 @@ class XiaoHongShuCrawler(AbstractCrawler):
             },
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
+            settings=self.settings,
         )
+        xhs_client_obj.concurrency = self.concurrency
         return xhs_client_obj
 
     async def launch_browser(
@@ -361,10 +408,10 @@ class XiaoHongShuCrawler(AbstractCrawler):
     ) -> BrowserContext:
         """Launch browser and create browser context"""
         utils.logger.info("[XiaoHongShuCrawler.launch_browser] Begin create browser context ...")
-        if config.SAVE_LOGIN_STATE:
+        if self.settings.SAVE_LOGIN_STATE:
             # feat issue #14
             # we will save login state to avoid login every time
-            user_data_dir = os.path.join(os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM)  # type: ignore
+            user_data_dir = os.path.join(os.getcwd(), "browser_data", self.settings.USER_DATA_DIR % self.settings.PLATFORM)  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
                 accept_downloads=True,
@@ -376,10 +423,12 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 },
                 user_agent=user_agent,
             )
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
         else:
             browser = await chromium.launch(headless=headless, proxy=playwright_proxy)  # type: ignore
             browser_context = await browser.new_context(viewport={"width": 1920, "height": 1080}, user_agent=user_agent)
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
 
     async def launch_browser_with_cdp(
@@ -393,7 +442,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         使用CDP模式启动浏览器
         """
         try:
-            self.cdp_manager = CDPBrowserManager()
+            self.cdp_manager = CDPBrowserManager(self.settings)
             browser_context = await self.cdp_manager.launch_and_connect(
                 playwright=playwright,
                 playwright_proxy=playwright_proxy,
@@ -415,6 +464,9 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭 API 客户端的 httpx 连接池
+        if getattr(self, "xhs_client", None):
+            await self.xhs_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
@@ -424,7 +476,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         utils.logger.info("[XiaoHongShuCrawler.close] Browser context closed ...")
 
     async def get_notice_media(self, note_detail: Dict):
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.settings.ENABLE_GET_MEIDAS:
             utils.logger.info(f"[XiaoHongShuCrawler.get_notice_media] Crawling image mode is not enabled")
             return
         await self.get_note_images(note_detail)
@@ -436,7 +488,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         :param note_item:
         :return:
         """
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.settings.ENABLE_GET_MEIDAS:
             return
         note_id = note_item.get("note_id")
         image_list: List[Dict] = note_item.get("image_list", [])
@@ -452,13 +504,10 @@ class XiaoHongShuCrawler(AbstractCrawler):
             url = pic.get("url")
             if not url:
                 continue
-            content = await self.xhs_client.get_note_media(url)
-            await asyncio.sleep(random.random())
-            if content is None:
-                continue
             extension_file_name = f"{picNum}.jpg"
             picNum += 1
-            await xhs_store.update_xhs_note_image(note_id, content, extension_file_name)
+            await xhs_store.download_xhs_note_image(note_id, url, extension_file_name,
+                                                    proxy=self.xhs_client.proxy, timeout=self.xhs_client.timeout)
 
     async def get_notice_video(self, note_item: Dict):
         """
@@ -466,7 +515,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         :param note_item:
         :return:
         """
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.settings.ENABLE_GET_MEIDAS:
             return
         note_id = note_item.get("note_id")
 
@@ -476,10 +525,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
             return
         videoNum = 0
         for url in videos:
-            content = await self.xhs_client.get_note_media(url)
-            await asyncio.sleep(random.random())
-            if content is None:
-                continue
             extension_file_name = f"{videoNum}.mp4"
             videoNum += 1
-            await xhs_store.update_xhs_note_video(note_id, content, extension_file_name)
+            await xhs_store.download_xhs_note_video(note_id, url, extension_file_name,
+                                                    proxy=self.xhs_client.proxy, timeout=self.xhs_client.timeout)
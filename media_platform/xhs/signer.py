@@ -0,0 +1,109 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 小红书请求签名，合并同时等待的签名请求，减少与浏览器之间的 CDP 往返
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from playwright.async_api import Page
+
+from tools import utils
+
+# 一次 evaluate 中对多个请求调用 window._webmsxyw，需要时顺便读取 localStorage 中的 b1
+_BATCH_SIGN_JS = """([requests, needB1]) => ({
+    signs: requests.map(([url, data]) => window._webmsxyw(url, data)),
+    b1: needB1 ? window.localStorage.getItem("b1") : null,
+})"""
+
+
+class XhsPlaywrightSigner:
+    """
+    通过浏览器页面计算小红书请求的 X-s、X-t 参数
+    - 同一时刻等待签名的请求合并到一次 page.evaluate 中执行
+    - localStorage 中的 b1 只在第一次签名、缓存过期或调用 invalidate_b1 后读取，且和签名在同一次 evaluate 中完成
+    """
+
+    def __init__(self, playwright_page: Page, max_batch_size: int = 16, b1_ttl: float = 300):
+        """
+        :param playwright_page: 已经打开小红书页面的 playwright 页面
+        :param max_batch_size: 一次 evaluate 最多签名的请求数
+        :param b1_ttl: b1 缓存的有效期（秒）
+        """
+        self.playwright_page = playwright_page
+        self.max_batch_size = max_batch_size
+        self.b1_ttl = b1_ttl
+        self._b1: Optional[str] = None
+        self._b1_expire_time = 0.0
+        self._pending: List[Tuple[str, Any, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def invalidate_b1(self):
+        """
+        使 b1 缓存失效，下一次签名时重新从 localStorage 读取，cookie 更新或页面重新加载后调用
+        """
+        self._b1 = None
+        self._b1_expire_time = 0.0
+
+    async def sign(self, url: str, data: Any = None) -> Tuple[Dict, str]:
+        """
+        计算请求的加密参数
+        Args:
+            url: 请求路由（包含查询参数）
+            data: 请求体参数
+
+        Returns: window._webmsxyw 的返回值，b1
+
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((url, data, future))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        batch: List[Tuple[str, Any, asyncio.Future]] = []
+        try:
+            # 让出一次事件循环，使同时发起的签名请求都进入本批
+            await asyncio.sleep(0)
+            while self._pending:
+                batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+                need_b1 = self._b1 is None or time.monotonic() >= self._b1_expire_time
+                try:
+                    result: Dict = await self.playwright_page.evaluate(
+                        _BATCH_SIGN_JS, [[[url, data] for url, data, _ in batch], need_b1]
+                    )
+                except Exception as e:
+                    utils.logger.error(f"[XhsPlaywrightSigner._flush] sign {len(batch)} requests failed: {e}")
+                    self._fail_futures(batch, e)
+                    continue
+                if need_b1:
+                    self._b1 = result.get("b1") or ""
+                    self._b1_expire_time = time.monotonic() + self.b1_ttl
+                signs = result.get("signs") or []
+                for (_, _, future), encrypt_params in zip(batch, signs):
+                    if not future.done():
+                        future.set_result((encrypt_params or {}, self._b1))
+                # 返回的签名数少于请求数时，没有拿到签名的请求直接失败，避免一直等待
+                self._fail_futures(batch, RuntimeError(f"sign returned {len(signs)} results for {len(batch)} requests"))
+        finally:
+            # 签名任务被取消（例如页面关闭、程序退出）时，本批和后续等待的请求全部取消
+            pending, self._pending = batch + self._pending, []
+            for _, _, future in pending:
+                if not future.done():
+                    future.cancel()
+
+    @staticmethod
+    def _fail_futures(batch: List[Tuple[str, Any, asyncio.Future]], error: Exception):
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
@@ -14,7 +14,7 @@ import asyncio
 import os
 import random
 from asyncio import Task
-from typing import Dict, List, Optional, Tuple, cast
+from typing import AsyncIterator, Dict, List, Optional, Tuple, cast
 
 from playwright.async_api import (
     BrowserContext,
@@ -24,15 +24,21 @@ from playwright.async_api import (
     async_playwright,
 )
 
-import config
+from config import PlatformSettings, get_platform_settings
 from constant import zhihu as constant
 from base.base_crawler import AbstractCrawler
 from model.m_zhihu import ZhihuContent, ZhihuCreator
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import zhihu as zhihu_store
 from tools import utils
+from tools.keyword_runner import run_keywords
+from tools.rate_limiter import get_crawl_interval
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_controller import ConcurrencyController
+from tools.crawl_pipeline import CrawlPipeline, get_stage_worker_num
+from tools.login_state_cache import check_login_state
+from tools.resource_blocker import disable_resource_blocking, enable_resource_blocking
+from var import crawler_type_var
 
 from .client import ZhiHuClient
 from .exception import DataFetchError
@@ -45,13 +51,16 @@ class ZhihuCrawler(AbstractCrawler):
     zhihu_client: ZhiHuClient
     browser_context: BrowserContext
     cdp_manager: Optional[CDPBrowserManager]
+    concurrency: ConcurrencyController
 
-    def __init__(self) -> None:
+    def __init__(self, settings: Optional[PlatformSettings] = None) -> None:
+        self.settings = settings or get_platform_settings("zhihu")
         self.index_url = "https://www.zhihu.com"
         # self.user_agent = utils.get_user_agent()
         self.user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"
         self._extractor = ZhihuExtractor()
         self.cdp_manager = None
+        self.concurrency = ConcurrencyController.for_platform("zhihu", self.settings)
 
     async def start(self) -> None:
         """
@@ -60,9 +69,9 @@ class ZhihuCrawler(AbstractCrawler):
 
         """
         playwright_proxy_format, httpx_proxy_format = None, None
-        if config.ENABLE_IP_PROXY:
+        if self.settings.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
+                self.settings.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(
@@ -71,20 +80,20 @@ class ZhihuCrawler(AbstractCrawler):
 
         async with async_playwright() as playwright:
             # 根据配置选择启动模式
-            if config.ENABLE_CDP_MODE:
+            if self.settings.ENABLE_CDP_MODE:
                 utils.logger.info("[ZhihuCrawler] 使用CDP模式启动浏览器")
                 self.browser_context = await self.launch_browser_with_cdp(
                     playwright,
                     playwright_proxy_format,
                     self.user_agent,
-                    headless=config.CDP_HEADLESS,
+                    headless=self.settings.CDP_HEADLESS,
                 )
             else:
                 utils.logger.info("[ZhihuCrawler] 使用标准模式启动浏览器")
                 # Launch a browser context.
                 chromium = playwright.chromium
                 self.browser_context = await self.launch_browser(
-                    chromium, None, self.user_agent, headless=config.HEADLESS
+                    chromium, None, self.user_agent, headless=self.settings.HEADLESS
                 )
             # stealth.min.js is a js script to prevent the website from detecting the crawler.
             await self.browser_context.add_init_script(path="libs/stealth.min.js")
@@ -94,18 +103,22 @@ class ZhihuCrawler(AbstractCrawler):
 
             # Create a client to interact with the zhihu website.
             self.zhihu_client = await self.create_zhihu_client(httpx_proxy_format)
-            if not await self.zhihu_client.pong():
+            if not await check_login_state(self.settings.PLATFORM, self.zhihu_client.cookie_dict, self.zhihu_client.pong):
                 login_obj = ZhiHuLogin(
-                    login_type=config.LOGIN_TYPE,
+                    login_type=self.settings.LOGIN_TYPE,
                     login_phone="",  # input your phone number
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=self.settings.COOKIES,
                 )
+                # 登录前关闭请求拦截，避免登录二维码无法显示
+                await disable_resource_blocking(self.browser_context, self.settings)
                 await login_obj.begin()
                 await self.zhihu_client.update_cookies(
                     browser_context=self.browser_context
                 )
+                # 登录完成后重新开启请求拦截
+                await enable_resource_blocking(self.browser_context, self.settings)
 
             # 知乎的搜索接口需要打开搜索页面之后cookies才能访问API，单独的首页不行
             utils.logger.info(
@@ -117,14 +130,14 @@ class ZhihuCrawler(AbstractCrawler):
             await asyncio.sleep(5)
             await self.zhihu_client.update_cookies(browser_context=self.browser_context)
 
-            crawler_type_var.set(config.CRAWLER_TYPE)
-            if config.CRAWLER_TYPE == "search":
+            crawler_type_var.set(self.settings.CRAWLER_TYPE)
+            if self.settings.CRAWLER_TYPE == "search":
                 # Search for notes and retrieve their comment information.
                 await self.search()
-            elif config.CRAWLER_TYPE == "detail":
+            elif self.settings.CRAWLER_TYPE == "detail":
                 # Get the information and comments of the specified post
                 await self.get_specified_notes()
-            elif config.CRAWLER_TYPE == "creator":
+            elif self.settings.CRAWLER_TYPE == "creator":
                 # Get creator's information and their notes and comments
                 await self.get_creators_and_notes()
             else:
@@ -136,48 +149,75 @@ class ZhihuCrawler(AbstractCrawler):
         """Search for notes and retrieve their comment information."""
         utils.logger.info("[ZhihuCrawler.search] Begin search zhihu keywords")
         zhihu_limit_count = 20  # zhihu limit page fixed value
-        if config.CRAWLER_MAX_NOTES_COUNT < zhihu_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = zhihu_limit_count
-        start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        # 多个平台同时爬取时共用配置模块，这里用局部变量，不修改全局配置
+        max_notes_count = max(self.settings.CRAWLER_MAX_NOTES_COUNT, zhihu_limit_count)
+        start_page = self.settings.START_PAGE
+        comment_worker_num = get_stage_worker_num(self.settings.CRAWL_PIPELINE_COMMENT_WORKER_NUM, self.concurrency.comment.limit)
+
+        async def search_keyword(keyword: str):
             utils.logger.info(
                 f"[ZhihuCrawler.search] Current search keyword: {keyword}"
             )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * zhihu_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[ZhihuCrawler.search] Skip page {page}")
-                    page += 1
-                    continue
-
-                try:
-                    utils.logger.info(
-                        f"[ZhihuCrawler.search] search zhihu keyword: {keyword}, page: {page}"
-                    )
-                    content_list: List[ZhihuContent] = (
-                        await self.zhihu_client.get_note_by_keyword(
-                            keyword=keyword,
-                            page=page,
-                        )
-                    )
-                    utils.logger.info(
-                        f"[ZhihuCrawler.search] Search contents :{content_list}"
-                    )
-                    if not content_list:
-                        utils.logger.info("No more content!")
-                        break
-
-                    page += 1
-                    for content in content_list:
-                        await zhihu_store.update_zhihu_content(content)
-
-                    await self.batch_get_content_comments(content_list)
-                except DataFetchError:
-                    utils.logger.error("[ZhihuCrawler.search] Search content error")
-                    return
+            # 搜索结果已经是完整的内容，搜索 -> 存储 -> 评论 分阶段执行，下一页的搜索不再等待上一页的评论爬取完成
+            pipeline = CrawlPipeline("ZhihuCrawler.search", ignore_errors=(DataFetchError,), settings=self.settings)
+            pipeline.add_stage("store", self.save_content)
+            if self.settings.ENABLE_GET_COMMENTS:
+                pipeline.add_stage(
+                    "comment",
+                    lambda content: self.get_comments(content, self.concurrency.comment),
+                    worker_num=comment_worker_num,
+                )
+            await pipeline.run(self.iter_search_contents(keyword, start_page, zhihu_limit_count, max_notes_count))
+
+        await run_keywords("ZhihuCrawler.search", self.settings.KEYWORDS.split(","), search_keyword,
+                           ignore_errors=(DataFetchError,), concurrency=self.settings.KEYWORD_CONCURRENCY_NUM,
+                           controller=self.concurrency)
+
+    async def iter_search_contents(self, keyword: str, start_page: int, page_size: int,
+                                   max_notes_count: int) -> AsyncIterator[ZhihuContent]:
+        """
+        Search contents page by page and yield the search result contents
+        Args:
+            keyword: search keyword
+            start_page: skip the pages before start_page
+            page_size: zhihu limit page fixed value
+            max_notes_count: max contents count of the keyword
+
+        Returns:
+
+        """
+        page = 1
+        while (page - start_page + 1) * page_size <= max_notes_count:
+            if page < start_page:
+                utils.logger.info(f"[ZhihuCrawler.search] Skip page {page}")
+                page += 1
+                continue
+
+            utils.logger.info(
+                f"[ZhihuCrawler.search] search zhihu keyword: {keyword}, page: {page}"
+            )
+            try:
+                content_list: List[ZhihuContent] = await self.zhihu_client.get_note_by_keyword(
+                    keyword=keyword,
+                    page=page,
+                )
+            except DataFetchError:
+                utils.logger.error("[ZhihuCrawler.search] Search content error")
+                break
+            utils.logger.info(
+                f"[ZhihuCrawler.search] Search contents :{content_list}"
+            )
+            if not content_list:
+                utils.logger.info("No more content!")
+                break
+            page += 1
+            for content in content_list:
+                yield content
+
+    async def save_content(self, content: ZhihuContent) -> ZhihuContent:
+        """Save content, return the content for the comment stage"""
+        await zhihu_store.update_zhihu_content(content)
+        return content
 
     async def batch_get_content_comments(self, content_list: List[ZhihuContent]):
         """
@@ -188,13 +228,13 @@ class ZhihuCrawler(AbstractCrawler):
         Returns:
 
         """
-        if not config.ENABLE_GET_COMMENTS:
+        if not self.settings.ENABLE_GET_COMMENTS:
             utils.logger.info(
                 f"[ZhihuCrawler.batch_get_content_comments] Crawling comment mode is not enabled"
             )
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.concurrency.comment
         task_list: List[Task] = []
         for content_item in content_list:
             task = asyncio.create_task(
@@ -221,7 +261,7 @@ class ZhihuCrawler(AbstractCrawler):
             )
             await self.zhihu_client.get_note_all_comments(
                 content=content_item,
-                crawl_interval=random.random(),
+                crawl_interval=get_crawl_interval(random.random(), self.settings),
                 callback=zhihu_store.batch_update_zhihu_note_comments,
             )
 
@@ -234,7 +274,7 @@ class ZhihuCrawler(AbstractCrawler):
         utils.logger.info(
             "[ZhihuCrawler.get_creators_and_notes] Begin get xiaohongshu creators"
         )
-        for user_link in config.ZHIHU_CREATOR_URL_LIST:
+        for user_link in self.settings.ZHIHU_CREATOR_URL_LIST:
             utils.logger.info(
                 f"[ZhihuCrawler.get_creators_and_notes] Begin get creator {user_link}"
             )
@@ -259,7 +299,7 @@ class ZhihuCrawler(AbstractCrawler):
             # Get all anwser information of the creator
             all_content_list = await self.zhihu_client.get_all_anwser_by_creator(
                 creator=createor_info,
-                crawl_interval=random.random(),
+                crawl_interval=get_crawl_interval(random.random(), self.settings),
                 callback=zhihu_store.batch_update_zhihu_contents,
             )
 
@@ -327,12 +367,12 @@ class ZhihuCrawler(AbstractCrawler):
 
         """
         get_note_detail_task_list = []
-        for full_note_url in config.ZHIHU_SPECIFIED_ID_LIST:
+        for full_note_url in self.settings.ZHIHU_SPECIFIED_ID_LIST:
             # remove query params
             full_note_url = full_note_url.split("?")[0]
             crawler_task = self.get_note_detail(
                 full_note_url=full_note_url,
-                semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
+                semaphore=self.concurrency.api,
             )
             get_note_detail_task_list.append(crawler_task)
 
@@ -341,7 +381,7 @@ class ZhihuCrawler(AbstractCrawler):
         for index, note_detail in enumerate(note_details):
             if not note_detail:
                 utils.logger.info(
-                    f"[ZhihuCrawler.get_specified_notes] Note {config.ZHIHU_SPECIFIED_ID_LIST[index]} not found"
+                    f"[ZhihuCrawler.get_specified_notes] Note {self.settings.ZHIHU_SPECIFIED_ID_LIST[index]} not found"
                 )
                 continue
 
@@ -375,7 +415,9 @@ class ZhihuCrawler(AbstractCrawler):
             },
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
+            settings=self.settings,
         )
+        zhihu_client_obj.concurrency = self.concurrency
         return zhihu_client_obj
 
     async def launch_browser(
@@ -389,11 +431,11 @@ class ZhihuCrawler(AbstractCrawler):
         utils.logger.info(
             "[ZhihuCrawler.launch_browser] Begin create browser context ..."
         )
-        if config.SAVE_LOGIN_STATE:
+        if self.settings.SAVE_LOGIN_STATE:
             # feat issue #14
             # we will save login state to avoid login every time
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", self.settings.USER_DATA_DIR % self.settings.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -403,12 +445,14 @@ class ZhihuCrawler(AbstractCrawler):
                 viewport={"width": 1920, "height": 1080},
                 user_agent=user_agent,
             )
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
         else:
             browser = await chromium.launch(headless=headless, proxy=playwright_proxy)  # type: ignore
             browser_context = await browser.new_context(
                 viewport={"width": 1920, "height": 1080}, user_agent=user_agent
             )
+            await enable_resource_blocking(browser_context, self.settings)
             return browser_context
 
     async def launch_browser_with_cdp(
@@ -422,7 +466,7 @@ class ZhihuCrawler(AbstractCrawler):
         使用CDP模式启动浏览器
         """
         try:
-            self.cdp_manager = CDPBrowserManager()
+            self.cdp_manager = CDPBrowserManager(self.settings)
             browser_context = await self.cdp_manager.launch_and_connect(
                 playwright=playwright,
                 playwright_proxy=playwright_proxy,
@@ -446,6 +490,9 @@ class ZhihuCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭 API 客户端的 httpx 连接池
+        if getattr(self, "zhihu_client", None):
+            await self.zhihu_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
@@ -14,18 +14,19 @@ import json
 from typing import Dict, List, Optional
 from urllib.parse import parse_qs, urlparse
 
-import execjs
 from parsel import Selector
 
+from config import get_platform_settings
 from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from tools import utils
 from tools.crawler_util import extract_text_from_html
+from tools.js_signer import JsSignerPool
 
-ZHIHU_SGIN_JS = None
+zhihu_sign_pool = JsSignerPool("libs/zhihu.js", settings=get_platform_settings("zhihu"))
 
 
-def sign(url: str, cookies: str) -> Dict:
+async def sign(url: str, cookies: str) -> Dict:
     """
     zhihu sign algorithm
     Args:
@@ -35,12 +36,7 @@ def sign(url: str, cookies: str) -> Dict:
     Returns:
 
     """
-    global ZHIHU_SGIN_JS
-    if not ZHIHU_SGIN_JS:
-        with open("libs/zhihu.js", mode="r", encoding="utf-8-sig") as f:
-            ZHIHU_SGIN_JS = execjs.compile(f.read())
-
-    return ZHIHU_SGIN_JS.call("get_sign", url, cookies)
+    return await zhihu_sign_pool.call("get_sign", url, cookies)
 
 
 class ZhihuExtractor:
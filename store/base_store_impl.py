@@ -0,0 +1,279 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 各平台存储实现类的公共部分，平台的存储实现类只需要指定文件路径、sql 接口模块等
+import asyncio
+import importlib
+import json
+import os
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+import aiofiles
+
+import config
+from config import get_platform_settings
+from base.base_crawler import AbstractStore
+from tools import utils, words
+from tools.async_file_writer import csv_writer, jsonl_writer
+from var import crawler_type_var
+
+
+class BaseCsvStoreImplement(AbstractStore):
+    """
+    CSV 存储的公共实现，文件句柄由 csv_writer 在整个运行期间保持打开
+    子类需要指定 csv_store_path 和 file_count
+    """
+    csv_store_path: str = ""
+    file_count: int = 1
+    # 创作者数据的文件类型名，各平台不一致（creator | creators）
+    creator_store_type: str = "creator"
+
+    def make_save_file_name(self, store_type: str) -> str:
+        """
+        make save file name by store type
+        Args:
+            store_type: contents or comments
+
+        Returns: eg: data/xhs/1_search_comments_20240114.csv ...
+
+        """
+        return f"{self.csv_store_path}/{self.file_count}_{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.csv"
+
+    async def save_data_to_csv(self, save_item: Dict, store_type: str):
+        """
+        Below is a simple way to save it in CSV format.
+        Args:
+            save_item:  save content dict info
+            store_type: Save type contains content and comments（contents | comments）
+
+        Returns: no returns
+
+        """
+        await self.save_items_to_csv([save_item], store_type)
+
+    async def save_items_to_csv(self, save_items: List[Dict], store_type: str):
+        """
+        Save a batch of items to the CSV file, the file handle is kept open for the whole run.
+        Args:
+            save_items: save content dict info list
+            store_type: Save type contains content and comments（contents | comments）
+
+        Returns: no returns
+
+        """
+        save_file_name = self.make_save_file_name(store_type=store_type)
+        await csv_writer.write_many(save_file_name, save_items)
+
+    async def store_content(self, content_item: Dict):
+        await self.save_items_to_csv([content_item], "contents")
+
+    async def store_comment(self, comment_item: Dict):
+        await self.save_items_to_csv([comment_item], "comments")
+
+    async def store_creator(self, creator: Dict):
+        await self.save_items_to_csv([creator], self.creator_store_type)
+
+    async def store_contents(self, content_items: List[Dict]):
+        await self.save_items_to_csv(content_items, "contents")
+
+    async def store_comments(self, comment_items: List[Dict]):
+        await self.save_items_to_csv(comment_items, "comments")
+
+    async def store_creators(self, creators: List[Dict]):
+        await self.save_items_to_csv(creators, self.creator_store_type)
+
+
+class BaseDbStoreImplement(AbstractStore):
+    """
+    数据库（MySQL、SQLite）存储的公共实现，写入前给每条数据加上 add_ts，调用平台 sql 接口模块中的 upsert_{store_type}
+    子类需要指定 sql_module
+    """
+    # 平台的 sql 接口模块，写入时才导入
+    sql_module: str = ""
+
+    async def upsert_items(self, store_type: str, items: List[Dict]):
+        """
+        批量新增或更新数据
+        Args:
+            store_type: 存储类型（contents | comments | creators ...），对应 sql 接口模块中的 upsert_{store_type}
+            items: 需要保存的数据列表
+
+        Returns:
+
+        """
+        if not items:
+            return
+        add_ts = utils.get_current_timestamp()
+        for item in items:
+            item["add_ts"] = add_ts
+        upsert = getattr(importlib.import_module(self.sql_module), f"upsert_{store_type}")
+        await upsert(items)
+
+    async def store_content(self, content_item: Dict):
+        await self.store_contents([content_item])
+
+    async def store_comment(self, comment_item: Dict):
+        await self.store_comments([comment_item])
+
+    async def store_creator(self, creator: Dict):
+        await self.store_creators([creator])
+
+    async def store_contents(self, content_items: List[Dict]):
+        await self.upsert_items("contents", content_items)
+
+    async def store_comments(self, comment_items: List[Dict]):
+        await self.upsert_items("comments", comment_items)
+
+    async def store_creators(self, creators: List[Dict]):
+        await self.upsert_items("creators", creators)
+
+
+class BaseJsonStoreImplement(AbstractStore):
+    """
+    JSON 存储的公共实现，写入文件后，开启评论和词云时同时更新词频和词云
+    子类需要指定 platform、json_store_path、words_store_path、file_count，以及平台自己的 lock 和 WordCloud
+    """
+    # 平台名称，是否生成词云以该平台的配置为准
+    platform: str = ""
+    json_store_path: str = ""
+    words_store_path: str = ""
+    lock: asyncio.Lock
+    file_count: int = 1
+    WordCloud: words.AsyncWordCloudGenerator
+    # 创作者数据的文件类型名，各平台不一致（creator | creators）
+    creator_store_type: str = "creator"
+    # json 文件的缩进，None 时不换行
+    json_indent: Optional[int] = None
+
+    def make_save_file_name(self, store_type: str) -> Tuple[str, str]:
+        """
+        make save file name by store type
+        Args:
+            store_type: Save type contains content and comments（contents | comments）
+
+        Returns: json 文件路径, 词频和词云文件的路径前缀
+
+        """
+        return (
+            f"{self.json_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.json",
+            f"{self.words_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}"
+        )
+
+    async def save_data_to_json(self, save_item: Dict, store_type: str):
+        """
+        Below is a simple way to save it in json format.
+        Args:
+            save_item: save content dict info
+            store_type: Save type contains content and comments（contents | comments）
+
+        Returns:
+
+        """
+        await self.save_items_to_json([save_item], store_type)
+
+    async def save_items_to_json(self, save_items: List[Dict], store_type: str):
+        """
+        Save a batch of items to the json file, then update the word frequency and word cloud.
+        Args:
+            save_items: save content dict info list
+            store_type: Save type contains content and comments（contents | comments）
+
+        Returns:
+
+        """
+        if not save_items:
+            return
+        await self.write_items(save_items, store_type)
+        await self.generate_word_cloud(save_items, store_type)
+
+    async def write_items(self, save_items: List[Dict], store_type: str):
+        """
+        Write a batch of items to the json file, the file is read and written only once.
+        Args:
+            save_items: save content dict info list
+            store_type: Save type contains content and comments（contents | comments）
+
+        Returns:
+
+        """
+        pathlib.Path(self.json_store_path).mkdir(parents=True, exist_ok=True)
+        save_file_name, _ = self.make_save_file_name(store_type=store_type)
+        save_data = []
+
+        async with self.lock:
+            if os.path.exists(save_file_name):
+                async with aiofiles.open(save_file_name, 'r', encoding='utf-8') as file:
+                    save_data = json.loads(await file.read())
+
+            save_data.extend(save_items)
+            async with aiofiles.open(save_file_name, 'w', encoding='utf-8') as file:
+                await file.write(json.dumps(save_data, ensure_ascii=False, indent=self.json_indent))
+
+    async def generate_word_cloud(self, save_items: List[Dict], store_type: str):
+        """
+        开启评论和词云时根据这批数据更新词频和词云，生成失败只记录日志，不影响数据的保存
+        Args:
+            save_items: save content dict info list
+            store_type: Save type contains content and comments（contents | comments）
+
+        Returns:
+
+        """
+        settings = get_platform_settings(self.platform) if self.platform else config
+        if not (settings.ENABLE_GET_COMMENTS and settings.ENABLE_GET_WORDCLOUD):
+            return
+        pathlib.Path(self.words_store_path).mkdir(parents=True, exist_ok=True)
+        _, words_file_name_prefix = self.make_save_file_name(store_type=store_type)
+        async with self.lock:
+            try:
+                await self.WordCloud.generate_word_frequency_and_cloud(save_items, words_file_name_prefix)
+            except Exception as e:
+                utils.logger.error(f"[{self.__class__.__name__}.generate_word_cloud] generate word cloud of {store_type} failed: {e!r}")
+
+    async def store_content(self, content_item: Dict):
+        await self.save_items_to_json([content_item], "contents")
+
+    async def store_comment(self, comment_item: Dict):
+        await self.save_items_to_json([comment_item], "comments")
+
+    async def store_creator(self, creator: Dict):
+        await self.save_items_to_json([creator], self.creator_store_type)
+
+    async def store_contents(self, content_items: List[Dict]):
+        await self.save_items_to_json(content_items, "contents")
+
+    async def store_comments(self, comment_items: List[Dict]):
+        await self.save_items_to_json(comment_items, "comments")
+
+    async def store_creators(self, creators: List[Dict]):
+        await self.save_items_to_json(creators, self.creator_store_type)
+
+
+class JsonlStoreMixin:
+    """
+    JSON Lines 存储，与平台的 JSON 存储实现类一起继承，只替换文件的写入方式，词频和词云的生成不变
+    每条数据追加一行，文件句柄由 jsonl_writer 在整个运行期间保持打开
+    """
+    json_store_path: str
+
+    async def write_items(self, save_items: List[Dict], store_type: str):
+        """
+        Append the items to a jsonl file.
+        Args:
+            save_items: save content dict info list
+            store_type: Save type contains content and comments（contents | comments）
+
+        Returns:
+
+        """
+        await jsonl_writer.write_many(self.json_store_path, crawler_type_var.get(), store_type, save_items)
@@ -16,6 +16,9 @@
 from typing import List
 
 import config
+from base.base_crawler import AbstractStore
+from store.store_pipeline import store_pipeline
+from tools.media_downloader import media_downloader
 from var import source_keyword_var
 
 from .bilibili_store_impl import *
@@ -27,6 +30,7 @@ class BiliStoreFactory:
         "csv": BiliCsvStoreImplement,
         "db": BiliDbStoreImplement,
         "json": BiliJsonStoreImplement,
+        "jsonl": BiliJsonlStoreImplement,
         "sqlite": BiliSqliteStoreImplement,
     }
 
@@ -34,7 +38,7 @@ class BiliStoreFactory:
     def create_store() -> AbstractStore:
         store_class = BiliStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
+            raise ValueError("[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite ...")
         return store_class()
 
 
@@ -66,7 +70,7 @@ async def update_bilibili_video(video_item: Dict):
         "source_keyword": source_keyword_var.get(),
     }
     utils.logger.info(f"[store.bilibili.update_bilibili_video] bilibili video id:{video_id}, title:{save_content_item.get('title')}")
-    await BiliStoreFactory.create_store().store_content(content_item=save_content_item)
+    await store_pipeline.put(BiliStoreFactory.create_store(), "content", save_content_item)
 
 
 async def update_up_info(video_item: Dict):
@@ -85,17 +89,21 @@ async def update_up_info(video_item: Dict):
         "is_official": video_item_card.get("official_verify").get("type"),
     }
     utils.logger.info(f"[store.bilibili.update_up_info] bilibili user_id:{video_item_card.get('mid')}")
-    await BiliStoreFactory.create_store().store_creator(creator=saver_up_info)
+    await store_pipeline.put(BiliStoreFactory.create_store(), "creator", saver_up_info)
 
 
 async def batch_update_bilibili_video_comments(video_id: str, comments: List[Dict]):
     if not comments:
         return
-    for comment_item in comments:
-        await update_bilibili_video_comment(video_id, comment_item)
+    comment_items = [convert_bilibili_video_comment(video_id, comment_item) for comment_item in comments]
+    await store_pipeline.put_many(BiliStoreFactory.create_store(), "comment", comment_items)
 
 
 async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
+    await store_pipeline.put(BiliStoreFactory.create_store(), "comment", convert_bilibili_video_comment(video_id, comment_item))
+
+
+def convert_bilibili_video_comment(video_id: str, comment_item: Dict) -> Dict:
     comment_id = str(comment_item.get("rpid"))
     parent_comment_id = str(comment_item.get("parent", 0))
     content: Dict = comment_item.get("content")
@@ -117,27 +125,26 @@ async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
         "last_modify_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.bilibili.update_bilibili_video_comment] Bilibili video comment: {comment_id}, content: {save_comment_item.get('content')}")
-    await BiliStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
 
 
-async def store_video(aid, video_content, extension_file_name):
+async def download_video(aid, url, extension_file_name, **request_kwargs):
     """
-    video video storage implementation
+    把视频加入媒体下载队列
     Args:
         aid:
-        video_content:
+        url:
         extension_file_name:
+        request_kwargs: 下载请求参数（proxy、timeout、headers 等）
     """
-    await BilibiliVideo().store_video({
-        "aid": aid,
-        "video_content": video_content,
-        "extension_file_name": extension_file_name,
-    })
+    save_file_name = BilibiliVideo().make_save_file_name(str(aid), extension_file_name)
+    await media_downloader.submit(url, save_file_name, **request_kwargs)
 
 
 async def batch_update_bilibili_creator_fans(creator_info: Dict, fans_list: List[Dict]):
     if not fans_list:
         return
+    contact_items = []
     for fan_item in fans_list:
         fan_info: Dict = {
             "id": fan_item.get("mid"),
@@ -145,12 +152,14 @@ async def batch_update_bilibili_creator_fans(creator_info: Dict, fans_list: List
             "sign": fan_item.get("sign"),
             "avatar": fan_item.get("face"),
         }
-        await update_bilibili_creator_contact(creator_info=creator_info, fan_info=fan_info)
+        contact_items.append(convert_bilibili_creator_contact(creator_info=creator_info, fan_info=fan_info))
+    await store_pipeline.put_many(BiliStoreFactory.create_store(), "contact", contact_items)
 
 
 async def batch_update_bilibili_creator_followings(creator_info: Dict, followings_list: List[Dict]):
     if not followings_list:
         return
+    contact_items = []
     for following_item in followings_list:
         following_info: Dict = {
             "id": following_item.get("mid"),
@@ -158,12 +167,14 @@ async def batch_update_bilibili_creator_followings(creator_info: Dict, following
             "sign": following_item.get("sign"),
             "avatar": following_item.get("face"),
         }
-        await update_bilibili_creator_contact(creator_info=following_info, fan_info=creator_info)
+        contact_items.append(convert_bilibili_creator_contact(creator_info=following_info, fan_info=creator_info))
+    await store_pipeline.put_many(BiliStoreFactory.create_store(), "contact", contact_items)
 
 
 async def batch_update_bilibili_creator_dynamics(creator_info: Dict, dynamics_list: List[Dict]):
     if not dynamics_list:
         return
+    dynamic_items = []
     for dynamic_item in dynamics_list:
         dynamic_id: str = dynamic_item["id_str"]
         dynamic_text: str = ""
@@ -184,10 +195,15 @@ async def batch_update_bilibili_creator_dynamics(creator_info: Dict, dynamics_li
             "total_forwards": dynamic_forward,
             "total_liked": dynamic_like,
         }
-        await update_bilibili_creator_dynamic(creator_info=creator_info, dynamic_info=dynamic_info)
+        dynamic_items.append(convert_bilibili_creator_dynamic(creator_info=creator_info, dynamic_info=dynamic_info))
+    await store_pipeline.put_many(BiliStoreFactory.create_store(), "dynamic", dynamic_items)
 
 
 async def update_bilibili_creator_contact(creator_info: Dict, fan_info: Dict):
+    await store_pipeline.put(BiliStoreFactory.create_store(), "contact", convert_bilibili_creator_contact(creator_info, fan_info))
+
+
+def convert_bilibili_creator_contact(creator_info: Dict, fan_info: Dict) -> Dict:
     save_contact_item = {
         "up_id": creator_info["id"],
         "fan_id": fan_info["id"],
@@ -199,11 +215,14 @@ async def update_bilibili_creator_contact(creator_info: Dict, fan_info: Dict):
         "fan_avatar": fan_info["avatar"],
         "last_modify_ts": utils.get_current_timestamp(),
     }
-
-    await BiliStoreFactory.create_store().store_contact(contact_item=save_contact_item)
+    return save_contact_item
 
 
 async def update_bilibili_creator_dynamic(creator_info: Dict, dynamic_info: Dict):
+    await store_pipeline.put(BiliStoreFactory.create_store(), "dynamic", convert_bilibili_creator_dynamic(creator_info, dynamic_info))
+
+
+def convert_bilibili_creator_dynamic(creator_info: Dict, dynamic_info: Dict) -> Dict:
     save_dynamic_item = {
         "dynamic_id": dynamic_info["dynamic_id"],
         "user_id": creator_info["id"],
@@ -216,5 +235,4 @@ async def update_bilibili_creator_dynamic(creator_info: Dict, dynamic_info: Dict
         "total_liked": dynamic_info["total_liked"],
         "last_modify_ts": utils.get_current_timestamp(),
     }
-
-    await BiliStoreFactory.create_store().store_dynamic(dynamic_item=save_dynamic_item)
+    return save_dynamic_item
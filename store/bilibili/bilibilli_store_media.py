@@ -12,19 +12,17 @@
 # @Author  : helloteemo
 # @Time    : 2024/7/12 20:01
 # @Desc    : bilibili 媒体保存
-import pathlib
 from typing import Dict
 
-import aiofiles
-
 from base.base_crawler import AbstractStoreImage, AbstractStoreVideo
 from tools import utils
+from tools.media_downloader import MediaContent, save_media_to_file
 
 
 class BilibiliVideo(AbstractStoreVideo):
     video_store_path: str = "data/bilibili/videos"
 
-    async def store_video(self, video_content_item: Dict):
+    async def store_video(self, video_content_item: Dict) -> bool:
         """
         store content
         
@@ -34,7 +32,7 @@ class BilibiliVideo(AbstractStoreVideo):
         Returns:
 
         """
-        await self.save_video(video_content_item.get("aid"), video_content_item.get("video_content"), video_content_item.get("extension_file_name"))
+        return await self.save_video(video_content_item.get("aid"), video_content_item.get("video_content"), video_content_item.get("extension_file_name"))
 
     def make_save_file_name(self, aid: str, extension_file_name: str) -> str:
         """
@@ -49,7 +47,7 @@ class BilibiliVideo(AbstractStoreVideo):
         """
         return f"{self.video_store_path}/{aid}/{extension_file_name}"
 
-    async def save_video(self, aid: int, video_content: str, extension_file_name="mp4"):
+    async def save_video(self, aid: int, video_content: MediaContent, extension_file_name="mp4") -> bool:
         """
         save video to local
         
@@ -61,8 +59,8 @@ class BilibiliVideo(AbstractStoreVideo):
         Returns:
 
         """
-        pathlib.Path(self.video_store_path + "/" + str(aid)).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(str(aid), extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(video_content)
-            utils.logger.info(f"[BilibiliVideoImplement.save_video] save save_video {save_file_name} success ...")
+        if not await save_media_to_file(save_file_name, video_content):
+            return False
+        utils.logger.info(f"[BilibiliVideoImplement.save_video] save save_video {save_file_name} success ...")
+        return True
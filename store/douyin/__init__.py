@@ -12,9 +12,12 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 18:46
 # @Desc    :
-from typing import List
+from typing import List, Optional
 
 import config
+from base.base_crawler import AbstractStore
+from store.store_pipeline import store_pipeline
+from tools.media_downloader import media_downloader
 from var import source_keyword_var
 
 from .douyin_store_impl import *
@@ -26,6 +29,7 @@ class DouyinStoreFactory:
         "csv": DouyinCsvStoreImplement,
         "db": DouyinDbStoreImplement,
         "json": DouyinJsonStoreImplement,
+        "jsonl": DouyinJsonlStoreImplement,
         "sqlite": DouyinSqliteStoreImplement,
     }
 
@@ -33,7 +37,7 @@ class DouyinStoreFactory:
     def create_store() -> AbstractStore:
         store_class = DouyinStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[DouyinStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
+            raise ValueError("[DouyinStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite ...")
         return store_class()
 
 
@@ -172,21 +176,27 @@ async def update_douyin_aweme(aweme_item: Dict):
         "source_keyword": source_keyword_var.get(),
     }
     utils.logger.info(f"[store.douyin.update_douyin_aweme] douyin aweme id:{aweme_id}, title:{save_content_item.get('title')}")
-    await DouyinStoreFactory.create_store().store_content(content_item=save_content_item)
+    await store_pipeline.put(DouyinStoreFactory.create_store(), "content", save_content_item)
 
 
 async def batch_update_dy_aweme_comments(aweme_id: str, comments: List[Dict]):
     if not comments:
         return
-    for comment_item in comments:
-        await update_dy_aweme_comment(aweme_id, comment_item)
+    comment_items = [convert_dy_aweme_comment(aweme_id, comment_item) for comment_item in comments]
+    await store_pipeline.put_many(DouyinStoreFactory.create_store(), "comment", [item for item in comment_items if item])
 
 
 async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
+    save_comment_item = convert_dy_aweme_comment(aweme_id, comment_item)
+    if save_comment_item:
+        await store_pipeline.put(DouyinStoreFactory.create_store(), "comment", save_comment_item)
+
+
+def convert_dy_aweme_comment(aweme_id: str, comment_item: Dict) -> Optional[Dict]:
     comment_aweme_id = comment_item.get("aweme_id")
     if aweme_id != comment_aweme_id:
         utils.logger.error(f"[store.douyin.update_dy_aweme_comment] comment_aweme_id: {comment_aweme_id} != aweme_id: {aweme_id}")
-        return
+        return None
     user_info = comment_item.get("user", {})
     comment_id = comment_item.get("cid")
     parent_comment_id = comment_item.get("reply_id", "0")
@@ -211,8 +221,7 @@ async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
         "pictures": ",".join(_extract_comment_image_list(comment_item)),
     }
     utils.logger.info(f"[store.douyin.update_dy_aweme_comment] douyin aweme comment: {comment_id}, content: {save_comment_item.get('content')}")
-
-    await DouyinStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
 
 
 async def save_creator(user_id: str, creator: Dict):
@@ -233,34 +242,36 @@ async def save_creator(user_id: str, creator: Dict):
         "last_modify_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.douyin.save_creator] creator:{local_db_item}")
-    await DouyinStoreFactory.create_store().store_creator(local_db_item)
+    await store_pipeline.put(DouyinStoreFactory.create_store(), "creator", local_db_item)
 
 
-async def update_dy_aweme_image(aweme_id, pic_content, extension_file_name):
+async def download_dy_aweme_image(aweme_id, url, extension_file_name, **request_kwargs):
     """
-    更新抖音笔记图片
+    把抖音笔记图片加入媒体下载队列
     Args:
         aweme_id:
-        pic_content:
+        url:
         extension_file_name:
+        request_kwargs: 下载请求参数（proxy、timeout、headers 等）
 
     Returns:
 
     """
-
-    await DouYinImage().store_image({"aweme_id": aweme_id, "pic_content": pic_content, "extension_file_name": extension_file_name})
+    save_file_name = DouYinImage().make_save_file_name(aweme_id, extension_file_name)
+    await media_downloader.submit(url, save_file_name, **request_kwargs)
 
 
-async def update_dy_aweme_video(aweme_id, video_content, extension_file_name):
+async def download_dy_aweme_video(aweme_id, url, extension_file_name, **request_kwargs):
     """
-    更新抖音短视频
+    把抖音短视频加入媒体下载队列
     Args:
         aweme_id:
-        video_content:
+        url:
         extension_file_name:
+        request_kwargs: 下载请求参数（proxy、timeout、headers 等）
 
     Returns:
 
     """
-
-    await DouYinVideo().store_video({"aweme_id": aweme_id, "video_content": video_content, "extension_file_name": extension_file_name})
+    save_file_name = DouYinVideo().make_save_file_name(aweme_id, extension_file_name)
+    await media_downloader.submit(url, save_file_name, **request_kwargs)
@@ -8,19 +8,17 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-import pathlib
 from typing import Dict
 
-import aiofiles
-
 from base.base_crawler import AbstractStoreImage, AbstractStoreVideo
 from tools import utils
+from tools.media_downloader import MediaContent, save_media_to_file
 
 
 class DouYinImage(AbstractStoreImage):
     image_store_path: str = "data/douyin/images"
 
-    async def store_image(self, image_content_item: Dict):
+    async def store_image(self, image_content_item: Dict) -> bool:
         """
         store content
         
@@ -30,7 +28,7 @@ class DouYinImage(AbstractStoreImage):
         Returns:
 
         """
-        await self.save_image(image_content_item.get("aweme_id"), image_content_item.get("pic_content"), image_content_item.get("extension_file_name"))
+        return await self.save_image(image_content_item.get("aweme_id"), image_content_item.get("pic_content"), image_content_item.get("extension_file_name"))
 
     def make_save_file_name(self, aweme_id: str, extension_file_name: str) -> str:
         """
@@ -45,7 +43,7 @@ class DouYinImage(AbstractStoreImage):
         """
         return f"{self.image_store_path}/{aweme_id}/{extension_file_name}"
 
-    async def save_image(self, aweme_id: str, pic_content: str, extension_file_name):
+    async def save_image(self, aweme_id: str, pic_content: MediaContent, extension_file_name) -> bool:
         """
         save image to local
         
@@ -57,17 +55,17 @@ class DouYinImage(AbstractStoreImage):
         Returns:
 
         """
-        pathlib.Path(self.image_store_path + "/" + aweme_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(aweme_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(pic_content)
-            utils.logger.info(f"[DouYinImageStoreImplement.save_image] save image {save_file_name} success ...")
+        if not await save_media_to_file(save_file_name, pic_content):
+            return False
+        utils.logger.info(f"[DouYinImageStoreImplement.save_image] save image {save_file_name} success ...")
+        return True
 
 
 class DouYinVideo(AbstractStoreVideo):
     video_store_path: str = "data/douyin/videos"
 
-    async def store_video(self, video_content_item: Dict):
+    async def store_video(self, video_content_item: Dict) -> bool:
         """
         store content
         
@@ -77,7 +75,7 @@ class DouYinVideo(AbstractStoreVideo):
         Returns:
 
         """
-        await self.save_video(video_content_item.get("aweme_id"), video_content_item.get("video_content"), video_content_item.get("extension_file_name"))
+        return await self.save_video(video_content_item.get("aweme_id"), video_content_item.get("video_content"), video_content_item.get("extension_file_name"))
 
     def make_save_file_name(self, aweme_id: str, extension_file_name: str) -> str:
         """
@@ -92,7 +90,7 @@ class DouYinVideo(AbstractStoreVideo):
         """
         return f"{self.video_store_path}/{aweme_id}/{extension_file_name}"
 
-    async def save_video(self, aweme_id: str, video_content: str, extension_file_name):
+    async def save_video(self, aweme_id: str, video_content: MediaContent, extension_file_name) -> bool:
         """
         save video to local
         
@@ -104,8 +102,8 @@ class DouYinVideo(AbstractStoreVideo):
         Returns:
 
         """
-        pathlib.Path(self.video_store_path + "/" + aweme_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(aweme_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(video_content)
-            utils.logger.info(f"[DouYinVideoStoreImplement.save_video] save video {save_file_name} success ...")
+        if not await save_media_to_file(save_file_name, video_content):
+            return False
+        utils.logger.info(f"[DouYinVideoStoreImplement.save_video] save video {save_file_name} success ...")
+        return True
@@ -16,6 +16,9 @@
 from typing import List
 
 import config
+from base.base_crawler import AbstractStore
+from store.store_pipeline import store_pipeline
+from tools import utils
 from var import source_keyword_var
 
 from .kuaishou_store_impl import *
@@ -26,6 +29,7 @@ class KuaishouStoreFactory:
         "csv": KuaishouCsvStoreImplement,
         "db": KuaishouDbStoreImplement,
         "json": KuaishouJsonStoreImplement,
+        "jsonl": KuaishouJsonlStoreImplement,
         "sqlite": KuaishouSqliteStoreImplement
     }
 
@@ -34,7 +38,7 @@ class KuaishouStoreFactory:
         store_class = KuaishouStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
             raise ValueError(
-                "[KuaishouStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
+                "[KuaishouStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite ...")
         return store_class()
 
 
@@ -63,18 +67,22 @@ async def update_kuaishou_video(video_item: Dict):
     }
     utils.logger.info(
         f"[store.kuaishou.update_kuaishou_video] Kuaishou video id:{video_id}, title:{save_content_item.get('title')}")
-    await KuaishouStoreFactory.create_store().store_content(content_item=save_content_item)
+    await store_pipeline.put(KuaishouStoreFactory.create_store(), "content", save_content_item)
 
 
 async def batch_update_ks_video_comments(video_id: str, comments: List[Dict]):
     utils.logger.info(f"[store.kuaishou.batch_update_ks_video_comments] video_id:{video_id}, comments:{comments}")
     if not comments:
         return
-    for comment_item in comments:
-        await update_ks_video_comment(video_id, comment_item)
+    comment_items = [convert_ks_video_comment(video_id, comment_item) for comment_item in comments]
+    await store_pipeline.put_many(KuaishouStoreFactory.create_store(), "comment", comment_items)
 
 
 async def update_ks_video_comment(video_id: str, comment_item: Dict):
+    await store_pipeline.put(KuaishouStoreFactory.create_store(), "comment", convert_ks_video_comment(video_id, comment_item))
+
+
+def convert_ks_video_comment(video_id: str, comment_item: Dict) -> Dict:
     comment_id = comment_item.get("commentId")
     save_comment_item = {
         "comment_id": comment_id,
@@ -89,7 +97,8 @@ async def update_ks_video_comment(video_id: str, comment_item: Dict):
     }
     utils.logger.info(
         f"[store.kuaishou.update_ks_video_comment] Kuaishou video comment: {comment_id}, content: {save_comment_item.get('content')}")
-    await KuaishouStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
+
 
 async def save_creator(user_id: str, creator: Dict):
     ownerCount = creator.get('ownerCount', {})
@@ -108,4 +117,4 @@ async def save_creator(user_id: str, creator: Dict):
         "last_modify_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.kuaishou.save_creator] creator:{local_db_item}")
-    await KuaishouStoreFactory.create_store().store_creator(local_db_item)
\ No newline at end of file
+    await store_pipeline.put(KuaishouStoreFactory.create_store(), "creator", local_db_item)
\ No newline at end of file
@@ -14,18 +14,12 @@
 # @Time    : 2024/1/14 20:03
 # @Desc    : 快手存储实现类
 import asyncio
-import csv
-import json
 import os
-import pathlib
-from typing import Dict
+from typing import Dict, List
 
-import aiofiles
-
-import config
-from base.base_crawler import AbstractStore
-from tools import utils, words
-from var import crawler_type_var
+from store.base_store_impl import (BaseCsvStoreImplement, BaseDbStoreImplement, BaseJsonStoreImplement,
+                                   JsonlStoreMixin)
+from tools import words
 
 
 def calculate_number_of_files(file_store_path: str) -> int:
@@ -43,248 +37,43 @@ def calculate_number_of_files(file_store_path: str) -> int:
         return 1
 
 
-class KuaishouCsvStoreImplement(AbstractStore):
-    async def store_creator(self, creator: Dict):
-        pass
-
+class KuaishouCsvStoreImplement(BaseCsvStoreImplement):
     csv_store_path: str = "data/kuaishou"
-    file_count:int=calculate_number_of_files(csv_store_path)
-
-    def make_save_file_name(self, store_type: str) -> str:
-        """
-        make save file name by store type
-        Args:
-            store_type: contents or comments
-
-        Returns: eg: data/douyin/search_comments_20240114.csv ...
-
-        """
-        return f"{self.csv_store_path}/{self.file_count}_{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.csv"
-
-    async def save_data_to_csv(self, save_item: Dict, store_type: str):
-        """
-        Below is a simple way to save it in CSV format.
-        Args:
-            save_item:  save content dict info
-            store_type: Save type contains content and comments（contents | comments）
-
-        Returns: no returns
-
-        """
-        pathlib.Path(self.csv_store_path).mkdir(parents=True, exist_ok=True)
-        save_file_name = self.make_save_file_name(store_type=store_type)
-        async with aiofiles.open(save_file_name, mode='a+', encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f)
-            if await f.tell() == 0:
-                await writer.writerow(save_item.keys())
-            await writer.writerow(save_item.values())
-
-    async def store_content(self, content_item: Dict):
-        """
-        Kuaishou content CSV storage implementation
-        Args:
-            content_item: note item dict
-
-        Returns:
-
-        """
-        await self.save_data_to_csv(save_item=content_item, store_type="contents")
-
-    async def store_comment(self, comment_item: Dict):
-        """
-        Kuaishou comment CSV storage implementation
-        Args:
-            comment_item: comment item dict
-
-        Returns:
+    file_count: int = calculate_number_of_files(csv_store_path)
 
-        """
-        await self.save_data_to_csv(save_item=comment_item, store_type="comments")
-
-
-class KuaishouDbStoreImplement(AbstractStore):
     async def store_creator(self, creator: Dict):
         pass
 
-    async def store_content(self, content_item: Dict):
-        """
-        Kuaishou content DB storage implementation
-        Args:
-            content_item: content item dict
-
-        Returns:
-
-        """
+    async def store_creators(self, creators: List[Dict]):
+        pass
 
-        from .kuaishou_store_sql import (add_new_content,
-                                         query_content_by_content_id,
-                                         update_content_by_content_id)
-        video_id = content_item.get("video_id")
-        video_detail: Dict = await query_content_by_content_id(content_id=video_id)
-        if not video_detail:
-            content_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_content(content_item)
-        else:
-            await update_content_by_content_id(video_id, content_item=content_item)
 
-    async def store_comment(self, comment_item: Dict):
-        """
-        Kuaishou content DB storage implementation
-        Args:
-            comment_item: comment item dict
+class KuaishouDbStoreImplement(BaseDbStoreImplement):
+    sql_module: str = "store.kuaishou.kuaishou_store_sql"
 
-        Returns:
+    async def store_creator(self, creator: Dict):
+        pass
 
-        """
-        from .kuaishou_store_sql import (add_new_comment,
-                                         query_comment_by_comment_id,
-                                         update_comment_by_comment_id)
-        comment_id = comment_item.get("comment_id")
-        comment_detail: Dict = await query_comment_by_comment_id(comment_id=comment_id)
-        if not comment_detail:
-            comment_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_comment(comment_item)
-        else:
-            await update_comment_by_comment_id(comment_id, comment_item=comment_item)
+    async def store_creators(self, creators: List[Dict]):
+        pass
 
 
-class KuaishouJsonStoreImplement(AbstractStore):
+class KuaishouJsonStoreImplement(BaseJsonStoreImplement):
+    platform: str = "ks"
     json_store_path: str = "data/kuaishou/json"
     words_store_path: str = "data/kuaishou/words"
     lock = asyncio.Lock()
-    file_count:int=calculate_number_of_files(json_store_path)
+    file_count: int = calculate_number_of_files(json_store_path)
     WordCloud = words.AsyncWordCloudGenerator()
 
 
+class KuaishouJsonlStoreImplement(JsonlStoreMixin, KuaishouJsonStoreImplement):
+    """
+    Kuaishou JSON Lines storage implementation, append one compact line per item
+    """
 
-    def make_save_file_name(self, store_type: str) -> (str,str):
-        """
-        make save file name by store type
-        Args:
-            store_type: Save type contains content and comments（contents | comments）
-
-        Returns:
-
-        """
-
-        return (
-            f"{self.json_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.json",
-            f"{self.words_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}"
-        )
-
-    async def save_data_to_json(self, save_item: Dict, store_type: str):
-        """
-        Below is a simple way to save it in json format.
-        Args:
-            save_item: save content dict info
-            store_type: Save type contains content and comments（contents | comments）
-
-        Returns:
-
-        """
-        pathlib.Path(self.json_store_path).mkdir(parents=True, exist_ok=True)
-        pathlib.Path(self.words_store_path).mkdir(parents=True, exist_ok=True)
-        save_file_name,words_file_name_prefix = self.make_save_file_name(store_type=store_type)
-        save_data = []
-
-        async with self.lock:
-            if os.path.exists(save_file_name):
-                async with aiofiles.open(save_file_name, 'r', encoding='utf-8') as file:
-                    save_data = json.loads(await file.read())
-
-            save_data.append(save_item)
-            async with aiofiles.open(save_file_name, 'w', encoding='utf-8') as file:
-                await file.write(json.dumps(save_data, ensure_ascii=False))
-
-            if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
-                try:
-                    await self.WordCloud.generate_word_frequency_and_cloud(save_data, words_file_name_prefix)
-                except:
-                    pass
-
-    async def store_content(self, content_item: Dict):
-        """
-        content JSON storage implementation
-        Args:
-            content_item:
-
-        Returns:
-
-        """
-        await self.save_data_to_json(content_item, "contents")
-
-    async def store_comment(self, comment_item: Dict):
-        """
-        comment JSON storage implementation
-        Args:
-            comment_item:
-
-        Returns:
-
-        """
-        await self.save_data_to_json(comment_item, "comments")
-
-    async def store_creator(self, creator: Dict):
-        """
-        Kuaishou content JSON storage implementation
-        Args:
-            creator: creator dict
-
-        Returns:
-
-        """
-        await self.save_data_to_json(creator, "creator")
-
-
-class KuaishouSqliteStoreImplement(AbstractStore):
-    async def store_content(self, content_item: Dict):
-        """
-        Kuaishou content SQLite storage implementation
-        Args:
-            content_item: content item dict
-
-        Returns:
-
-        """
-
-        from .kuaishou_store_sql import (add_new_content,
-                                         query_content_by_content_id,
-                                         update_content_by_content_id)
-        video_id = content_item.get("video_id")
-        video_detail: Dict = await query_content_by_content_id(content_id=video_id)
-        if not video_detail:
-            content_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_content(content_item)
-        else:
-            await update_content_by_content_id(video_id, content_item=content_item)
-
-    async def store_comment(self, comment_item: Dict):
-        """
-        Kuaishou comment SQLite storage implementation
-        Args:
-            comment_item: comment item dict
-
-        Returns:
-
-        """
-        from .kuaishou_store_sql import (add_new_comment,
-                                         query_comment_by_comment_id,
-                                         update_comment_by_comment_id)
-        comment_id = comment_item.get("comment_id")
-        comment_detail: Dict = await query_comment_by_comment_id(comment_id=comment_id)
-        if not comment_detail:
-            comment_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_comment(comment_item)
-        else:
-            await update_comment_by_comment_id(comment_id, comment_item=comment_item)
-
-    async def store_creator(self, creator: Dict):
-        """
-        Kuaishou creator SQLite storage implementation
-        Args:
-            creator: creator dict
-
-        Returns:
 
-        """
-        pass
\ No newline at end of file
+class KuaishouSqliteStoreImplement(KuaishouDbStoreImplement):
+    """
+    Kuaishou SQLite storage implementation, SQLite and MySQL share the same sql interfaces
+    """
@@ -0,0 +1,195 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 异步存储管道，爬取流程只负责把数据放进队列，由后台的写入任务批量落盘
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import config
+from base.base_crawler import AbstractStore
+from tools import utils
+from var import crawler_type_var
+
+# 批量分组的 key: (存储实现类, 存储类型, 爬取类型)
+StoreBatchKey = Tuple[Type[AbstractStore], str, str]
+
+_STOP = object()
+
+
+class StoreWriteError(Exception):
+    """存储队列中有数据重试后仍然写入失败，__cause__ 为第一次失败的错误"""
+
+
+class AsyncStorePipeline:
+    """
+    写后（write-behind）存储管道
+    - 有界队列：队列满时 put 会等待，给爬取流程施加背压
+    - 写入任务按 (存储实现类, 存储类型, 爬取类型) 分组攒批，数量达到 batch_size 或者等待超过 flush_interval 秒时调用批量存储接口写入
+    - 一批数据写入失败时重试 write_max_attempts 次，仍然失败的记录下来，不影响其他数据的写入
+    - close 时会先把队列中剩余的数据全部写完再退出，有写入失败的数据时抛出 StoreWriteError
+    """
+
+    def __init__(self, max_queue_size: Optional[int] = None, worker_num: Optional[int] = None,
+                 batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 write_max_attempts: Optional[int] = None, write_retry_delay: Optional[float] = None):
+        """
+        参数为 None 时在使用时读取对应的 STORE_* 配置，存储队列整个进程共用，不读取平台的配置段
+        :param max_queue_size: 队列容量
+        :param worker_num: 写入任务数量
+        :param batch_size: 每批最多写入的数据条数
+        :param flush_interval: 攒批的最长等待时间（秒）
+        :param write_max_attempts: 一批数据的最大写入尝试次数
+        :param write_retry_delay: 写入重试的等待时间（秒），第 n 次重试等待 n 倍
+        """
+        self._max_queue_size = max_queue_size
+        self._worker_num = worker_num
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._write_max_attempts = write_max_attempts
+        self._write_retry_delay = write_retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # 重试后仍然写入失败的批次：(错误, 数据条数)
+        self._failures: List[Tuple[Exception, int]] = []
+
+    @staticmethod
+    def _get_option(value: Any, config_key: str) -> Any:
+        return value if value is not None else getattr(config, config_key)
+
+    def start(self):
+        """
+        启动写入任务，写入任务会继承当前上下文中的数据库连接等上下文变量
+        没有提前启动时在第一次 put 时启动；多个平台同时爬取时需要在平台任务之外提前启动，避免写入任务继承某个平台的配置
+        """
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self._get_option(self._max_queue_size, "STORE_QUEUE_MAX_SIZE"))
+        worker_num = self._get_option(self._worker_num, "STORE_WORKER_NUM")
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(worker_num)]
+
+    async def put(self, store: AbstractStore, store_type: str, item: Dict):
+        """
+        把一条数据放入存储队列
+        Args:
+            store: 存储实现类对象, 由各平台的 StoreFactory.create_store() 创建
+            store_type: 存储类型（content | comment | creator | contact | dynamic），对应 store.store_{store_type}
+            item: 需要保存的数据
+
+        Returns:
+
+        """
+        await self.put_many(store, store_type, [item])
+
+    async def put_many(self, store: AbstractStore, store_type: str, items: List[Dict]):
+        """
+        把一批数据放入存储队列，写入时调用批量存储接口 store.store_{store_type}s
+        Args:
+            store: 存储实现类对象, 由各平台的 StoreFactory.create_store() 创建
+            store_type: 存储类型（content | comment | creator | contact | dynamic）
+            items: 需要保存的数据列表
+
+        Returns:
+
+        """
+        if not items:
+            return
+        if not config.ENABLE_STORE_PIPELINE:
+            await self._store_items(store, store_type, items)
+            return
+        self.start()
+        await self._queue.put((type(store), store_type, crawler_type_var.get(), items))
+
+    async def close(self):
+        """
+        等待队列中的数据全部写入后停止写入任务，有重试后仍然写入失败的数据时抛出 StoreWriteError
+        """
+        if self._queue is None:
+            return
+        for _ in self._workers:
+            await self._queue.put(_STOP)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._queue = None
+        self._workers = []
+        failures, self._failures = self._failures, []
+        if failures:
+            failed_items = sum(item_num for _, item_num in failures)
+            write_max_attempts = max(1, self._get_option(self._write_max_attempts, "STORE_WRITE_MAX_ATTEMPTS"))
+            raise StoreWriteError(
+                f"{len(failures)} store batches ({failed_items} items) failed after {write_max_attempts} attempts, "
+                f"first error: {failures[0][0]!r}"
+            ) from failures[0][0]
+        utils.logger.info("[AsyncStorePipeline.close] all pending store tasks have been flushed")
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        batch_size = self._get_option(self._batch_size, "STORE_BATCH_SIZE")
+        flush_interval = self._get_option(self._flush_interval, "STORE_FLUSH_INTERVAL_SEC")
+        batches: Dict[StoreBatchKey, List[Dict]] = {}
+        buffered = 0
+        deadline = 0.0
+        while True:
+            timeout = max(deadline - loop.time(), 0) if buffered else None
+            try:
+                task = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                task = None
+
+            if task is _STOP:
+                await self._flush(batches)
+                return
+
+            if task is not None:
+                store_class, store_type, crawler_type, items = task
+                if not buffered:
+                    deadline = loop.time() + flush_interval
+                batches.setdefault((store_class, store_type, crawler_type), []).extend(items)
+                buffered += len(items)
+
+            if buffered and (buffered >= batch_size or loop.time() >= deadline):
+                await self._flush(batches)
+                batches = {}
+                buffered = 0
+
+    @staticmethod
+    async def _store_items(store: AbstractStore, store_type: str, items: List[Dict]):
+        """
+        优先调用批量存储接口，没有批量接口的存储类型逐条写入
+        """
+        batch_store_method = getattr(store, f"store_{store_type}s", None)
+        if batch_store_method is not None:
+            await batch_store_method(items)
+            return
+        for item in items:
+            await getattr(store, f"store_{store_type}")(item)
+
+    async def _flush(self, batches: Dict[StoreBatchKey, List[Dict]]):
+        write_max_attempts = max(1, self._get_option(self._write_max_attempts, "STORE_WRITE_MAX_ATTEMPTS"))
+        write_retry_delay = self._get_option(self._write_retry_delay, "STORE_WRITE_RETRY_DELAY_SEC")
+        for (store_class, store_type, crawler_type), items in batches.items():
+            # 文件存储会用 crawler_type 生成文件名，这里恢复为数据入队时的值
+            crawler_type_var.set(crawler_type)
+            for attempt in range(1, write_max_attempts + 1):
+                try:
+                    await self._store_items(store_class(), store_type, items)
+                    break
+                except Exception as e:
+                    if attempt >= write_max_attempts:
+                        utils.logger.error(f"[AsyncStorePipeline._flush] {store_class.__name__}.store_{store_type}s failed "
+                                           f"after {attempt} attempts, {len(items)} items not saved: {e!r}")
+                        self._failures.append((e, len(items)))
+                        break
+                    utils.logger.warning(f"[AsyncStorePipeline._flush] {store_class.__name__}.store_{store_type}s failed: {e!r}, "
+                                         f"retry {attempt} after {write_retry_delay * attempt:.1f}s")
+                    await asyncio.sleep(write_retry_delay * attempt)
+
+
+store_pipeline = AsyncStorePipeline()
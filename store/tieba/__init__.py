@@ -10,9 +10,13 @@
 
 
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Dict, List
 
+import config
+from base.base_crawler import AbstractStore
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
+from store.store_pipeline import store_pipeline
+from tools import utils
 from var import source_keyword_var
 
 from . import tieba_store_impl
@@ -24,6 +28,7 @@ class TieBaStoreFactory:
         "csv": TieBaCsvStoreImplement,
         "db": TieBaDbStoreImplement,
         "json": TieBaJsonStoreImplement,
+        "jsonl": TieBaJsonlStoreImplement,
         "sqlite": TieBaSqliteStoreImplement
     }
 
@@ -32,7 +37,7 @@ class TieBaStoreFactory:
         store_class = TieBaStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
             raise ValueError(
-                "[TieBaStoreFactory.create_store] Invalid save option only supported csv or db or json ...")
+                "[TieBaStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite ...")
         return store_class()
 
 
@@ -47,8 +52,8 @@ async def batch_update_tieba_notes(note_list: List[TiebaNote]):
     """
     if not note_list:
         return
-    for note_item in note_list:
-        await update_tieba_note(note_item)
+    note_items = [convert_tieba_note(note_item) for note_item in note_list]
+    await store_pipeline.put_many(TieBaStoreFactory.create_store(), "content", note_items)
 
 
 async def update_tieba_note(note_item: TiebaNote):
@@ -59,13 +64,24 @@ async def update_tieba_note(note_item: TiebaNote):
 
     Returns:
 
+    """
+    await store_pipeline.put(TieBaStoreFactory.create_store(), "content", convert_tieba_note(note_item))
+
+
+def convert_tieba_note(note_item: TiebaNote) -> Dict:
+    """
+    Convert tieba note to the store item
+    Args:
+        note_item:
+
+    Returns:
+
     """
     note_item.source_keyword = source_keyword_var.get()
     save_note_item = note_item.model_dump()
     save_note_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.tieba.update_tieba_note] tieba note: {save_note_item}")
-
-    await TieBaStoreFactory.create_store().store_content(save_note_item)
+    return save_note_item
 
 
 async def batch_update_tieba_note_comments(note_id: str, comments: List[TiebaComment]):
@@ -80,8 +96,8 @@ async def batch_update_tieba_note_comments(note_id: str, comments: List[TiebaCom
     """
     if not comments:
         return
-    for comment_item in comments:
-        await update_tieba_note_comment(note_id, comment_item)
+    comment_items = [convert_tieba_note_comment(note_id, comment_item) for comment_item in comments]
+    await store_pipeline.put_many(TieBaStoreFactory.create_store(), "comment", comment_items)
 
 
 async def update_tieba_note_comment(note_id: str, comment_item: TiebaComment):
@@ -93,11 +109,24 @@ async def update_tieba_note_comment(note_id: str, comment_item: TiebaComment):
 
     Returns:
 
+    """
+    await store_pipeline.put(TieBaStoreFactory.create_store(), "comment", convert_tieba_note_comment(note_id, comment_item))
+
+
+def convert_tieba_note_comment(note_id: str, comment_item: TiebaComment) -> Dict:
+    """
+    Convert tieba note comment to the store item
+    Args:
+        note_id:
+        comment_item:
+
+    Returns:
+
     """
     save_comment_item = comment_item.model_dump()
     save_comment_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.tieba.update_tieba_note_comment] tieba note id: {note_id} comment:{save_comment_item}")
-    await TieBaStoreFactory.create_store().store_comment(save_comment_item)
+    return save_comment_item
 
 
 async def save_creator(user_info: TiebaCreator):
@@ -112,4 +141,4 @@ async def save_creator(user_info: TiebaCreator):
     local_db_item = user_info.model_dump()
     local_db_item["last_modify_ts"] = utils.get_current_timestamp()
     utils.logger.info(f"[store.tieba.save_creator] creator:{local_db_item}")
-    await TieBaStoreFactory.create_store().store_creator(local_db_item)
+    await store_pipeline.put(TieBaStoreFactory.create_store(), "creator", local_db_item)
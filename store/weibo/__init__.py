@@ -14,8 +14,12 @@
 # @Desc    :
 
 import re
-from typing import List
+from typing import List, Optional
 
+import config
+from base.base_crawler import AbstractStore
+from store.store_pipeline import store_pipeline
+from tools.media_downloader import media_downloader
 from var import source_keyword_var
 
 from .weibo_store_media import *
@@ -27,6 +31,7 @@ class WeibostoreFactory:
         "csv": WeiboCsvStoreImplement,
         "db": WeiboDbStoreImplement,
         "json": WeiboJsonStoreImplement,
+        "jsonl": WeiboJsonlStoreImplement,
         "sqlite": WeiboSqliteStoreImplement,
     }
 
@@ -34,7 +39,7 @@ class WeibostoreFactory:
     def create_store() -> AbstractStore:
         store_class = WeibostoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[WeibotoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
+            raise ValueError("[WeibotoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite ...")
         return store_class()
 
 
@@ -49,8 +54,8 @@ async def batch_update_weibo_notes(note_list: List[Dict]):
     """
     if not note_list:
         return
-    for note_item in note_list:
-        await update_weibo_note(note_item)
+    note_items = [convert_weibo_note(note_item) for note_item in note_list]
+    await store_pipeline.put_many(WeibostoreFactory.create_store(), "content", [item for item in note_items if item])
 
 
 async def update_weibo_note(note_item: Dict):
@@ -61,9 +66,23 @@ async def update_weibo_note(note_item: Dict):
 
     Returns:
 
+    """
+    save_content_item = convert_weibo_note(note_item)
+    if save_content_item:
+        await store_pipeline.put(WeibostoreFactory.create_store(), "content", save_content_item)
+
+
+def convert_weibo_note(note_item: Dict) -> Optional[Dict]:
+    """
+    Convert weibo note to the store item
+    Args:
+        note_item:
+
+    Returns:
+
     """
     if not note_item:
-        return
+        return None
 
     mblog: Dict = note_item.get("mblog")
     user_info: Dict = mblog.get("user")
@@ -92,7 +111,7 @@ async def update_weibo_note(note_item: Dict):
         "source_keyword": source_keyword_var.get(),
     }
     utils.logger.info(f"[store.weibo.update_weibo_note] weibo note id:{note_id}, title:{save_content_item.get('content')[:24]} ...")
-    await WeibostoreFactory.create_store().store_content(content_item=save_content_item)
+    return save_content_item
 
 
 async def batch_update_weibo_note_comments(note_id: str, comments: List[Dict]):
@@ -107,8 +126,8 @@ async def batch_update_weibo_note_comments(note_id: str, comments: List[Dict]):
     """
     if not comments:
         return
-    for comment_item in comments:
-        await update_weibo_note_comment(note_id, comment_item)
+    comment_items = [convert_weibo_note_comment(note_id, comment_item) for comment_item in comments]
+    await store_pipeline.put_many(WeibostoreFactory.create_store(), "comment", [item for item in comment_items if item])
 
 
 async def update_weibo_note_comment(note_id: str, comment_item: Dict):
@@ -120,9 +139,24 @@ async def update_weibo_note_comment(note_id: str, comment_item: Dict):
 
     Returns:
 
+    """
+    save_comment_item = convert_weibo_note_comment(note_id, comment_item)
+    if save_comment_item:
+        await store_pipeline.put(WeibostoreFactory.create_store(), "comment", save_comment_item)
+
+
+def convert_weibo_note_comment(note_id: str, comment_item: Dict) -> Optional[Dict]:
+    """
+    Convert weibo note comment to the store item
+    Args:
+        note_id: weibo note id
+        comment_item: weibo comment item
+
+    Returns:
+
     """
     if not comment_item or not note_id:
-        return
+        return None
     comment_id = str(comment_item.get("id"))
     user_info: Dict = comment_item.get("user")
     content_text = comment_item.get("text")
@@ -147,21 +181,23 @@ async def update_weibo_note_comment(note_id: str, comment_item: Dict):
         "avatar": user_info.get("profile_image_url", ""),
     }
     utils.logger.info(f"[store.weibo.update_weibo_note_comment] Weibo note comment: {comment_id}, content: {save_comment_item.get('content', '')[:24]} ...")
-    await WeibostoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
 
 
-async def update_weibo_note_image(picid: str, pic_content, extension_file_name):
+async def download_weibo_note_image(picid: str, url: str, extension_file_name, **request_kwargs):
     """
-    Save weibo note image to local
+    Add weibo note image to the media download queue
     Args:
         picid:
-        pic_content:
+        url:
         extension_file_name:
+        request_kwargs: download request kwargs (proxy, timeout, headers ...)
 
     Returns:
 
     """
-    await WeiboStoreImage().store_image({"pic_id": picid, "pic_content": pic_content, "extension_file_name": extension_file_name})
+    save_file_name = WeiboStoreImage().make_save_file_name(picid, extension_file_name)
+    await media_downloader.submit(url, save_file_name, **request_kwargs)
 
 
 async def save_creator(user_id: str, user_info: Dict):
@@ -187,4 +223,4 @@ async def save_creator(user_id: str, user_info: Dict):
         "last_modify_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.weibo.save_creator] creator:{local_db_item}")
-    await WeibostoreFactory.create_store().store_creator(local_db_item)
+    await store_pipeline.put(WeibostoreFactory.create_store(), "creator", local_db_item)
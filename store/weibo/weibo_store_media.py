@@ -12,19 +12,17 @@
 # @Author  : Erm
 # @Time    : 2024/4/9 17:35
 # @Desc    : 微博媒体保存
-import pathlib
 from typing import Dict
 
-import aiofiles
-
 from base.base_crawler import AbstractStoreImage, AbstractStoreVideo
 from tools import utils
+from tools.media_downloader import MediaContent, save_media_to_file
 
 
 class WeiboStoreImage(AbstractStoreImage):
     image_store_path: str = "data/weibo/images"
 
-    async def store_image(self, image_content_item: Dict):
+    async def store_image(self, image_content_item: Dict) -> bool:
         """
         store content
         
@@ -34,7 +32,7 @@ class WeiboStoreImage(AbstractStoreImage):
         Returns:
 
         """
-        await self.save_image(image_content_item.get("pic_id"), image_content_item.get("pic_content"), image_content_item.get("extension_file_name"))
+        return await self.save_image(image_content_item.get("pic_id"), image_content_item.get("pic_content"), image_content_item.get("extension_file_name"))
 
     def make_save_file_name(self, picid: str, extension_file_name: str) -> str:
         """
@@ -49,7 +47,7 @@ class WeiboStoreImage(AbstractStoreImage):
         """
         return f"{self.image_store_path}/{picid}.{extension_file_name}"
 
-    async def save_image(self, picid: str, pic_content: str, extension_file_name="jpg"):
+    async def save_image(self, picid: str, pic_content: MediaContent, extension_file_name="jpg") -> bool:
         """
         save image to local
         
@@ -61,8 +59,8 @@ class WeiboStoreImage(AbstractStoreImage):
         Returns:
 
         """
-        pathlib.Path(self.image_store_path).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(picid, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(pic_content)
-            utils.logger.info(f"[WeiboImageStoreImplement.save_image] save image {save_file_name} success ...")
+        if not await save_media_to_file(save_file_name, pic_content):
+            return False
+        utils.logger.info(f"[WeiboImageStoreImplement.save_image] save image {save_file_name} success ...")
+        return True
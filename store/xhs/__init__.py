@@ -12,9 +12,13 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 17:34
 # @Desc    :
+import json
 from typing import List
 
 import config
+from base.base_crawler import AbstractStore
+from store.store_pipeline import store_pipeline
+from tools.media_downloader import media_downloader
 from var import source_keyword_var
 
 from . import xhs_store_impl
@@ -27,6 +31,7 @@ class XhsStoreFactory:
         "csv": XhsCsvStoreImplement,
         "db": XhsDbStoreImplement,
         "json": XhsJsonStoreImplement,
+        "jsonl": XhsJsonlStoreImplement,
         "sqlite": XhsSqliteStoreImplement,
     }
 
@@ -34,7 +39,7 @@ class XhsStoreFactory:
     def create_store() -> AbstractStore:
         store_class = XhsStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[XhsStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
+            raise ValueError("[XhsStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite ...")
         return store_class()
 
 
@@ -110,7 +115,7 @@ async def update_xhs_note(note_item: Dict):
         "xsec_token": note_item.get("xsec_token"),  # xsec_token
     }
     utils.logger.info(f"[store.xhs.update_xhs_note] xhs note: {local_db_item}")
-    await XhsStoreFactory.create_store().store_content(local_db_item)
+    await store_pipeline.put(XhsStoreFactory.create_store(), "content", local_db_item)
 
 
 async def batch_update_xhs_note_comments(note_id: str, comments: List[Dict]):
@@ -125,8 +130,8 @@ async def batch_update_xhs_note_comments(note_id: str, comments: List[Dict]):
     """
     if not comments:
         return
-    for comment_item in comments:
-        await update_xhs_note_comment(note_id, comment_item)
+    comment_items = [convert_xhs_note_comment(note_id, comment_item) for comment_item in comments]
+    await store_pipeline.put_many(XhsStoreFactory.create_store(), "comment", comment_items)
 
 
 async def update_xhs_note_comment(note_id: str, comment_item: Dict):
@@ -138,6 +143,19 @@ async def update_xhs_note_comment(note_id: str, comment_item: Dict):
 
     Returns:
 
+    """
+    await store_pipeline.put(XhsStoreFactory.create_store(), "comment", convert_xhs_note_comment(note_id, comment_item))
+
+
+def convert_xhs_note_comment(note_id: str, comment_item: Dict) -> Dict:
+    """
+    把小红书笔记评论转换为存储的数据格式
+    Args:
+        note_id:
+        comment_item:
+
+    Returns:
+
     """
     user_info = comment_item.get("user_info", {})
     comment_id = comment_item.get("id")
@@ -159,7 +177,7 @@ async def update_xhs_note_comment(note_id: str, comment_item: Dict):
         "like_count": comment_item.get("like_count", 0),
     }
     utils.logger.info(f"[store.xhs.update_xhs_note_comment] xhs note comment:{local_db_item}")
-    await XhsStoreFactory.create_store().store_comment(local_db_item)
+    return local_db_item
 
 
 async def save_creator(user_id: str, creator: Dict):
@@ -208,34 +226,36 @@ async def save_creator(user_id: str, creator: Dict):
         "last_modify_ts": utils.get_current_timestamp(),  # 最后更新时间戳（MediaCrawler程序生成的，主要用途在db存储的时候记录一条记录最新更新时间）
     }
     utils.logger.info(f"[store.xhs.save_creator] creator:{local_db_item}")
-    await XhsStoreFactory.create_store().store_creator(local_db_item)
+    await store_pipeline.put(XhsStoreFactory.create_store(), "creator", local_db_item)
 
 
-async def update_xhs_note_image(note_id, pic_content, extension_file_name):
+async def download_xhs_note_image(note_id, url, extension_file_name, **request_kwargs):
     """
-    更新小红书笔记图片
+    把小红书笔记图片加入媒体下载队列
     Args:
         note_id:
-        pic_content:
+        url:
         extension_file_name:
+        request_kwargs: 下载请求参数（proxy、timeout、headers 等）
 
     Returns:
 
     """
-
-    await XiaoHongShuImage().store_image({"notice_id": note_id, "pic_content": pic_content, "extension_file_name": extension_file_name})
+    save_file_name = XiaoHongShuImage().make_save_file_name(note_id, extension_file_name)
+    await media_downloader.submit(url, save_file_name, **request_kwargs)
 
 
-async def update_xhs_note_video(note_id, video_content, extension_file_name):
+async def download_xhs_note_video(note_id, url, extension_file_name, **request_kwargs):
     """
-    更新小红书笔记视频
+    把小红书笔记视频加入媒体下载队列
     Args:
         note_id:
-        video_content:
+        url:
         extension_file_name:
+        request_kwargs: 下载请求参数（proxy、timeout、headers 等）
 
     Returns:
 
     """
-
-    await XiaoHongShuVideo().store_video({"notice_id": note_id, "video_content": video_content, "extension_file_name": extension_file_name})
+    save_file_name = XiaoHongShuVideo().make_save_file_name(note_id, extension_file_name)
+    await media_downloader.submit(url, save_file_name, **request_kwargs)
@@ -12,19 +12,17 @@
 # @Author  : helloteemo
 # @Time    : 2024/7/11 22:35
 # @Desc    : 小红书媒体保存
-import pathlib
 from typing import Dict
 
-import aiofiles
-
 from base.base_crawler import AbstractStoreImage, AbstractStoreVideo
 from tools import utils
+from tools.media_downloader import MediaContent, save_media_to_file
 
 
 class XiaoHongShuImage(AbstractStoreImage):
     image_store_path: str = "data/xhs/images"
 
-    async def store_image(self, image_content_item: Dict):
+    async def store_image(self, image_content_item: Dict) -> bool:
         """
         store content
         
@@ -34,7 +32,7 @@ class XiaoHongShuImage(AbstractStoreImage):
         Returns:
 
         """
-        await self.save_image(image_content_item.get("notice_id"), image_content_item.get("pic_content"), image_content_item.get("extension_file_name"))
+        return await self.save_image(image_content_item.get("notice_id"), image_content_item.get("pic_content"), image_content_item.get("extension_file_name"))
 
     def make_save_file_name(self, notice_id: str, extension_file_name: str) -> str:
         """
@@ -49,7 +47,7 @@ class XiaoHongShuImage(AbstractStoreImage):
         """
         return f"{self.image_store_path}/{notice_id}/{extension_file_name}"
 
-    async def save_image(self, notice_id: str, pic_content: str, extension_file_name):
+    async def save_image(self, notice_id: str, pic_content: MediaContent, extension_file_name) -> bool:
         """
         save image to local
         
@@ -61,17 +59,17 @@ class XiaoHongShuImage(AbstractStoreImage):
         Returns:
 
         """
-        pathlib.Path(self.image_store_path + "/" + notice_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(notice_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(pic_content)
-            utils.logger.info(f"[XiaoHongShuImageStoreImplement.save_image] save image {save_file_name} success ...")
+        if not await save_media_to_file(save_file_name, pic_content):
+            return False
+        utils.logger.info(f"[XiaoHongShuImageStoreImplement.save_image] save image {save_file_name} success ...")
+        return True
 
 
 class XiaoHongShuVideo(AbstractStoreVideo):
     video_store_path: str = "data/xhs/videos"
 
-    async def store_video(self, video_content_item: Dict):
+    async def store_video(self, video_content_item: Dict) -> bool:
         """
         store content
         
@@ -81,7 +79,7 @@ class XiaoHongShuVideo(AbstractStoreVideo):
         Returns:
 
         """
-        await self.save_video(video_content_item.get("notice_id"), video_content_item.get("video_content"), video_content_item.get("extension_file_name"))
+        return await self.save_video(video_content_item.get("notice_id"), video_content_item.get("video_content"), video_content_item.get("extension_file_name"))
 
     def make_save_file_name(self, notice_id: str, extension_file_name: str) -> str:
         """
@@ -96,7 +94,7 @@ class XiaoHongShuVideo(AbstractStoreVideo):
         """
         return f"{self.video_store_path}/{notice_id}/{extension_file_name}"
 
-    async def save_video(self, notice_id: str, video_content: str, extension_file_name):
+    async def save_video(self, notice_id: str, video_content: MediaContent, extension_file_name) -> bool:
         """
         save video to local
         
@@ -108,8 +106,8 @@ class XiaoHongShuVideo(AbstractStoreVideo):
         Returns:
 
         """
-        pathlib.Path(self.video_store_path + "/" + notice_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(notice_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(video_content)
-            utils.logger.info(f"[XiaoHongShuVideoStoreImplement.save_video] save video {save_file_name} success ...")
+        if not await save_media_to_file(save_file_name, video_content):
+            return False
+        utils.logger.info(f"[XiaoHongShuVideoStoreImplement.save_video] save video {save_file_name} success ...")
+        return True
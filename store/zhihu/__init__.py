@@ -10,16 +10,18 @@
 
 
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Dict, List
 
 import config
 from base.base_crawler import AbstractStore
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from store.zhihu.zhihu_store_impl import (ZhihuCsvStoreImplement,
                                           ZhihuDbStoreImplement,
+                                          ZhihuJsonlStoreImplement,
                                           ZhihuJsonStoreImplement,
                                           ZhihuSqliteStoreImplement)
 from tools import utils
+from store.store_pipeline import store_pipeline
 from var import source_keyword_var
 
 
@@ -28,6 +30,7 @@ class ZhihuStoreFactory:
         "csv": ZhihuCsvStoreImplement,
         "db": ZhihuDbStoreImplement,
         "json": ZhihuJsonStoreImplement,
+        "jsonl": ZhihuJsonlStoreImplement,
         "sqlite": ZhihuSqliteStoreImplement
     }
 
@@ -35,7 +38,7 @@ class ZhihuStoreFactory:
     def create_store() -> AbstractStore:
         store_class = ZhihuStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[ZhihuStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
+            raise ValueError("[ZhihuStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or sqlite ...")
         return store_class()
 
 async def batch_update_zhihu_contents(contents: List[ZhihuContent]):
@@ -50,8 +53,8 @@ async def batch_update_zhihu_contents(contents: List[ZhihuContent]):
     if not contents:
         return
 
-    for content_item in contents:
-        await update_zhihu_content(content_item)
+    content_items = [convert_zhihu_content(content_item) for content_item in contents]
+    await store_pipeline.put_many(ZhihuStoreFactory.create_store(), "content", content_items)
 
 async def update_zhihu_content(content_item: ZhihuContent):
     """
@@ -61,12 +64,24 @@ async def update_zhihu_content(content_item: ZhihuContent):
 
     Returns:
 
+    """
+    await store_pipeline.put(ZhihuStoreFactory.create_store(), "content", convert_zhihu_content(content_item))
+
+
+def convert_zhihu_content(content_item: ZhihuContent) -> Dict:
+    """
+    把知乎内容转换为存储的数据格式
+    Args:
+        content_item:
+
+    Returns:
+
     """
     content_item.source_keyword = source_keyword_var.get()
     local_db_item = content_item.model_dump()
     local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.zhihu.update_zhihu_content] zhihu content: {local_db_item}")
-    await ZhihuStoreFactory.create_store().store_content(local_db_item)
+    return local_db_item
 
 
 
@@ -82,8 +97,8 @@ async def batch_update_zhihu_note_comments(comments: List[ZhihuComment]):
     if not comments:
         return
     
-    for comment_item in comments:
-        await update_zhihu_content_comment(comment_item)
+    comment_items = [convert_zhihu_content_comment(comment_item) for comment_item in comments]
+    await store_pipeline.put_many(ZhihuStoreFactory.create_store(), "comment", comment_items)
 
 
 async def update_zhihu_content_comment(comment_item: ZhihuComment):
@@ -94,11 +109,23 @@ async def update_zhihu_content_comment(comment_item: ZhihuComment):
 
     Returns:
 
+    """
+    await store_pipeline.put(ZhihuStoreFactory.create_store(), "comment", convert_zhihu_content_comment(comment_item))
+
+
+def convert_zhihu_content_comment(comment_item: ZhihuComment) -> Dict:
+    """
+    把知乎内容评论转换为存储的数据格式
+    Args:
+        comment_item:
+
+    Returns:
+
     """
     local_db_item = comment_item.model_dump()
     local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.zhihu.update_zhihu_note_comment] zhihu content comment:{local_db_item}")
-    await ZhihuStoreFactory.create_store().store_comment(local_db_item)
+    return local_db_item
 
 
 async def save_creator(creator: ZhihuCreator):
@@ -114,4 +141,4 @@ async def save_creator(creator: ZhihuCreator):
         return
     local_db_item = creator.model_dump()
     local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
-    await ZhihuStoreFactory.create_store().store_creator(local_db_item)
\ No newline at end of file
+    await store_pipeline.put(ZhihuStoreFactory.create_store(), "creator", local_db_item)
\ No newline at end of file
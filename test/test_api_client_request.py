@@ -0,0 +1,138 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from typing import List
+
+import httpx
+
+import config
+from base.base_crawler import AbstractApiClient, RequestRetryError, RetryBudget
+from tools.rate_limiter import AdaptiveRateLimiter
+
+
+class FetchError(Exception):
+    pass
+
+
+class FakeApiClient(AbstractApiClient):
+    retry_max_attempts = 3
+    retry_base_delay = 0.001
+    retry_max_delay = 0.001
+
+    def __init__(self, status_codes: List[int]):
+        self.status_codes = status_codes
+        self.attempts = 0
+        self.request_headers: List[dict] = []
+        self.request_timeouts: List[float] = []
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self._handler))
+
+    def _handler(self, request: httpx.Request) -> httpx.Response:
+        status_code = self.status_codes[min(self.attempts, len(self.status_codes) - 1)]
+        self.attempts += 1
+        self.request_headers.append(dict(request.headers))
+        self.request_timeouts.append(request.extensions["timeout"]["read"])
+        if status_code == 0:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(status_code, json={"code": status_code})
+
+    @staticmethod
+    def _validate_response(response: httpx.Response):
+        if response.status_code == 404:
+            raise FetchError("note deleted")
+        return response.json()
+
+    async def request(self, method, url, **kwargs):
+        return await self.send_request(self.client, method, url, self._validate_response, timeout=10, **kwargs)
+
+    async def update_cookies(self, browser_context):
+        pass
+
+
+class TestApiClientRequest(unittest.TestCase):
+
+    def setUp(self):
+        self.enable_rate_limiter = config.ENABLE_RATE_LIMITER
+        config.ENABLE_RATE_LIMITER = False
+
+    def tearDown(self):
+        config.ENABLE_RATE_LIMITER = self.enable_rate_limiter
+
+    def test_retry_then_success(self):
+        client = FakeApiClient([503, 0, 200])
+        self.assertEqual(asyncio.run(client.request("GET", "https://example.com")), {"code": 200})
+        self.assertEqual(client.attempts, 3)
+
+    def test_not_retry_non_retryable_error(self):
+        client = FakeApiClient([404])
+        with self.assertRaises(FetchError):
+            asyncio.run(client.request("GET", "https://example.com"))
+        self.assertEqual(client.attempts, 1)
+
+    def test_max_attempts(self):
+        client = FakeApiClient([429])
+        with self.assertRaises(RequestRetryError) as ctx:
+            asyncio.run(client.request("GET", "https://example.com"))
+        self.assertEqual(client.attempts, 3)
+        self.assertIsNotNone(ctx.exception.__cause__)
+
+    def test_read_retry_config_at_call_time(self):
+        client = FakeApiClient([429])
+        client.retry_max_attempts = None
+        max_attempts = config.REQUEST_RETRY_MAX_ATTEMPTS
+        # 客户端创建之后修改配置，下一次请求生效
+        config.REQUEST_RETRY_MAX_ATTEMPTS = 2
+        try:
+            with self.assertRaises(RequestRetryError):
+                asyncio.run(client.request("GET", "https://example.com"))
+        finally:
+            config.REQUEST_RETRY_MAX_ATTEMPTS = max_attempts
+        self.assertEqual(client.attempts, 2)
+
+    def test_retry_budget(self):
+        client = FakeApiClient([0])
+        client._retry_budget = RetryBudget(max_tokens=1)
+        with self.assertRaises(RequestRetryError):
+            asyncio.run(client.request("GET", "https://example.com"))
+        # 预算只够重试一次
+        self.assertEqual(client.attempts, 2)
+
+    def test_deadline_starts_after_rate_limiter(self):
+        client = FakeApiClient([200])
+        client.request_deadline = 0.05
+
+        async def slow_acquire(host: str):
+            # 模拟排队等待限流令牌的时间超过了请求截止时间
+            await asyncio.sleep(0.1)
+
+        config.ENABLE_RATE_LIMITER = True
+        client._rate_limiter = AdaptiveRateLimiter()
+        client._rate_limiter.acquire = slow_acquire
+        self.assertEqual(asyncio.run(client.request("GET", "https://example.com")), {"code": 200})
+        self.assertGreaterEqual(client.request_timeouts[0], client.min_attempt_timeout)
+
+    def test_prepare_headers_each_attempt(self):
+        client = FakeApiClient([503, 200])
+        sign_count = 0
+
+        async def prepare_headers():
+            nonlocal sign_count
+            sign_count += 1
+            return {"X-t": str(sign_count)}
+
+        asyncio.run(client.request("GET", "https://example.com", prepare_headers=prepare_headers))
+        self.assertEqual([headers["x-t"] for headers in client.request_headers], ["1", "2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tools.async_file_writer import (AsyncCsvWriter, AsyncJsonlWriter,
+                                     convert_jsonl_to_json)
+
+
+class TestAsyncJsonlWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.items = [
+            {"note_id": "1", "content": "第一条评论", "like_count": 3},
+            {"note_id": "2", "content": "second", "nested": {"a": [1, 2]}},
+        ]
+
+    def test_write_and_convert(self):
+        writer = AsyncJsonlWriter()
+
+        async def _write():
+            for item in self.items:
+                await writer.write(self.tmp_dir.name, "search", "comments", item)
+
+        asyncio.run(_write())
+        file_name = writer.make_file_name(self.tmp_dir.name, "search", "comments")
+        writer.close(convert_to_json=True)
+
+        with open(file_name, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line) for line in f], self.items)
+
+        # 转换后的文件与旧版 json 存储的输出完全一致
+        with open(os.path.splitext(file_name)[0] + ".converted.json", encoding="utf-8") as f:
+            self.assertEqual(f.read(), json.dumps(self.items, ensure_ascii=False, indent=4))
+
+    def test_convert_empty_file(self):
+        jsonl_file_name = os.path.join(self.tmp_dir.name, "empty.jsonl")
+        open(jsonl_file_name, "w").close()
+        with open(convert_jsonl_to_json(jsonl_file_name), encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [])
+
+    def test_csv_header_and_day_rollover(self):
+        writer = AsyncCsvWriter()
+
+        async def _write(date: str):
+            with mock.patch("tools.utils.get_current_date", return_value=date):
+                file_name = os.path.join(self.tmp_dir.name, f"1_search_comments_{date}.csv")
+                await writer.write_many(file_name, self.items[:1])
+                await writer.write_many(file_name, self.items[1:])
+                return file_name
+
+        first_file = asyncio.run(_write("2024-01-14"))
+        second_file = asyncio.run(_write("2024-01-15"))
+        # 跨天后前一天的句柄已经关闭，数据全部落盘
+        with open(first_file, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["note_id", "content", "like_count"])
+        self.assertEqual([row[0] for row in rows[1:]], ["1", "2"])
+
+        writer.close()
+        with open(second_file, encoding="utf-8-sig", newline="") as f:
+            self.assertEqual(len(list(csv.reader(f))), 3)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
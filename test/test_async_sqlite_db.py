@@ -0,0 +1,108 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import tempfile
+import unittest
+
+from async_sqlite_db import AsyncSqliteDB
+
+SCHEMA = """
+CREATE TABLE note_comment (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    comment_id TEXT NOT NULL,
+    content TEXT,
+    desc TEXT,
+    add_ts INTEGER NOT NULL,
+    last_modify_ts INTEGER NOT NULL
+);
+"""
+
+
+class TestAsyncSqliteDBUpsert(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = AsyncSqliteDB(os.path.join(self.tmp_dir.name, "test.db"))
+
+    async def _upsert_twice(self, schema: str):
+        await self.db.executescript(schema)
+        first = [
+            {"comment_id": "1", "content": "a", "desc": "x", "add_ts": 1, "last_modify_ts": 1},
+            {"comment_id": "2", "content": "b", "desc": "y", "add_ts": 1, "last_modify_ts": 1},
+        ]
+        second = [
+            {"comment_id": "2", "content": "b2", "desc": "y2", "add_ts": 2, "last_modify_ts": 2},
+            {"comment_id": "3", "content": "c", "desc": "z", "add_ts": 2, "last_modify_ts": 2},
+        ]
+        await self.db.upsert_many("note_comment", first, "comment_id")
+        await self.db.upsert_many("note_comment", second, "comment_id")
+        has_unique_key = await self.db.has_unique_key("note_comment", ["comment_id"])
+        await self.db.close()
+
+        # 关闭时会提交合并的事务，重新打开连接后数据仍然存在
+        rows = await self.db.query("select comment_id, content, add_ts from note_comment order by comment_id")
+        journal_mode = await self.db.get_first("PRAGMA journal_mode")
+        await self.db.close()
+        return has_unique_key, rows, journal_mode
+
+    def _assert_upserted(self, rows):
+        self.assertEqual(rows, [
+            {"comment_id": "1", "content": "a", "add_ts": 1},
+            # 已存在的记录被更新，但 add_ts 保持第一次写入时的值
+            {"comment_id": "2", "content": "b2", "add_ts": 1},
+            {"comment_id": "3", "content": "c", "add_ts": 2},
+        ])
+
+    def test_upsert_with_unique_key(self):
+        schema = SCHEMA + "CREATE UNIQUE INDEX uk_comment_id ON note_comment(comment_id);"
+        has_unique_key, rows, journal_mode = asyncio.run(self._upsert_twice(schema))
+        self.assertTrue(has_unique_key)
+        self._assert_upserted(rows)
+        self.assertEqual(journal_mode, {"journal_mode": "wal"})
+
+    def test_upsert_without_unique_key(self):
+        has_unique_key, rows, _ = asyncio.run(self._upsert_twice(SCHEMA))
+        self.assertFalse(has_unique_key)
+        self._assert_upserted(rows)
+
+    def test_add_unique_key(self):
+        async def _migrate():
+            await self.db.executescript(SCHEMA)
+            for add_ts, content in [(1, "a"), (2, "a2"), (3, "b")]:
+                comment_id = "2" if content == "b" else "1"
+                await self.db.item_to_table("note_comment", {
+                    "comment_id": comment_id, "content": content, "add_ts": add_ts, "last_modify_ts": add_ts,
+                })
+            exists = await self.db.table_exists("note_comment")
+            deleted_rows = await self.db.add_unique_key("note_comment", ["comment_id"], "uk_note_comment_comment_id")
+            rows = await self.db.query("select comment_id, content from note_comment order by comment_id")
+            await self.db.close()
+            reopened_db = AsyncSqliteDB(os.path.join(self.tmp_dir.name, "test.db"))
+            has_unique_key = await reopened_db.has_unique_key("note_comment", ["comment_id"])
+            await reopened_db.close()
+            return exists, deleted_rows, rows, has_unique_key
+
+        exists, deleted_rows, rows, has_unique_key = asyncio.run(_migrate())
+        self.assertTrue(exists)
+        self.assertEqual(deleted_rows, 1)
+        # 重复的记录只保留最新写入的一条
+        self.assertEqual(rows, [{"comment_id": "1", "content": "a2"}, {"comment_id": "2", "content": "b"}])
+        self.assertTrue(has_unique_key)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from typing import Dict, List, Tuple
+
+import config
+from store.base_store_impl import BaseDbStoreImplement, BaseJsonStoreImplement
+from tools import words
+from var import crawler_type_var
+
+# 作为 DemoDbStoreImplement 的 sql 接口模块，记录每次 upsert 的表和数据
+upserted: List[Tuple[str, List[Dict]]] = []
+
+
+async def upsert_contents(content_items: List[Dict]) -> int:
+    upserted.append(("demo_content", content_items))
+    return len(content_items)
+
+
+async def upsert_creators(creator_items: List[Dict]) -> int:
+    upserted.append(("demo_creator", creator_items))
+    return len(creator_items)
+
+
+class DemoDbStoreImplement(BaseDbStoreImplement):
+    sql_module = __name__
+
+
+class BrokenWordCloud:
+    async def generate_word_frequency_and_cloud(self, data: List[Dict], save_words_file_name_prefix: str):
+        raise ValueError("font not found")
+
+
+class TestBaseStoreImplement(unittest.TestCase):
+
+    def setUp(self):
+        upserted.clear()
+
+    def test_db_store_batch(self):
+        store = DemoDbStoreImplement()
+
+        async def _run():
+            await store.store_contents([{"note_id": "1"}, {"note_id": "2"}])
+            await store.store_creator({"user_id": "u1"})
+            # 空批次不调用 sql 接口
+            await store.store_contents([])
+
+        asyncio.run(_run())
+        self.assertEqual([(table, len(items)) for table, items in upserted], [("demo_content", 2), ("demo_creator", 1)])
+        # 同一批数据使用同一个 add_ts
+        self.assertEqual(len({item["add_ts"] for item in upserted[0][1]}), 1)
+        self.assertIn("add_ts", upserted[1][1][0])
+
+    def test_json_store_batch(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+
+            async def _run():
+                # python3.9 的 asyncio.Lock 创建时需要事件循环，在事件循环中定义存储类
+                class DemoJsonStoreImplement(BaseJsonStoreImplement):
+                    json_store_path = os.path.join(tmp_dir, "json")
+                    words_store_path = os.path.join(tmp_dir, "words")
+                    lock = asyncio.Lock()
+                    WordCloud = words.AsyncWordCloudGenerator()
+                    creator_store_type = "creators"
+
+                store = DemoJsonStoreImplement()
+                crawler_type_var.set("search")
+                await store.store_contents([{"note_id": "1"}, {"note_id": "2"}])
+                await store.store_content({"note_id": "3"})
+                await store.store_creators([{"user_id": "u1"}])
+
+            asyncio.run(_run())
+            file_names = sorted(os.listdir(os.path.join(tmp_dir, "json")))
+            self.assertEqual([name.split("_")[:2] for name in file_names], [["search", "contents"], ["search", "creators"]])
+            with open(os.path.join(tmp_dir, "json", file_names[0]), encoding="utf-8") as f:
+                self.assertEqual([item["note_id"] for item in json.load(f)], ["1", "2", "3"])
+
+    def test_word_cloud_error_is_logged(self):
+        enable_comments, enable_wordcloud = config.ENABLE_GET_COMMENTS, config.ENABLE_GET_WORDCLOUD
+        config.ENABLE_GET_COMMENTS, config.ENABLE_GET_WORDCLOUD = True, True
+        with tempfile.TemporaryDirectory() as tmp_dir:
+
+            async def _run():
+                class DemoJsonStoreImplement(BaseJsonStoreImplement):
+                    json_store_path = os.path.join(tmp_dir, "json")
+                    words_store_path = os.path.join(tmp_dir, "words")
+                    lock = asyncio.Lock()
+                    WordCloud = BrokenWordCloud()
+
+                await DemoJsonStoreImplement().store_comments([{"content": "评论"}])
+
+            try:
+                with self.assertLogs("MediaCrawler", level="ERROR") as logs:
+                    asyncio.run(_run())
+            finally:
+                config.ENABLE_GET_COMMENTS, config.ENABLE_GET_WORDCLOUD = enable_comments, enable_wordcloud
+            # 词云生成失败只记录日志，数据照常写入
+            self.assertIn("font not found", logs.output[0])
+            self.assertEqual(len(os.listdir(os.path.join(tmp_dir, "json"))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
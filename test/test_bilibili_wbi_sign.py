@@ -0,0 +1,64 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from unittest import mock
+
+from media_platform.bilibili.client import BilibiliClient
+from media_platform.bilibili.help import BilibiliSign
+
+IMG_KEY = "7cd084941338484aae1ad9425b84077c"
+SUB_KEY = "4932caff0ff746eab6f01bf08b70ac45"
+
+
+class FakePage:
+    def __init__(self):
+        self.evaluate_count = 0
+
+    async def evaluate(self, expression):
+        self.evaluate_count += 1
+        await asyncio.sleep(0.01)
+        return {"wbi_img_urls": f"https://i0.hdslb.com/bfs/wbi/{IMG_KEY}.png-https://i0.hdslb.com/bfs/wbi/{SUB_KEY}.png"}
+
+
+class TestBilibiliWbiSign(unittest.TestCase):
+
+    def test_salt(self):
+        # 与按位拼接 mixin key 的原实现结果一致
+        self.assertEqual(BilibiliSign(IMG_KEY, SUB_KEY).get_salt(), "ea1db124af3c7062474693fa704f4ff8")
+
+    def test_cache_wbi_keys(self):
+        page = FakePage()
+        client = BilibiliClient(headers={}, playwright_page=page, cookie_dict={})
+
+        async def _run():
+            signed = await asyncio.gather(*[client.pre_request_data({"aid": i}) for i in range(5)])
+            self.assertEqual(page.evaluate_count, 1)
+            # 缓存过期后立即返回旧的签名对象，在后台刷新
+            client._wbi_sign_expire_time = 0
+            old_sign = await client.get_wbi_sign()
+            await client._wbi_refresh_task
+            self.assertEqual(page.evaluate_count, 2)
+            self.assertIsNot(await client.get_wbi_sign(), old_sign)
+            await client.close()
+            return signed
+
+        with mock.patch("tools.utils.get_unix_timestamp", return_value=1700000000):
+            signed = asyncio.run(_run())
+            self.assertEqual(signed[0]["w_rid"], BilibiliSign(IMG_KEY, SUB_KEY).sign({"aid": 0})["w_rid"])
+        self.assertEqual([item["aid"] for item in signed], [str(i) for i in range(5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
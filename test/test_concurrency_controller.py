@@ -0,0 +1,84 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+
+from tools.concurrency_controller import ConcurrencyController
+
+
+class TestConcurrencyController(unittest.TestCase):
+
+    def test_for_platform_is_shared(self):
+        self.assertIs(ConcurrencyController.for_platform("xhs"), ConcurrencyController.for_platform("xhs"))
+        self.assertIsNot(ConcurrencyController.for_platform("xhs"), ConcurrencyController.for_platform("dy"))
+
+    def test_budget_limit_and_stats(self):
+        controller = ConcurrencyController("test", limits={"api": 2, "comment": 1, "media": 1})
+        max_in_use = 0
+        snapshot = {}
+
+        async def task():
+            nonlocal max_in_use
+            async with controller.api:
+                max_in_use = max(max_in_use, controller.api.in_use)
+                await asyncio.sleep(0.02)
+
+        async def monitor():
+            nonlocal snapshot
+            await asyncio.sleep(0.005)
+            snapshot = controller.stats()
+
+        async def _run():
+            await asyncio.gather(monitor(), *[task() for _ in range(6)])
+
+        asyncio.run(_run())
+        self.assertEqual(max_in_use, 2)
+        self.assertEqual(snapshot["api"], {"limit": 2, "in_use": 2, "waiting": 4})
+        self.assertEqual(controller.stats()["api"]["in_use"], 0)
+        self.assertEqual(controller.stats()["comment"], {"limit": 1, "in_use": 0, "waiting": 0})
+
+    def test_cancelled_waiter(self):
+        controller = ConcurrencyController("test", limits={"api": 1, "comment": 1, "media": 1})
+
+        async def _run():
+            async with controller.api:
+                waiter = asyncio.ensure_future(controller.api.acquire())
+                await asyncio.sleep(0)
+                waiting = controller.api.waiting
+                waiter.cancel()
+                await asyncio.gather(waiter, return_exceptions=True)
+                return waiting, controller.api.waiting
+
+        # 取消等待中的 acquire 后等待数同步减少
+        self.assertEqual(asyncio.run(_run()), (1, 0))
+        with self.assertLogs("MediaCrawler", level="INFO") as logs:
+            controller.log_stats()
+        self.assertIn("api: 0/1 in use, 0 waiting", logs.output[0])
+
+    def test_new_event_loop(self):
+        controller = ConcurrencyController("test", limits={"api": 1, "comment": 1, "media": 1})
+
+        async def _run():
+            await asyncio.gather(*[_acquire() for _ in range(2)])
+
+        async def _acquire():
+            async with controller.api:
+                await asyncio.sleep(0)
+
+        # 每次 asyncio.run 都是新的事件循环，信号量需要重新创建
+        asyncio.run(_run())
+        asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import config
+from tools import cookie_store
+
+
+class TestCookieStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patcher = mock.patch.multiple(
+            config,
+            BROWSERLESS_COOKIE_FILE=os.path.join(self.tmp_dir.name, "browser_data", "%s_cookies.json"),
+            SAVE_LOGIN_STATE=True,
+            LOGIN_TYPE="qrcode",
+            COOKIES="a=config",
+        )
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def test_save_and_load(self):
+        self.assertEqual(cookie_store.load_cookies("ks"), "")
+        cookie_store.save_cookies("ks", "a=1;b=2")
+        self.assertEqual(cookie_store.load_cookies("ks"), "a=1;b=2")
+        self.assertEqual(cookie_store.load_cookies("wb"), "")
+
+    def test_fallback_to_config_cookies(self):
+        config.LOGIN_TYPE = "cookie"
+        self.assertEqual(cookie_store.load_cookies("ks"), "a=config")
+        # 保存过的 cookie 优先
+        cookie_store.save_cookies("ks", "a=saved")
+        self.assertEqual(cookie_store.load_cookies("ks"), "a=saved")
+
+    def test_not_save_login_state(self):
+        config.SAVE_LOGIN_STATE = False
+        cookie_store.save_cookies("ks", "a=1")
+        self.assertFalse(os.path.exists(cookie_store.get_cookie_file("ks")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from typing import List
+
+from tools.crawl_pipeline import CrawlPipeline
+from var import source_keyword_var
+
+
+class FetchError(Exception):
+    pass
+
+
+class TestCrawlPipeline(unittest.TestCase):
+
+    def test_stages_and_drop(self):
+        stored: List[int] = []
+
+        async def detail(item: int):
+            if item == 3:
+                return None
+            if item == 5:
+                raise FetchError("detail failed")
+            await asyncio.sleep(0.001)
+            return item * 10
+
+        async def store(item: int):
+            stored.append(item)
+
+        async def source():
+            for i in range(10):
+                yield i
+
+        pipeline = CrawlPipeline("test", queue_size=2, ignore_errors=(FetchError,))
+        pipeline.add_stage("detail", detail, worker_num=3).add_stage("store", store)
+        asyncio.run(pipeline.run(source()))
+        self.assertEqual(sorted(stored), [0, 10, 20, 40, 60, 70, 80, 90])
+
+    def test_next_page_overlaps_with_comments(self):
+        events: List[str] = []
+
+        async def source():
+            for page in range(2):
+                events.append(f"search {page}")
+                yield page
+
+        async def comment(page: int):
+            events.append(f"comment {page} begin")
+            await asyncio.sleep(0.01)
+            events.append(f"comment {page} end")
+
+        async def _run():
+            pipeline = CrawlPipeline("test")
+            pipeline.add_stage("comment", comment, worker_num=1)
+            await pipeline.run(source())
+
+        asyncio.run(_run())
+        # 第二页的搜索不等待第一页的评论爬取完成
+        self.assertLess(events.index("search 1"), events.index("comment 0 end"))
+        self.assertEqual(len(events), 6)
+
+    def test_context_var_inherited(self):
+        keywords: List[str] = []
+
+        async def stage(item: int):
+            keywords.append(source_keyword_var.get())
+
+        async def source():
+            yield 1
+
+        async def _run():
+            source_keyword_var.set("python")
+            await CrawlPipeline("test").add_stage("stage", stage).run(source())
+
+        asyncio.run(_run())
+        self.assertEqual(keywords, ["python"])
+
+    def test_fatal_error_stops_pipeline(self):
+        searched: List[int] = []
+
+        async def detail(item: int):
+            if item == 1:
+                raise RuntimeError("ip blocked")
+            return item
+
+        async def source():
+            for page in range(100):
+                searched.append(page)
+                yield page
+
+        pipeline = CrawlPipeline("test", queue_size=1, ignore_errors=(FetchError,))
+        pipeline.add_stage("detail", detail)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(pipeline.run(source()))
+        # 出现致命错误后不再继续搜索
+        self.assertLess(len(searched), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
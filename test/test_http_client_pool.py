@@ -0,0 +1,89 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tools.http_client_pool import HttpClientPool
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = (self.headers.get("Cookie") or "").encode()
+        self.send_response(200)
+        self.send_header("Set-Cookie", "session=abc; Path=/")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpClientPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), CookieHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_reuse_client(self):
+        pool = HttpClientPool(max_proxy_clients=2)
+
+        async def _run():
+            async with pool.get_client() as client:
+                async with pool.get_client(None) as same_client:
+                    self.assertIs(same_client, client)
+                first = await client.get(self.url)
+                # 不保存响应中的 cookie，只发送请求头中显式传入的 cookie
+                second = await client.get(self.url)
+                third = await client.get(self.url, headers={"Cookie": "a1=1"})
+            self.assertEqual((first.text, second.text, third.text), ("", "", "a1=1"))
+
+            async with pool.get_client("http://127.0.0.1:1") as proxy_client:
+                self.assertIsNot(proxy_client, client)
+            # 超过 max_proxy_clients 时关闭最早创建的连接池
+            async with pool.get_client("http://127.0.0.1:2"):
+                pass
+            self.assertTrue(client.is_closed)
+            await pool.close()
+            self.assertTrue(proxy_client.is_closed)
+            self.assertNotIn(pool, HttpClientPool._instances)
+
+        asyncio.run(_run())
+
+    def test_evict_client_in_use(self):
+        pool = HttpClientPool(max_proxy_clients=1)
+
+        async def _run():
+            async with pool.get_client() as client:
+                # 连接池被淘汰时还有正在进行的请求，请求结束后才关闭
+                async with pool.get_client("http://127.0.0.1:1"):
+                    pass
+                self.assertFalse(client.is_closed)
+                self.assertEqual((await client.get(self.url)).status_code, 200)
+            self.assertTrue(client.is_closed)
+            await HttpClientPool.close_all()
+            self.assertNotIn(pool, HttpClientPool._instances)
+
+        asyncio.run(_run())
+
+if __name__ == '__main__':
+    unittest.main()
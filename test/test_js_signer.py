@@ -0,0 +1,112 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from tools.js_signer import JsSignerPool
+
+SIGN_JS = """
+const crypto = require('crypto');
+var salt = 'mc';
+function sign(text, n) {
+    return crypto.createHash('md5').update(salt + text + n).digest('hex');
+}
+function fail() {
+    throw new Error('sign failed');
+}
+function noisy() {
+    console.log('deprecated api');
+    process.stdout.write('{"partial": ');
+    process.stdout.write('1}\\n');
+    return 'ok';
+}
+function crash() {
+    process.exit(1);
+}
+"""
+
+
+@unittest.skipIf(shutil.which("node") is None, "node is not installed")
+class TestJsSignerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.js_file = os.path.join(self.tmp_dir.name, "sign.js")
+        with open(self.js_file, "w", encoding="utf-8") as f:
+            f.write(SIGN_JS)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_concurrent_calls(self):
+        pool = JsSignerPool(self.js_file, worker_num=2)
+
+        async def _run():
+            try:
+                return await asyncio.gather(*[pool.call("sign", f"text{i}", i) for i in range(50)])
+            finally:
+                await pool.close()
+
+        expected = [hashlib.md5(f"mctext{i}{i}".encode()).hexdigest() for i in range(50)]
+        self.assertEqual(asyncio.run(_run()), expected)
+
+    def test_js_error(self):
+        pool = JsSignerPool(self.js_file, worker_num=1)
+
+        async def _run():
+            try:
+                with self.assertRaises(RuntimeError):
+                    await pool.call("fail")
+                # 单个调用失败不影响签名进程
+                return await pool.call("sign", "a", 1)
+            finally:
+                await pool.close()
+
+        self.assertEqual(len(asyncio.run(_run())), 32)
+
+    def test_skip_junk_output(self):
+        pool = JsSignerPool(self.js_file, worker_num=1)
+
+        async def _run():
+            try:
+                # 脚本输出到 stdout 的非结果行被跳过，不影响结果的读取
+                self.assertEqual(await pool.call("noisy"), "ok")
+                with self.assertRaises(TypeError):
+                    await pool.call("sign", object(), 1)
+                return await pool.call("sign", "a", 1)
+            finally:
+                await pool.close()
+
+        self.assertEqual(asyncio.run(_run()), hashlib.md5(b"mca1").hexdigest())
+
+    def test_restart_dead_worker(self):
+        pool = JsSignerPool(self.js_file, worker_num=1)
+
+        async def _run():
+            try:
+                with self.assertRaises(RuntimeError):
+                    await asyncio.wait_for(pool.call("crash"), timeout=10)
+                # 进程退出后重新启动，之后的调用正常返回
+                return await asyncio.wait_for(pool.call("sign", "a", 1), timeout=10)
+            finally:
+                await pool.close()
+
+        self.assertEqual(asyncio.run(_run()), hashlib.md5(b"mca1").hexdigest())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from typing import List, Tuple
+
+from tools.keyword_runner import run_keywords
+from var import source_keyword_var
+
+
+class FetchError(Exception):
+    pass
+
+
+class TestKeywordRunner(unittest.TestCase):
+
+    def test_concurrent_keywords(self):
+        running = 0
+        max_running = 0
+        seen: List[Tuple[str, str]] = []
+
+        async def handler(keyword: str):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            # 并发执行时每个关键词读取到的仍然是自己的 source_keyword_var
+            seen.append((keyword, source_keyword_var.get()))
+            running -= 1
+            if keyword == "c":
+                raise FetchError("search failed")
+
+        results = asyncio.run(run_keywords("test", ["a", "b", "c", "d", "e"], handler, concurrency=2,
+                                           ignore_errors=(FetchError,)))
+        self.assertEqual(max_running, 2)
+        self.assertTrue(all(keyword == var for keyword, var in seen))
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(results, {"a": True, "b": True, "c": False, "d": True, "e": True})
+
+    def test_fatal_error_stops_keywords(self):
+        finished: List[str] = []
+
+        async def handler(keyword: str):
+            if keyword == "a":
+                raise RuntimeError("ip blocked")
+            await asyncio.sleep(0.05)
+            finished.append(keyword)
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run_keywords("test", ["a", "b", "c"], handler, concurrency=3, ignore_errors=(FetchError,)))
+        # 其他关键词的任务被取消，不再继续爬取
+        self.assertEqual(finished, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
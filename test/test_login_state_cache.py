@@ -0,0 +1,91 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import config
+from cache.file_cache import ExpiringFileCache
+from tools import login_state_cache
+
+
+class TestExpiringFileCache(unittest.TestCase):
+
+    def test_set_get_and_expire(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_file = os.path.join(tmp_dir, "cache", "cache.json")
+            cache = ExpiringFileCache(cache_file)
+            cache.set("login_state:xhs:a", True, 10)
+            cache.set("login_state:xhs:b", True, -1)
+            # 重新打开缓存文件后仍然有效
+            cache = ExpiringFileCache(cache_file)
+            self.assertTrue(cache.get("login_state:xhs:a"))
+            self.assertIsNone(cache.get("login_state:xhs:b"))
+            self.assertEqual(cache.keys("login_state:*"), ["login_state:xhs:a"])
+
+
+class TestCheckLoginState(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patcher = mock.patch.multiple(
+            config,
+            LOGIN_STATE_CACHE_TTL_SEC=60,
+            LOGIN_STATE_CACHE_TYPE="file",
+            LOGIN_STATE_CACHE_FILE=os.path.join(self.tmp_dir.name, "login_state_cache.json"),
+        )
+        self.patcher.start()
+        login_state_cache._cache_client = None
+        self.pong_count = 0
+
+    def tearDown(self):
+        login_state_cache._cache_client = None
+        self.patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def _pong(self, result: bool):
+        async def _run():
+            self.pong_count += 1
+            return result
+        return _run
+
+    def test_cache_success_only(self):
+        cookie_dict = {"web_session": "session-1", "acw_tc": str(time.time())}
+
+        async def _run():
+            self.assertFalse(await login_state_cache.check_login_state("xhs", cookie_dict, self._pong(False)))
+            self.assertTrue(await login_state_cache.check_login_state("xhs", cookie_dict, self._pong(True)))
+            # 其他 cookie 变化不影响缓存
+            cookie_dict["acw_tc"] = "changed"
+            self.assertTrue(await login_state_cache.check_login_state("xhs", cookie_dict, self._pong(False)))
+            # 登录会话 cookie 变化后重新检查
+            self.assertFalse(await login_state_cache.check_login_state("xhs", {"web_session": "session-2"}, self._pong(False)))
+
+        asyncio.run(_run())
+        self.assertEqual(self.pong_count, 3)
+
+    def test_without_session_cookie(self):
+        async def _run():
+            await login_state_cache.check_login_state("xhs", {"a1": "x"}, self._pong(True))
+            await login_state_cache.check_login_state("xhs", {"a1": "x"}, self._pong(True))
+
+        asyncio.run(_run())
+        self.assertEqual(self.pong_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import functools
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from tools.media_downloader import AsyncMediaDownloader, save_media_to_file
+
+
+async def _chunks(fail: bool = False):
+    for i in range(3):
+        yield bytes([i]) * 4
+    if fail:
+        raise ConnectionError("connection reset")
+
+
+class TestMediaDownloader(unittest.TestCase):
+
+    def test_save_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_file_name = os.path.join(tmp_dir, "123", "video.mp4")
+            self.assertTrue(asyncio.run(save_media_to_file(save_file_name, _chunks())))
+            with open(save_file_name, "rb") as f:
+                self.assertEqual(f.read(), b"\x00" * 4 + b"\x01" * 4 + b"\x02" * 4)
+            self.assertEqual(os.listdir(os.path.dirname(save_file_name)), ["video.mp4"])
+
+    def test_save_bytes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_file_name = os.path.join(tmp_dir, "0.jpg")
+            self.assertTrue(asyncio.run(save_media_to_file(save_file_name, b"image")))
+            with open(save_file_name, "rb") as f:
+                self.assertEqual(f.read(), b"image")
+
+    def test_interrupted_download(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_file_name = os.path.join(tmp_dir, "video.mp4")
+            self.assertFalse(asyncio.run(save_media_to_file(save_file_name, _chunks(fail=True))))
+            # 下载中断时不留下目标文件和临时文件
+            self.assertEqual(os.listdir(tmp_dir), [])
+
+
+
+class TestAsyncMediaDownloader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        os.makedirs(os.path.join(self.root, "cdn"))
+        for name in ("a.jpg", "b.jpg", "c.jpg"):
+            with open(os.path.join(self.root, "cdn", name), "wb") as f:
+                f.write(name.encode() * 1000)
+        handler = functools.partial(SimpleHTTPRequestHandler, directory=os.path.join(self.root, "cdn"))
+        handler.log_message = lambda *args: None
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.queue_file = os.path.join(self.root, "media_download_queue.jsonl")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def _save_file_name(self, name: str) -> str:
+        return os.path.join(self.root, "data", name)
+
+    def test_download_and_remove_queue_file(self):
+        downloader = AsyncMediaDownloader(worker_num=2, per_host_limit=1, queue_file=self.queue_file)
+
+        async def _run():
+            for name in ("a.jpg", "b.jpg", "c.jpg"):
+                await downloader.submit(f"{self.base_url}/{name}", self._save_file_name(name))
+            await downloader.close()
+
+        asyncio.run(_run())
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, "data"))), ["a.jpg", "b.jpg", "c.jpg"])
+        with open(self._save_file_name("b.jpg"), "rb") as f:
+            self.assertEqual(f.read(), b"b.jpg" * 1000)
+        self.assertFalse(os.path.exists(self.queue_file))
+
+    def test_keep_failed_tasks(self):
+        downloader = AsyncMediaDownloader(worker_num=2, queue_file=self.queue_file, max_attempts=2)
+        # 没有服务监听的端口，连接失败
+        unreachable_url = "http://127.0.0.1:1/d.jpg"
+
+        async def _run():
+            await downloader.submit(f"{self.base_url}/a.jpg", self._save_file_name("a.jpg"))
+            await downloader.submit(unreachable_url, self._save_file_name("d.jpg"))
+            await downloader.close()
+
+        asyncio.run(_run())
+        self.assertEqual(os.listdir(os.path.join(self.root, "data")), ["a.jpg"])
+        # 队列文件只保留下载失败的任务，并记录失败次数
+        with open(self.queue_file, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([(record["task"]["url"], record["task"]["attempts"]) for record in records], [(unreachable_url, 1)])
+
+        async def _resume():
+            downloader.start()
+            await downloader.close()
+
+        # 下次启动时重新下载，失败次数达到上限后从队列中移除
+        asyncio.run(_resume())
+        self.assertFalse(os.path.exists(self.queue_file))
+
+    def test_drop_client_error(self):
+        downloader = AsyncMediaDownloader(queue_file=self.queue_file)
+
+        async def _run():
+            await downloader.submit(f"{self.base_url}/missing.jpg", self._save_file_name("missing.jpg"))
+            await downloader.close()
+
+        asyncio.run(_run())
+        # 资源返回 404 时直接移除，不再重试
+        self.assertFalse(os.path.exists(self._save_file_name("missing.jpg")))
+        self.assertFalse(os.path.exists(self.queue_file))
+
+    def test_resume_unfinished_tasks(self):
+        def _task(name):
+            return {"url": f"{self.base_url}/{name}", "save_file_name": self._save_file_name(name), "proxy": None,
+                    "timeout": 10, "headers": None, "follow_redirects": False}
+
+        with open(self.queue_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "add", "task": _task("a.jpg")}) + "\n")
+            f.write(json.dumps({"op": "add", "task": _task("b.jpg")}) + "\n")
+            f.write(json.dumps({"op": "done", "task": _task("a.jpg")}) + "\n")
+            f.write('{"op": "add", "ta')
+
+        downloader = AsyncMediaDownloader(queue_file=self.queue_file)
+
+        async def _run():
+            downloader.start()
+            await downloader.close()
+
+        asyncio.run(_run())
+        self.assertEqual(os.listdir(os.path.join(self.root, "data")), ["b.jpg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+
+import httpx
+
+import config
+from base.base_crawler import RequestRetryError
+from media_platform.weibo.client import WeiboClient
+from tools.rate_limiter import AdaptiveRateLimiter
+
+
+def create_client() -> WeiboClient:
+    return WeiboClient(headers={}, playwright_page=None, cookie_dict={}, settings=config.get_platform_settings("wb"))
+
+
+class TestPlatformConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.platform_configs = config.PLATFORM_CONFIGS
+        self.rate_limiters = dict(AdaptiveRateLimiter._instances)
+        AdaptiveRateLimiter._instances.pop("wb", None)
+
+    def tearDown(self):
+        config.PLATFORM_CONFIGS = self.platform_configs
+        AdaptiveRateLimiter._instances.clear()
+        AdaptiveRateLimiter._instances.update(self.rate_limiters)
+
+    def test_section_overrides_global_config(self):
+        config.PLATFORM_CONFIGS = {"wb": {"KEYWORDS": "python"}, "dy": {"KEYWORDS": "golang", "START_PAGE": 3}}
+        wb_settings, dy_settings = config.get_platform_settings("wb"), config.get_platform_settings("dy")
+        self.assertEqual((wb_settings.KEYWORDS, wb_settings.START_PAGE), ("python", config.START_PAGE))
+        self.assertEqual((dy_settings.KEYWORDS, dy_settings.START_PAGE), ("golang", 3))
+        # 没有配置段的平台和 config 模块读取的仍然是全局配置
+        self.assertEqual(config.get_platform_settings("xhs").KEYWORDS, config.KEYWORDS)
+        # 创建之后修改的配置段同样生效
+        config.PLATFORM_CONFIGS["wb"]["KEYWORDS"] = "rust"
+        self.assertEqual(wb_settings.KEYWORDS, "rust")
+
+    def test_section_changes_rate_limiter(self):
+        config.PLATFORM_CONFIGS = {"wb": {"RATE_LIMIT_DEFAULT_RPS": 0.2, "RATE_LIMIT_DEFAULT_BURST": 1}}
+        rate_limiter = create_client().rate_limiter
+        self.assertEqual((rate_limiter._default_rate, rate_limiter._default_burst), (0.2, 1))
+
+    def test_section_changes_retries(self):
+        config.PLATFORM_CONFIGS = {"wb": {
+            "ENABLE_RATE_LIMITER": False,
+            "REQUEST_RETRY_MAX_ATTEMPTS": 2,
+            "REQUEST_RETRY_BASE_DELAY_SEC": 0.001,
+            "REQUEST_RETRY_MAX_DELAY_SEC": 0.001,
+        }}
+        client = create_client()
+        attempts = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal attempts
+            attempts += 1
+            return httpx.Response(503)
+
+        async def _run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+                await client.send_request(http_client, "GET", "https://m.weibo.cn", lambda response: response.json())
+
+        with self.assertRaises(RequestRetryError):
+            asyncio.run(_run())
+        self.assertEqual(attempts, 2)
+
+    def test_section_changes_http_pool(self):
+        config.PLATFORM_CONFIGS = {"wb": {"HTTP_POOL_MAX_CONNECTIONS": 7, "HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS": 3}}
+        limits = create_client()._http_pool._get_limits()
+        self.assertEqual((limits.max_connections, limits.max_keepalive_connections), (7, 3))
+        self.assertEqual(limits.keepalive_expiry, config.HTTP_POOL_KEEPALIVE_EXPIRY)
+
+    def test_check_platform_configs(self):
+        config.PLATFORM_CONFIGS = {"wb": {"KEYWORDS": "python", "RATE_LIMIT_DEFAULT_RPS": 0.5}}
+        config.check_platform_configs()
+        # 存储和数据库的配置整个进程共用，不能按平台配置
+        for key in ("SAVE_DATA_OPTION", "MYSQL_DB_HOST"):
+            config.PLATFORM_CONFIGS = {"wb": {key: "x"}}
+            with self.assertRaises(ValueError):
+                config.check_platform_configs()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+import unittest
+
+from tools.rate_limiter import AdaptiveRateLimiter
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+
+    def test_rate_and_burst(self):
+        limiter = AdaptiveRateLimiter(default_rate=1, default_burst=1, host_rules={"a.com": (20, 2)})
+
+        async def _run():
+            start = time.monotonic()
+            # 多个任务共享同一个令牌桶
+            await asyncio.gather(*[limiter.acquire("a.com") for _ in range(6)])
+            return time.monotonic() - start
+
+        elapsed = asyncio.run(_run())
+        # 突发 2 个，剩下 4 个按每秒 20 个发放
+        self.assertGreaterEqual(elapsed, 0.18)
+        self.assertLess(elapsed, 0.5)
+
+    def test_penalize_and_recover(self):
+        limiter = AdaptiveRateLimiter(default_rate=10, default_burst=1, min_rate=4, recover_step=0.5)
+        limiter.penalize("a.com")
+        self.assertEqual(limiter._get_bucket("a.com").rate, 5)
+        limiter.penalize("a.com")
+        self.assertEqual(limiter._get_bucket("a.com").rate, 4)
+        limiter.reward("a.com")
+        self.assertEqual(limiter._get_bucket("a.com").rate, 9)
+        limiter.reward("a.com")
+        self.assertEqual(limiter._get_bucket("a.com").rate, 10)
+        # 其他域名不受影响
+        self.assertEqual(limiter._get_bucket("b.com").rate, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+
+# -*- coding: utf-8 -*-
+import unittest
+
+from tools.resource_blocker import PLATFORM_ALLOWED_HOSTS, is_allowed_host, should_block_request
+
+BLOCKED_TYPES = ("image", "media", "font")
+
+
+class TestResourceBlocker(unittest.TestCase):
+
+    def test_is_allowed_host(self):
+        allowed_hosts = PLATFORM_ALLOWED_HOSTS["xhs"]
+        self.assertTrue(is_allowed_host("https://www.xiaohongshu.com/explore", allowed_hosts))
+        self.assertTrue(is_allowed_host("https://fe-static.xhscdn.com/formula-static/xhs-pc-web/public/vendor.js", allowed_hosts))
+        self.assertFalse(is_allowed_host("https://hm.baidu.com/hm.js", allowed_hosts))
+        # 只匹配完整的域名后缀
+        self.assertFalse(is_allowed_host("https://fakexiaohongshu.com/a.js", allowed_hosts))
+
+    def test_should_block_request(self):
+        allowed_hosts = PLATFORM_ALLOWED_HOSTS["xhs"]
+        self.assertFalse(should_block_request("script", "https://fe-static.xhscdn.com/a.js", BLOCKED_TYPES, allowed_hosts))
+        self.assertFalse(should_block_request("xhr", "https://edith.xiaohongshu.com/api/sns/web/v1/feed", BLOCKED_TYPES, allowed_hosts))
+        self.assertTrue(should_block_request("image", "https://sns-img-qc.xhscdn.com/a.png", BLOCKED_TYPES, allowed_hosts))
+        self.assertTrue(should_block_request("script", "https://www.googletagmanager.com/gtag.js", BLOCKED_TYPES, allowed_hosts))
+        # 页面本身总是允许加载
+        self.assertFalse(should_block_request("document", "https://example.com/", BLOCKED_TYPES, allowed_hosts))
+        # 没有配置域名的平台只按资源类型拦截
+        self.assertFalse(should_block_request("script", "https://www.googletagmanager.com/gtag.js", BLOCKED_TYPES, None))
+        self.assertTrue(should_block_request("font", "https://example.com/a.woff2", BLOCKED_TYPES, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from typing import Dict, List, Tuple
+
+from base.base_crawler import AbstractStore
+from store.store_pipeline import AsyncStorePipeline, StoreWriteError
+from var import crawler_type_var
+
+
+class MemoryStore(AbstractStore):
+    saved: List[Tuple[str, str, Dict]] = []
+    batch_sizes: List[int] = []
+    comment_failures = 0
+
+    async def store_content(self, content_item: Dict):
+        await asyncio.sleep(0)
+        self.saved.append(("content", crawler_type_var.get(), content_item))
+
+    async def store_comment(self, comment_item: Dict):
+        if MemoryStore.comment_failures:
+            MemoryStore.comment_failures -= 1
+            raise RuntimeError("database is locked")
+        self.saved.append(("comment", crawler_type_var.get(), comment_item))
+
+    async def store_creator(self, creator: Dict):
+        raise RuntimeError("write failed")
+
+    async def store_contents(self, content_items: List[Dict]):
+        self.batch_sizes.append(len(content_items))
+        await super().store_contents(content_items)
+
+
+class TestAsyncStorePipeline(unittest.TestCase):
+
+    def setUp(self):
+        MemoryStore.saved = []
+        MemoryStore.batch_sizes = []
+        MemoryStore.comment_failures = 0
+
+    def test_drain_on_close(self):
+        pipeline = AsyncStorePipeline(max_queue_size=2, worker_num=2, batch_size=3, flush_interval=10,
+                                      write_max_attempts=2, write_retry_delay=0.001)
+
+        async def _run():
+            crawler_type_var.set("search")
+            for i in range(5):
+                await pipeline.put(MemoryStore(), "content", {"id": i})
+                await pipeline.put(MemoryStore(), "comment", {"id": i})
+            # 写入失败不影响其他数据，重试后仍然失败时关闭存储队列时抛出错误
+            await pipeline.put(MemoryStore(), "creator", {"id": 0})
+            await pipeline.close()
+
+        with self.assertRaises(StoreWriteError) as ctx:
+            asyncio.run(_run())
+        self.assertIsInstance(ctx.exception.__cause__, RuntimeError)
+        self.assertEqual(len(MemoryStore.saved), 10)
+        self.assertEqual({crawler_type for _, crawler_type, _ in MemoryStore.saved}, {"search"})
+        contents = [item["id"] for store_type, _, item in MemoryStore.saved if store_type == "content"]
+        self.assertEqual(sorted(contents), list(range(5)))
+
+    def test_put_many_use_batch_store(self):
+        pipeline = AsyncStorePipeline(batch_size=10, flush_interval=10)
+
+        async def _run():
+            crawler_type_var.set("search")
+            await pipeline.put_many(MemoryStore(), "content", [{"id": i} for i in range(4)])
+            await pipeline.put_many(MemoryStore(), "content", [{"id": i} for i in range(4, 6)])
+            await pipeline.close()
+
+        asyncio.run(_run())
+        # 两批数据在同一次 flush 中合并为一次批量写入
+        self.assertEqual(MemoryStore.batch_sizes, [6])
+        self.assertEqual([item["id"] for _, _, item in MemoryStore.saved], list(range(6)))
+
+    def test_flush_by_interval(self):
+        pipeline = AsyncStorePipeline(batch_size=100, flush_interval=0.05)
+
+        async def _run():
+            crawler_type_var.set("detail")
+            await pipeline.put(MemoryStore(), "comment", {"id": 1})
+            await asyncio.sleep(0.2)
+            saved_before_close = list(MemoryStore.saved)
+            await pipeline.close()
+            return saved_before_close
+
+        self.assertEqual(asyncio.run(_run()), [("comment", "detail", {"id": 1})])
+
+    def test_retry_failed_batch(self):
+        pipeline = AsyncStorePipeline(batch_size=10, flush_interval=10, write_max_attempts=3, write_retry_delay=0.001)
+        MemoryStore.comment_failures = 2
+
+        async def _run():
+            crawler_type_var.set("search")
+            await pipeline.put(MemoryStore(), "comment", {"id": 1})
+            await pipeline.close()
+
+        asyncio.run(_run())
+        self.assertEqual(MemoryStore.saved, [("comment", "search", {"id": 1})])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from typing import Dict, List
+from unittest import mock
+
+import config
+from media_platform.xhs.client import XiaoHongShuClient
+from tools.concurrency_controller import ConcurrencyController
+
+
+class TestSubCommentThreads(unittest.TestCase):
+
+    def _create_client(self, api_limit: int) -> XiaoHongShuClient:
+        client = XiaoHongShuClient(headers={}, playwright_page=None, cookie_dict={})
+        client.concurrency = ConcurrencyController("test", limits={"api": api_limit, "comment": 1, "media": 1})
+        return client
+
+    def test_threads_run_concurrently_and_pages_in_order(self):
+        client = self._create_client(api_limit=3)
+        running = 0
+        max_running = 0
+        cursors: Dict[str, List[str]] = {}
+
+        async def get_note_sub_comments(note_id, root_comment_id, xsec_token, num=10, cursor=""):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            cursors.setdefault(root_comment_id, []).append(cursor)
+            await asyncio.sleep(0.01)
+            running -= 1
+            page = int(cursor)
+            return {
+                "has_more": page < 2,
+                "cursor": str(page + 1),
+                "comments": [{"id": f"{root_comment_id}-{page}"}],
+            }
+
+        root_comments = [
+            {"id": f"root{i}", "note_id": "note", "sub_comment_has_more": True, "sub_comment_cursor": "0"}
+            for i in range(5)
+        ]
+        # 没有更多二级评论的一级评论不需要请求
+        root_comments.append({"id": "root5", "note_id": "note", "sub_comment_has_more": False})
+
+        with mock.patch.object(config, "ENABLE_GET_SUB_COMMENTS", True), \
+                mock.patch.object(client, "get_note_sub_comments", side_effect=get_note_sub_comments):
+            result = asyncio.run(client.get_comments_all_sub_comments(root_comments, xsec_token="", crawl_interval=0))
+
+        self.assertEqual(max_running, 3)
+        self.assertEqual(len(result), 15)
+        self.assertEqual([comment["id"] for comment in result[:3]], ["root0-0", "root0-1", "root0-2"])
+        self.assertEqual(cursors["root4"], ["0", "1", "2"])
+        self.assertNotIn("root5", cursors)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from tools.words import AsyncWordCloudGenerator
+
+
+class TestAsyncWordCloudGenerator(unittest.TestCase):
+
+    def test_incremental_word_freq(self):
+        generator = AsyncWordCloudGenerator(flush_interval=3600)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            prefix = os.path.join(tmp_dir, "search_comments")
+
+            async def _run():
+                await generator.generate_word_frequency_and_cloud([{"content": "苹果 香蕉"}], prefix)
+                await generator.generate_word_frequency_and_cloud([{"content": "苹果"}, {"content": ""}], prefix)
+                # 未到生成间隔，不会写词频文件
+                self.assertFalse(os.path.exists(f"{prefix}_word_freq.json"))
+                await AsyncWordCloudGenerator.close_all()
+
+            asyncio.run(_run())
+            with open(f"{prefix}_word_freq.json", encoding="utf-8") as f:
+                word_freq = json.load(f)
+        self.assertEqual(word_freq["苹果"], 2)
+        self.assertEqual(word_freq["香蕉"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import hashlib
+import unittest
+
+from media_platform.xhs.help import b64Encode, encodeUtf8, mrc, sign
+
+# 以下期望值由优化前的纯 Python 实现生成，格式：(a1, b1, x_s, x_t, x-s-common)
+SIGN_GOLDEN_CASES = [
+    (
+        "187a8b2d9c3yg5ab0e2f6qx1c4n5d8m9h7j6k3l2p0",
+        "I38rHdgsjopgIvesdVwgIC",
+        "I38rHdgsjopgIvesdVwgIC+oIELmBZ5e3VwXLgFTIxS3bqwErFeexd0ekncAzMFYnqthIhJeSBMDKutRI3KsYorWHPtGrbV0IERRIE5eGI7sIB0sZLrrIvgekBgsIBE+ZgGRzxrWbPYcePQdIWVhIBR3I9DRPUHfInKsIP3jI9gsIBHWIi==",
+        "1722830283000",
+        "2UQAPsHCPUIjqArjwjHjNsQhPsHCH0rjNsQhPaHCH0P1+UhhN/HjNsQhPjHCHDMYGUmOLUHVHdWAH0ij2BYANgm0Ng4SGjHVHdWFH0ij+shU+UhUHjIj2eLjwjHlwe4YwBHU8eS0P7Sd+nbjPBLU808l2eb0+BhM8eYTwnW7y083P9IUqeZjNsQh+jHCH0r7P0HhPAZUwePIPeZjNsQh+UHCHDDAwoQH8B4AyfRI8FS98g+Dpd4daLP3JFSb/BMsn0pSPM87nrldzSzQ2bPAGdb7zgQB8nph8emSy9E0cgk+zSS1qgzianYt8p+s/LzN4gzaa/+NqMS6qS4HLozoqfQnPrSbLSQQz/pSzFD7qFSsPo+y/oQUag8d8nTs87+QcDL3nf4oLdkhqS4jLbS08pmz8rSgpfYQcSHAa/SrLSmpaB8QJDTAapZAyDDE87+QcDYganDROaHVHdWhH0ija/PhqDYD87+xJ7mdag8Sq9zn494QcUHVHdWEH0iTwerI+eHEw/HhNsQhP/Zjw0rM+oF=",
+    ),
+    (
+        "a1",
+        "",
+        "XYW_eyJzaWduU3ZuIjoiNTEiLCJzaWduVHlwZSI6IngxIiwiYXBwSWQiOiJ4aHMtcGMtd2ViIiwic2lnblZlcnNpb24iOiIxIiwicGF5bG9hZCI6IjAwMDAwIn0=",
+        "1700000000000",
+        "2UQAPsHCPUIjqArjwjHjNsQhPsHCH0rjNsQhPaHCH0P1+UhhN/HjNsQhPjHCHDMYGUmOLUHVHdWAH0ij2BYANgm0Ng4SGjHVHdWFH0ij+shU+UhUHjIj2eLjwjQYPaHVHdW9H0ijP/qIPeZIPeZIPeZIPsHVHdW7H0ijnbSgg9pEadkYp9zMp/+y4LSxJ9Swprpk/r+t2fbg8opnaBl7nS+Q+DS187YQyg4knpYs4M+gLnSOyLiFGLY+4B+o/gzDPS8kanS7ynPUJBEjJbkVG9EwqBHU+BSOyLShanS7yn+oz0pjzASinD+Q+DSxcg4+zrb7anhIOaHVHdWhH0ijHjIj2eDjwjFA+/GMPADIweHlNsQhP/Zjw0rM+oF=",
+    ),
+    (
+        "18c5f1a2b3e4d5c6",
+        "b1中文✓&%=xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx",
+        "XYW_abcDEF0123+/=_-abcDEF0123+/=_-abcDEF0123+/=_-abcDEF0123+/=_-abcDEF0123+/=_-abcDEF0123+/=_-abcDEF0123+/=_-abcDEF0123+/=_-",
+        "1699999999999",
+        "2UQAPsHCPUIjqArjwjHjNsQhPsHCH0rjNsQhPaHCH0P1+UhhN/HjNsQhPjHCHDMYGUmOLUHVHdWAH0ij2BYANgm0Ng4SGjHVHdWFH0ij+shU+UhUHjIj2eLjwjHlwBPM80bYPfHA8/zD+nP9HjIj2eGjwjHl+0DEw/DEw/DEw/DEHjIj2eqjwjQGnp4KGnQ0zrpBPerUPUV6OpuTGnQ0zrpBPerUPUV6OpuTGnQ0zrpBPerUPUV6OpuTGnQ0zrpBPerUPUV6OpuTGnQ0zrpBPerUPUV6OpuTGnQ0zrpBPerUPUV6OpuTGnQ0zrpBPerUPUV6OpuTGnQ0zrpBPerUPUV6OpuTHjIj2eWjwjQjPplM+BLU8blM+0Lh+MlMP0qlPUGSOgYh2oYh2oYh2oYh2oYh2oYh2oYh2oYh2oYh2oYh2oYh2oYh2oYh2oWjNsQhwaHCN/HEP/cEP/LIPArVHdWlPsHCP/LFKc==",
+    ),
+    (
+        "qmJjxFgrtgbkemxhJqocquziyEhndHACcGqdyvGxfnpAfjueHaxD",
+        "OSSGcIRp2JSRPCZ6/amxqiG96utiB6CXgS6lvQmzPJhbFZ55qF8ZN",
+        "XYW_1ZAdvqyyAY=cUYjDAAyp9l4P9eBJK08myRP4bZpNKF6m0fcjIV6WOmE6ibHKVB0CmypIJqpIYoDnkjuS77O0oVgkeVdPPtMD2lSAkOs/4e9goc98RVn0GGCT+4A=kERHblfqVi+/=d+WbUXpxLKQk4tcNa12bPMMjS7YzajDzP5ZJLaek3oevcSNE24VWlxBHqiOhbg9f0U=9Ti2U18u+l1iOXjXWi7oSd0GCcA/x91kW3BZnO5v55LKW6Dss4HGZQU3bKznrIo6Vfq6+cP3W0Z6KzgxKcjuqZUMDVY/w+ws",
+        "1756305585987",
+        "2UQAPsHCPUIjqArjwjHjNsQhPsHCH0rjNsQhPaHCH0P1+UhhN/HjNsQhPjHCHDMYGUmOLUHVHdWAH0ij2BYANgm0Ng4SGjHVHdWFH0ij+shU+UhUHjIj2eLjwjQlJLkx2r8dqdzdGfTSJgYiadb6G7bM2fSEznY18rYmc9+oqnzE4D4h8fEIcn8x4npHGgYrHjIj2eGjwjHl+AL9PAZM+/WMw/W7HjIj2eqjwjQGnp4KPpkm8o8l2gSmn/M0ppSxzrbm2gZEJezcwnpsaDVIwBMELSZFGSkI/DTB+fFI8f+xapG9pFRTz/8kGDYNpDHIc9MEqrStqgmQnnRrJfTx4pP7+FuIJM8dy9pn8bmc4rMrPfl/cnTOqUuF8/SdJ9PEwbQnJ0mozF+LtAzmOnTbLDYjJB8lpfD3NAMDtM4jppYI2rlNLnVF4B+wG/rUGSm+/nk/+MSCGnkr2SZMnDkPGnp3P9RS4f+//DLU+b8gJoYsaobk/9Yj8ASfPbLRwpzkPSLlwoL3Jebk/MYxnb4k+9R/8emoc9+mN7WEPnTgPFQyJDuM40LM/rTg+DzAqAzHzMkzp/+ja7k1qDS6+S8fq/G3GMZApAmy+DTC87YNG9kMqpkp/LznnaR7t74AHjIj2eWjwjQOLM+oGFSaqeQtLMQccMi9N9bT2obkzAD94gzkc08enB4/+fl9LnMCLrkiGD8y+/plz0Yy/jHVHdWEH0iTP0cFweLI+/cEwsIj2erIH0il+/zR",
+    ),
+]
+
+MRC_GOLDEN_CASES = [
+    ("aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa", -1110711967),
+    ("012345678901234567890123456789012345678901234567890123456789", -614507527),
+    ("XYW_zzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzz", -4259761243),
+]
+
+B64_GOLDEN_CASES = [
+    ("", ""),
+    ("a", "Gc=="),
+    ("ab", "GnH="),
+    ("abc", "GnQ0"),
+    ("中文✓ ~()*!.'%&", "ENjTEkyohkU/HohitaiYNjqSQW=="),
+]
+
+
+class TestXhsSignHelp(unittest.TestCase):
+
+    def test_sign(self):
+        for a1, b1, x_s, x_t, x_s_common in SIGN_GOLDEN_CASES:
+            signs = sign(a1=a1, b1=b1, x_s=x_s, x_t=x_t)
+            self.assertEqual(signs["x-s-common"], x_s_common)
+            self.assertEqual((signs["x-s"], signs["x-t"]), (x_s, x_t))
+            self.assertRegex(signs["x-b3-traceid"], r"^[0-9a-f]{16}$")
+
+    def test_mrc(self):
+        for text, expected in MRC_GOLDEN_CASES:
+            self.assertEqual(mrc(text), expected)
+
+    def test_b64_encode(self):
+        for text, expected in B64_GOLDEN_CASES:
+            self.assertEqual(b64Encode(encodeUtf8(text)), expected)
+        # 原实现按 16383 字节分块编码，长输入的结果与分块无关
+        self.assertEqual(hashlib.md5(b64Encode(encodeUtf8("x" * 20000)).encode()).hexdigest(), "0bef0ef22c980fb0b7439ac902b2416f")
+
+    def test_encode_utf8(self):
+        self.assertEqual(encodeUtf8("a中~%"), [97, 228, 184, 173, 126, 37])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from typing import List
+
+from media_platform.xhs.signer import XhsPlaywrightSigner
+
+
+class FakePage:
+    def __init__(self):
+        self.evaluate_args: List = []
+        self.b1 = "b1-v1"
+        # 只返回前 max_signs 个签名，模拟页面返回的结果不完整
+        self.max_signs = None
+        self.delay = 0.01
+
+    async def evaluate(self, expression, arg):
+        self.evaluate_args.append(arg)
+        await asyncio.sleep(self.delay)
+        requests, need_b1 = arg
+        return {
+            "signs": [{"X-s": f"xs-{url}", "X-t": 1} for url, _ in requests][:self.max_signs],
+            "b1": self.b1 if need_b1 else None,
+        }
+
+
+class TestXhsPlaywrightSigner(unittest.TestCase):
+
+    def test_batch_and_cache_b1(self):
+        page = FakePage()
+        signer = XhsPlaywrightSigner(page, max_batch_size=4)
+
+        async def _run():
+            results = await asyncio.gather(*[signer.sign(f"/api/{i}", {"i": i}) for i in range(6)])
+            results.append(await signer.sign("/api/next"))
+            page.b1 = "b1-v2"
+            signer.invalidate_b1()
+            results.append(await signer.sign("/api/refresh"))
+            return results
+
+        results = asyncio.run(_run())
+        # 6 个并发请求按批大小合并成 2 次 evaluate，之后每个请求 1 次
+        self.assertEqual([len(requests) for requests, _ in page.evaluate_args], [4, 2, 1, 1])
+        # b1 只在第一次和失效后读取
+        self.assertEqual([need_b1 for _, need_b1 in page.evaluate_args], [True, False, False, True])
+        self.assertEqual([params["X-s"] for params, _ in results[:6]], [f"xs-/api/{i}" for i in range(6)])
+        self.assertEqual(results[6][1], "b1-v1")
+        self.assertEqual(results[7][1], "b1-v2")
+
+    def test_missing_signs(self):
+        page = FakePage()
+        page.max_signs = 1
+        signer = XhsPlaywrightSigner(page)
+
+        async def _run():
+            return await asyncio.wait_for(
+                asyncio.gather(signer.sign("/api/0"), signer.sign("/api/1"), return_exceptions=True), timeout=1
+            )
+
+        first, second = asyncio.run(_run())
+        self.assertEqual(first[0]["X-s"], "xs-/api/0")
+        self.assertIsInstance(second, RuntimeError)
+
+    def test_cancel_flush(self):
+        page = FakePage()
+        page.delay = 10
+        signer = XhsPlaywrightSigner(page, max_batch_size=1)
+
+        async def _run():
+            futures = [asyncio.ensure_future(signer.sign(f"/api/{i}")) for i in range(3)]
+            await asyncio.sleep(0.05)
+            signer._flush_task.cancel()
+            return await asyncio.wait_for(asyncio.gather(*futures, return_exceptions=True), timeout=1)
+
+        results = asyncio.run(_run())
+        # 正在签名的一批和后续等待的请求都被取消，不会一直等待
+        self.assertTrue(all(isinstance(result, asyncio.CancelledError) for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
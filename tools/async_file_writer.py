@@ -0,0 +1,247 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 常驻文件句柄的追加写入工具（jsonl / csv），供各平台的文件存储实现复用
+import csv
+import json
+import os
+import pathlib
+import sys
+import time
+from typing import IO, Dict, List
+
+from tools import utils
+
+
+class AsyncJsonlWriter:
+    """
+    JSON Lines 追加写入器
+    每个 (crawler_type, store_type, date) 对应一个常驻的带缓冲文件句柄，每条数据只追加一行紧凑的 json，
+    写入代价与文件中已有的数据量无关；单个事件循环内写缓冲区不会被打断，所以不需要加锁
+    """
+
+    def __init__(self, buffer_size: int = 64 * 1024, flush_interval: float = 5.0):
+        """
+        :param buffer_size: 每个文件句柄的写缓冲区大小
+        :param flush_interval: 两次主动 flush 之间的最大间隔（秒）
+        """
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._handles: Dict[str, IO[str]] = {}
+        # key: 不带日期的文件前缀，value: 当前正在写入的文件路径，用于跨天时关闭前一天的句柄
+        self._current_files: Dict[str, str] = {}
+        self._written_files: List[str] = []
+        self._last_flush_time = time.monotonic()
+
+    @staticmethod
+    def make_file_name(store_path: str, crawler_type: str, store_type: str) -> str:
+        """
+        make save file name, eg: data/xhs/json/search_comments_2024-01-14.jsonl
+        """
+        return f"{store_path}/{crawler_type}_{store_type}_{utils.get_current_date()}.jsonl"
+
+    def _get_handle(self, store_path: str, crawler_type: str, store_type: str) -> IO[str]:
+        file_prefix = f"{store_path}/{crawler_type}_{store_type}"
+        file_name = self.make_file_name(store_path, crawler_type, store_type)
+        handle = self._handles.get(file_name)
+        if handle is not None:
+            return handle
+
+        # 日期变了，前一天的文件不会再被写入，直接关掉
+        previous_file = self._current_files.get(file_prefix)
+        if previous_file and previous_file in self._handles:
+            self._handles.pop(previous_file).close()
+
+        pathlib.Path(store_path).mkdir(parents=True, exist_ok=True)
+        handle = open(file_name, mode="a", encoding="utf-8", buffering=self._buffer_size)
+        self._handles[file_name] = handle
+        self._current_files[file_prefix] = file_name
+        if file_name not in self._written_files:
+            self._written_files.append(file_name)
+        return handle
+
+    async def write(self, store_path: str, crawler_type: str, store_type: str, save_item: Dict):
+        """
+        追加写入一条数据
+        Args:
+            store_path: 文件保存目录
+            crawler_type: 爬取类型（search | detail | creator）
+            store_type: 存储类型（contents | comments | creator ...）
+            save_item: 需要保存的数据
+
+        Returns:
+
+        """
+        await self.write_many(store_path, crawler_type, store_type, [save_item])
+
+    async def write_many(self, store_path: str, crawler_type: str, store_type: str, save_items: List[Dict]):
+        """
+        追加写入一批数据，一次 write 调用写入所有行
+        Args:
+            store_path: 文件保存目录
+            crawler_type: 爬取类型（search | detail | creator）
+            store_type: 存储类型（contents | comments | creator ...）
+            save_items: 需要保存的数据列表
+
+        Returns:
+
+        """
+        if not save_items:
+            return
+        handle = self._get_handle(store_path, crawler_type, store_type)
+        handle.write("".join(
+            json.dumps(save_item, ensure_ascii=False, separators=(",", ":")) + "\n" for save_item in save_items
+        ))
+        if time.monotonic() - self._last_flush_time >= self._flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        把所有句柄缓冲区中的数据刷到磁盘
+        """
+        for handle in self._handles.values():
+            handle.flush()
+        self._last_flush_time = time.monotonic()
+
+    def close(self, convert_to_json: bool = False):
+        """
+        关闭所有文件句柄
+        Args:
+            convert_to_json: 是否同时导出一份旧版的 json 数组格式文件
+
+        Returns:
+
+        """
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+        self._current_files.clear()
+
+        if convert_to_json:
+            for file_name in self._written_files:
+                json_file_name = convert_jsonl_to_json(file_name)
+                utils.logger.info(f"[AsyncJsonlWriter.close] converted {file_name} to {json_file_name}")
+        self._written_files.clear()
+
+
+class AsyncCsvWriter:
+    """
+    CSV 追加写入器
+    每个输出文件对应一个常驻的带缓冲文件句柄，表头是否已写入记录在内存中，
+    不再为每一行数据重复 mkdir、打开文件和 tell()
+    """
+
+    def __init__(self, buffer_size: int = 64 * 1024, flush_interval: float = 5.0):
+        """
+        :param buffer_size: 每个文件句柄的写缓冲区大小
+        :param flush_interval: 两次主动 flush 之间的最大间隔（秒）
+        """
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._handles: Dict[str, IO[str]] = {}
+        # key: 去掉日期后的文件名，value: 当前正在写入的文件路径，用于跨天时关闭前一天的句柄
+        self._current_files: Dict[str, str] = {}
+        self._last_flush_time = time.monotonic()
+
+    def _get_handle(self, file_name: str, header: List[str]) -> IO[str]:
+        handle = self._handles.get(file_name)
+        if handle is not None:
+            return handle
+
+        # 文件名由存储实现类按当天日期生成，去掉日期后作为同一份输出的 key
+        file_key = file_name.replace(utils.get_current_date(), "")
+        previous_file = self._current_files.get(file_key)
+        if previous_file and previous_file in self._handles:
+            self._handles.pop(previous_file).close()
+
+        pathlib.Path(file_name).parent.mkdir(parents=True, exist_ok=True)
+        need_header = not os.path.exists(file_name) or os.path.getsize(file_name) == 0
+        handle = open(file_name, mode="a", encoding="utf-8-sig", newline="", buffering=self._buffer_size)
+        if need_header:
+            csv.writer(handle).writerow(header)
+        self._handles[file_name] = handle
+        self._current_files[file_key] = file_name
+        return handle
+
+    async def write_many(self, file_name: str, save_items: List[Dict]):
+        """
+        追加写入一批数据，第一次写入新文件时先写表头
+        Args:
+            file_name: csv 文件路径，eg: data/xhs/1_search_comments_2024-01-14.csv
+            save_items: 需要保存的数据列表
+
+        Returns:
+
+        """
+        if not save_items:
+            return
+        handle = self._get_handle(file_name, list(save_items[0].keys()))
+        csv.writer(handle).writerows(save_item.values() for save_item in save_items)
+        if time.monotonic() - self._last_flush_time >= self._flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        把所有句柄缓冲区中的数据刷到磁盘
+        """
+        for handle in self._handles.values():
+            handle.flush()
+        self._last_flush_time = time.monotonic()
+
+    def close(self):
+        """
+        关闭所有文件句柄
+        """
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+        self._current_files.clear()
+
+
+def convert_jsonl_to_json(jsonl_file_name: str, json_file_name: str = "") -> str:
+    """
+    把 jsonl 文件转换为旧版的 json 数组格式（indent=4），逐行流式处理，不会把整个文件读入内存
+    Args:
+        jsonl_file_name: jsonl 文件路径
+        json_file_name: 输出的 json 文件路径，默认与 jsonl 文件同名，扩展名为 .converted.json，
+                        避免覆盖 json 存储模式写入的同名 .json 文件
+
+    Returns: 输出的 json 文件路径
+
+    """
+    if not json_file_name:
+        json_file_name = os.path.splitext(jsonl_file_name)[0] + ".converted.json"
+
+    with open(jsonl_file_name, mode="r", encoding="utf-8") as src, \
+            open(json_file_name, mode="w", encoding="utf-8") as dst:
+        first = True
+        for line in src:
+            line = line.strip()
+            if not line:
+                continue
+            item_str = json.dumps(json.loads(line), ensure_ascii=False, indent=4)
+            # 与 json.dumps(list, indent=4) 的输出保持一致：数组元素整体缩进一级
+            dst.write("[\n" if first else ",\n")
+            dst.write("\n".join("    " + item_line for item_line in item_str.split("\n")))
+            first = False
+        dst.write("[]" if first else "\n]")
+    return json_file_name
+
+
+jsonl_writer = AsyncJsonlWriter()
+csv_writer = AsyncCsvWriter()
+
+
+if __name__ == '__main__':
+    # usage: python -m tools.async_file_writer data/xhs/json/search_comments_2024-01-14.jsonl
+    for _file_name in sys.argv[1:]:
+        print(convert_jsonl_to_json(_file_name))
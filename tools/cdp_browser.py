@@ -17,7 +17,9 @@ from typing import Optional, Dict, Any
 from playwright.async_api import Browser, BrowserContext, Playwright
 
 import config
+from config import PlatformSettings
 from tools.browser_launcher import BrowserLauncher
+from tools.resource_blocker import enable_resource_blocking
 from tools import utils
 
 
@@ -26,7 +28,11 @@ class CDPBrowserManager:
     CDP浏览器管理器，负责启动和管理通过CDP连接的浏览器
     """
 
-    def __init__(self):
+    def __init__(self, settings: Optional[PlatformSettings] = None):
+        """
+        :param settings: 平台的配置，默认读取全局配置
+        """
+        self.settings = settings or config
         self.launcher = BrowserLauncher()
         self.browser: Optional[Browser] = None
         self.browser_context: Optional[BrowserContext] = None
@@ -47,7 +53,7 @@ class CDPBrowserManager:
             browser_path = await self._get_browser_path()
 
             # 2. 获取可用端口
-            self.debug_port = self.launcher.find_available_port(config.CDP_DEBUG_PORT)
+            self.debug_port = self.launcher.find_available_port(self.settings.CDP_DEBUG_PORT)
 
             # 3. 启动浏览器
             await self._launch_browser(browser_path, headless)
@@ -60,6 +66,9 @@ class CDPBrowserManager:
                 playwright_proxy, user_agent
             )
 
+            # 6. 按配置拦截不需要的请求
+            await enable_resource_blocking(browser_context, self.settings)
+
             self.browser_context = browser_context
             return browser_context
 
@@ -73,11 +82,11 @@ class CDPBrowserManager:
         获取浏览器路径
         """
         # 优先使用用户自定义路径
-        if config.CUSTOM_BROWSER_PATH and os.path.isfile(config.CUSTOM_BROWSER_PATH):
+        if self.settings.CUSTOM_BROWSER_PATH and os.path.isfile(self.settings.CUSTOM_BROWSER_PATH):
             utils.logger.info(
-                f"[CDPBrowserManager] 使用自定义浏览器路径: {config.CUSTOM_BROWSER_PATH}"
+                f"[CDPBrowserManager] 使用自定义浏览器路径: {self.settings.CUSTOM_BROWSER_PATH}"
             )
-            return config.CUSTOM_BROWSER_PATH
+            return self.settings.CUSTOM_BROWSER_PATH
 
         # 自动检测浏览器路径
         browser_paths = self.launcher.detect_browser_paths()
@@ -127,11 +136,11 @@ class CDPBrowserManager:
         """
         # 设置用户数据目录（如果启用了保存登录状态）
         user_data_dir = None
-        if config.SAVE_LOGIN_STATE:
+        if self.settings.SAVE_LOGIN_STATE:
             user_data_dir = os.path.join(
                 os.getcwd(),
                 "browser_data",
-                f"cdp_{config.USER_DATA_DIR % config.PLATFORM}",
+                f"cdp_{self.settings.USER_DATA_DIR % self.settings.PLATFORM}",
             )
             os.makedirs(user_data_dir, exist_ok=True)
             utils.logger.info(f"[CDPBrowserManager] 用户数据目录: {user_data_dir}")
@@ -146,9 +155,9 @@ class CDPBrowserManager:
 
         # 等待浏览器准备就绪
         if not self.launcher.wait_for_browser_ready(
-            self.debug_port, config.BROWSER_LAUNCH_TIMEOUT
+            self.debug_port, self.settings.BROWSER_LAUNCH_TIMEOUT
         ):
-            raise RuntimeError(f"浏览器在 {config.BROWSER_LAUNCH_TIMEOUT} 秒内未能启动")
+            raise RuntimeError(f"浏览器在 {self.settings.BROWSER_LAUNCH_TIMEOUT} 秒内未能启动")
 
         # 额外等待一秒让CDP服务完全启动
         await asyncio.sleep(1)
@@ -303,7 +312,7 @@ class CDPBrowserManager:
             #     utils.logger.info("[CDPBrowserManager] 浏览器连接已断开")
 
             # 关闭浏览器进程（如果配置为自动关闭）
-            if config.AUTO_CLOSE_BROWSER:
+            if self.settings.AUTO_CLOSE_BROWSER:
                 self.launcher.cleanup()
             else:
                 utils.logger.info(
@@ -0,0 +1,172 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 进程级的并发控制器，每个平台一个，API、评论、媒体分别有独立的并发额度
+import asyncio
+from typing import Dict, Optional
+
+import config
+from config import PlatformSettings
+from tools import utils
+
+BUDGET_API = "api"
+BUDGET_COMMENT = "comment"
+BUDGET_MEDIA = "media"
+
+
+def get_budget_limits(settings: Optional[PlatformSettings] = None) -> Dict[str, int]:
+    """
+    读取各并发额度的配置，配置为 0 时使用 MAX_CONCURRENCY_NUM
+    Args:
+        settings: 平台的配置，默认读取全局配置
+
+    Returns:
+
+    """
+    settings = settings or config
+    limits = {
+        BUDGET_API: settings.CONCURRENCY_API_NUM,
+        BUDGET_COMMENT: settings.CONCURRENCY_COMMENT_NUM,
+        BUDGET_MEDIA: settings.CONCURRENCY_MEDIA_NUM,
+    }
+    return {name: limit if limit > 0 else max(1, settings.MAX_CONCURRENCY_NUM) for name, limit in limits.items()}
+
+
+class TrackedSemaphore(asyncio.Semaphore):
+    """
+    记录已占用许可数和等待数的信号量
+    """
+
+    def __init__(self, limit: int):
+        super().__init__(limit)
+        self.limit = limit
+        self.in_use = 0
+        self.waiting = 0
+
+    async def acquire(self):
+        self.waiting += 1
+        try:
+            await super().acquire()
+        finally:
+            self.waiting -= 1
+        self.in_use += 1
+        return True
+
+    def release(self):
+        self.in_use -= 1
+        super().release()
+
+
+class ConcurrencyController:
+    """
+    平台级的并发控制器
+    - 同一个平台的爬虫和客户端共用一个控制器，MAX_CONCURRENCY_NUM 对整个进程生效，不再是每一页、每一批各自一个信号量
+    - api（详情等接口请求）、comment（评论爬取）、media（媒体相关请求）三类额度互相独立，可以分别调整
+    - 信号量在第一次使用时按当前事件循环创建，stats 可以随时查看各额度的占用情况，每个关键词结束和程序退出时输出到日志
+    """
+    _instances: Dict[str, "ConcurrencyController"] = {}
+
+    def __init__(self, platform: str, limits: Optional[Dict[str, int]] = None):
+        """
+        :param platform: 平台名称
+        :param limits: 各额度的并发数，默认读取配置
+        """
+        self.platform = platform
+        self.limits = limits or get_budget_limits()
+        self._semaphores: Dict[str, TrackedSemaphore] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def for_platform(cls, platform: str, settings: Optional[PlatformSettings] = None) -> "ConcurrencyController":
+        """
+        获取平台的并发控制器，不存在时按平台的配置创建
+        Args:
+            platform: 平台名称，xhs | dy | ks | bili | wb | tieba | zhihu
+            settings: 平台的配置，默认读取全局配置
+
+        Returns:
+
+        """
+        if platform not in cls._instances:
+            cls._instances[platform] = cls(platform, get_budget_limits(settings))
+        return cls._instances[platform]
+
+    def get_semaphore(self, budget: str) -> TrackedSemaphore:
+        """
+        获取某一类额度的信号量
+        Args:
+            budget: 额度名称，api | comment | media
+
+        Returns:
+
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # python3.9 的信号量会绑定创建时的事件循环，事件循环变化后重新创建
+            self._semaphores = {}
+            self._loop = loop
+        if budget not in self._semaphores:
+            self._semaphores[budget] = TrackedSemaphore(self.limits[budget])
+        return self._semaphores[budget]
+
+    @property
+    def api(self) -> TrackedSemaphore:
+        return self.get_semaphore(BUDGET_API)
+
+    @property
+    def comment(self) -> TrackedSemaphore:
+        return self.get_semaphore(BUDGET_COMMENT)
+
+    @property
+    def media(self) -> TrackedSemaphore:
+        return self.get_semaphore(BUDGET_MEDIA)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        各额度当前的占用情况
+        Returns: {额度名称: {"limit": 并发上限, "in_use": 已占用, "waiting": 等待中}}
+
+        """
+        result = {}
+        for budget, limit in self.limits.items():
+            semaphore = self._semaphores.get(budget)
+            result[budget] = {
+                "limit": limit,
+                "in_use": semaphore.in_use if semaphore else 0,
+                "waiting": semaphore.waiting if semaphore else 0,
+            }
+        return result
+
+    def log_stats(self):
+        """
+        把各额度的占用情况输出到日志
+        """
+        stats = ", ".join(
+            f"{budget}: {item['in_use']}/{item['limit']} in use, {item['waiting']} waiting"
+            for budget, item in self.stats().items()
+        )
+        utils.logger.info(f"[ConcurrencyController] {self.platform} concurrency {stats}")
+
+    @classmethod
+    def log_all_stats(cls):
+        """
+        把所有平台并发控制器的占用情况输出到日志
+        """
+        for controller in cls._instances.values():
+            controller.log_stats()
+
+    @classmethod
+    def all_stats(cls) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """
+        所有平台并发控制器的占用情况
+        """
+        return {platform: controller.stats() for platform, controller in cls._instances.items()}
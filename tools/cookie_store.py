@@ -0,0 +1,73 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 免浏览器模式下登录 cookie 的保存和读取
+import json
+import os
+import time
+from typing import Optional
+
+import config
+from config import PlatformSettings
+from tools import utils
+
+
+def get_cookie_file(platform: str, settings: Optional[PlatformSettings] = None) -> str:
+    return (settings or config).BROWSERLESS_COOKIE_FILE % platform
+
+
+def load_cookies(platform: str, settings: Optional[PlatformSettings] = None) -> str:
+    """
+    读取平台保存的登录 cookie，没有保存过时使用 LOGIN_TYPE 为 cookie 时配置的 COOKIES
+    Args:
+        platform: 平台名称
+        settings: 平台的配置，默认读取全局配置
+
+    Returns: cookie 字符串
+
+    """
+    settings = settings or config
+    cookie_file = get_cookie_file(platform, settings)
+    if os.path.exists(cookie_file):
+        try:
+            with open(cookie_file, "r", encoding="utf-8") as f:
+                cookie_str = json.load(f).get("cookie", "")
+            if cookie_str:
+                return cookie_str
+        except (OSError, ValueError) as e:
+            utils.logger.warning(f"[cookie_store.load_cookies] load cookies from {cookie_file} failed: {e}")
+    if settings.LOGIN_TYPE == "cookie":
+        return settings.COOKIES
+    return ""
+
+
+def save_cookies(platform: str, cookie_str: str, settings: Optional[PlatformSettings] = None):
+    """
+    保存平台的登录 cookie，SAVE_LOGIN_STATE 为 False 时不保存
+    Args:
+        platform: 平台名称
+        cookie_str: cookie 字符串
+        settings: 平台的配置，默认读取全局配置
+
+    Returns:
+
+    """
+    settings = settings or config
+    if not settings.SAVE_LOGIN_STATE or not cookie_str:
+        return
+    cookie_file = get_cookie_file(platform, settings)
+    os.makedirs(os.path.dirname(cookie_file) or ".", exist_ok=True)
+    tmp_file = f"{cookie_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({"cookie": cookie_str, "update_time": int(time.time())}, f, ensure_ascii=False)
+    os.replace(tmp_file, cookie_file)
+    utils.logger.info(f"[cookie_store.save_cookies] save {platform} cookies to {cookie_file}")
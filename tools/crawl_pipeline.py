@@ -0,0 +1,130 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 分阶段的爬取流水线，搜索、详情、存储、评论各阶段之间用有界队列连接，不再逐页串行等待
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Type
+
+import config
+from config import PlatformSettings
+from tools import utils
+
+# 阶段处理函数：返回值交给下一阶段处理，返回 None 表示丢弃该条数据
+StageHandler = Callable[[Any], Awaitable[Any]]
+
+
+def get_stage_worker_num(worker_num: int, default: int = 0) -> int:
+    """
+    获取阶段的并发数，配置为 0 时使用 default，default 也为 0 时使用 MAX_CONCURRENCY_NUM
+    Args:
+        worker_num: 配置的并发数
+        default: 默认并发数，一般是并发控制器中对应额度的并发上限
+
+    Returns:
+
+    """
+    if worker_num > 0:
+        return worker_num
+    return default if default > 0 else max(1, config.MAX_CONCURRENCY_NUM)
+
+
+class CrawlPipeline:
+    """
+    分阶段的爬取流水线
+    - 数据源（一般是逐页搜索的异步生成器）产出的数据依次经过各个阶段，每个阶段有自己的有界队列和若干并发的 worker
+    - 下一页的搜索和详情获取可以和上一页的评论获取同时进行，队列满时上游会等待，给数据源施加背压
+    - 单条数据抛出 ignore_errors 中的错误（一般是平台的 DataFetchError）只记录日志并丢弃，不影响其他数据
+    - 其他错误（IP 被封、登录失效、重试用完后的 RequestRetryError 等）会取消整个流水线并由 run 抛出
+    - run 在数据源耗尽并且各阶段队列中的数据全部处理完后返回
+    """
+
+    def __init__(self, name: str, queue_size: Optional[int] = None,
+                 ignore_errors: Tuple[Type[Exception], ...] = (), settings: Optional[PlatformSettings] = None):
+        """
+        :param name: 流水线名称，用于日志
+        :param queue_size: 每个阶段的队列容量，为 None 时在运行时读取 settings 中的 CRAWL_PIPELINE_QUEUE_SIZE
+        :param ignore_errors: 只记录日志、丢弃当前数据的错误类型
+        :param settings: 平台的配置，默认读取全局配置
+        """
+        self.name = name
+        self.queue_size = queue_size
+        self.settings = settings or config
+        self.ignore_errors = ignore_errors
+        self._stages: List[Tuple[str, StageHandler, int]] = []
+
+    def add_stage(self, name: str, handler: StageHandler, worker_num: int = 1) -> "CrawlPipeline":
+        """
+        添加一个处理阶段，阶段按添加顺序串联
+        Args:
+            name: 阶段名称，用于日志
+            handler: 处理函数，最后一个阶段的返回值会被忽略
+            worker_num: 该阶段并发处理的 worker 数
+
+        Returns: 流水线本身，方便链式调用
+
+        """
+        self._stages.append((name, handler, max(1, worker_num)))
+        return self
+
+    async def run(self, source: AsyncIterator[Any]) -> None:
+        """
+        运行流水线，worker 在这里创建，会继承调用时的上下文变量（如 source_keyword_var）
+        Args:
+            source: 数据源
+
+        Returns:
+
+        """
+        if not self._stages:
+            async for _ in source:
+                pass
+            return
+
+        queue_size = self.queue_size if self.queue_size is not None else self.settings.CRAWL_PIPELINE_QUEUE_SIZE
+        queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in self._stages]
+        workers: List[asyncio.Task] = []
+        for index, (stage_name, handler, worker_num) in enumerate(self._stages):
+            next_queue = queues[index + 1] if index + 1 < len(queues) else None
+            for _ in range(worker_num):
+                workers.append(asyncio.create_task(self._worker(stage_name, handler, queues[index], next_queue)))
+
+        async def _feed():
+            async for item in source:
+                await queues[0].put(item)
+            # 按阶段顺序等待，上一阶段处理完时它产出的数据都已经进入下一阶段的队列
+            for queue in queues:
+                await queue.join()
+
+        feeder = asyncio.create_task(_feed())
+        try:
+            # worker 只会因为致命错误结束，数据源出错或者任意一个 worker 出错时停止整个流水线
+            done, _ = await asyncio.wait([feeder, *workers], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            feeder.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(feeder, *workers, return_exceptions=True)
+
+    async def _worker(self, stage_name: str, handler: StageHandler, queue: asyncio.Queue,
+                      next_queue: Optional[asyncio.Queue]):
+        while True:
+            item = await queue.get()
+            try:
+                result = await handler(item)
+                if result is not None and next_queue is not None:
+                    await next_queue.put(result)
+            except self.ignore_errors as e:
+                utils.logger.error(f"[CrawlPipeline.{self.name}] stage {stage_name} failed: {e}")
+            finally:
+                queue.task_done()
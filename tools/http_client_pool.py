@@ -0,0 +1,142 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 常驻的 httpx 连接池，各平台的 API 客户端复用同一个连接池，避免每次请求都重新建立 TCP 和 TLS 连接
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+import config
+from config import PlatformSettings
+from tools import utils
+
+
+class HttpClientPool:
+    """
+    httpx.AsyncClient 连接池
+    - 每个代理地址对应一个常驻的 httpx.AsyncClient，切换代理时不会复用旧代理的连接
+    - 代理地址对应的连接池数量超过 max_proxy_clients 时淘汰最早创建的连接池，淘汰的连接池等正在进行的请求全部结束后再关闭
+    - 不保存响应中的 cookie
+    - 程序结束时调用 close_all 关闭所有还没有关闭的连接池
+    """
+    _instances: List["HttpClientPool"] = []
+
+    def __init__(self, max_connections: Optional[int] = None,
+                 max_keepalive_connections: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = None,
+                 http2: Optional[bool] = None,
+                 max_proxy_clients: Optional[int] = None,
+                 settings: Optional[PlatformSettings] = None):
+        """
+        参数为 None 时在创建连接池时读取 settings 中对应的 HTTP_POOL_* 配置
+        :param max_connections: 每个连接池的最大连接数
+        :param max_keepalive_connections: 每个连接池保持的最大空闲连接数
+        :param keepalive_expiry: 空闲连接的保持时间（秒）
+        :param http2: 是否启用 HTTP/2，需要安装 h2
+        :param max_proxy_clients: 最多同时保留的连接池（代理地址）数量
+        :param settings: 平台的配置，默认读取全局配置
+        """
+        self._max_connections = max_connections
+        self._max_keepalive_connections = max_keepalive_connections
+        self._keepalive_expiry = keepalive_expiry
+        self._http2 = http2
+        self._max_proxy_clients = max_proxy_clients
+        self._settings = settings or config
+        # key: 代理地址（不使用代理时为空字符串），value: 对应的连接池
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        # 每个连接池正在进行的请求数，被淘汰的连接池在请求数归零时关闭
+        self._in_flight: Dict[httpx.AsyncClient, int] = {}
+        self._evicted: List[httpx.AsyncClient] = []
+
+    def _get_option(self, value: Any, config_key: str) -> Any:
+        return value if value is not None else getattr(self._settings, config_key)
+
+    def _get_limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self._get_option(self._max_connections, "HTTP_POOL_MAX_CONNECTIONS"),
+            max_keepalive_connections=self._get_option(self._max_keepalive_connections, "HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS"),
+            keepalive_expiry=self._get_option(self._keepalive_expiry, "HTTP_POOL_KEEPALIVE_EXPIRY"),
+        )
+
+    @staticmethod
+    def _h2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            utils.logger.warning("[HttpClientPool] HTTP/2 is enabled but h2 is not installed, fallback to HTTP/1.1, run `pip install httpx[http2]` to enable it")
+            return False
+
+    @asynccontextmanager
+    async def get_client(self, proxy: Optional[str] = None) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        获取代理地址对应的连接池，不存在时创建，请求结束前连接池不会因为被淘汰而关闭
+        用法：async with pool.get_client(proxy) as client: ...
+        Args:
+            proxy: 代理地址
+
+        Returns:
+
+        """
+        client = await self._get_or_create_client(proxy)
+        self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        try:
+            yield client
+        finally:
+            self._in_flight[client] -= 1
+            if not self._in_flight[client]:
+                del self._in_flight[client]
+                if client in self._evicted:
+                    self._evicted.remove(client)
+                    await client.aclose()
+
+    async def _get_or_create_client(self, proxy: Optional[str]) -> httpx.AsyncClient:
+        key = proxy or ""
+        client = self._clients.get(key)
+        if client is not None and not client.is_closed:
+            return client
+        if len(self._clients) >= self._get_option(self._max_proxy_clients, "HTTP_POOL_MAX_PROXY_CLIENTS"):
+            oldest_key = next(iter(self._clients))
+            oldest_client = self._clients.pop(oldest_key)
+            if self._in_flight.get(oldest_client):
+                self._evicted.append(oldest_client)
+            else:
+                await oldest_client.aclose()
+        # 各平台的 cookie 都通过请求头显式传入，连接池不保存响应中的 cookie，与每次请求新建客户端时的行为保持一致
+        cookie_jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        http2 = self._get_option(self._http2, "HTTP_POOL_ENABLE_HTTP2") and self._h2_available()
+        client = httpx.AsyncClient(proxy=proxy, limits=self._get_limits(), http2=http2, cookies=cookie_jar)
+        self._clients[key] = client
+        if self not in HttpClientPool._instances:
+            HttpClientPool._instances.append(self)
+        return client
+
+    async def close(self):
+        """
+        关闭所有连接池（包括等待请求结束的被淘汰的连接池），并从 close_all 的列表中移除
+        """
+        for client in [*self._clients.values(), *self._evicted]:
+            await client.aclose()
+        self._clients = {}
+        self._evicted = []
+        if self in HttpClientPool._instances:
+            HttpClientPool._instances.remove(self)
+
+    @classmethod
+    async def close_all(cls):
+        """
+        程序结束时调用，关闭所有还没有关闭的连接池
+        """
+        for pool in list(cls._instances):
+            await pool.close()
@@ -0,0 +1,272 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 常驻的 JS 签名进程池，签名脚本在每个 node 进程中只加载一次，签名时不阻塞事件循环
+import asyncio
+import itertools
+import json
+import os
+import shutil
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from config import PlatformSettings
+from tools import utils
+
+SIGN_WORKER_JS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "libs", "sign_worker.js")
+
+# 签名结果一行的最大长度，超过 asyncio 默认的 64KB 时会读取失败
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+
+class _JsSignWorker:
+    """
+    单个常驻的 node 签名进程
+    - 写协程从签名池的队列中取出所有已经等待的调用，合并成一批写入 stdin
+    - 读协程读取 stdout 中每一批的结果，按 id 唤醒对应的调用，不是结果的行（脚本中的 console.log 等）直接跳过
+    - 任意一个协程出现致命错误时，等待中的调用全部失败，进程标记为不可用并通知签名池重新启动
+    """
+
+    def __init__(self, js_file: str, queue: "asyncio.Queue[Tuple[int, str, list, asyncio.Future]]", max_batch_size: int,
+                 on_dead: Optional[Callable[[], None]] = None):
+        self.js_file = js_file
+        self.queue = queue
+        self.max_batch_size = max_batch_size
+        self.process: Optional[asyncio.subprocess.Process] = None
+        # key: 调用 id，value: 等待结果的 future
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._dead = False
+        self._on_dead = on_dead
+
+    @property
+    def alive(self) -> bool:
+        return not self._dead and self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            "node", SIGN_WORKER_JS, self.js_file,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=_STREAM_LIMIT,
+        )
+        self._tasks = [asyncio.create_task(self._write_loop()), asyncio.create_task(self._read_loop())]
+
+    async def _write_loop(self):
+        try:
+            while True:
+                calls = [await self.queue.get()]
+                while len(calls) < self.max_batch_size and not self.queue.empty():
+                    calls.append(self.queue.get_nowait())
+                batch = []
+                for call_id, func, args, future in calls:
+                    if future.done():
+                        continue
+                    try:
+                        batch.append(json.dumps({"id": call_id, "func": func, "args": args}))
+                    except (TypeError, ValueError) as e:
+                        # 参数不能被 json 序列化时只让这一个调用失败
+                        # 去掉异常中写协程的栈帧，调用方清理栈帧（例如 traceback.clear_frames）时不会把写协程一起结束
+                        future.set_exception(e.with_traceback(None))
+                        continue
+                    self._pending[call_id] = future
+                if not batch:
+                    continue
+                self.process.stdin.write(("[" + ",".join(batch) + "]\n").encode("utf-8"))
+                await self.process.stdin.drain()
+        except Exception as e:
+            self._die(e)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    raise RuntimeError(f"sign worker of {self.js_file} exited")
+                self._handle_line(line)
+        except Exception as e:
+            self._die(e)
+
+    def _handle_line(self, line: bytes):
+        try:
+            results = json.loads(line)
+        except ValueError:
+            utils.logger.warning(f"[JsSignerPool] skip non-result output of {self.js_file}: {line[:200]!r}")
+            return
+        if not isinstance(results, list):
+            utils.logger.warning(f"[JsSignerPool] skip non-result output of {self.js_file}: {line[:200]!r}")
+            return
+        for result in results:
+            if not isinstance(result, dict) or "id" not in result:
+                continue
+            future = self._pending.pop(result["id"], None)
+            if future is None or future.done():
+                continue
+            if "error" in result:
+                future.set_exception(RuntimeError(result["error"]))
+            else:
+                future.set_result(result.get("result"))
+
+    def _die(self, error: Exception):
+        """
+        读写协程出现致命错误：标记进程不可用，等待中的调用全部失败，停止另一个协程并结束进程，通知签名池重新启动
+        """
+        if self._dead:
+            return
+        self._dead = True
+        utils.logger.error(f"[JsSignerPool] sign worker of {self.js_file} stopped: {error!r}")
+        self._fail_pending(error)
+        current_task = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current_task:
+                task.cancel()
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+        if self._on_dead is not None:
+            self._on_dead()
+
+    def _fail_pending(self, error: Exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def close(self):
+        self._dead = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.process is not None and self.process.returncode is None:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        self._fail_pending(RuntimeError(f"sign worker of {self.js_file} closed"))
+
+
+class JsSignerPool:
+    """
+    JS 签名进程池
+    - 启动 worker_num 个常驻的 node 进程，每个进程只加载一次签名脚本，不再像 execjs 那样每次签名都启动一个新进程
+    - 调用是异步的，同时等待的多个签名请求会合并成一批发给同一个进程，签名吞吐量随进程数增加
+    - 第一次调用时才启动进程，进程意外退出或者读写出错后立即重新启动，队列中等待的调用由新进程处理
+    - 没有安装 node 时退回到 execjs，在线程池中执行，同样不阻塞事件循环
+    - 程序结束时调用 close_all 关闭所有签名进程
+    """
+    _instances: List["JsSignerPool"] = []
+
+    def __init__(self, js_file: str, worker_num: Optional[int] = None, max_batch_size: int = 64,
+                 settings: Optional[PlatformSettings] = None):
+        """
+        :param js_file: 签名脚本路径，脚本中的签名函数需要是顶层的函数声明
+        :param worker_num: 常驻的 node 进程数，为 None 时在启动进程时读取 settings 中的 JS_SIGN_WORKER_NUM
+        :param max_batch_size: 每一批最多合并的签名请求数
+        :param settings: 平台的配置，默认读取全局配置
+        """
+        self.js_file = os.path.abspath(js_file)
+        self._worker_num = worker_num
+        self._settings = settings or config
+        self.max_batch_size = max_batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[_JsSignWorker] = []
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._call_ids = itertools.count()
+        self._execjs_ctx = None
+        JsSignerPool._instances.append(self)
+
+    @property
+    def worker_num(self) -> int:
+        worker_num = self._worker_num if self._worker_num is not None else self._settings.JS_SIGN_WORKER_NUM
+        return max(1, worker_num)
+
+    @staticmethod
+    def _node_available() -> bool:
+        return shutil.which("node") is not None
+
+    async def _ensure_workers(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._queue is None:
+                self._queue = asyncio.Queue()
+            self._workers = [worker for worker in self._workers if worker.alive]
+            while len(self._workers) < self.worker_num:
+                worker = _JsSignWorker(self.js_file, self._queue, self.max_batch_size, on_dead=self._on_worker_dead)
+                await worker.start()
+                self._workers.append(worker)
+                utils.logger.info(f"[JsSignerPool] start sign worker {len(self._workers)}/{self.worker_num} for {self.js_file}")
+
+    def _on_worker_dead(self):
+        if self._queue is not None:
+            asyncio.create_task(self._restart_workers())
+
+    async def _restart_workers(self):
+        try:
+            await self._ensure_workers()
+        except Exception as e:
+            # 进程无法重新启动时，队列中等待的调用全部失败，避免一直等待
+            utils.logger.error(f"[JsSignerPool] restart sign worker of {self.js_file} failed: {e!r}")
+            self._fail_queued(e)
+
+    def _fail_queued(self, error: Exception):
+        while self._queue is not None and not self._queue.empty():
+            future = self._queue.get_nowait()[-1]
+            if not future.done():
+                future.set_exception(error)
+
+    async def call(self, func: str, *args) -> Any:
+        """
+        调用签名脚本中的函数
+        Args:
+            func: 函数名
+            *args: 函数参数，需要可以被 json 序列化
+
+        Returns: 函数的返回值
+
+        """
+        if not self._node_available():
+            return await self._call_by_execjs(func, *args)
+        if len(self._workers) < self.worker_num or not all(worker.alive for worker in self._workers):
+            await self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((next(self._call_ids), func, list(args), future))
+        return await future
+
+    async def _call_by_execjs(self, func: str, *args) -> Any:
+        if self._execjs_ctx is None:
+            import execjs
+            with open(self.js_file, encoding="utf-8-sig") as f:
+                self._execjs_ctx = execjs.compile(f.read())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self._execjs_ctx.call(func, *args))
+
+    async def close(self):
+        """
+        关闭所有签名进程
+        """
+        for worker in self._workers:
+            await worker.close()
+        self._workers = []
+        self._fail_queued(RuntimeError(f"sign pool of {self.js_file} closed"))
+        self._queue = None
+        self._start_lock = None
+
+    @classmethod
+    async def close_all(cls):
+        """
+        程序结束时调用，关闭所有签名进程池
+        """
+        for pool in cls._instances:
+            await pool.close()
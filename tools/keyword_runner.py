@@ -0,0 +1,79 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 关键词搜索时多个关键词并发爬取，每个关键词一个独立的任务
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+import config
+from tools import utils
+from tools.concurrency_controller import ConcurrencyController
+from var import source_keyword_var
+
+
+async def run_keywords(name: str, keywords: List[str], handler: Callable[[str], Awaitable[None]],
+                       concurrency: int = 0, ignore_errors: Tuple[Type[Exception], ...] = (),
+                       controller: Optional[ConcurrencyController] = None) -> Dict[str, bool]:
+    """
+    并发爬取多个关键词
+    - 每个关键词在独立的任务中执行，任务有自己的上下文，source_keyword_var 互不影响
+    - 同时执行的关键词数不超过 concurrency，接口请求仍然受平台并发控制器和限流器的约束
+    - 某个关键词抛出 ignore_errors 中的错误（一般是平台的 DataFetchError）只记录日志，不影响其他关键词
+    - 其他错误（IP 被封、登录失效、重试用完后的 RequestRetryError 等）会取消其他关键词的任务并向上抛出，停止爬取
+    - 每个关键词开始和结束时输出进度，结束时同时输出平台并发控制器的占用情况
+    Args:
+        name: 调用方名称，用于日志
+        keywords: 关键词列表
+        handler: 爬取单个关键词的函数
+        concurrency: 同时爬取的关键词数，0 表示使用 KEYWORD_CONCURRENCY_NUM
+        ignore_errors: 只记录日志、不停止爬取的错误类型
+        controller: 平台的并发控制器，不为空时每个关键词结束后输出各额度的占用情况
+
+    Returns: {关键词: 是否成功}
+
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or config.KEYWORD_CONCURRENCY_NUM))
+    total = len(keywords)
+    results: Dict[str, bool] = {}
+    started, finished = 0, 0
+
+    async def _run(keyword: str):
+        nonlocal started, finished
+        async with semaphore:
+            started += 1
+            source_keyword_var.set(keyword)
+            utils.logger.info(f"[{name}] Begin keyword: {keyword} ({started}/{total})")
+            start_time = time.monotonic()
+            try:
+                await handler(keyword)
+                results[keyword] = True
+            except ignore_errors as e:
+                utils.logger.error(f"[{name}] Keyword: {keyword} failed, err: {e}")
+                results[keyword] = False
+            finished += 1
+            utils.logger.info(
+                f"[{name}] Finished keyword: {keyword} in {time.monotonic() - start_time:.1f}s, "
+                f"progress: {finished}/{total}"
+            )
+            if controller is not None:
+                controller.log_stats()
+
+    tasks = [asyncio.create_task(_run(keyword)) for keyword in keywords]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return results
@@ -0,0 +1,94 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 缓存登录态检查结果，同一份登录 cookie 在缓存时间内不再重复请求平台检查登录态
+import hashlib
+from typing import Awaitable, Callable, Dict, Optional
+
+import config
+from cache.abs_cache import AbstractCache
+from cache.cache_factory import CacheFactory
+from tools import utils
+
+# 各平台标识登录会话的 cookie，登录态缓存按这些 cookie 的值区分，其他经常变化的 cookie 不影响缓存
+PLATFORM_LOGIN_COOKIE_NAMES: Dict[str, tuple] = {
+    "xhs": ("web_session",),
+    "dy": ("sessionid",),
+    "ks": ("passToken", "userId"),
+    "bili": ("SESSDATA", "DedeUserID"),
+    "wb": ("SUB",),
+    "tieba": ("BDUSS",),
+    "zhihu": ("z_c0",),
+}
+
+_cache_client: Optional[AbstractCache] = None
+
+
+def get_cache_client() -> AbstractCache:
+    global _cache_client
+    if _cache_client is None:
+        if config.LOGIN_STATE_CACHE_TYPE == config.CACHE_TYPE_FILE:
+            _cache_client = CacheFactory.create_cache(config.CACHE_TYPE_FILE, config.LOGIN_STATE_CACHE_FILE)
+        else:
+            _cache_client = CacheFactory.create_cache(config.LOGIN_STATE_CACHE_TYPE)
+    return _cache_client
+
+
+def get_cookie_fingerprint(platform: str, cookie_dict: Dict[str, str]) -> str:
+    """
+    计算登录 cookie 的指纹，没有登录会话 cookie 时返回空字符串
+    Args:
+        platform: 平台名称
+        cookie_dict: cookie
+
+    Returns:
+
+    """
+    cookie_names = PLATFORM_LOGIN_COOKIE_NAMES.get(platform)
+    if not cookie_names or not cookie_dict:
+        return ""
+    values = [cookie_dict.get(name) or "" for name in cookie_names]
+    if not all(values):
+        return ""
+    return hashlib.sha256("\n".join(values).encode("utf-8")).hexdigest()[:32]
+
+
+async def check_login_state(platform: str, cookie_dict: Dict[str, str], pong: Callable[[], Awaitable[bool]]) -> bool:
+    """
+    检查登录态，缓存时间内检查成功过的登录 cookie 直接返回 True，只缓存检查成功的结果
+    Args:
+        platform: 平台名称
+        cookie_dict: 当前 API 客户端使用的 cookie
+        pong: API 客户端检查登录态的方法
+
+    Returns:
+
+    """
+    fingerprint = get_cookie_fingerprint(platform, cookie_dict)
+    if not fingerprint or config.LOGIN_STATE_CACHE_TTL_SEC <= 0:
+        return await pong()
+
+    cache_key = f"login_state:{platform}:{fingerprint}"
+    try:
+        if get_cache_client().get(cache_key):
+            utils.logger.info(f"[login_state_cache.check_login_state] {platform} login state is cached, skip pong")
+            return True
+    except Exception as e:
+        utils.logger.warning(f"[login_state_cache.check_login_state] read login state cache failed: {e}")
+
+    if not await pong():
+        return False
+    try:
+        get_cache_client().set(cache_key, True, config.LOGIN_STATE_CACHE_TTL_SEC)
+    except Exception as e:
+        utils.logger.warning(f"[login_state_cache.check_login_state] write login state cache failed: {e}")
+    return True
@@ -0,0 +1,309 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 媒体文件（图片、视频）下载工具
+#            - 下载内容按块写入临时文件，完成后原子重命名为目标文件
+#            - 独立的下载任务池，按 CDN 域名限制并发，与接口爬取并行执行
+import asyncio
+import json
+import os
+import pathlib
+import uuid
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Union
+from urllib.parse import urlparse
+
+import aiofiles
+import httpx
+
+import config
+from tools import utils
+from tools.http_client_pool import HttpClientPool
+
+MediaContent = Union[bytes, AsyncIterable[bytes]]
+
+
+async def iter_media_chunks(client: httpx.AsyncClient, url: str, timeout: int = 60,
+                            headers: Optional[Dict] = None, follow_redirects: bool = False) -> AsyncIterator[bytes]:
+    """
+    流式请求媒体资源，按块返回响应内容，内存中最多只保留一个块
+    Args:
+        client: httpx 客户端，一般是连接池中代理地址对应的客户端
+        url: 媒体资源地址
+        timeout: 超时时间
+        headers: 请求头
+        follow_redirects: 是否跟随重定向
+
+    Returns:
+
+    """
+    async with client.stream("GET", url, timeout=timeout, headers=headers, follow_redirects=follow_redirects) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes(config.MEDIA_DOWNLOAD_CHUNK_SIZE):
+            yield chunk
+
+
+async def _as_chunks(content: bytes) -> AsyncIterator[bytes]:
+    yield content
+
+
+async def save_media_to_file(save_file_name: str, content: MediaContent, raise_error: bool = False) -> bool:
+    """
+    把媒体内容写入文件
+    先写到同目录下的临时文件，全部写完后再原子重命名，下载中断时不会留下不完整的目标文件
+    Args:
+        save_file_name: 目标文件路径
+        content: 媒体内容，可以是 bytes，也可以是按块返回内容的异步迭代器
+        raise_error: 保存失败时是否抛出错误，默认记录日志后返回 False
+
+    Returns: 是否保存成功
+
+    """
+    if isinstance(content, (bytes, bytearray)):
+        content = _as_chunks(content)
+    pathlib.Path(save_file_name).parent.mkdir(parents=True, exist_ok=True)
+    tmp_file_name = f"{save_file_name}.{uuid.uuid4().hex}.tmp"
+    try:
+        async with aiofiles.open(tmp_file_name, 'wb') as f:
+            async for chunk in content:
+                await f.write(chunk)
+        os.replace(tmp_file_name, save_file_name)
+        return True
+    except Exception as e:
+        if os.path.exists(tmp_file_name):
+            os.remove(tmp_file_name)
+        if raise_error:
+            raise
+        utils.logger.error(f"[media_downloader.save_media_to_file] save {save_file_name} failed, {e.__class__.__name__}: {e}")
+        return False
+    finally:
+        if hasattr(content, "aclose"):
+            await content.aclose()
+
+
+_STOP = object()
+
+
+class AsyncMediaDownloader:
+    """
+    媒体文件下载池
+    - 爬取流程只负责把下载任务放进队列，由后台的下载任务并发下载，下载速度与 MAX_CONCURRENCY_NUM 无关
+    - 每个 CDN 域名单独限制并发数，避免对同一个域名请求过于频繁
+    - 下载任务同时追加记录到队列文件中，下载成功后才记录完成，程序中断或下载失败的任务下次启动时会继续下载
+    - 任务记录累计的失败次数，达到 max_attempts 或者资源返回 4xx 时从队列中移除，不会每次启动都重新下载
+    - 下载请求复用连接池，同一个代理地址的下载共用一个 httpx 客户端
+    """
+
+    def __init__(self, max_queue_size: Optional[int] = None, worker_num: Optional[int] = None,
+                 per_host_limit: Optional[int] = None, queue_file: Optional[str] = None,
+                 max_attempts: Optional[int] = None):
+        """
+        参数为 None 时在使用时读取对应的 MEDIA_DOWNLOAD_* 配置，下载池整个进程共用，不读取平台的配置段
+        :param max_queue_size: 队列容量
+        :param worker_num: 下载任务数量
+        :param per_host_limit: 每个域名的最大并发下载数
+        :param queue_file: 持久化队列文件路径，为空字符串时不持久化
+        :param max_attempts: 一个下载任务的最大尝试次数
+        """
+        self._max_queue_size = max_queue_size
+        self._worker_num = worker_num
+        self._per_host_limit = per_host_limit
+        self._queue_file = queue_file
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._queue_file_handle = None
+        self._restore_task: Optional[asyncio.Task] = None
+        self._http_pool = HttpClientPool()
+        self._max_attempts = max_attempts
+        self._failed_num = 0
+        self._dropped_num = 0
+
+    @staticmethod
+    def _get_option(value: Any, config_key: str) -> Any:
+        return value if value is not None else getattr(config, config_key)
+
+    @property
+    def queue_file(self) -> str:
+        return self._get_option(self._queue_file, "MEDIA_DOWNLOAD_QUEUE_FILE")
+
+    def start(self):
+        """
+        启动下载任务，并把队列文件中上次没有完成的任务重新放入队列
+        """
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self._get_option(self._max_queue_size, "MEDIA_DOWNLOAD_QUEUE_MAX_SIZE"))
+        worker_num = self._get_option(self._worker_num, "MEDIA_DOWNLOAD_WORKER_NUM")
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(worker_num)]
+        if not self.queue_file:
+            return
+        pending_tasks = self._load_pending_tasks()
+        pathlib.Path(self.queue_file).parent.mkdir(parents=True, exist_ok=True)
+        # 只保留没有完成的任务，重写队列文件
+        self._queue_file_handle = open(self.queue_file, "w", encoding="utf-8")
+        for task in pending_tasks:
+            self._append_record("add", task)
+        if pending_tasks:
+            utils.logger.info(f"[AsyncMediaDownloader.start] resume {len(pending_tasks)} unfinished download tasks")
+            self._restore_task = asyncio.create_task(self._put_tasks(pending_tasks))
+
+    async def submit(self, url: str, save_file_name: str, proxy: Optional[str] = None, timeout: int = 60,
+                     headers: Optional[Dict] = None, follow_redirects: bool = False):
+        """
+        提交一个下载任务，队列满时会等待
+        Args:
+            url: 媒体资源地址
+            save_file_name: 保存的文件路径
+            proxy: 代理地址
+            timeout: 超时时间
+            headers: 请求头
+            follow_redirects: 是否跟随重定向
+
+        Returns:
+
+        """
+        self.start()
+        task = {
+            "url": url,
+            "save_file_name": save_file_name,
+            "proxy": proxy,
+            "timeout": timeout,
+            "headers": headers,
+            "follow_redirects": follow_redirects,
+        }
+        self._append_record("add", task)
+        await self._queue.put(task)
+
+    async def close(self):
+        """
+        等待队列中的任务全部下载完成后停止下载任务
+        所有任务都完成时删除队列文件，有下载失败的任务时把队列文件压缩为只包含未完成的任务，下次启动时重新下载
+        """
+        if self._queue is None:
+            return
+        if self._restore_task is not None:
+            await self._restore_task
+            self._restore_task = None
+        for _ in self._workers:
+            await self._queue.put(_STOP)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self._http_pool.close()
+        if self._dropped_num:
+            utils.logger.warning(f"[AsyncMediaDownloader.close] {self._dropped_num} download tasks failed for good and were dropped")
+        if self._failed_num:
+            utils.logger.warning(f"[AsyncMediaDownloader.close] {self._failed_num} download tasks failed, they will be retried next time")
+        if not self._failed_num and not self._dropped_num:
+            utils.logger.info("[AsyncMediaDownloader.close] all pending download tasks have been finished")
+        if self._queue_file_handle is not None:
+            self._queue_file_handle.close()
+            self._queue_file_handle = None
+            self._compact_queue_file()
+        self._queue = None
+        self._workers = []
+        self._host_semaphores = {}
+        self._failed_num = 0
+        self._dropped_num = 0
+
+    def _compact_queue_file(self):
+        pending_tasks = self._load_pending_tasks()
+        if not pending_tasks:
+            os.remove(self.queue_file)
+            return
+        with open(self.queue_file, "w", encoding="utf-8") as f:
+            for task in pending_tasks:
+                f.write(json.dumps({"op": "add", "task": task}, ensure_ascii=False) + "\n")
+
+    def _load_pending_tasks(self) -> List[Dict]:
+        if not os.path.exists(self.queue_file):
+            return []
+        pending_tasks: Dict[str, Dict] = {}
+        with open(self.queue_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 程序中断时最后一行可能没有写完整
+                    continue
+                if record["op"] == "add":
+                    # 同一个文件的最后一条 add 记录中是最新的失败次数
+                    pending_tasks[record["task"]["save_file_name"]] = record["task"]
+                else:
+                    # done: 下载完成; drop: 失败次数达到上限或者资源不存在，不再下载
+                    pending_tasks.pop(record["task"]["save_file_name"], None)
+        return list(pending_tasks.values())
+
+    def _append_record(self, op: str, task: Dict):
+        if self._queue_file_handle is None:
+            return
+        self._queue_file_handle.write(json.dumps({"op": op, "task": task}, ensure_ascii=False) + "\n")
+        self._queue_file_handle.flush()
+
+    async def _put_tasks(self, tasks: List[Dict]):
+        for task in tasks:
+            await self._queue.put(task)
+
+    async def _worker(self):
+        while True:
+            task = await self._queue.get()
+            if task is _STOP:
+                return
+            try:
+                await self._download(task)
+            except Exception as e:
+                self._on_download_failed(task, e)
+            else:
+                self._append_record("done", task)
+
+    def _on_download_failed(self, task: Dict, error: Exception):
+        """
+        记录下载失败的任务：失败次数加一后重新记录到队列文件中，下次启动时重新下载；
+        失败次数达到上限或者资源返回 4xx（不会因为重试而成功）时从队列中移除
+        """
+        attempts = task.get("attempts", 0) + 1
+        error_msg = f"{error.__class__.__name__}: {error}"
+        max_attempts = max(1, self._get_option(self._max_attempts, "MEDIA_DOWNLOAD_MAX_ATTEMPTS"))
+        if self._is_client_error(error) or attempts >= max_attempts:
+            utils.logger.error(f"[AsyncMediaDownloader._worker] download {task['url']} failed {attempts} times, "
+                               f"drop the task, {error_msg}")
+            self._append_record("drop", task)
+            self._dropped_num += 1
+            return
+        utils.logger.error(f"[AsyncMediaDownloader._worker] download {task['url']} failed {attempts} times, {error_msg}")
+        self._append_record("add", dict(task, attempts=attempts))
+        self._failed_num += 1
+
+    @staticmethod
+    def _is_client_error(error: Exception) -> bool:
+        if not isinstance(error, httpx.HTTPStatusError):
+            return False
+        status_code = error.response.status_code
+        # 408 请求超时、429 请求过多可以稍后重试
+        return 400 <= status_code < 500 and status_code not in (408, 429)
+
+    async def _download(self, task: Dict):
+        save_file_name = task["save_file_name"]
+        if os.path.exists(save_file_name):
+            return
+        host = urlparse(task["url"]).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._get_option(self._per_host_limit, "MEDIA_DOWNLOAD_PER_HOST_LIMIT"))
+            self._host_semaphores[host] = semaphore
+        async with semaphore:
+            async with self._http_pool.get_client(task["proxy"]) as client:
+                chunks = iter_media_chunks(client, task["url"], timeout=task["timeout"],
+                                           headers=task["headers"], follow_redirects=task["follow_redirects"])
+                await save_media_to_file(save_file_name, chunks, raise_error=True)
+            utils.logger.info(f"[AsyncMediaDownloader._download] save media {save_file_name} success ...")
+
+
+media_downloader = AsyncMediaDownloader()
@@ -0,0 +1,161 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按域名限流的令牌桶，所有请求任务共享，遇到风控时自动降速
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+import config
+from config import PlatformSettings
+from tools import utils
+
+
+class TokenBucket:
+    """
+    单个域名的令牌桶
+    rate 为当前速率（每秒请求数），遇到风控时乘性降低，请求成功时加性恢复到配置的速率
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.configured_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        # 在事件循环中第一次获取令牌时创建
+        self.lock: Optional[asyncio.Lock] = None
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+
+class AdaptiveRateLimiter:
+    """
+    按域名限流
+    - 每个域名一个令牌桶，速率和突发数可以按域名配置
+    - 遇到验证码、403、IP 被封等风控响应时把该域名的速率乘以 backoff_factor，之后每次请求成功按 recover_step 逐步恢复
+    - 每个平台一个限流器，由 for_platform 按平台的配置创建
+    """
+    _instances: Dict[str, "AdaptiveRateLimiter"] = {}
+
+    def __init__(self, default_rate: float = 1.0, default_burst: int = 3,
+                 host_rules: Optional[Dict[str, Tuple[float, int]]] = None,
+                 backoff_factor: float = 0.5, min_rate: float = 0.05, recover_step: float = 0.02):
+        """
+        :param default_rate: 默认每秒请求数
+        :param default_burst: 默认突发请求数
+        :param host_rules: 按域名配置的 (每秒请求数, 突发请求数)
+        :param backoff_factor: 遇到风控时速率降低的比例
+        :param min_rate: 最低速率
+        :param recover_step: 每次请求成功后恢复的速率，占配置速率的比例
+        """
+        self._default_rate = default_rate
+        self._default_burst = default_burst
+        self._host_rules = host_rules or {}
+        self._backoff_factor = backoff_factor
+        self._min_rate = min_rate
+        self._recover_step = recover_step
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    @classmethod
+    def for_platform(cls, settings: PlatformSettings) -> "AdaptiveRateLimiter":
+        """
+        获取平台的限流器，不存在时按平台的配置创建
+        Args:
+            settings: 平台的配置
+
+        Returns:
+
+        """
+        platform = settings.PLATFORM
+        if platform not in cls._instances:
+            cls._instances[platform] = cls(
+                default_rate=settings.RATE_LIMIT_DEFAULT_RPS,
+                default_burst=settings.RATE_LIMIT_DEFAULT_BURST,
+                host_rules=settings.RATE_LIMIT_HOST_RULES,
+                backoff_factor=settings.RATE_LIMIT_BACKOFF_FACTOR,
+                min_rate=settings.RATE_LIMIT_MIN_RPS,
+            )
+        return cls._instances[platform]
+
+    def _get_bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self._host_rules.get(host, (self._default_rate, self._default_burst))
+            bucket = TokenBucket(rate, burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    async def acquire(self, host: str):
+        """
+        获取一个请求令牌，令牌不足时等待
+        Args:
+            host: 请求的域名
+
+        Returns:
+
+        """
+        bucket = self._get_bucket(host)
+        if bucket.lock is None:
+            bucket.lock = asyncio.Lock()
+        # 持有锁等待，保证同一个域名的请求按顺序获取令牌
+        async with bucket.lock:
+            bucket.refill()
+            if bucket.tokens < 1:
+                await asyncio.sleep((1 - bucket.tokens) / bucket.rate)
+                bucket.refill()
+            bucket.tokens -= 1
+
+    def penalize(self, host: str):
+        """
+        遇到风控时降低该域名的速率
+        Args:
+            host: 请求的域名
+
+        Returns:
+
+        """
+        bucket = self._get_bucket(host)
+        bucket.refill()
+        bucket.rate = max(self._min_rate, bucket.rate * self._backoff_factor)
+        bucket.tokens = min(bucket.tokens, 0)
+        utils.logger.warning(f"[AdaptiveRateLimiter.penalize] {host} is rate limited, slow down to {bucket.rate:.3f} requests/s")
+
+    def reward(self, host: str):
+        """
+        请求成功后逐步恢复该域名的速率
+        Args:
+            host: 请求的域名
+
+        Returns:
+
+        """
+        bucket = self._get_bucket(host)
+        if bucket.rate < bucket.configured_rate:
+            bucket.refill()
+            bucket.rate = min(bucket.configured_rate, bucket.rate + bucket.configured_rate * self._recover_step)
+
+
+def get_crawl_interval(interval: float, settings: Optional[PlatformSettings] = None) -> float:
+    """
+    开启限流器时请求节奏由限流器控制，不再额外随机等待
+    Args:
+        interval: 不开启限流器时的等待时间
+        settings: 平台的配置，默认读取全局配置
+
+    Returns:
+
+    """
+    return 0 if (settings or config).ENABLE_RATE_LIMITER else interval
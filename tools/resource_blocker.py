@@ -0,0 +1,117 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 浏览器请求拦截策略，浏览器只用来获取 cookie、localStorage 和执行签名函数，不需要加载图片、视频、字体和第三方统计脚本
+from typing import Dict, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext, Route
+
+import config
+from config import PlatformSettings
+from tools import utils
+
+# 各平台允许请求的域名（包含子域名），签名依赖的脚本都在这些域名下，其他第三方域名的请求会被拦截
+PLATFORM_ALLOWED_HOSTS: Dict[str, Tuple[str, ...]] = {
+    "xhs": ("xiaohongshu.com", "xhscdn.com"),
+    "dy": ("douyin.com", "douyinstatic.com", "bytedance.com", "bytescm.com", "byteimg.com", "bytegoofy.com",
+           "zijieapi.com", "snssdk.com", "pstatp.com", "ibytedtos.com"),
+    "ks": ("kuaishou.com", "kuaishouzt.com", "yximgs.com", "ksapisrv.com"),
+    "bili": ("bilibili.com", "hdslb.com", "biliapi.net", "biliapi.com"),
+    "wb": ("weibo.com", "weibo.cn", "sinaimg.cn", "sina.com.cn", "sina.cn"),
+    "tieba": ("baidu.com", "bdstatic.com", "bdimg.com"),
+    "zhihu": ("zhihu.com", "zhimg.com"),
+}
+
+# 浏览器通过 route 拦截的 url 规则
+_ROUTE_PATTERN = "**/*"
+
+
+def is_allowed_host(url: str, allowed_hosts: Sequence[str]) -> bool:
+    """
+    判断请求的域名是否在允许的域名（包含子域名）中
+    Args:
+        url: 请求地址
+        allowed_hosts: 允许的域名
+
+    Returns:
+
+    """
+    host = urlparse(url).hostname or ""
+    return any(host == allowed_host or host.endswith(f".{allowed_host}") for allowed_host in allowed_hosts)
+
+
+def should_block_request(resource_type: str, url: str,
+                         blocked_resource_types: Sequence[str],
+                         allowed_hosts: Optional[Sequence[str]]) -> bool:
+    """
+    判断浏览器中的请求是否需要拦截
+    Args:
+        resource_type: playwright 的资源类型，例如 document、script、image
+        url: 请求地址
+        blocked_resource_types: 需要拦截的资源类型
+        allowed_hosts: 允许请求的域名，为 None 时不按域名拦截
+
+    Returns:
+
+    """
+    if resource_type == "document":
+        return False
+    if resource_type in blocked_resource_types:
+        return True
+    if allowed_hosts is not None and not is_allowed_host(url, allowed_hosts):
+        return True
+    return False
+
+
+async def enable_resource_blocking(browser_context: BrowserContext, settings: Optional[PlatformSettings] = None):
+    """
+    为浏览器上下文开启请求拦截，ENABLE_BROWSER_RESOURCE_BLOCKING 为 False 时不做任何处理
+    Args:
+        browser_context: 浏览器上下文
+        settings: 平台的配置，默认读取全局配置
+
+    Returns:
+
+    """
+    settings = settings or config
+    if not settings.ENABLE_BROWSER_RESOURCE_BLOCKING:
+        return
+    platform = settings.PLATFORM
+    blocked_resource_types = tuple(settings.BROWSER_BLOCKED_RESOURCE_TYPES)
+    allowed_hosts = PLATFORM_ALLOWED_HOSTS.get(platform)
+
+    async def _handle_route(route: Route):
+        request = route.request
+        if should_block_request(request.resource_type, request.url, blocked_resource_types, allowed_hosts):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await browser_context.route(_ROUTE_PATTERN, _handle_route)
+    utils.logger.info(f"[resource_blocker] Enable resource blocking for {platform}, blocked resource types: {blocked_resource_types}")
+
+
+async def disable_resource_blocking(browser_context: BrowserContext, settings: Optional[PlatformSettings] = None):
+    """
+    关闭请求拦截，扫码、手机号登录前调用，避免登录二维码和验证码图片无法加载，登录完成后需要重新调用 enable_resource_blocking
+    Args:
+        browser_context: 浏览器上下文
+        settings: 平台的配置，默认读取全局配置
+
+    Returns:
+
+    """
+    if not (settings or config).ENABLE_BROWSER_RESOURCE_BLOCKING:
+        return
+    await browser_context.unroute(_ROUTE_PATTERN)
+    utils.logger.info("[resource_blocker] Disable resource blocking before login")
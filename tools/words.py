@@ -12,72 +12,192 @@
 import asyncio
 import json
 import logging
+import time
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
 
 import aiofiles
-import jieba
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
 
 import config
 from tools import utils
 
-plot_lock = asyncio.Lock()
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+# 以下全局变量只在进程池的子进程中使用，由 _init_worker 初始化
+_stop_words: Set[str] = set()
+
+
+def _init_worker(stop_words_file: str, custom_words: Dict[str, str]):
+    """
+    进程池子进程的初始化函数，每个子进程只加载一次停用词和自定义词
+    """
+    global _stop_words
+    import jieba
+    logging.getLogger('jieba').setLevel(logging.WARNING)
+    with open(stop_words_file, 'r', encoding='utf-8') as f:
+        _stop_words = set(f.read().strip().split('\n'))
+    for word in custom_words:
+        jieba.add_word(word)
+
+
+def cut_words(texts: List[str]) -> Counter:
+    """
+    分词并统计词频（在子进程中执行）
+    Args:
+        texts: 待分词的文本列表
+
+    Returns: 词频
+
+    """
+    import jieba
+    words = [word for word in jieba.lcut(' '.join(texts)) if word not in _stop_words and len(word.strip()) > 0]
+    return Counter(words)
+
+
+def render_word_cloud(word_freq: Dict[str, int], save_words_prefix: str, font_path: str):
+    """
+    根据词频渲染词云图（在子进程中执行）
+    Args:
+        word_freq: 词频
+        save_words_prefix: 保存文件的前缀
+        font_path: 中文字体文件路径
+
+    Returns:
+
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+
+    top_20_word_freq = {word: freq for word, freq in
+                        sorted(word_freq.items(), key=lambda item: item[1], reverse=True)[:20]}
+    wordcloud = WordCloud(
+        font_path=font_path,
+        width=800,
+        height=400,
+        background_color='white',
+        max_words=200,
+        colormap='viridis',
+        contour_color='steelblue',
+        contour_width=1
+    ).generate_from_frequencies(top_20_word_freq)
+
+    # Save word cloud image
+    plt.figure(figsize=(10, 5), facecolor='white')
+    plt.imshow(wordcloud, interpolation='bilinear')
+
+    plt.axis('off')
+    plt.tight_layout(pad=0)
+    plt.savefig(f"{save_words_prefix}_word_cloud.png", format='png', dpi=300)
+    plt.close()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=config.WORDCLOUD_PROCESS_NUM,
+            initializer=_init_worker,
+            initargs=(config.STOP_WORDS_FILE, config.CUSTOM_WORDS),
+        )
+    return _process_pool
+
 
 class AsyncWordCloudGenerator:
-    def __init__(self):
-        logging.getLogger('jieba').setLevel(logging.WARNING)
-        self.stop_words_file = config.STOP_WORDS_FILE
-        self.lock = asyncio.Lock()
-        self.stop_words = self.load_stop_words()
-        self.custom_words = config.CUSTOM_WORDS
-        for word, group in self.custom_words.items():
-            jieba.add_word(word)
-
-    def load_stop_words(self):
-        with open(self.stop_words_file, 'r', encoding='utf-8') as f:
-            return set(f.read().strip().split('\n'))
-
-    async def generate_word_frequency_and_cloud(self, data, save_words_prefix):
-        all_text = ' '.join(item['content'] for item in data)
-        words = [word for word in jieba.lcut(all_text) if word not in self.stop_words and len(word.strip()) > 0]
-        word_freq = Counter(words)
+    """
+    增量词云生成器
+    - 每次只对新增的数据分词，词频累加到常驻内存的 Counter 中
+    - 词频文件和词云图每个 flush_interval 秒最多生成一次，程序结束时再生成一次
+    - 分词和渲染都在进程池中执行，不阻塞事件循环
+    """
+    _instances: List["AsyncWordCloudGenerator"] = []
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        """
+        :param flush_interval: 词云生成的最小间隔（秒），为 None 时每次读取 WORDCLOUD_FLUSH_INTERVAL_SEC
+        """
+        self._flush_interval = flush_interval
+        # key: 词云文件前缀，value: 累计词频
+        self.word_freqs: Dict[str, Counter] = {}
+        self._last_flush_time: Dict[str, float] = {}
+        self._dirty_prefixes: Set[str] = set()
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        AsyncWordCloudGenerator._instances.append(self)
+
+    async def generate_word_frequency_and_cloud(self, data: List[Dict], save_words_prefix: str):
+        """
+        对新增的数据分词并累加词频，距离上次生成超过 flush_interval 秒时在后台生成词频文件和词云图
+        Args:
+            data: 新增的数据，只会使用其中的 content 字段
+            save_words_prefix: 保存文件的前缀
+
+        Returns:
+
+        """
+        texts = [item.get('content') for item in data if item.get('content')]
+        if not texts:
+            return
+
+        loop = asyncio.get_running_loop()
+        word_freq: Counter = await loop.run_in_executor(get_process_pool(), cut_words, texts)
+        self.word_freqs.setdefault(save_words_prefix, Counter()).update(word_freq)
+        self._dirty_prefixes.add(save_words_prefix)
+
+        now = time.monotonic()
+        last_flush_time = self._last_flush_time.setdefault(save_words_prefix, now)
+        flush_interval = self._flush_interval if self._flush_interval is not None else config.WORDCLOUD_FLUSH_INTERVAL_SEC
+        if now - last_flush_time < flush_interval:
+            return
+        flush_task = self._flush_tasks.get(save_words_prefix)
+        if flush_task is not None and not flush_task.done():
+            utils.logger.info("Skipping word cloud generation as the previous one is still running.")
+            return
+        self._last_flush_time[save_words_prefix] = now
+        self._flush_tasks[save_words_prefix] = asyncio.create_task(self.flush(save_words_prefix))
+
+    async def flush(self, save_words_prefix: str):
+        """
+        保存词频文件并渲染词云图
+        Args:
+            save_words_prefix: 保存文件的前缀
+
+        Returns:
+
+        """
+        self._dirty_prefixes.discard(save_words_prefix)
+        word_freq = dict(self.word_freqs.get(save_words_prefix, {}))
 
         # Save word frequency to file
         freq_file = f"{save_words_prefix}_word_freq.json"
         async with aiofiles.open(freq_file, 'w', encoding='utf-8') as file:
             await file.write(json.dumps(word_freq, ensure_ascii=False, indent=4))
 
-        # Try to acquire the plot lock without waiting
-        if plot_lock.locked():
-            utils.logger.info("Skipping word cloud generation as the lock is held.")
-            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(get_process_pool(), render_word_cloud, word_freq, save_words_prefix, config.FONT_PATH)
+        except Exception as e:
+            utils.logger.error(f"[AsyncWordCloudGenerator.flush] render word cloud {save_words_prefix} failed: {e}")
+
+    async def close(self):
+        """
+        等待后台的生成任务结束，并为还没有生成过的最新词频再生成一次
+        """
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks.values(), return_exceptions=True)
+            self._flush_tasks.clear()
+        for save_words_prefix in list(self._dirty_prefixes):
+            await self.flush(save_words_prefix)
 
-        await self.generate_word_cloud(word_freq, save_words_prefix)
-
-    async def generate_word_cloud(self, word_freq, save_words_prefix):
-        await plot_lock.acquire()
-        top_20_word_freq = {word: freq for word, freq in
-                            sorted(word_freq.items(), key=lambda item: item[1], reverse=True)[:20]}
-        wordcloud = WordCloud(
-            font_path=config.FONT_PATH,
-            width=800,
-            height=400,
-            background_color='white',
-            max_words=200,
-            stopwords=self.stop_words,
-            colormap='viridis',
-            contour_color='steelblue',
-            contour_width=1
-        ).generate_from_frequencies(top_20_word_freq)
-
-        # Save word cloud image
-        plt.figure(figsize=(10, 5), facecolor='white')
-        plt.imshow(wordcloud, interpolation='bilinear')
-
-        plt.axis('off')
-        plt.tight_layout(pad=0)
-        plt.savefig(f"{save_words_prefix}_word_cloud.png", format='png', dpi=300)
-        plt.close()
-
-        plot_lock.release()
\ No newline at end of file
+    @classmethod
+    async def close_all(cls):
+        """
+        程序结束时调用，生成所有词云生成器的最终结果并关闭进程池
+        """
+        global _process_pool
+        for generator in cls._instances:
+            await generator.close()
+        if _process_pool is not None:
+            _process_pool.shutdown()
+            _process_pool = None